@@ -0,0 +1,55 @@
+"""Montants des devis en centimes entiers, calculés pour toutes les lignes d'un coup (numpy)
+
+Le montant d'une ligne vaut quantite × prix_unitaire arrondi au centime, la demi-unité
+s'éloignant de zéro (arrondi commercial). Quantités (au millième) et prix (au centime) sont
+d'abord ramenés à des entiers : le produit est exact, 3 × 0,10 € fait 0,30 € et non
+0,30000000000000004. Le HT est la somme des lignes ; la TVA est arrondie une seule fois, sur le HT.
+Les bornes gardent tous les calculs dans un int64.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+QUANTITE_MAX = 1_000_000
+PRIX_UNITAIRE_MAX = 1_000_000  # euros
+LIGNES_MAX = 10_000
+
+class ErreurMontant(ValueError):
+    """Quantité, prix ou nombre de lignes hors des bornes du calcul exact"""
+
+def arrondir_division(numerateur, diviseur: int):
+    """numerateur / diviseur arrondi à l'entier, la demi-unité s'éloignant de zéro (tableaux ou entiers)"""
+    signe = np.sign(numerateur)
+    return signe * ((np.abs(numerateur) + diviseur // 2) // diviseur)
+
+def _verifier(valeurs: np.ndarray, maximum: int, libelle: str):
+    if valeurs.size and not (np.isfinite(valeurs).all() and np.abs(valeurs).max() <= maximum):
+        raise ErreurMontant(f"{libelle} hors bornes : {maximum} au maximum en valeur absolue")
+
+def montants_lignes(quantites: Sequence[float], prix_unitaires: Sequence[float]) -> np.ndarray:
+    """Montant de chaque ligne, en centimes (int64)"""
+    quantites = np.asarray(quantites, dtype=np.float64)
+    prix_unitaires = np.asarray(prix_unitaires, dtype=np.float64)
+    if quantites.size > LIGNES_MAX:
+        raise ErreurMontant(f"Devis trop grand : {LIGNES_MAX} lignes maximum")
+    _verifier(quantites, QUANTITE_MAX, "Quantité")
+    _verifier(prix_unitaires, PRIX_UNITAIRE_MAX, "Prix unitaire")
+    milliemes = np.rint(quantites * 1000).astype(np.int64)
+    centimes = np.rint(prix_unitaires * 100).astype(np.int64)
+    return arrondir_division(milliemes * centimes, 1000)
+
+def totaux(montant_ht: int, taux_tva: float) -> Tuple[int, int, int]:
+    """(HT, TVA, TTC) en centimes à partir du HT en centimes ; taux en pourcentage (20.0, 5.5...)"""
+    montant_ht = int(montant_ht)
+    montant_tva = int(arrondir_division(montant_ht * round(taux_tva * 100), 10_000))
+    return montant_ht, montant_tva, montant_ht + montant_tva
+
+def en_centimes(montant: float) -> int:
+    """Montant en euros déjà arrondi au centime (tel que stocké) vers les centimes"""
+    return int(round(montant * 100))
+
+def en_euros(centimes):
+    """Centimes (entier ou tableau) vers des euros flottants, tels qu'exposés par l'API"""
+    if isinstance(centimes, np.ndarray):
+        return (centimes / 100).tolist()
+    return centimes / 100
@@ -0,0 +1 @@
+"""Tir de charge du backend : scénarios, paliers de concurrence, base MongoDB en mémoire"""
@@ -0,0 +1,89 @@
+"""Tir de charge du backend, en processus (ASGI) ou contre un uvicorn local
+
+    python -m charge --memoire --paliers 1:10,10:20,50:30
+    python -m charge --url http://localhost:8001 --melange crud=1,calendrier=4 --json rapport.json
+    python -m charge --memoire --verifier
+
+Sans --url, l'application server.py est appelée directement via ASGI (pas de réseau) ; la base
+est celle de MONGO_URL / DB_NAME, ou les dépôts en mémoire avec --memoire. --verifier exécute
+chaque scénario une fois et échoue à la première réponse inattendue (test de fumée).
+Le rapport donne, par palier et par route, le débit et les latences p50 / p95 / p99.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+
+import httpx
+
+from .harnais import ClientMesure, ErreurScenario, Mesures, executer_tir, formater_rapport, lire_melange, lire_paliers
+from .scenarios import MELANGE_DEFAUT, SCENARIOS, precharger
+
+def fabrique_asgi(memoire: bool):
+    if memoire:
+        os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+        os.environ.setdefault('DB_NAME', 'charge')
+    import server
+    if memoire:
+        from depots import Depots
+        server.depots = Depots.memoire()
+    transport = httpx.ASGITransport(app=server.app)
+    return lambda: httpx.AsyncClient(transport=transport, base_url="http://charge", timeout=60)
+
+def fabrique_url(url: str):
+    return lambda: httpx.AsyncClient(base_url=url.rstrip('/'), timeout=60)
+
+async def verifier(fabrique_client) -> int:
+    """Chaque scénario une fois, dans l'ordre ; code de sortie non nul à la première erreur"""
+    mesures = Mesures()
+    alea = random.Random(0)
+    async with fabrique_client() as client:
+        client_mesure = ClientMesure(client, mesures)
+        for nom, scenario in SCENARIOS.items():
+            try:
+                await scenario(client_mesure, alea)
+            except ErreurScenario:
+                print(f"ÉCHEC {nom} : {mesures.exemples_erreurs[-1]}")
+                return 1
+            print(f"OK    {nom}")
+    return 0
+
+async def principal(args) -> int:
+    fabrique_client = fabrique_url(args.url) if args.url else fabrique_asgi(args.memoire)
+
+    if args.verifier:
+        return await verifier(fabrique_client)
+
+    if args.prechargement:
+        async with fabrique_client() as client:
+            await precharger(ClientMesure(client, Mesures()), random.Random(args.graine), args.prechargement)
+
+    rapport = await executer_tir(
+        fabrique_client, SCENARIOS, lire_melange(args.melange), lire_paliers(args.paliers), args.graine
+    )
+    print(formater_rapport(rapport))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fichier:
+            json.dump(rapport, fichier, ensure_ascii=False, indent=2)
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m charge', description="Tir de charge du backend CRM")
+    parser.add_argument('--url', help="URL d'un serveur local (ex. http://localhost:8001) ; sinon ASGI en processus")
+    parser.add_argument('--memoire', action='store_true', help="Base en mémoire au lieu de MongoDB (mode ASGI)")
+    parser.add_argument('--paliers', default='1:5,10:10', help="concurrence:durée_s,... (défaut : %(default)s)")
+    parser.add_argument('--melange', default=MELANGE_DEFAUT,
+                        help=f"scénario=poids,... parmi {', '.join(SCENARIOS)} (défaut : %(default)s)")
+    parser.add_argument('--prechargement', type=int, default=20, help="Clients créés avant le tir")
+    parser.add_argument('--graine', type=int, default=0)
+    parser.add_argument('--json', help="Écrit le rapport complet dans ce fichier")
+    parser.add_argument('--verifier', action='store_true', help="Exécute chaque scénario une fois (test de fumée)")
+    args = parser.parse_args(argv)
+    if args.url and args.memoire:
+        parser.error("--memoire ne s'applique qu'au mode ASGI (sans --url)")
+    return asyncio.run(principal(args))
+
+if __name__ == '__main__':
+    sys.exit(main())
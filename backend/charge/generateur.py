@@ -0,0 +1,363 @@
+"""Jeu de données CRM synthétique et déterministe, pour reproduire les volumes de production
+
+    python -m charge.generateur --clients 100000 --graine 7
+    python -m charge.generateur --clients 1000000 --prospects 3000000 --lot 5000 --vider
+
+Par client : ses affaires (nombre moyen réglable), leurs actions et, pour une partie d'entre
+elles, un devis dont le statut suit celui de l'affaire. Les identifiants, noms, dates et
+montants sont tirés d'un unique générateur pseudo-aléatoire : même graine et mêmes volumes
+donnent les mêmes documents, octet pour octet. Les dates sont réparties sur les trois années
+précédant la date de référence (fixe par défaut) et les actions s'étalent jusqu'à quatre mois
+après. Une petite part des prospects reprend l'identité d'un client avec une autre graphie
+de l'email ou du téléphone, comme les doublons saisis à la main.
+
+Les documents sont produits au fil de l'eau et écrits par lots insert_many(ordered=False),
+plusieurs lots en vol : la mémoire reste bornée quel que soit le volume.
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+import unicodedata
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+DATE_REFERENCE = datetime(2025, 6, 30, 9, 0, tzinfo=timezone.utc)
+LIGNES_MAX = 2000
+
+NOMS = [
+    "Martin", "Bernard", "Thomas", "Petit", "Robert", "Richard", "Durand", "Dubois", "Moreau", "Laurent",
+    "Simon", "Michel", "Lefèvre", "Leroy", "Roux", "David", "Bertrand", "Morel", "Fournier", "Girard",
+    "Bonnet", "Dupont", "Lambert", "Fontaine", "Rousseau", "Vincent", "Müller", "Lefebvre", "Faure", "André",
+    "Mercier", "Blanc", "Guérin", "Boyer", "Garnier", "Chevalier", "François", "Legrand", "Gauthier", "Garcia",
+]
+PRENOMS = [
+    "Marie", "Jean", "Pierre", "Michel", "André", "Philippe", "Nathalie", "Isabelle", "Sylvie", "Catherine",
+    "Françoise", "Nicolas", "Christophe", "Stéphane", "Sandrine", "Céline", "Julien", "Camille", "Léa", "Hugo",
+    "Emma", "Louis", "Chloé", "Lucas", "Manon", "Thomas", "Inès", "Antoine", "Sophie", "Élodie",
+]
+SECTEURS = ["Bâtiment", "Conseil", "Transports", "Informatique", "Menuiserie", "Architecture", "Restauration",
+            "Imprimerie", "Électricité", "Paysage", "Formation", "Santé"]
+FORMES = ["SARL", "SAS", "SASU", "EURL", "SA"]
+POSTES = ["Gérant", "Directeur général", "Responsable achats", "DAF", "Directrice technique", "Assistante de direction",
+          None, None]
+PRESTATIONS = ["Étude préalable", "Main d'œuvre", "Fourniture", "Déplacement", "Licence annuelle", "Maintenance",
+               "Formation sur site", "Pose", "Audit", "Développement spécifique"]
+
+# Répartitions des statuts (poids relatifs)
+STATUTS_PROSPECT = {"nouveau": 35, "qualifie": 20, "interesse": 15, "non_interesse": 20, "converti": 10}
+STATUTS_AFFAIRE = {"prospect": 25, "proposition": 20, "negociation": 15, "gagne": 25, "perdu": 15}
+PROBABILITE_AFFAIRE = {"prospect": 10, "proposition": 40, "negociation": 60, "gagne": 100, "perdu": 0}
+STATUTS_DEVIS = {
+    "prospect": {"brouillon": 1},
+    "proposition": {"brouillon": 30, "envoye": 70},
+    "negociation": {"envoye": 80, "brouillon": 20},
+    "gagne": {"accepte": 1},
+    "perdu": {"refuse": 70, "expire": 30},
+}
+TYPES_ACTION = {"appel": 35, "email": 30, "rendez_vous": 15, "relance": 15, "autre": 5}
+TAUX_TVA = {20.0: 85, 10.0: 10, 5.5: 5}
+
+@dataclass
+class Volumes:
+    clients: int = 1000
+    prospects: int = 2000
+    affaires_par_client: float = 2.0  # moyennes
+    actions_par_affaire: float = 3.0
+    part_affaires_avec_devis: float = 0.6
+    lignes_par_devis: float = 5.0  # médiane, queue longue jusqu'à LIGNES_MAX
+    part_doublons: float = 0.02  # prospects reprenant l'identité d'un client
+
+def _tableaux(repartition: Dict) -> Tuple[list, list]:
+    valeurs = list(repartition)
+    cumul, total = [], 0
+    for valeur in valeurs:
+        total += repartition[valeur]
+        cumul.append(total)
+    return valeurs, cumul
+
+def _sans_accents(texte: str) -> str:
+    return unicodedata.normalize('NFKD', texte).encode('ascii', 'ignore').decode()
+
+class Generateur:
+    def __init__(self, volumes: Volumes, graine: int = 0, reference: datetime = DATE_REFERENCE):
+        self.volumes = volumes
+        self.graine = graine
+        self.reference = reference
+        self._tirages = {nom: _tableaux(rep) for nom, rep in (
+            ("prospect", STATUTS_PROSPECT), ("affaire", STATUTS_AFFAIRE), ("action", TYPES_ACTION), ("tva", TAUX_TVA),
+            *((f"devis_{statut}", rep) for statut, rep in STATUTS_DEVIS.items()),
+        )}
+
+    # --- Tirages élémentaires ---
+
+    def _choix(self, alea: random.Random, nom: str):
+        valeurs, cumul = self._tirages[nom]
+        return alea.choices(valeurs, cum_weights=cumul)[0]
+
+    @staticmethod
+    def _nombre(alea: random.Random, moyenne: float, maximum: int = 1000) -> int:
+        """Entier >= 0 de moyenne ~moyenne (loi exponentielle arrondie)"""
+        return min(int(alea.expovariate(1 / moyenne) + 0.5), maximum) if moyenne > 0 else 0
+
+    @staticmethod
+    def _uuid(alea: random.Random) -> str:
+        return str(uuid.UUID(int=alea.getrandbits(128), version=4))
+
+    def _date(self, alea: random.Random, debut: datetime, fin: datetime) -> datetime:
+        return debut + timedelta(seconds=alea.uniform(0, max((fin - debut).total_seconds(), 0)))
+
+    def _identite(self, alea: random.Random, numero: int) -> dict:
+        nom, prenom = alea.choice(NOMS), alea.choice(PRENOMS)
+        entreprise = f"{alea.choice(SECTEURS)} {alea.choice(NOMS)} {alea.choice(FORMES)}"
+        domaine = _sans_accents(entreprise.split()[1]).lower()
+        return {
+            "nom": nom,
+            "prenom": prenom,
+            "email": f"{_sans_accents(prenom).lower()}.{_sans_accents(nom).lower()}{numero}@{domaine}.fr",
+            "telephone": f"0{alea.choice('1234567')}{alea.randrange(10 ** 8):08d}",
+            "entreprise": entreprise,
+            "poste": alea.choice(POSTES),
+        }
+
+    @staticmethod
+    def _variante(identite: dict, alea: random.Random) -> dict:
+        """Même personne, autre saisie : casse de l'email, téléphone international ou espacé"""
+        telephone = identite["telephone"]
+        variante = dict(identite)
+        if alea.random() < 0.5:
+            variante["email"] = identite["email"].upper() if alea.random() < 0.5 else identite["email"].capitalize()
+        if alea.random() < 0.5:
+            variante["telephone"] = "+33 " + " ".join([telephone[1]] + [telephone[i:i + 2] for i in range(2, 10, 2)])
+        else:
+            variante["telephone"] = ".".join(telephone[i:i + 2] for i in range(0, 10, 2))
+        return variante
+
+    # --- Documents ---
+
+    def documents(self) -> Iterator[Tuple[str, dict]]:
+        """(collection, document prêt pour MongoDB), client par client puis les prospects"""
+        alea = random.Random(self.graine)
+        debut_periode = self.reference - timedelta(days=3 * 365)
+        numero_devis = 0
+        identites_clients: List[dict] = []
+
+        for numero in range(self.volumes.clients):
+            identite = self._identite(alea, numero)
+            if len(identites_clients) < 10000:
+                identites_clients.append(identite)
+            creation_client = self._date(alea, debut_periode, self.reference)
+            client_id = self._uuid(alea)
+            enfants: List[Tuple[str, dict]] = []
+            chiffre_affaire = 0.0
+
+            for _ in range(self._nombre(alea, self.volumes.affaires_par_client, 50)):
+                statut_affaire = self._choix(alea, "affaire")
+                creation = self._date(alea, creation_client, self.reference)
+                affaire_id = self._uuid(alea)
+                montant = round(math.exp(alea.gauss(math.log(15000), 1.0)), -1)
+                enfants.append(("affaires", {
+                    "id": affaire_id,
+                    "client_id": client_id,
+                    "titre": f"{alea.choice(PRESTATIONS)} {identite['entreprise'].split()[0].lower()}",
+                    "description": None,
+                    "montant_previsionnel": montant,
+                    "probabilite": PROBABILITE_AFFAIRE[statut_affaire],
+                    "statut": statut_affaire,
+                    "date_cloture_prevue": (creation + timedelta(days=alea.randrange(15, 180))).isoformat(),
+                    "date_creation": creation.isoformat(),
+                    "date_modification": self._date(alea, creation, self.reference).isoformat(),
+                }))
+
+                for _ in range(self._nombre(alea, self.volumes.actions_par_affaire, 100)):
+                    date_prevue = creation + timedelta(seconds=alea.uniform(0, 120 * 86400))
+                    if date_prevue < self.reference:
+                        statut_action = alea.choices(["termine", "annule", "a_faire"], [80, 10, 10])[0]
+                    else:
+                        statut_action = alea.choices(["a_faire", "en_cours"], [85, 15])[0]
+                    enfants.append(("actions", {
+                        "id": self._uuid(alea),
+                        "affaire_id": affaire_id,
+                        "type_action": self._choix(alea, "action"),
+                        "titre": f"Suivi {identite['nom']}",
+                        "description": None,
+                        "date_prevue": date_prevue.isoformat(),
+                        "statut": statut_action,
+                        "date_creation": creation.isoformat(),
+                        "date_modification": min(date_prevue, self.reference).isoformat(),
+                    }))
+
+                if alea.random() < self.volumes.part_affaires_avec_devis:
+                    numero_devis += 1
+                    devis = self._devis(alea, numero_devis, client_id, affaire_id, statut_affaire, creation)
+                    if devis["statut"] == "accepte":
+                        chiffre_affaire += devis["montant_ttc"]
+                    enfants.append(("devis", devis))
+
+            yield "clients", {
+                "id": client_id,
+                **identite,
+                "adresse": f"{alea.randrange(1, 200)} rue {alea.choice(NOMS)}, {alea.randrange(1000, 96000):05d}",
+                "siret": f"{alea.randrange(10 ** 14):014d}",
+                "notes": None,
+                "chiffre_affaire_total": round(chiffre_affaire, 2),
+                "date_creation": creation_client.isoformat(),
+                "date_modification": creation_client.isoformat(),
+            }
+            yield from enfants
+
+        for numero in range(self.volumes.prospects):
+            statut = self._choix(alea, "prospect")
+            if identites_clients and alea.random() < self.volumes.part_doublons:
+                identite = self._variante(alea.choice(identites_clients), alea)
+            else:
+                identite = self._identite(alea, self.volumes.clients + numero)
+            creation = self._date(alea, debut_periode, self.reference)
+            yield "prospects", {
+                "id": self._uuid(alea),
+                **identite,
+                "statut": statut,
+                "notes": None,
+                "date_creation": creation.isoformat(),
+                "date_modification": self._date(alea, creation, self.reference).isoformat(),
+            }
+
+    def _devis(self, alea: random.Random, numero: int, client_id: str, affaire_id: str, statut_affaire: str,
+               creation_affaire: datetime) -> dict:
+        nombre_lignes = max(1, min(int(math.exp(alea.gauss(math.log(self.volumes.lignes_par_devis), 1.0))), LIGNES_MAX))
+        lignes = []
+        montant_ht = 0
+        for _ in range(nombre_lignes):
+            quantite = alea.choice([1, 1, 1, 2, 3, 5, 10, 0.5, 1.5])
+            prix_unitaire = round(math.exp(alea.gauss(math.log(300), 1.2)), 2)
+            montant = round(quantite * prix_unitaire, 2)
+            montant_ht += round(montant * 100)
+            lignes.append({
+                "description": alea.choice(PRESTATIONS),
+                "quantite": quantite,
+                "prix_unitaire": prix_unitaire,
+                "montant": montant,
+            })
+        taux_tva = self._choix(alea, "tva")
+        montant_ht /= 100
+        montant_tva = round(montant_ht * taux_tva / 100, 2)
+        creation = self._date(alea, creation_affaire, max(creation_affaire, self.reference))
+        return {
+            "id": self._uuid(alea),
+            "client_id": client_id,
+            "affaire_id": affaire_id,
+            "numero": f"DEV-{numero:04d}",
+            "titre": f"Devis {alea.choice(PRESTATIONS).lower()}",
+            "lignes": lignes,
+            "nombre_lignes": nombre_lignes,
+            "montant_ht": montant_ht,
+            "taux_tva": taux_tva,
+            "montant_tva": montant_tva,
+            "montant_ttc": round(montant_ht + montant_tva, 2),
+            "statut": self._choix(alea, f"devis_{statut_affaire}"),
+            "date_creation": creation.isoformat(),
+            "date_modification": self._date(alea, creation, self.reference).isoformat(),
+            "date_validite": (creation + timedelta(days=30)).isoformat(),
+        }
+
+async def semer(db, generateur: Generateur, taille_lot: int = 1000, paralleles: int = 4,
+                progression: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """Écrit les documents par lots insert_many(ordered=False), au plus `paralleles` lots en vol"""
+    lots: Dict[str, List[dict]] = {}
+    ecrits: Dict[str, int] = {}
+    en_vol = set()
+
+    async def ecrire(nom: str, lot: List[dict]):
+        await db[nom].insert_many(lot, ordered=False)
+        ecrits[nom] = ecrits.get(nom, 0) + len(lot)
+        if progression:
+            progression(ecrits)
+
+    async def envoyer(nom: str, lot: List[dict]):
+        nonlocal en_vol
+        if len(en_vol) >= paralleles:
+            termines, en_vol = await asyncio.wait(en_vol, return_when=asyncio.FIRST_COMPLETED)
+            for tache in termines:
+                tache.result()
+        en_vol.add(asyncio.ensure_future(ecrire(nom, lot)))
+
+    try:
+        for nom, document in generateur.documents():
+            lot = lots.setdefault(nom, [])
+            lot.append(document)
+            if len(lot) >= taille_lot:
+                lots[nom] = []
+                await envoyer(nom, lot)
+        for nom, lot in lots.items():
+            if lot:
+                await envoyer(nom, lot)
+        for tache in asyncio.as_completed(en_vol):
+            await tache
+    finally:
+        for tache in en_vol:
+            tache.cancel()
+    return ecrits
+
+async def principal(args) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from depots import COLLECTIONS_CRM
+
+    load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+    client = AsyncIOMotorClient(args.mongo_url or os.environ['MONGO_URL'])
+    db = client[args.db or os.environ['DB_NAME']]
+    volumes = Volumes(
+        clients=args.clients, prospects=args.prospects if args.prospects is not None else 2 * args.clients,
+        affaires_par_client=args.affaires_par_client, actions_par_affaire=args.actions_par_affaire,
+        part_affaires_avec_devis=args.part_devis, lignes_par_devis=args.lignes_par_devis,
+    )
+    reference = datetime.fromisoformat(args.reference).replace(tzinfo=timezone.utc) if args.reference else DATE_REFERENCE
+    try:
+        if args.vider:
+            for nom in COLLECTIONS_CRM:
+                await db[nom].drop()
+        debut = time.perf_counter()
+        dernier_affichage = [0]
+
+        def progression(ecrits):
+            total = sum(ecrits.values())
+            if total - dernier_affichage[0] >= 100000:
+                dernier_affichage[0] = total
+                print(f"\r{total} documents, {total / (time.perf_counter() - debut):.0f}/s", end='', file=sys.stderr)
+
+        ecrits = await semer(db, Generateur(volumes, args.graine, reference), args.lot, args.paralleles, progression)
+        duree = time.perf_counter() - debut
+        print(file=sys.stderr)
+        for nom in COLLECTIONS_CRM:
+            print(f"{nom:<10} {ecrits.get(nom, 0):>10}")
+        print(f"{sum(ecrits.values())} documents en {duree:.1f} s")
+    finally:
+        client.close()
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m charge.generateur', description="Jeu de données CRM synthétique")
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--prospects', type=int, help="Défaut : deux fois le nombre de clients")
+    parser.add_argument('--affaires-par-client', type=float, default=Volumes.affaires_par_client)
+    parser.add_argument('--actions-par-affaire', type=float, default=Volumes.actions_par_affaire)
+    parser.add_argument('--part-devis', type=float, default=Volumes.part_affaires_avec_devis,
+                        help="Part des affaires ayant un devis")
+    parser.add_argument('--lignes-par-devis', type=float, default=Volumes.lignes_par_devis, help="Médiane")
+    parser.add_argument('--graine', type=int, default=0)
+    parser.add_argument('--reference', help="Date de référence AAAA-MM-JJ (défaut : 2025-06-30)")
+    parser.add_argument('--lot', type=int, default=1000, help="Documents par insert_many")
+    parser.add_argument('--paralleles', type=int, default=4, help="Lots écrits simultanément")
+    parser.add_argument('--vider', action='store_true', help="Supprime d'abord les cinq collections du CRM")
+    parser.add_argument('--mongo-url', help="Défaut : MONGO_URL")
+    parser.add_argument('--db', help="Défaut : DB_NAME")
+    return asyncio.run(principal(parser.parse_args(argv)))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Moteur du tir de charge : paliers de concurrence, tirage pondéré des scénarios, statistiques par route"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+@dataclass
+class Palier:
+    concurrence: int
+    duree: float  # secondes
+
+def lire_paliers(texte: str) -> List[Palier]:
+    """'1:10,10:20,50:30' -> 1 utilisateur 10 s, puis 10 pendant 20 s, puis 50 pendant 30 s"""
+    paliers = []
+    for morceau in texte.split(','):
+        concurrence, duree = morceau.split(':')
+        paliers.append(Palier(int(concurrence), float(duree)))
+    return paliers
+
+def lire_melange(texte: str) -> Dict[str, float]:
+    """'crud=3,dashboard=1' -> poids relatifs des scénarios"""
+    melange = {}
+    for morceau in texte.split(','):
+        nom, _, poids = morceau.partition('=')
+        melange[nom.strip()] = float(poids or 1)
+    return melange
+
+@dataclass
+class Mesures:
+    durees_ms: Dict[str, List[float]] = field(default_factory=dict)
+    erreurs: Dict[str, int] = field(default_factory=dict)
+    exemples_erreurs: List[str] = field(default_factory=list)
+
+    def enregistrer(self, route: str, duree_ms: float, erreur: Optional[str] = None):
+        self.durees_ms.setdefault(route, []).append(duree_ms)
+        if erreur is not None:
+            self.erreurs[route] = self.erreurs.get(route, 0) + 1
+            if len(self.exemples_erreurs) < 20:
+                self.exemples_erreurs.append(f"{route} : {erreur}")
+
+    def rapport(self, duree_s: float) -> dict:
+        routes = {}
+        for route, durees in sorted(self.durees_ms.items()):
+            valeurs = np.array(durees)
+            routes[route] = {
+                "requetes": len(durees),
+                "erreurs": self.erreurs.get(route, 0),
+                "rps": len(durees) / duree_s if duree_s > 0 else 0.0,
+                **{f"p{p}_ms": float(np.percentile(valeurs, p)) for p in PERCENTILES},
+                "max_ms": float(valeurs.max()),
+            }
+        total = sum(len(d) for d in self.durees_ms.values())
+        return {
+            "duree_s": duree_s,
+            "requetes": total,
+            "erreurs": sum(self.erreurs.values()),
+            "rps": total / duree_s if duree_s > 0 else 0.0,
+            "routes": routes,
+            "exemples_erreurs": self.exemples_erreurs,
+        }
+
+class ErreurScenario(Exception):
+    """Réponse inattendue : la suite du scénario est abandonnée"""
+
+class ClientMesure:
+    """Client HTTP qui chronomètre chaque appel et l'attribue à un nom de route stable"""
+
+    def __init__(self, client: httpx.AsyncClient, mesures: Mesures):
+        self.client = client
+        self.mesures = mesures
+
+    async def requete(self, methode: str, chemin: str, route: Optional[str] = None, attendu: Tuple[int, ...] = (200,),
+                      **kwargs):
+        route = f"{methode} {route or chemin}"
+        debut = time.perf_counter()
+        try:
+            reponse = await self.client.request(methode, chemin, **kwargs)
+        except httpx.HTTPError as e:
+            self.mesures.enregistrer(route, (time.perf_counter() - debut) * 1000, type(e).__name__)
+            raise ErreurScenario(route) from e
+        duree_ms = (time.perf_counter() - debut) * 1000
+        if reponse.status_code not in attendu:
+            self.mesures.enregistrer(route, duree_ms, f"HTTP {reponse.status_code} {reponse.text[:200]}")
+            raise ErreurScenario(route)
+        self.mesures.enregistrer(route, duree_ms)
+        return reponse.json() if reponse.content and 'json' in reponse.headers.get('content-type', '') else None
+
+    async def get(self, chemin: str, route: Optional[str] = None, **kwargs):
+        return await self.requete('GET', chemin, route, **kwargs)
+
+    async def post(self, chemin: str, route: Optional[str] = None, **kwargs):
+        return await self.requete('POST', chemin, route, **kwargs)
+
+    async def put(self, chemin: str, route: Optional[str] = None, **kwargs):
+        return await self.requete('PUT', chemin, route, **kwargs)
+
+    async def patch(self, chemin: str, route: Optional[str] = None, **kwargs):
+        return await self.requete('PATCH', chemin, route, **kwargs)
+
+    async def delete(self, chemin: str, route: Optional[str] = None, **kwargs):
+        return await self.requete('DELETE', chemin, route, **kwargs)
+
+Scenario = Callable[[ClientMesure, random.Random], "asyncio.Future"]
+
+async def executer_palier(fabrique_client: Callable[[], httpx.AsyncClient], scenarios: Dict[str, Scenario],
+                          melange: Dict[str, float], palier: Palier, graine: int) -> dict:
+    """palier.concurrence utilisateurs enchaînent des scénarios tirés au sort jusqu'à la fin du palier"""
+    mesures = Mesures()
+    noms = [nom for nom in melange if melange[nom] > 0]
+    poids = [melange[nom] for nom in noms]
+    fin = time.perf_counter() + palier.duree
+    executions = {nom: 0 for nom in noms}
+
+    async def utilisateur(numero: int):
+        alea = random.Random(graine * 100003 + numero)
+        async with fabrique_client() as client:
+            client_mesure = ClientMesure(client, mesures)
+            while time.perf_counter() < fin:
+                nom = alea.choices(noms, poids)[0]
+                executions[nom] += 1
+                try:
+                    await scenarios[nom](client_mesure, alea)
+                except ErreurScenario:
+                    pass
+
+    debut = time.perf_counter()
+    await asyncio.gather(*(utilisateur(i) for i in range(palier.concurrence)))
+    rapport = mesures.rapport(time.perf_counter() - debut)
+    return {"concurrence": palier.concurrence, "scenarios": executions, **rapport}
+
+async def executer_tir(fabrique_client: Callable[[], httpx.AsyncClient], scenarios: Dict[str, Scenario],
+                       melange: Dict[str, float], paliers: List[Palier], graine: int = 0) -> dict:
+    inconnus = set(melange) - set(scenarios)
+    if inconnus:
+        raise ValueError(f"Scénarios inconnus : {', '.join(sorted(inconnus))} (disponibles : {', '.join(scenarios)})")
+    resultats = []
+    for i, palier in enumerate(paliers):
+        resultats.append(await executer_palier(fabrique_client, scenarios, melange, palier, graine + i))
+    return {"melange": melange, "paliers": resultats}
+
+def formater_rapport(rapport: dict) -> str:
+    lignes = []
+    for palier in rapport["paliers"]:
+        lignes.append(
+            f"\n== {palier['concurrence']} utilisateurs, {palier['duree_s']:.1f} s : "
+            f"{palier['requetes']} requêtes, {palier['rps']:.1f} req/s, {palier['erreurs']} erreurs"
+        )
+        lignes.append(f"{'route':<52} {'n':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for route, stats in palier["routes"].items():
+            lignes.append(
+                f"{route:<52} {stats['requetes']:>7} {stats['erreurs']:>5} {stats['rps']:>8.1f} "
+                f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+            )
+        for exemple in palier["exemples_erreurs"][:5]:
+            lignes.append(f"  ! {exemple}")
+    return '\n'.join(lignes)
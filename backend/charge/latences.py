@@ -0,0 +1,437 @@
+"""Référence de latence par route, mesurée en processus (ASGI) sur un jeu de données fixe
+
+    python -m charge.latences enregistrer            # réécrit la référence versionnée
+    python -m charge.latences verifier               # code de sortie 1 si une route régresse
+    python -m charge.latences verifier --routes devis --tolerance-mediane 0.4
+
+Chaque route d'api_router est appelée à travers toute la pile ASGI (middlewares, validation,
+sérialisation) sur des dépôts en mémoire chargés avec le jeu synthétique de
+charge.generateur : la mesure isole le coût de l'application de celui de MongoDB. Les calculs
+du pool restent dans le processus. Une route régresse quand sa médiane ou son p99 dépasse la
+référence de plus de la tolérance (relative) et de la marge (absolue, contre le bruit des
+routes de quelques centaines de microsecondes, plus large pour le p99). La référence est la médiane de plusieurs
+passes ; une route suspecte est remesurée avant d'être déclarée en régression.
+
+La référence n'a de sens que sur la machine qui l'a enregistrée : la régénérer sur la
+machine de CI, et après toute optimisation assumée.
+"""
+import argparse
+import asyncio
+import cProfile
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from .generateur import NOMS, PRENOMS, Generateur, Volumes
+from .scenarios import personne
+
+FICHIER_REFERENCE = Path(__file__).resolve().parents[2] / 'tests' / 'benchmarks' / 'latences_reference.json'
+VOLUMES_REFERENCE = Volumes(clients=300, prospects=600)
+GRAINE_REFERENCE = 0
+JETON_PROFILAGE = "reference-latences"
+
+class ErreurReference(Exception):
+    """Route sans requête de référence, ou réponse inattendue pendant la mesure"""
+
+@dataclass
+class Contexte:
+    client: httpx.AsyncClient
+    alea: random.Random
+    ids: Dict[str, List[str]] = field(default_factory=dict)
+    simulations: Dict[str, str] = field(default_factory=dict)  # client_id -> simulation_id
+    profil_id: Optional[str] = None
+
+    def choisir(self, collection: str) -> str:
+        return self.alea.choice(self.ids[collection])
+
+    async def creer(self, chemin: str, corps) -> dict:
+        """Création hors chronomètre (cible fraîche d'un DELETE, d'une conversion...)"""
+        reponse = await self.client.post(chemin, json=corps)
+        if reponse.status_code != 200:
+            raise ErreurReference(f"Préparation POST {chemin} : HTTP {reponse.status_code} {reponse.text[:200]}")
+        return reponse.json()
+
+# --- Requêtes de référence : une par route, (chemin, arguments httpx) ---
+
+Preparation = Callable[[Contexte], Awaitable[Tuple[str, dict]]]
+
+def fixe(chemin: str, **kwargs) -> Preparation:
+    async def preparer(ctx: Contexte):
+        return chemin, kwargs
+    return preparer
+
+def avec_corps(chemin: str, corps: Callable[[Contexte], object]) -> Preparation:
+    async def preparer(ctx: Contexte):
+        return chemin, {"json": corps(ctx)}
+    return preparer
+
+def sur_existant(modele: str, collection: str, corps: Optional[Callable[[Contexte], dict]] = None) -> Preparation:
+    async def preparer(ctx: Contexte):
+        chemin = modele.format(id=ctx.choisir(collection))
+        return chemin, {"json": corps(ctx)} if corps else {}
+    return preparer
+
+def sur_nouveau(modele: str, creation: str, corps: Callable[[Contexte], dict]) -> Preparation:
+    async def preparer(ctx: Contexte):
+        document = await ctx.creer(creation, corps(ctx))
+        return modele.format(id=document["id"]), {}
+    return preparer
+
+def corps_affaire(ctx: Contexte) -> dict:
+    return {"client_id": ctx.choisir("clients"), "titre": "Affaire de référence",
+            "montant_previsionnel": round(ctx.alea.uniform(1000, 90000), 2)}
+
+def corps_action(ctx: Contexte) -> dict:
+    return {"affaire_id": ctx.choisir("affaires"), "type_action": "appel", "titre": "Rappel",
+            "date_prevue": "2025-07-15T10:00:00+00:00"}
+
+def corps_devis(ctx: Contexte) -> dict:
+    return {"client_id": ctx.choisir("clients"), "titre": "Devis de référence", "lignes": [
+        {"description": f"Prestation {i}", "quantite": i + 1, "prix_unitaire": 120.5, "montant": 120.5 * (i + 1)}
+        for i in range(8)
+    ]}
+
+def modifications_lot(collection: str, champs: Callable[[Contexte], dict], taille: int = 20):
+    def corps(ctx: Contexte) -> list:
+        return [{"id": identifiant, "champs": champs(ctx)} for identifiant in ctx.alea.sample(ctx.ids[collection], taille)]
+    return corps
+
+# Lot réimporté à chaque appel : après le premier, chaque ligne est un doublon ignoré et les
+# collections ne grossissent pas d'une mesure à l'autre
+IMPORT_CONTACTS = [
+    {"nom": nom, "prenom": prenom, "email": f"{prenom}.{nom}@exemple.fr".lower(),
+     "telephone": f"06 {i:02d} 00 00 00", "entreprise": f"{nom} SARL"}
+    for i, (nom, prenom) in enumerate(zip(NOMS[:20], PRENOMS[:20]))
+]
+
+LIGNE = {"description": "Prestation", "quantite": 2.5, "prix_unitaire": 480.0}
+OPTIMISATION = {"ca_previsionnel": 150000, "charges_deductibles": 30000, "nombre_parts": 2}
+SIMULATION = {"type": "simulation-salaire-net", "parametres": {"salaire_net_souhaite": 40000}}
+
+async def preparer_simulation(ctx: Contexte):
+    client_id, simulation_id = ctx.alea.choice(sorted(ctx.simulations.items()))
+    return f"/api/clients/{client_id}/simulations/{simulation_id}", {}
+
+async def preparer_suppression_simulation(ctx: Contexte):
+    client_id = ctx.choisir("clients")
+    simulation = await ctx.creer(f"/api/clients/{client_id}/simulations", {
+        "type": "simulation-salaire-net", "parametres": {"salaire_net_souhaite": ctx.alea.randrange(15000, 150000)}
+    })
+    return f"/api/clients/{client_id}/simulations/{simulation['id']}", {}
+
+def avec_jeton_profilage(preparation: Preparation) -> Preparation:
+    async def preparer(ctx: Contexte):
+        chemin, kwargs = await preparation(ctx)
+        return chemin, {**kwargs, "headers": {"X-Profile-Token": JETON_PROFILAGE}}
+    return preparer
+
+async def preparer_recherche(ctx: Contexte):
+    """Saisie en cours : début d'un nom du jeu synthétique, parfois suivi d'un prénom"""
+    saisie = ctx.alea.choice(NOMS)[:ctx.alea.randrange(2, 6)]
+    if ctx.alea.random() < 0.3:
+        saisie += " " + ctx.alea.choice(PRENOMS)[:3]
+    return "/api/search", {"params": {"q": saisie}}
+
+async def chemin_profil(ctx: Contexte):
+    return f"/api/profils/{ctx.profil_id}", {"params": {"texte": "true"}}
+
+REQUETES: Dict[str, Preparation] = {
+    "GET /api/prospects": fixe("/api/prospects"),
+    "POST /api/prospects": avec_corps("/api/prospects", lambda ctx: personne(ctx.alea)),
+    "GET /api/prospects/{prospect_id}": sur_existant("/api/prospects/{id}", "prospects"),
+    "PUT /api/prospects/{prospect_id}": sur_existant("/api/prospects/{id}", "prospects", lambda ctx: personne(ctx.alea)),
+    "DELETE /api/prospects/{prospect_id}": sur_nouveau("/api/prospects/{id}", "/api/prospects",
+                                                       lambda ctx: personne(ctx.alea)),
+    "POST /api/prospects/{prospect_id}/convert": sur_nouveau("/api/prospects/{id}/convert", "/api/prospects",
+                                                             lambda ctx: personne(ctx.alea)),
+    "GET /api/clients": fixe("/api/clients"),
+    "POST /api/clients": avec_corps("/api/clients", lambda ctx: personne(ctx.alea)),
+    "GET /api/clients/{client_id}": sur_existant("/api/clients/{id}", "clients"),
+    "PUT /api/clients/{client_id}": sur_existant("/api/clients/{id}", "clients", lambda ctx: personne(ctx.alea)),
+    "DELETE /api/clients/{client_id}": sur_nouveau("/api/clients/{id}", "/api/clients", lambda ctx: personne(ctx.alea)),
+    "GET /api/affaires": fixe("/api/affaires"),
+    "POST /api/affaires": avec_corps("/api/affaires", corps_affaire),
+    "GET /api/affaires/{affaire_id}": sur_existant("/api/affaires/{id}", "affaires"),
+    "PUT /api/affaires/{affaire_id}": sur_existant("/api/affaires/{id}", "affaires", corps_affaire),
+    "DELETE /api/affaires/{affaire_id}": sur_nouveau("/api/affaires/{id}", "/api/affaires", corps_affaire),
+    "GET /api/actions": fixe("/api/actions"),
+    "POST /api/actions": avec_corps("/api/actions", corps_action),
+    "GET /api/actions/{action_id}": sur_existant("/api/actions/{id}", "actions"),
+    "PUT /api/actions/{action_id}": sur_existant("/api/actions/{id}", "actions", corps_action),
+    "PATCH /api/actions/bulk": avec_corps("/api/actions/bulk", modifications_lot("actions", lambda ctx: {
+        "date_prevue": f"2025-07-{ctx.alea.randrange(1, 29):02d}T09:00:00+00:00", "statut": "en_cours"})),
+    "DELETE /api/actions/{action_id}": sur_nouveau("/api/actions/{id}", "/api/actions", corps_action),
+    "GET /api/devis": fixe("/api/devis"),
+    "POST /api/devis": avec_corps("/api/devis", corps_devis),
+    "GET /api/devis/{devis_id}": sur_existant("/api/devis/{id}", "devis"),
+    "PUT /api/devis/{devis_id}": sur_existant("/api/devis/{id}", "devis", corps_devis),
+    "GET /api/devis/{devis_id}/lignes": sur_existant("/api/devis/{id}/lignes?saut=0&limite=100", "devis"),
+    "POST /api/devis/{devis_id}/lignes": sur_existant("/api/devis/{id}/lignes", "devis", lambda ctx: LIGNE),
+    "PUT /api/devis/{devis_id}/lignes/{index}": sur_existant("/api/devis/{id}/lignes/0", "devis", lambda ctx: LIGNE),
+    "GET /api/devis/{devis_id}/pdf": sur_existant("/api/devis/{id}/pdf", "devis"),
+    "PATCH /api/devis/{devis_id}/statut": sur_existant("/api/devis/{id}/statut", "devis",
+                                                       lambda ctx: {"statut": ctx.alea.choice(["envoye", "accepte"])}),
+    "PATCH /api/devis/bulk": avec_corps("/api/devis/bulk", modifications_lot("devis", lambda ctx: {
+        "statut": ctx.alea.choice(["envoye", "accepte", "refuse"])})),
+    "DELETE /api/devis/{devis_id}": sur_nouveau("/api/devis/{id}", "/api/devis", corps_devis),
+    "POST /api/simulation-salaire-net": fixe("/api/simulation-salaire-net", json={"salaire_net_souhaite": 40000}),
+    "POST /api/optimisation-fiscale": fixe("/api/optimisation-fiscale", json=OPTIMISATION),
+    "POST /api/optimisation-fiscale/objectif-net": fixe("/api/optimisation-fiscale/objectif-net", json={
+        "net_disponible_cible": 60000, "charges_deductibles": 20000}),
+    "POST /api/optimisation-fiscale/batch": fixe("/api/optimisation-fiscale/batch", json=[
+        {**OPTIMISATION, "ca_previsionnel": 60000 + 20000 * i} for i in range(10)]),
+    "POST /api/optimisation-fiscale/grid": fixe("/api/optimisation-fiscale/grid", json={
+        "ca_min": 50000, "ca_max": 300000, "ca_points": 20, "remuneration_max": 100000, "remuneration_points": 20}),
+    "POST /api/optimisation-fiscale/projection": fixe("/api/optimisation-fiscale/projection", json={
+        "ca_previsionnel": 150000, "nombre_trajectoires": 1000, "graine": 1}),
+    "GET /api/optimisation-fiscale/cache": fixe("/api/optimisation-fiscale/cache"),
+    "DELETE /api/optimisation-fiscale/cache": fixe("/api/optimisation-fiscale/cache"),
+    "GET /api/baremes-fiscaux-2025": fixe("/api/baremes-fiscaux-2025"),
+    "POST /api/clients/{client_id}/simulations": sur_existant("/api/clients/{id}/simulations", "clients",
+                                                              lambda ctx: SIMULATION),
+    "GET /api/clients/{client_id}/simulations": sur_existant("/api/clients/{id}/simulations", "clients"),
+    "GET /api/clients/{client_id}/simulations/{simulation_id}": preparer_simulation,
+    "DELETE /api/clients/{client_id}/simulations/{simulation_id}": preparer_suppression_simulation,
+    "GET /api/profils": avec_jeton_profilage(fixe("/api/profils")),
+    "GET /api/profils/{profil_id}": avec_jeton_profilage(chemin_profil),
+    "GET /api/dashboard/stats": fixe("/api/dashboard/stats"),
+    "GET /api/search": preparer_recherche,
+    "POST /api/prospects/import": fixe("/api/prospects/import", json=IMPORT_CONTACTS,
+                                       params={"ignorer_doublons": "true"}),
+    "POST /api/clients/import": fixe("/api/clients/import", json=IMPORT_CONTACTS, params={"ignorer_doublons": "true"}),
+    "GET /api/contacts/doublons": fixe("/api/contacts/doublons"),
+}
+
+def importer_server():
+    """server lit sa configuration à l'import : valeurs locales par défaut, aucune connexion ouverte"""
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'latences')
+    import server
+    return server
+
+def routes_api() -> List[str]:
+    server = importer_server()
+    return [f"{methode} {route.path}" for route in server.api_router.routes for methode in sorted(route.methods)]
+
+# --- Mesure ---
+
+@contextlib.asynccontextmanager
+async def application_de_reference(volumes: Volumes = VOLUMES_REFERENCE, graine: int = GRAINE_REFERENCE):
+    """server.app sur dépôts en mémoire chargés, pool désactivé, profileur de test ; état restauré en sortie"""
+    server = importer_server()
+    from depots import Depots
+    from observabilite import Profileur
+
+    sauvegarde = {nom: getattr(server, nom) for nom in ('depots', 'pool_calcul', 'profileur')}
+    dossier_profils = tempfile.TemporaryDirectory()
+    try:
+        server.depots = Depots.memoire()
+        await server.creer_index_depots()
+        server.pool_calcul = server.PoolCalcul(workers=0, file_max=1000, retry_after=1)
+        server.profileur = Profileur(JETON_PROFILAGE, dossier_profils.name)
+        server.cache_fiscal.invalider()
+
+        ids: Dict[str, List[str]] = {}
+        for nom, document in Generateur(volumes, graine).documents():
+            await getattr(server.depots, nom).inserer(document)
+            ids.setdefault(nom, []).append(document["id"])
+        await server.renseigner_cles_contacts()
+        await server.reconstruire_index_recherche()
+
+        profil = cProfile.Profile()
+        profil.enable()
+        server.profileur.enregistrer("0123456789abcdef", "pstats", profil, {
+            "methode": "GET", "chemin": "/api/clients", "statut": 200, "date": 0.0, "duree_ms": 1.0})
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://reference") as client:
+            ctx = Contexte(client, random.Random(graine), ids, profil_id="0123456789abcdef")
+            for client_id in ids["clients"][:20]:
+                simulation = await ctx.creer(f"/api/clients/{client_id}/simulations", SIMULATION)
+                ctx.simulations[client_id] = simulation["id"]
+            yield ctx
+    finally:
+        for nom, valeur in sauvegarde.items():
+            setattr(server, nom, valeur)
+        server.cache_fiscal.invalider()
+        dossier_profils.cleanup()
+
+def statistiques(durees_ms: List[float]) -> dict:
+    valeurs = np.array(durees_ms)
+    return {
+        "n": len(durees_ms),
+        "mediane_ms": round(float(np.median(valeurs)), 4),
+        "p99_ms": round(float(np.percentile(valeurs, 99)), 4),
+        "min_ms": round(float(valeurs.min()), 4),
+    }
+
+async def mesurer_route(ctx: Contexte, route: str, iterations: int, echauffement: int, budget_s: float) -> dict:
+    methode = route.split(' ', 1)[0]
+    preparation = REQUETES[route]
+    durees = []
+    gc.collect()
+    limite = time.perf_counter() + budget_s
+    for i in range(echauffement + iterations):
+        chemin, kwargs = await preparation(ctx)
+        debut = time.perf_counter()
+        reponse = await ctx.client.request(methode, chemin, **kwargs)
+        duree_ms = (time.perf_counter() - debut) * 1000
+        if reponse.status_code != 200:
+            raise ErreurReference(f"{route} : HTTP {reponse.status_code} {reponse.text[:200]}")
+        if i >= echauffement:
+            durees.append(duree_ms)
+            # Au moins 30 mesures, puis arrêt au budget pour les routes lentes
+            if len(durees) >= 30 and time.perf_counter() > limite:
+                break
+    return statistiques(durees)
+
+def selectionner_routes(filtre: Optional[str] = None) -> List[str]:
+    routes = routes_api()
+    sans_requete = sorted(set(routes) - set(REQUETES))
+    if sans_requete:
+        raise ErreurReference(f"Routes sans requête de référence (à ajouter à REQUETES) : {', '.join(sans_requete)}")
+    return [route for route in routes if not filtre or filtre in route]
+
+async def mesurer(routes: List[str], iterations: int = 200, echauffement: int = 10, budget_s: float = 2.0,
+                  volumes: Volumes = VOLUMES_REFERENCE) -> dict:
+    resultats = {}
+    async with application_de_reference(volumes) as ctx:
+        for route in routes:
+            resultats[route] = await mesurer_route(ctx, route, iterations, echauffement, budget_s)
+    return {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "plateforme": platform.platform(),
+            "processeur": platform.processor() or platform.machine(),
+            "volumes": asdict(volumes),
+            "graine": GRAINE_REFERENCE,
+            "iterations": iterations,
+        },
+        "routes": resultats,
+    }
+
+def combiner(mesures: List[dict], fonction: Callable[[List[float]], float]) -> dict:
+    """Une mesure par route à partir de plusieurs passes : médiane pour la référence, minimum pour confirmer"""
+    routes = {}
+    for route in mesures[0]["routes"]:
+        passes = [m["routes"][route] for m in mesures if route in m["routes"]]
+        routes[route] = {cle: round(float(fonction([p[cle] for p in passes])), 4) for cle in passes[0]}
+        routes[route]["n"] = sum(p["n"] for p in passes)
+    return {"meta": {**mesures[0].get("meta", {}), "passes": len(mesures)}, "routes": routes}
+
+# --- Comparaison ---
+
+@dataclass
+class Ecart:
+    route: str
+    reference: Optional[dict]
+    mesure: dict
+    regressions: List[str]
+
+def comparer(reference: dict, mesure: dict, tolerance_mediane: float = 0.25, tolerance_p99: float = 0.5,
+             marge_ms: float = 0.1, marge_p99_ms: float = 1.0) -> List[Ecart]:
+    ecarts = []
+    for route, stats in mesure["routes"].items():
+        ref = reference["routes"].get(route)
+        regressions = []
+        if ref is not None:
+            for cle, tolerance, marge in (("mediane_ms", tolerance_mediane, marge_ms),
+                                          ("p99_ms", tolerance_p99, marge_p99_ms)):
+                if stats[cle] > ref[cle] * (1 + tolerance) + marge:
+                    regressions.append(f"{cle.replace('_ms', '')} {ref[cle]:.3f} -> {stats[cle]:.3f} ms")
+        ecarts.append(Ecart(route, ref, stats, regressions))
+    return ecarts
+
+def formater_ecarts(ecarts: List[Ecart]) -> str:
+    lignes = [f"{'route':<62} {'méd. réf':>9} {'méd.':>9} {'p99 réf':>9} {'p99':>9}"]
+    for ecart in ecarts:
+        ref = ecart.reference or {}
+        etat = "SANS RÉFÉRENCE" if not ecart.reference else ("RÉGRESSION " + ", ".join(ecart.regressions)
+                                                             if ecart.regressions else "")
+        lignes.append(
+            f"{ecart.route:<62} {ref.get('mediane_ms', float('nan')):>9.3f} {ecart.mesure['mediane_ms']:>9.3f} "
+            f"{ref.get('p99_ms', float('nan')):>9.3f} {ecart.mesure['p99_ms']:>9.3f}  {etat}"
+        )
+    return '\n'.join(lignes)
+
+def formater_mesure(mesure: dict) -> str:
+    lignes = [f"{'route':<62} {'n':>5} {'médiane':>9} {'p99':>9}"]
+    for route, stats in mesure["routes"].items():
+        lignes.append(f"{route:<62} {stats['n']:>5} {stats['mediane_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+    return '\n'.join(lignes)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m charge.latences', description="Référence de latence par route")
+    parser.add_argument('commande', choices=['enregistrer', 'verifier'])
+    parser.add_argument('--fichier', default=str(FICHIER_REFERENCE))
+    parser.add_argument('--routes', help="Ne mesure que les routes contenant ce texte")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--budget', type=float, default=2.0, help="Secondes de mesure maximum par route")
+    parser.add_argument('--passes', type=int, default=3, help="Passes complètes pour enregistrer (médiane)")
+    parser.add_argument('--confirmations', type=int, default=2,
+                        help="Nouvelles mesures d'une route suspecte avant de conclure à une régression")
+    parser.add_argument('--tolerance-mediane', type=float, default=0.25)
+    parser.add_argument('--tolerance-p99', type=float, default=0.5)
+    parser.add_argument('--marge-ms', type=float, default=0.1, help="Marge absolue sur la médiane")
+    parser.add_argument('--marge-p99-ms', type=float, default=1.0, help="Marge absolue sur le p99")
+    args = parser.parse_args(argv)
+
+    routes = selectionner_routes(args.routes)
+    chemin = Path(args.fichier)
+
+    def passe(routes_a_mesurer: List[str]) -> dict:
+        return asyncio.run(mesurer(routes_a_mesurer, args.iterations, budget_s=args.budget))
+
+    if args.commande == 'enregistrer':
+        mesure = combiner([passe(routes) for _ in range(max(1, args.passes))], statistics.median)
+        if args.routes and chemin.exists():
+            # Mise à jour partielle : les autres routes gardent leur référence
+            ancienne = json.loads(chemin.read_text(encoding='utf-8'))
+            mesure["routes"] = {**ancienne["routes"], **mesure["routes"]}
+        chemin.write_text(json.dumps(mesure, ensure_ascii=False, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+        print(formater_mesure(mesure))
+        print(f"\nRéférence écrite dans {chemin}")
+        return 0
+
+    reference = json.loads(chemin.read_text(encoding='utf-8'))
+    mesure = passe(routes)
+    if reference["meta"].get("python") != mesure["meta"]["python"]:
+        print(f"Attention : référence enregistrée avec Python {reference['meta'].get('python')}", file=sys.stderr)
+
+    def comparer_mesure():
+        return comparer(reference, mesure, args.tolerance_mediane, args.tolerance_p99, args.marge_ms,
+                        args.marge_p99_ms)
+
+    # Une régression doit se confirmer : les routes suspectes sont remesurées, le meilleur résultat est retenu
+    for _ in range(args.confirmations):
+        suspectes = [e.route for e in comparer_mesure() if e.regressions]
+        if not suspectes:
+            break
+        confirmation = combiner([mesure, passe(suspectes)], min)
+        mesure["routes"].update({route: confirmation["routes"][route] for route in suspectes})
+
+    ecarts = comparer_mesure()
+    print(formater_ecarts(ecarts))
+    regressions = [e for e in ecarts if e.regressions]
+    if regressions:
+        print(f"\n{len(regressions)} route(s) en régression", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Scénarios de charge : parcours types d'un utilisateur du CRM
+
+Chaque scénario est une coroutine (client, alea) qui enchaîne des appels ; les routes sont
+nommées par leur modèle (/api/clients/{id}) pour agréger les mesures.
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+from .harnais import ClientMesure
+
+TYPES_ACTION = ["appel", "email", "rendez_vous", "relance", "autre"]
+
+def personne(alea: random.Random) -> dict:
+    numero = alea.randrange(10 ** 6)
+    return {
+        "nom": f"Nom{numero}",
+        "prenom": f"Prenom{numero}",
+        "email": f"contact{numero}@exemple.fr",
+        "telephone": f"06{numero:08d}",
+        "entreprise": f"Entreprise {numero % 500}",
+    }
+
+async def crud(client: ClientMesure, alea: random.Random):
+    """Création d'un client et de son pipeline (affaire, action, devis), lectures, mise à jour, suppression"""
+    nouveau = await client.post("/api/clients", json=personne(alea))
+    client_id = nouveau["id"]
+    await client.get(f"/api/clients/{client_id}", "/api/clients/{id}")
+    await client.put(f"/api/clients/{client_id}", "/api/clients/{id}", json={**personne(alea), "notes": "Mis à jour"})
+
+    affaire = await client.post("/api/affaires", json={
+        "client_id": client_id,
+        "titre": "Affaire de charge",
+        "montant_previsionnel": alea.uniform(1000, 100000),
+        "probabilite": alea.choice([10, 25, 50, 75, 90]),
+    })
+    action = await client.post("/api/actions", json={
+        "affaire_id": affaire["id"],
+        "type_action": alea.choice(TYPES_ACTION),
+        "titre": "Relance",
+        "date_prevue": (datetime.now(timezone.utc) + timedelta(days=alea.randrange(60))).isoformat(),
+    })
+    lignes = [
+        {"description": f"Prestation {i}", "quantite": q, "prix_unitaire": p, "montant": q * p}
+        for i, (q, p) in enumerate((alea.randrange(1, 10), alea.randrange(100, 2000)) for _ in range(alea.randrange(1, 6)))
+    ]
+    devis = await client.post("/api/devis", json={
+        "client_id": client_id, "affaire_id": affaire["id"], "titre": "Devis de charge", "lignes": lignes,
+    })
+    await client.patch(f"/api/devis/{devis['id']}/statut", "/api/devis/{id}/statut", json={"statut": "envoye"})
+    await client.get("/api/prospects")
+
+    if alea.random() < 0.8:
+        # Le reste des données alimente les listes des autres scénarios
+        await client.delete(f"/api/devis/{devis['id']}", "/api/devis/{id}")
+        await client.delete(f"/api/actions/{action['id']}", "/api/actions/{id}")
+        await client.delete(f"/api/affaires/{affaire['id']}", "/api/affaires/{id}")
+        await client.delete(f"/api/clients/{client_id}", "/api/clients/{id}")
+
+async def calendrier(client: ClientMesure, alea: random.Random):
+    """Chargement de la page calendrier (actions, devis, clients et affaires en parallèle), puis
+    déplacement d'une sélection d'actions en une requête"""
+    actions, *_ = await asyncio.gather(
+        client.get("/api/actions"),
+        client.get("/api/devis"),
+        client.get("/api/clients"),
+        client.get("/api/affaires"),
+    )
+    if actions:
+        decalage = timedelta(days=alea.randrange(1, 8))
+        selection = alea.sample(actions, min(len(actions), alea.randrange(2, 11)))
+        await client.patch("/api/actions/bulk", json=[
+            {"id": action["id"],
+             "champs": {"date_prevue": (datetime.fromisoformat(action["date_prevue"]) + decalage).isoformat()}}
+            for action in selection
+        ])
+
+async def dashboard(client: ClientMesure, alea: random.Random):
+    await client.get("/api/dashboard/stats")
+
+async def optimisation(client: ClientMesure, alea: random.Random):
+    """Optimisation fiscale et simulation par salaire net ; CA arrondi pour un taux de cache réaliste"""
+    ca = round(alea.uniform(30000, 400000), -3)
+    await client.post("/api/optimisation-fiscale", json={
+        "ca_previsionnel": ca,
+        "charges_deductibles": round(ca * alea.uniform(0, 0.4), -3),
+        "nombre_parts": alea.choice([1, 1.5, 2, 3]),
+    })
+    await client.post("/api/simulation-salaire-net", json={
+        "salaire_net_souhaite": round(alea.uniform(15000, 120000), -2),
+        "nombre_parts": alea.choice([1, 2]),
+    })
+
+SCENARIOS = {
+    "crud": crud,
+    "calendrier": calendrier,
+    "dashboard": dashboard,
+    "optimisation": optimisation,
+}
+
+MELANGE_DEFAUT = "crud=2,calendrier=3,dashboard=3,optimisation=2"
+
+async def precharger(client: ClientMesure, alea: random.Random, nombre_clients: int):
+    """Quelques clients avec affaire, action et devis pour que les listes ne soient pas vides"""
+    for _ in range(nombre_clients):
+        nouveau = await client.post("/api/clients", json=personne(alea))
+        affaire = await client.post("/api/affaires", json={
+            "client_id": nouveau["id"], "titre": "Affaire", "montant_previsionnel": alea.uniform(1000, 100000),
+        })
+        await client.post("/api/actions", json={
+            "affaire_id": affaire["id"], "type_action": alea.choice(TYPES_ACTION), "titre": "Action",
+            "date_prevue": datetime.now(timezone.utc).isoformat(),
+        })
+        await client.post("/api/devis", json={
+            "client_id": nouveau["id"], "affaire_id": affaire["id"], "titre": "Devis",
+            "lignes": [{"description": "Prestation", "quantite": 1, "prix_unitaire": 500, "montant": 500}],
+        })
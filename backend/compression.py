@@ -0,0 +1,244 @@
+"""Compression négociée des réponses HTTP (br, gzip) : middleware ASGI pur
+
+L'encodage suit Accept-Encoding (q-values comprises ; à qualité égale, br avant gzip si le
+module brotli est installé). Une réponse complète n'est compressée qu'au-delà du seuil et
+seulement si elle rétrécit vraiment ; une réponse en flux (plusieurs messages body) est
+compressée morceau par morceau, chaque morceau vidé aussitôt pour que le client reçoive les
+données au fil de l'eau. Sont laissées telles quelles : les réponses déjà encodées, les types
+déjà compressés (images, archives, PDF...), les réponses partielles et celles marquées
+Cache-Control: no-transform. Les gros corps sont compressés hors de la boucle asyncio
+(zlib et brotli relâchent le GIL).
+
+Métriques : taux de compression et temps passé par encodage, octets avant / après, réponses
+non compressées par motif.
+"""
+import asyncio
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+from observabilite.metriques import registre
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip seul
+    brotli = None
+
+SEUIL_DEFAUT = 1024
+# Au-delà, la compression d'une réponse complète part dans un thread
+SEUIL_THREAD = 256 * 1024
+
+TYPES_DEJA_COMPRESSES = (
+    'image/', 'video/', 'audio/', 'font/woff', 'application/zip', 'application/gzip', 'application/x-gzip',
+    'application/x-bzip2', 'application/x-7z-compressed', 'application/pdf', 'application/vnd.apache.parquet',
+)
+
+compression_ratio = registre.histogramme(
+    'http_response_compression_ratio', "Taille compressée / taille d'origine des réponses", ('encoding',),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.7, 0.9, 1.0)
+)
+compression_duree = registre.histogramme(
+    'http_response_compression_seconds', "Temps de compression par réponse", ('encoding',),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+compression_octets = registre.compteur(
+    'http_response_compression_bytes_total', "Octets de réponse avant (in) et après (out) compression",
+    ('encoding', 'direction')
+)
+compression_ignorees = registre.compteur(
+    'http_response_compression_skipped_total', "Réponses acceptant la compression mais envoyées telles quelles",
+    ('reason',)
+)
+
+def encodages_disponibles() -> Tuple[str, ...]:
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def choisir_encodage(accept_encoding: str, disponibles: Tuple[str, ...]) -> Optional[str]:
+    """Meilleur encodage accepté parmi `disponibles` (dans leur ordre de préférence), ou None"""
+    qualites = {}
+    for element in accept_encoding.split(','):
+        nom, _, parametres = element.strip().partition(';')
+        nom = nom.strip().lower()
+        if not nom:
+            continue
+        qualite = 1.0
+        parametre, _, valeur = parametres.strip().partition('=')
+        if parametre.strip() == 'q':
+            try:
+                qualite = float(valeur)
+            except ValueError:
+                qualite = 0.0
+        qualites[nom] = qualite
+    meilleur, meilleure_qualite = None, 0.0
+    for encodage in disponibles:
+        qualite = qualites.get(encodage, qualites.get('*', 0.0))
+        if qualite > meilleure_qualite:
+            meilleur, meilleure_qualite = encodage, qualite
+    return meilleur
+
+class Compresseur:
+    """Compression incrémentale : morceau() vide la sortie à chaque appel, fin() termine le flux"""
+
+    def __init__(self, encodage: str, niveau_gzip: int, qualite_brotli: int):
+        self.encodage = encodage
+        if encodage == 'br':
+            self._brotli = brotli.Compressor(quality=qualite_brotli)
+        else:
+            self._zlib = zlib.compressobj(niveau_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def morceau(self, donnees: bytes) -> bytes:
+        if self.encodage == 'br':
+            return self._brotli.process(donnees) + self._brotli.flush()
+        return self._zlib.compress(donnees) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def fin(self, donnees: bytes = b'') -> bytes:
+        if self.encodage == 'br':
+            return self._brotli.process(donnees) + self._brotli.finish()
+        return self._zlib.compress(donnees) + self._zlib.flush()
+
+def compresser(donnees: bytes, encodage: str, niveau_gzip: int, qualite_brotli: int) -> bytes:
+    if encodage == 'br':
+        return brotli.compress(donnees, quality=qualite_brotli)
+    return zlib.compress(donnees, niveau_gzip, wbits=16 + zlib.MAX_WBITS)
+
+def _entete(entetes: List[Tuple[bytes, bytes]], nom: bytes) -> Optional[str]:
+    for cle, valeur in entetes:
+        if cle.lower() == nom:
+            return valeur.decode('latin-1')
+    return None
+
+def motif_sans_compression(statut: int, entetes: List[Tuple[bytes, bytes]]) -> Optional[str]:
+    if statut < 200 or statut in (204, 206, 304):
+        return 'statut'
+    if _entete(entetes, b'content-encoding') not in (None, 'identity'):
+        return 'deja_encodee'
+    if 'no-transform' in (_entete(entetes, b'cache-control') or '').lower():
+        return 'no_transform'
+    type_contenu = (_entete(entetes, b'content-type') or '').lower()
+    if type_contenu.startswith(TYPES_DEJA_COMPRESSES):
+        return 'type_compresse'
+    return None
+
+def entetes_compressees(entetes: List[Tuple[bytes, bytes]], encodage: str,
+                        longueur: Optional[int]) -> List[Tuple[bytes, bytes]]:
+    resultat = []
+    vary = None
+    for cle, valeur in entetes:
+        nom = cle.lower()
+        if nom == b'content-length':
+            continue
+        if nom == b'vary':
+            vary = valeur
+            continue
+        if nom == b'etag' and not valeur.startswith(b'W/'):
+            # Le contenu encodé n'est plus identique octet pour octet : ETag faible
+            valeur = b'W/' + valeur
+        resultat.append((cle, valeur))
+    if vary is None:
+        vary = b'Accept-Encoding'
+    elif b'accept-encoding' not in vary.lower() and vary.strip() != b'*':
+        vary = vary + b', Accept-Encoding'
+    resultat.append((b'vary', vary))
+    resultat.append((b'content-encoding', encodage.encode()))
+    if longueur is not None:
+        resultat.append((b'content-length', str(longueur).encode()))
+    return resultat
+
+class MiddlewareCompression:
+    def __init__(self, app, seuil: int = SEUIL_DEFAUT, niveau_gzip: int = 4, qualite_brotli: int = 4,
+                 encodages: Optional[Tuple[str, ...]] = None):
+        self.app = app
+        self.seuil = seuil
+        self.niveau_gzip = niveau_gzip
+        self.qualite_brotli = qualite_brotli
+        self.encodages = encodages or encodages_disponibles()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode('latin-1') for k, v in scope.get('headers', ()) if k == b'accept-encoding'), '')
+        encodage = choisir_encodage(accept, self.encodages) if accept else None
+        if encodage is None:
+            await self.app(scope, receive, send)
+            return
+
+        demarrage = None
+        compresseur: Optional[Compresseur] = None
+        transparent = False
+        octets = [0, 0]  # avant, après
+        duree = [0.0]
+
+        def mesurer(fonction, *args) -> bytes:
+            debut = time.perf_counter()
+            sortie = fonction(*args)
+            duree[0] += time.perf_counter() - debut
+            return sortie
+
+        def observer():
+            compression_duree.observer(duree[0], encodage)
+            compression_octets.inc(encodage, 'in', montant=octets[0])
+            compression_octets.inc(encodage, 'out', montant=octets[1])
+            if octets[0]:
+                compression_ratio.observer(octets[1] / octets[0], encodage)
+
+        async def envoyer(message):
+            nonlocal demarrage, compresseur, transparent
+            if message['type'] == 'http.response.start':
+                demarrage = message
+                return
+            if message['type'] != 'http.response.body' or transparent:
+                await send(message)
+                return
+
+            corps = message.get('body', b'')
+            suite = message.get('more_body', False)
+
+            if compresseur is None:
+                # Premier morceau : décision pour toute la réponse
+                entetes = list(demarrage.get('headers', []))
+                motif = motif_sans_compression(demarrage['status'], entetes)
+                longueur_annoncee = _entete(entetes, b'content-length')
+                if motif is None and not suite and len(corps) < self.seuil:
+                    motif = 'petite'
+                if motif is None and suite and longueur_annoncee is not None and int(longueur_annoncee) < self.seuil:
+                    motif = 'petite'
+                if motif is not None:
+                    compression_ignorees.inc(motif)
+                    transparent = True
+                    await send(demarrage)
+                    await send(message)
+                    return
+
+                if not suite:
+                    if len(corps) >= SEUIL_THREAD:
+                        debut = time.perf_counter()
+                        compresse = await asyncio.get_running_loop().run_in_executor(
+                            None, compresser, corps, encodage, self.niveau_gzip, self.qualite_brotli)
+                        duree[0] += time.perf_counter() - debut
+                    else:
+                        compresse = mesurer(compresser, corps, encodage, self.niveau_gzip, self.qualite_brotli)
+                    if len(compresse) >= len(corps):
+                        compression_ignorees.inc('sans_gain')
+                        transparent = True
+                        await send(demarrage)
+                        await send(message)
+                        return
+                    octets[0], octets[1] = len(corps), len(compresse)
+                    observer()
+                    await send({**demarrage, 'headers': entetes_compressees(entetes, encodage, len(compresse))})
+                    await send({'type': 'http.response.body', 'body': compresse})
+                    return
+
+                compresseur = Compresseur(encodage, self.niveau_gzip, self.qualite_brotli)
+                await send({**demarrage, 'headers': entetes_compressees(entetes, encodage, None)})
+
+            sortie = mesurer(compresseur.morceau if suite else compresseur.fin, corps)
+            octets[0] += len(corps)
+            octets[1] += len(sortie)
+            if not suite:
+                observer()
+            if sortie or not suite:
+                await send({'type': 'http.response.body', 'body': sortie, 'more_body': suite})
+
+        await self.app(scope, receive, envoyer)
@@ -0,0 +1,25 @@
+"""Accès aux collections du CRM derrière une interface commune, MongoDB (Motor) ou mémoire
+
+Un dépôt manipule des documents déjà préparés pour MongoDB (dates en ISO 8601), identifiés
+par leur champ "id", et les rend sans _id :
+    lister(filtre, tri, saut, limite, sans)   trouver(id, sans)   trouver_tranche(id, champ, saut, limite)
+    existe(id)   compter(filtre)   sommer(champ, filtre)   inserer(document)   modifier(id, champs)
+    modifier_si(id, condition, champs, ajouts)   modifier_selon(filtre, champs, increments)
+    modifier_lot([(id, champs), ...])   supprimer(id)   supprimer_selon(filtre)   creer_index(cles, unique)
+Les filtres sont ceux de MongoDB ; tri et cles sont des listes de (champ, sens). Une insertion
+qui viole un index unique lève DuplicateKeyError. L'index de recherche (index_recherche.py) a
+sa propre interface.
+"""
+from .crm import COLLECTIONS_CRM, Depots
+from .index_recherche import IndexRechercheMemoire, IndexRechercheMongo
+from .memoire import DepotMemoire
+from .mongo import DepotMongo
+
+__all__ = [
+    'COLLECTIONS_CRM',
+    'DepotMemoire',
+    'DepotMongo',
+    'Depots',
+    'IndexRechercheMemoire',
+    'IndexRechercheMongo',
+]
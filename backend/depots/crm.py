@@ -0,0 +1,29 @@
+"""Les cinq dépôts du CRM, l'historique des simulations et l'index de recherche, regroupés pour
+être remplacés d'un bloc (tests, benchmarks, tirs de charge)"""
+from dataclasses import dataclass
+
+from .index_recherche import IndexRechercheMemoire, IndexRechercheMongo
+from .memoire import DepotMemoire
+from .mongo import DepotMongo
+
+COLLECTIONS_CRM = ("prospects", "clients", "affaires", "actions", "devis")
+
+@dataclass
+class Depots:
+    prospects: object
+    clients: object
+    affaires: object
+    actions: object
+    devis: object
+    simulations: object
+    recherche: object
+
+    @classmethod
+    def mongo(cls, db) -> "Depots":
+        return cls(**{nom: DepotMongo(db[nom]) for nom in COLLECTIONS_CRM}, simulations=DepotMongo(db.simulations),
+                   recherche=IndexRechercheMongo(db.recherche))
+
+    @classmethod
+    def memoire(cls) -> "Depots":
+        return cls(**{nom: DepotMemoire(nom) for nom in COLLECTIONS_CRM}, simulations=DepotMemoire("simulations"),
+                   recherche=IndexRechercheMemoire())
@@ -0,0 +1,104 @@
+"""Filtres et tris MongoDB évalués en mémoire, pour DepotMemoire
+
+Opérateurs gérés : $eq, $ne, $gt, $gte, $lt, $lte, $in, $nin, $all, $exists, $or, $and, $nor ;
+chemins pointés (lignes.3.montant) ; ordre de tri entre types à la manière de MongoDB.
+"""
+from typing import List, Optional
+
+_ABSENT = object()
+
+def lire_champ(document: dict, chemin: str):
+    valeur = document
+    for morceau in chemin.split('.'):
+        if isinstance(valeur, dict) and morceau in valeur:
+            valeur = valeur[morceau]
+        elif isinstance(valeur, list) and morceau.isdigit() and int(morceau) < len(valeur):
+            valeur = valeur[int(morceau)]
+        else:
+            return _ABSENT
+    return valeur
+
+def ecrire_champ(document: dict, chemin: str, valeur):
+    morceaux = chemin.split('.')
+    for morceau in morceaux[:-1]:
+        if isinstance(document, list):
+            document = document[int(morceau)]
+        else:
+            document = document.setdefault(morceau, {})
+    if isinstance(document, list):
+        document[int(morceaux[-1])] = valeur
+    else:
+        document[morceaux[-1]] = valeur
+
+def rang(valeur):
+    """Ordre de tri entre types, à la manière de MongoDB (null < nombres < chaînes < ...)"""
+    if valeur is None or valeur is _ABSENT:
+        return (0, 0)
+    if isinstance(valeur, bool):
+        return (5, valeur)
+    if isinstance(valeur, (int, float)):
+        return (1, valeur)
+    if isinstance(valeur, str):
+        return (2, valeur)
+    if isinstance(valeur, dict):
+        return (3, str(valeur))
+    if isinstance(valeur, list):
+        return (4, [rang(v) for v in valeur])
+    return (6, str(valeur))
+
+def comparer(valeur, operateur: str, attendu) -> bool:
+    if operateur == '$eq':
+        return valeur == attendu or (isinstance(valeur, list) and attendu in valeur) or (
+            attendu is None and valeur is _ABSENT)
+    if operateur == '$ne':
+        return not comparer(valeur, '$eq', attendu)
+    if operateur == '$in':
+        if isinstance(valeur, str):
+            # Cas courant (identifiants, clés) : même résultat que $eq élément par élément, en C
+            return valeur in attendu
+        return any(comparer(valeur, '$eq', a) for a in attendu)
+    if operateur == '$nin':
+        return not comparer(valeur, '$in', attendu)
+    if operateur == '$all':
+        return all(comparer(valeur, '$eq', a) for a in attendu)
+    if operateur == '$exists':
+        return (valeur is not _ABSENT) == bool(attendu)
+    if operateur in ('$gt', '$gte', '$lt', '$lte'):
+        if valeur is _ABSENT or valeur is None or rang(valeur)[0] != rang(attendu)[0]:
+            return False
+        return {'$gt': valeur > attendu, '$gte': valeur >= attendu,
+                '$lt': valeur < attendu, '$lte': valeur <= attendu}[operateur]
+    raise NotImplementedError(f"Opérateur {operateur} non géré en mémoire")
+
+def correspond(document: dict, filtre: Optional[dict]) -> bool:
+    for cle, condition in (filtre or {}).items():
+        if cle == '$or':
+            if not any(correspond(document, f) for f in condition):
+                return False
+        elif cle == '$and':
+            if not all(correspond(document, f) for f in condition):
+                return False
+        elif cle == '$nor':
+            if any(correspond(document, f) for f in condition):
+                return False
+        else:
+            valeur = lire_champ(document, cle)
+            if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+                if not all(comparer(valeur, op, attendu) for op, attendu in condition.items()):
+                    return False
+            elif not comparer(valeur, '$eq', condition):
+                return False
+    return True
+
+def cle_tri(specification):
+    if isinstance(specification, str):
+        return [(specification, 1)]
+    if isinstance(specification, dict):
+        return list(specification.items())
+    return list(specification)
+
+def trier(documents: List[dict], specification) -> List[dict]:
+    # Tris stables successifs, du critère le moins prioritaire au plus prioritaire
+    for champ, sens in reversed(cle_tri(specification)):
+        documents = sorted(documents, key=lambda d: rang(lire_champ(d, champ)), reverse=sens < 0)
+    return documents
@@ -0,0 +1,97 @@
+"""Index de recherche : entrées {cle, type, id, libelle, detail, date, termes}, voir recherche.py
+
+    indexer(entrees)   retirer(cles)   chercher(termes, types, limite)   cles()   compter()   vider()
+
+chercher renvoie, sans leurs termes, au plus `limite` entrées contenant tous les termes,
+les plus récentes d'abord. Sur MongoDB, l'index multiclé (termes, date) sert à la fois la
+sélection et le tri ; en mémoire, un index inversé terme -> clés.
+"""
+import heapq
+from typing import Dict, List, Optional, Sequence, Set
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+
+class IndexRechercheMongo:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def creer_index(self):
+        await self.collection.create_index("cle", unique=True)
+        await self.collection.create_index([("termes", ASCENDING), ("date", DESCENDING)])
+
+    async def indexer(self, entrees: Sequence[dict]):
+        if entrees:
+            await self.collection.bulk_write(
+                [ReplaceOne({"cle": entree["cle"]}, dict(entree), upsert=True) for entree in entrees], ordered=False
+            )
+
+    async def retirer(self, cles: Sequence[str]):
+        await self.collection.delete_many({"cle": {"$in": list(cles)}})
+
+    async def chercher(self, termes: Sequence[str], types: Optional[Sequence[str]] = None,
+                       limite: int = 200) -> List[dict]:
+        filtre = {"termes": {"$all": list(termes)}}
+        if types:
+            filtre["type"] = {"$in": list(types)}
+        curseur = self.collection.find(filtre, {"_id": 0, "termes": 0}).sort([("date", DESCENDING)]).limit(limite)
+        return await curseur.to_list(limite)
+
+    async def cles(self) -> Set[str]:
+        return {entree["cle"] async for entree in self.collection.find({}, {"_id": 0, "cle": 1})}
+
+    async def compter(self) -> int:
+        return await self.collection.count_documents({})
+
+    async def vider(self):
+        await self.collection.delete_many({})
+
+class IndexRechercheMemoire:
+    def __init__(self):
+        self._entrees: Dict[str, dict] = {}
+        self._cles_par_terme: Dict[str, Set[str]] = {}
+
+    def _retirer(self, cle: str):
+        ancienne = self._entrees.pop(cle, None)
+        if ancienne is None:
+            return
+        for terme in ancienne["termes"]:
+            cles = self._cles_par_terme[terme]
+            cles.discard(cle)
+            if not cles:
+                del self._cles_par_terme[terme]
+
+    async def creer_index(self):
+        pass
+
+    async def indexer(self, entrees: Sequence[dict]):
+        for entree in entrees:
+            self._retirer(entree["cle"])
+            self._entrees[entree["cle"]] = dict(entree)
+            for terme in entree["termes"]:
+                self._cles_par_terme.setdefault(terme, set()).add(entree["cle"])
+
+    async def retirer(self, cles: Sequence[str]):
+        for cle in cles:
+            self._retirer(cle)
+
+    async def chercher(self, termes: Sequence[str], types: Optional[Sequence[str]] = None,
+                       limite: int = 200) -> List[dict]:
+        ensembles = sorted((self._cles_par_terme.get(terme, set()) for terme in termes), key=len)
+        if not ensembles:
+            return []
+        cles = ensembles[0].intersection(*ensembles[1:])
+        entrees = (self._entrees[cle] for cle in cles)
+        if types:
+            entrees = (entree for entree in entrees if entree["type"] in types)
+        plus_recentes = heapq.nlargest(limite, entrees, key=lambda entree: entree.get("date") or "")
+        return [{cle: v for cle, v in entree.items() if cle != "termes"} for entree in plus_recentes]
+
+    async def cles(self) -> Set[str]:
+        return set(self._entrees)
+
+    async def compter(self) -> int:
+        return len(self._entrees)
+
+    async def vider(self):
+        self._entrees.clear()
+        self._cles_par_terme.clear()
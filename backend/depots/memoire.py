@@ -0,0 +1,143 @@
+"""Dépôt en mémoire : mêmes filtres, tris, pagination et agrégats que DepotMongo, sans réseau
+
+Les documents sont indexés par "id" : lecture, modification et suppression unitaires en O(1),
+listes et comptages par parcours. Les filtres sont évalués par depots.filtres. Les index
+uniques déclarés par creer_index sont vérifiés à l'insertion, par parcours. Les valeurs
+imbriquées (lignes de devis...) sont copiées à l'entrée et à la sortie pour qu'un appelant ne
+puisse pas modifier le stockage par référence ; les scalaires sont partagés.
+"""
+import copy
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from .filtres import _ABSENT, correspond, ecrire_champ, lire_champ, trier
+
+def _copie(document: dict) -> dict:
+    return {cle: copy.deepcopy(v) if isinstance(v, (dict, list)) else v for cle, v in document.items()}
+
+class DepotMemoire:
+    def __init__(self, nom: str = ''):
+        self.nom = nom
+        self._documents: Dict[str, dict] = {}
+        self._index_uniques: List[Tuple[str, ...]] = []
+
+    def _selection(self, filtre: Optional[dict]) -> List[dict]:
+        if not filtre:
+            return list(self._documents.values())
+        identifiant = filtre.get("id")
+        if len(filtre) == 1 and isinstance(identifiant, str):
+            document = self._documents.get(identifiant)
+            return [document] if document is not None else []
+        return [d for d in self._documents.values() if correspond(d, filtre)]
+
+    async def lister(self, filtre: Optional[dict] = None, tri: Optional[Sequence[Tuple[str, int]]] = None,
+                     saut: int = 0, limite: Optional[int] = 1000, sans: Sequence[str] = ()) -> List[dict]:
+        documents = self._selection(filtre)
+        if tri:
+            documents = trier(documents, list(tri))
+        fin = saut + limite if limite else None
+        if sans:
+            return [_copie({cle: v for cle, v in d.items() if cle not in sans}) for d in documents[saut:fin]]
+        return [_copie(d) for d in documents[saut:fin]]
+
+    async def trouver(self, identifiant: str, sans: Sequence[str] = ()) -> Optional[dict]:
+        document = self._documents.get(identifiant)
+        if document is None:
+            return None
+        return _copie({cle: v for cle, v in document.items() if cle not in sans} if sans else document)
+
+    async def trouver_tranche(self, identifiant: str, champ: str, saut: int, limite: int) -> Optional[dict]:
+        document = self._documents.get(identifiant)
+        if document is None:
+            return None
+        tranche = _copie({cle: v for cle, v in document.items() if cle != champ})
+        if champ in document:
+            tranche[champ] = copy.deepcopy(document[champ][saut:saut + limite])
+        return tranche
+
+    async def existe(self, identifiant: str) -> bool:
+        return identifiant in self._documents
+
+    async def compter(self, filtre: Optional[dict] = None) -> int:
+        return len(self._documents) if not filtre else len(self._selection(filtre))
+
+    async def sommer(self, champ: str, filtre: Optional[dict] = None) -> float:
+        # Comme $sum : les valeurs absentes ou non numériques sont ignorées
+        total = 0
+        for document in self._selection(filtre):
+            valeur = lire_champ(document, champ)
+            if valeur is not _ABSENT and isinstance(valeur, (int, float)) and not isinstance(valeur, bool):
+                total += valeur
+        return total
+
+    async def inserer(self, document: dict):
+        identifiant = document["id"]
+        if identifiant in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.nom} id: {identifiant}")
+        for champs in self._index_uniques:
+            valeurs = [lire_champ(document, champ) for champ in champs]
+            if any([lire_champ(autre, champ) for champ in champs] == valeurs for autre in self._documents.values()):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.nom} index: {list(champs)}")
+        self._documents[identifiant] = {cle: v for cle, v in _copie(document).items() if cle != "_id"}
+
+    async def inserer_plusieurs(self, documents: Sequence[dict]):
+        for document in documents:
+            await self.inserer(document)
+
+    async def modifier(self, identifiant: str, champs: dict) -> Optional[dict]:
+        document = self._documents.get(identifiant)
+        if document is None:
+            return None
+        for chemin, valeur in champs.items():
+            ecrire_champ(document, chemin, copy.deepcopy(valeur))
+        return _copie(document)
+
+    async def modifier_si(self, identifiant: str, condition: dict, champs: dict,
+                          ajouts: Optional[dict] = None) -> bool:
+        document = self._documents.get(identifiant)
+        if document is None or not correspond(document, condition):
+            return False
+        for chemin, valeur in champs.items():
+            ecrire_champ(document, chemin, copy.deepcopy(valeur))
+        for chemin, valeur in (ajouts or {}).items():
+            tableau = lire_champ(document, chemin)
+            if tableau is _ABSENT:
+                ecrire_champ(document, chemin, [copy.deepcopy(valeur)])
+            else:
+                tableau.append(copy.deepcopy(valeur))
+        return True
+
+    async def modifier_selon(self, filtre: dict, champs: dict, increments: Optional[dict] = None) -> Optional[dict]:
+        document = next(iter(self._selection(filtre)), None)
+        if document is None:
+            return None
+        for chemin, valeur in champs.items():
+            ecrire_champ(document, chemin, copy.deepcopy(valeur))
+        for chemin, valeur in (increments or {}).items():
+            actuelle = lire_champ(document, chemin)
+            ecrire_champ(document, chemin, (0 if actuelle is _ABSENT else actuelle) + valeur)
+        return _copie(document)
+
+    async def modifier_lot(self, modifications: Sequence[Tuple[str, dict]]) -> Dict[str, dict]:
+        modifies = {}
+        for identifiant, champs in modifications:
+            document = await self.modifier(identifiant, champs)
+            if document is not None:
+                modifies[identifiant] = document
+        return modifies
+
+    async def supprimer(self, identifiant: str) -> bool:
+        return self._documents.pop(identifiant, None) is not None
+
+    async def supprimer_selon(self, filtre: dict) -> int:
+        supprimes = [d["id"] for d in self._selection(filtre)]
+        for identifiant in supprimes:
+            del self._documents[identifiant]
+        return len(supprimes)
+
+    async def creer_index(self, cles: Sequence[Tuple[str, int]], unique: bool = False):
+        # Seuls les index uniques changent le comportement ; les autres n'accélèrent rien ici
+        champs = tuple(champ for champ, _ in cles)
+        if unique and champs not in self._index_uniques:
+            self._index_uniques.append(champs)
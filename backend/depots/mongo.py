@@ -0,0 +1,103 @@
+"""Dépôt adossé à une collection Motor (ou à tout objet compatible, comme la base en mémoire des tests)"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+# Les documents sortent sans _id : les modèles pydantic n'en ont pas l'usage
+SANS_ID = {"_id": 0}
+
+class DepotMongo:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def lister(self, filtre: Optional[dict] = None, tri: Optional[Sequence[Tuple[str, int]]] = None,
+                     saut: int = 0, limite: Optional[int] = 1000, sans: Sequence[str] = ()) -> List[dict]:
+        curseur = self.collection.find(filtre or {}, {**SANS_ID, **{champ: 0 for champ in sans}})
+        if tri:
+            curseur = curseur.sort(list(tri))
+        if saut:
+            curseur = curseur.skip(saut)
+        if limite:
+            curseur = curseur.limit(limite)
+        return await curseur.to_list(limite)
+
+    async def trouver(self, identifiant: str, sans: Sequence[str] = ()) -> Optional[dict]:
+        """Le document, privé des champs `sans` (gros tableaux inutiles à l'appelant)"""
+        return await self.collection.find_one({"id": identifiant}, {**SANS_ID, **{champ: 0 for champ in sans}})
+
+    async def trouver_tranche(self, identifiant: str, champ: str, saut: int, limite: int) -> Optional[dict]:
+        """Le document avec seulement limite éléments du tableau `champ` à partir de saut ($slice)"""
+        return await self.collection.find_one({"id": identifiant}, {"_id": 0, champ: {"$slice": [saut, limite]}})
+
+    async def existe(self, identifiant: str) -> bool:
+        return await self.collection.find_one({"id": identifiant}, {"_id": 1}) is not None
+
+    async def compter(self, filtre: Optional[dict] = None) -> int:
+        return await self.collection.count_documents(filtre or {})
+
+    async def sommer(self, champ: str, filtre: Optional[dict] = None) -> float:
+        resultat = await self.collection.aggregate([
+            {"$match": filtre or {}},
+            {"$group": {"_id": None, "total": {"$sum": f"${champ}"}}},
+        ]).to_list(1)
+        return resultat[0]["total"] if resultat else 0
+
+    async def inserer(self, document: dict):
+        # insert_one ajoute _id au dictionnaire reçu : on insère une copie de surface
+        await self.collection.insert_one(dict(document))
+
+    async def inserer_plusieurs(self, documents: Sequence[dict]):
+        """Un seul aller-retour pour tout le lot (imports)"""
+        if documents:
+            await self.collection.insert_many([dict(document) for document in documents], ordered=False)
+
+    async def modifier(self, identifiant: str, champs: dict) -> Optional[dict]:
+        """Applique $set et renvoie le document modifié (None s'il n'existe pas), en un aller-retour"""
+        return await self.collection.find_one_and_update(
+            {"id": identifiant}, {"$set": champs}, SANS_ID, return_document=ReturnDocument.AFTER
+        )
+
+    async def modifier_si(self, identifiant: str, condition: dict, champs: dict,
+                          ajouts: Optional[dict] = None) -> bool:
+        """$set (et $push de `ajouts`) seulement si le document vérifie encore `condition` :
+        écriture optimiste, sans relecture. Faux si le document est absent ou a changé"""
+        mise_a_jour = {"$set": champs}
+        if ajouts:
+            mise_a_jour["$push"] = ajouts
+        resultat = await self.collection.update_one({**condition, "id": identifiant}, mise_a_jour)
+        return resultat.matched_count > 0
+
+    async def modifier_selon(self, filtre: dict, champs: dict, increments: Optional[dict] = None) -> Optional[dict]:
+        """$set (et $inc de `increments`) sur le premier document du filtre, renvoyé modifié (None
+        si aucun ne correspond) : lecture et écriture atomiques, en un aller-retour"""
+        mise_a_jour = {"$set": champs}
+        if increments:
+            mise_a_jour["$inc"] = increments
+        return await self.collection.find_one_and_update(
+            filtre, mise_a_jour, SANS_ID, return_document=ReturnDocument.AFTER
+        )
+
+    async def modifier_lot(self, modifications: Sequence[Tuple[str, dict]]) -> Dict[str, dict]:
+        """Applique chaque $set dans un seul bulk_write puis relit les documents modifiés : deux
+        allers-retours quelle que soit la taille du lot. Renvoie les documents par id ; un id absent
+        du résultat n'existe pas. Les ids doivent être distincts (lot non ordonné)"""
+        if not modifications:
+            return {}
+        await self.collection.bulk_write(
+            [UpdateOne({"id": identifiant}, {"$set": champs}) for identifiant, champs in modifications],
+            ordered=False
+        )
+        identifiants = [identifiant for identifiant, _ in modifications]
+        documents = await self.collection.find({"id": {"$in": identifiants}}, SANS_ID).to_list(len(identifiants))
+        return {document["id"]: document for document in documents}
+
+    async def supprimer(self, identifiant: str) -> bool:
+        resultat = await self.collection.delete_one({"id": identifiant})
+        return resultat.deleted_count > 0
+
+    async def supprimer_selon(self, filtre: dict) -> int:
+        resultat = await self.collection.delete_many(filtre)
+        return resultat.deleted_count
+
+    async def creer_index(self, cles: Sequence[Tuple[str, int]], unique: bool = False):
+        await self.collection.create_index(list(cles), unique=unique)
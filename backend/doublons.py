@@ -0,0 +1,225 @@
+"""Doublons de contacts (prospects et clients) : clés normalisées, blocage et ressemblance
+
+Chaque contact porte des clés normalisées, stockées et indexées avec lui :
+
+    cle_email       minuscules, sans étiquette « +... » ; points ignorés chez Gmail
+    cle_telephone   chiffres seuls, format national (+33 6 12... et 06.12... donnent 0612...)
+    cle_entreprise  mots normalisés du nom, sans forme juridique (SARL, SAS...)
+    cle_nom         début du nom et initiale du prénom, clé de blocage des fautes de frappe
+
+Deux contacts ne sont comparés que s'ils partagent une clé de blocage (email, téléphone ou
+nom) : à la création et à l'import, les candidats sont lus par ces clés indexées ; le rapport
+sur toute la base compare, dans chaque bloc trié, chaque contact à ses FENETRE voisins. Le
+coût reste linéaire même quand un bloc est énorme (standard téléphonique partagé).
+"""
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from recherche import mots
+
+FORMES_JURIDIQUES = frozenset({
+    "sa", "sas", "sasu", "sarl", "eurl", "sci", "snc", "scop", "scp", "selarl", "ei", "eirl", "sca",
+    "ets", "etablissements", "societe", "ste", "cie",
+})
+DOMAINES_GMAIL = ("gmail.com", "googlemail.com")
+CHAMPS_CLES = ("cle_email", "cle_telephone", "cle_entreprise", "cle_nom")
+# Clés qui désignent les candidats à comparer (cle_entreprise, trop large, ne fait que pondérer)
+CLES_BLOCAGE = ("cle_email", "cle_telephone", "cle_nom")
+
+# Poids de chaque indice ; une paire est un doublon probable à partir de SEUIL : même email,
+# ou nom proche avec le même téléphone ou la même entreprise (un standard partagé par deux
+# collègues de la même entreprise ne suffit pas)
+POIDS = {"email": 0.7, "telephone": 0.4, "nom": 0.45, "entreprise": 0.2}
+SEUIL = 0.65
+RESSEMBLANCE_NOM_MIN = 0.8
+LONGUEUR_BLOC_NOM = 4
+FENETRE = 20
+
+_NON_CHIFFRE = re.compile(r"\D")
+
+def cle_email(email: Optional[str]) -> Optional[str]:
+    email = (email or "").strip().lower()
+    local, arobase, domaine = email.rpartition("@")
+    if not arobase or not local or not domaine:
+        return email or None
+    local = local.split("+", 1)[0]
+    if domaine in DOMAINES_GMAIL:
+        local, domaine = local.replace(".", ""), DOMAINES_GMAIL[0]
+    return f"{local}@{domaine}"
+
+def cle_telephone(telephone: Optional[str]) -> Optional[str]:
+    chiffres = _NON_CHIFFRE.sub("", telephone or "")
+    if chiffres.startswith("0033"):
+        chiffres = chiffres[4:]
+    elif chiffres.startswith("33") and len(chiffres) in (11, 12):
+        chiffres = chiffres[2:]
+    if len(chiffres) == 9:
+        chiffres = "0" + chiffres
+    return chiffres if len(chiffres) >= 6 else None
+
+def cle_entreprise(entreprise: Optional[str]) -> Optional[str]:
+    return " ".join(mot for mot in mots(entreprise) if mot not in FORMES_JURIDIQUES) or None
+
+def cle_nom(nom: Optional[str], prenom: Optional[str]) -> Optional[str]:
+    nom_normalise = "".join(mots(nom))
+    if not nom_normalise:
+        return None
+    return f"{nom_normalise[:LONGUEUR_BLOC_NOM]} {''.join(mots(prenom))[:1]}".rstrip()
+
+def cles_contact(contact: dict) -> Dict[str, Optional[str]]:
+    """Clés normalisées d'un prospect ou d'un client, à stocker avec lui"""
+    return {
+        "cle_email": cle_email(contact.get("email")),
+        "cle_telephone": cle_telephone(contact.get("telephone")),
+        "cle_entreprise": cle_entreprise(contact.get("entreprise")),
+        "cle_nom": cle_nom(contact.get("nom"), contact.get("prenom")),
+    }
+
+def fiche(type_entite: str, contact: dict) -> dict:
+    """Ce que le rapprochement utilise d'un contact : clés (stockées, ou calculées si absentes),
+    nom et prénom normalisés"""
+    cles = {champ: contact.get(champ) for champ in CHAMPS_CLES} if "cle_nom" in contact else cles_contact(contact)
+    nom, prenom = mots(contact.get("nom")), mots(contact.get("prenom"))
+    return {
+        "type": type_entite,
+        "id": contact["id"],
+        "libelle": " ".join(filter(None, (contact.get("prenom"), contact.get("nom")))),
+        "nom": " ".join(nom),
+        "prenom": " ".join(prenom),
+        "nom_complet": " ".join(prenom + nom),
+        **cles,
+    }
+
+@lru_cache(maxsize=65536)
+def noms_proches(a: str, b: str) -> bool:
+    """Noms identiques ou proches (faute de frappe, lettre manquante) ; bornes bon marché
+    d'abord, SequenceMatcher seulement si elles ne tranchent pas"""
+    if a == b:
+        return True
+    if 2 * min(len(a), len(b)) / (len(a) + len(b)) < RESSEMBLANCE_NOM_MIN:
+        return False
+    comparaison = SequenceMatcher(None, a, b, autojunk=False)
+    return comparaison.quick_ratio() >= RESSEMBLANCE_NOM_MIN and comparaison.ratio() >= RESSEMBLANCE_NOM_MIN
+
+def _prenoms_compatibles(a: str, b: str) -> bool:
+    """Prénoms proches, ou l'un réduit à l'initiale de l'autre (« J. Dupont »)"""
+    if not a or not b:
+        return True
+    if len(a) == 1 or len(b) == 1:
+        return a[0] == b[0]
+    return noms_proches(*sorted((a, b)))
+
+def _meme_personne(a: dict, b: dict) -> bool:
+    # Nom et prénom comparés séparément : un long nom commun ne rapproche pas Jean et Julien
+    return bool(a["nom"] and b["nom"]) and noms_proches(*sorted((a["nom"], b["nom"]))) \
+        and _prenoms_compatibles(a["prenom"], b["prenom"])
+
+def ressemblance(a: dict, b: dict) -> Tuple[float, List[str]]:
+    """(score entre 0 et 1, indices concordants) de deux fiches"""
+    raisons = []
+    if a["cle_email"] and a["cle_email"] == b["cle_email"]:
+        raisons.append("email")
+    if a["cle_telephone"] and a["cle_telephone"] == b["cle_telephone"]:
+        raisons.append("telephone")
+    if _meme_personne(a, b):
+        raisons.append("nom")
+    if a["cle_entreprise"] and a["cle_entreprise"] == b["cle_entreprise"]:
+        raisons.append("entreprise")
+    return round(min(1.0, sum(POIDS[raison] for raison in raisons)), 2), raisons
+
+def _blocs(fiche_contact: dict) -> List[str]:
+    return [f"{champ}:{fiche_contact[champ]}" for champ in CLES_BLOCAGE if fiche_contact[champ]]
+
+class IndexDoublons:
+    """Fiches regroupées par clé de blocage, pour rapprocher des contacts au fil de l'eau
+    (création, import d'un lot face aux candidats déjà en base et aux lignes précédentes)"""
+
+    def __init__(self, fiches: Iterable[dict] = ()):
+        self._blocs: Dict[str, List[dict]] = {}
+        for fiche_contact in fiches:
+            self.ajouter(fiche_contact)
+
+    def ajouter(self, fiche_contact: dict):
+        for bloc in _blocs(fiche_contact):
+            self._blocs.setdefault(bloc, []).append(fiche_contact)
+
+    def doublons(self, fiche_contact: dict) -> List[dict]:
+        """Doublons probables de la fiche, du plus sûr au moins sûr"""
+        vus = {(fiche_contact["type"], fiche_contact["id"])}
+        resultats = []
+        for bloc in _blocs(fiche_contact):
+            for candidat in self._blocs.get(bloc, ()):
+                cle = (candidat["type"], candidat["id"])
+                if cle in vus:
+                    continue
+                vus.add(cle)
+                score, raisons = ressemblance(fiche_contact, candidat)
+                if score >= SEUIL:
+                    resultats.append({"type": candidat["type"], "id": candidat["id"], "libelle": candidat["libelle"],
+                                      "score": score, "raisons": raisons})
+        resultats.sort(key=lambda doublon: doublon["score"], reverse=True)
+        return resultats
+
+def rapport_doublons(contacts: Sequence[Tuple[str, dict]], fenetre: int = FENETRE) -> dict:
+    """Groupes de doublons probables parmi (type, contact), en temps quasi linéaire
+
+    Dans chaque bloc, trié par nom complet, un contact n'est comparé qu'à ses `fenetre`
+    suivants : O(n × fenetre) comparaisons au plus. Les paires retenues sont fusionnées en
+    groupes (union-find) : A ~ B et B ~ C donnent le groupe {A, B, C}.
+    """
+    fiches = [fiche(type_entite, contact) for type_entite, contact in contacts]
+    parents = list(range(len(fiches)))
+
+    def racine(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    blocs: Dict[str, List[int]] = {}
+    for i, fiche_contact in enumerate(fiches):
+        for bloc in _blocs(fiche_contact):
+            blocs.setdefault(bloc, []).append(i)
+
+    comparees = set()
+    paires: Dict[Tuple[int, int], Tuple[float, List[str]]] = {}
+    for membres in blocs.values():
+        if len(membres) < 2:
+            continue
+        membres.sort(key=lambda i: fiches[i]["nom_complet"])
+        for rang, i in enumerate(membres):
+            for j in membres[rang + 1:rang + 1 + fenetre]:
+                paire = (min(i, j), max(i, j))
+                if paire in comparees:
+                    continue
+                comparees.add(paire)
+                score, raisons = ressemblance(fiches[i], fiches[j])
+                if score >= SEUIL:
+                    paires[paire] = (score, raisons)
+                    parents[racine(i)] = racine(j)
+
+    groupes: Dict[int, dict] = {}
+    for (i, j), (score, raisons) in paires.items():
+        groupe = groupes.setdefault(racine(i), {"membres": set(), "score": 0.0, "raisons": set()})
+        groupe["membres"].update((i, j))
+        groupe["score"] = max(groupe["score"], score)
+        groupe["raisons"].update(raisons)
+
+    resultat = [
+        {
+            "contacts": [{"type": fiches[i]["type"], "id": fiches[i]["id"], "libelle": fiches[i]["libelle"]}
+                         for i in sorted(groupe["membres"], key=lambda i: (fiches[i]["nom_complet"], fiches[i]["id"]))],
+            "score": groupe["score"],
+            "raisons": sorted(groupe["raisons"]),
+        }
+        for groupe in groupes.values()
+    ]
+    resultat.sort(key=lambda groupe: (-groupe["score"], -len(groupe["contacts"]), groupe["contacts"][0]["libelle"]))
+    return {
+        "contacts_analyses": len(fiches),
+        "comparaisons": len(comparees),
+        "doublons": sum(len(groupe["contacts"]) - 1 for groupe in resultat),
+        "groupes": resultat,
+    }
@@ -0,0 +1,76 @@
+"""Moteur fiscal SASU 2025, indépendant de l'API et de la base de données
+
+L'import reste léger : numpy n'est chargé que par moteur_fiscal.vectorise et
+moteur_fiscal.projection. Utilisation en ligne de commande : python -m moteur_fiscal --help
+"""
+from .baremes import (
+    PLAFOND_ABATTEMENT_2025,
+    SEUIL_IS_TAUX_REDUIT_2025,
+    TAUX_COTISATIONS_DIRIGEANT,
+    TAUX_IR_DIVIDENDES,
+    TAUX_IS_NORMAL_2025,
+    TAUX_IS_REDUIT_2025,
+    TAUX_PRELEVEMENTS_SOCIAUX,
+    TRANCHES_IR_2025,
+    calcul_cotisations_sociales_dirigeant,
+    calcul_ir_2025,
+    calcul_ir_dividendes,
+    calcul_is_2025,
+    calcul_prelevements_sociaux_dividendes,
+    version_bareme,
+)
+from .calculs import (
+    CourbeOptimisation,
+    ErreurCalculFiscal,
+    ParametresObjectifNet,
+    ParametresOptimisation,
+    ParametresSimulationNet,
+    ResultatObjectifNet,
+    ResultatOptimisation,
+    ResultatSimulationNet,
+    ScenarioFiscal,
+    SituationFamiliale,
+    ca_minimum_pour_net,
+    calculer_charges_patronales_estimees,
+    calculer_salaire_brut_depuis_net,
+    calculer_scenario,
+    optimiser_fiscalite,
+    optimiser_lot,
+    optimiser_sous_contraintes,
+    simuler_salaire_net,
+)
+
+__all__ = [
+    'PLAFOND_ABATTEMENT_2025',
+    'SEUIL_IS_TAUX_REDUIT_2025',
+    'TAUX_COTISATIONS_DIRIGEANT',
+    'TAUX_IR_DIVIDENDES',
+    'TAUX_IS_NORMAL_2025',
+    'TAUX_IS_REDUIT_2025',
+    'TAUX_PRELEVEMENTS_SOCIAUX',
+    'TRANCHES_IR_2025',
+    'calcul_cotisations_sociales_dirigeant',
+    'calcul_ir_2025',
+    'calcul_ir_dividendes',
+    'calcul_is_2025',
+    'calcul_prelevements_sociaux_dividendes',
+    'version_bareme',
+    'CourbeOptimisation',
+    'ErreurCalculFiscal',
+    'ParametresObjectifNet',
+    'ParametresOptimisation',
+    'ParametresSimulationNet',
+    'ResultatObjectifNet',
+    'ResultatOptimisation',
+    'ResultatSimulationNet',
+    'ScenarioFiscal',
+    'SituationFamiliale',
+    'ca_minimum_pour_net',
+    'calculer_charges_patronales_estimees',
+    'calculer_salaire_brut_depuis_net',
+    'calculer_scenario',
+    'optimiser_fiscalite',
+    'optimiser_lot',
+    'optimiser_sous_contraintes',
+    'simuler_salaire_net',
+]
@@ -0,0 +1,110 @@
+"""CLI : optimisation fiscale d'un fichier CSV de situations clients, ligne par ligne
+
+    python -m moteur_fiscal situations.csv -o resultats.csv
+    cat situations.csv | python -m moteur_fiscal > resultats.csv
+
+Colonnes lues (seule ca_previsionnel est obligatoire) : ca_previsionnel, charges_deductibles,
+situation_familiale, nombre_parts, autres_revenus, patrimoine_existant, remuneration_nette_souhaitee.
+Les colonnes d'entrée sont recopiées et suivies des résultats ; une ligne en erreur est
+signalée dans la colonne "erreur" sans interrompre le traitement.
+"""
+import argparse
+import csv
+import sys
+from dataclasses import fields
+
+from .calculs import ErreurCalculFiscal, ParametresOptimisation, SituationFamiliale, optimiser_fiscalite
+
+COLONNES_RESULTAT = [
+    'resultat_avant_is',
+    'remuneration_brute',
+    'dividendes_bruts',
+    'is_a_payer',
+    'cotisations_sociales',
+    'ir_sur_remuneration',
+    'ir_sur_dividendes',
+    'prelevement_sociaux_dividendes',
+    'total_impots_et_charges',
+    'net_disponible',
+    'taux_global_imposition',
+    'erreur',
+]
+
+CHAMPS_BOOLEENS = {f.name for f in fields(ParametresOptimisation) if f.type is bool}
+CHAMPS_NUMERIQUES = {f.name for f in fields(ParametresOptimisation)} - {'situation_familiale'} - CHAMPS_BOOLEENS
+VALEURS_BOOLEENNES = {'true': True, 'vrai': True, 'oui': True, '1': True,
+                      'false': False, 'faux': False, 'non': False, '0': False}
+
+
+def lire_booleen(nom: str, valeur: str) -> bool:
+    try:
+        return VALEURS_BOOLEENNES[valeur.lower()]
+    except KeyError:
+        raise ValueError(f"Valeur booléenne invalide pour {nom} : {valeur}") from None
+
+
+def lire_parametres(ligne: dict) -> ParametresOptimisation:
+    valeurs = {}
+    for nom, valeur in ligne.items():
+        if nom is None or valeur is None or valeur.strip() == '':
+            continue
+        valeur = valeur.strip()
+        if nom == 'situation_familiale':
+            valeurs[nom] = SituationFamiliale(valeur.lower())
+        elif nom in CHAMPS_BOOLEENS:
+            valeurs[nom] = lire_booleen(nom, valeur)
+        elif nom in CHAMPS_NUMERIQUES:
+            valeurs[nom] = float(valeur.replace(',', '.'))
+    if 'ca_previsionnel' not in valeurs:
+        raise ErreurCalculFiscal("Colonne ca_previsionnel manquante")
+    return ParametresOptimisation(**valeurs)
+
+
+def traiter(entree, sortie, delimiteur: str = ',') -> tuple:
+    """Optimise chaque ligne au fil de l'eau ; retourne (lignes traitées, lignes en erreur)"""
+    lecteur = csv.DictReader(entree, delimiter=delimiteur)
+    colonnes_entree = lecteur.fieldnames or []
+    colonnes = colonnes_entree + [c for c in COLONNES_RESULTAT if c not in colonnes_entree]
+    ecrivain = csv.DictWriter(sortie, fieldnames=colonnes, delimiter=delimiteur, extrasaction='ignore')
+    ecrivain.writeheader()
+
+    traitees = erreurs = 0
+    for ligne in lecteur:
+        resultat = dict(ligne)
+        try:
+            optimisation = optimiser_fiscalite(lire_parametres(ligne))
+            scenario = optimisation.scenario_optimal
+            resultat['resultat_avant_is'] = round(optimisation.resultat_avant_is, 2)
+            for colonne in COLONNES_RESULTAT[1:-1]:
+                resultat[colonne] = round(getattr(scenario, colonne), 2)
+        except ValueError as e:  # ErreurCalculFiscal ou valeur de colonne invalide
+            resultat['erreur'] = str(e)
+            erreurs += 1
+        ecrivain.writerow(resultat)
+        traitees += 1
+    return traitees, erreurs
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m moteur_fiscal', description=__doc__.splitlines()[0])
+    parser.add_argument('entree', nargs='?', help="Fichier CSV d'entrée (défaut : entrée standard)")
+    parser.add_argument('-o', '--sortie', help="Fichier CSV de sortie (défaut : sortie standard)")
+    parser.add_argument('-d', '--delimiteur', default=',', help="Séparateur de colonnes (défaut : ,)")
+    args = parser.parse_args(argv)
+
+    entree = open(args.entree, newline='', encoding='utf-8') if args.entree else sys.stdin
+    sortie = open(args.sortie, 'w', newline='', encoding='utf-8') if args.sortie else sys.stdout
+    try:
+        traitees, erreurs = traiter(entree, sortie, args.delimiteur)
+    finally:
+        if args.entree:
+            entree.close()
+        if args.sortie:
+            sortie.close()
+
+    print(f"{traitees} situation(s) traitée(s), {erreurs} en erreur", file=sys.stderr)
+    return 1 if erreurs and erreurs == traitees else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Barèmes fiscaux 2025 et calculs élémentaires (IS, IR, cotisations, fiscalité des dividendes)"""
+import hashlib
+import json
+
+# IS 2025 : taux réduit PME jusqu'à 42 500€, taux normal au-delà
+SEUIL_IS_TAUX_REDUIT_2025 = 42500
+TAUX_IS_REDUIT_2025 = 0.15
+TAUX_IS_NORMAL_2025 = 0.25
+
+# Barème IR 2025 par part
+TRANCHES_IR_2025 = [
+    (0, 11294, 0.0),      # 0%
+    (11294, 28797, 0.11), # 11%
+    (28797, 82341, 0.30), # 30%
+    (82341, 177106, 0.41), # 41%
+    (177106, float('inf'), 0.45) # 45%
+]
+
+PLAFOND_ABATTEMENT_2025 = 12829
+TAUX_COTISATIONS_DIRIGEANT = 0.45
+TAUX_IR_DIVIDENDES = 0.128
+TAUX_PRELEVEMENTS_SOCIAUX = 0.172
+
+def version_bareme() -> str:
+    """Empreinte des paramètres du barème : change dès qu'un taux ou une tranche change"""
+    parametres = {
+        "is": [SEUIL_IS_TAUX_REDUIT_2025, TAUX_IS_REDUIT_2025, TAUX_IS_NORMAL_2025],
+        "ir": [[min_t, None if max_t == float('inf') else max_t, taux] for min_t, max_t, taux in TRANCHES_IR_2025],
+        "abattement": PLAFOND_ABATTEMENT_2025,
+        "cotisations": TAUX_COTISATIONS_DIRIGEANT,
+        "dividendes": [TAUX_IR_DIVIDENDES, TAUX_PRELEVEMENTS_SOCIAUX],
+    }
+    empreinte = hashlib.sha256(json.dumps(parametres, sort_keys=True).encode()).hexdigest()
+    return f"2025-{empreinte[:12]}"
+
+def calcul_is_2025(benefice: float) -> float:
+    """Calcul de l'impôt sur les sociétés 2025"""
+    if benefice <= 0:
+        return 0.0
+    
+    is_total = 0.0
+    
+    # Tranche à 15% jusqu'à 42 500€
+    if benefice <= SEUIL_IS_TAUX_REDUIT_2025:
+        is_total = benefice * TAUX_IS_REDUIT_2025
+    else:
+        # 15% sur les premiers 42 500€
+        is_total = SEUIL_IS_TAUX_REDUIT_2025 * TAUX_IS_REDUIT_2025
+        # 25% sur le surplus
+        is_total += (benefice - SEUIL_IS_TAUX_REDUIT_2025) * TAUX_IS_NORMAL_2025
+    
+    return is_total
+
+def calcul_ir_2025(revenu_imposable: float, nombre_parts: float = 1.0) -> float:
+    """Calcul de l'impôt sur le revenu 2025 avec barème progressif"""
+    if revenu_imposable <= 0:
+        return 0.0
+    
+    # Quotient familial
+    quotient = revenu_imposable / nombre_parts
+    
+    tranches = TRANCHES_IR_2025
+    
+    ir_par_part = 0.0
+    
+    for i, (min_tranche, max_tranche, taux) in enumerate(tranches):
+        if quotient > min_tranche:
+            base_imposable = min(quotient, max_tranche) - min_tranche
+            ir_par_part += base_imposable * taux
+    
+    return ir_par_part * nombre_parts
+
+def calcul_cotisations_sociales_dirigeant(remuneration_brute: float) -> float:
+    """Calcul des cotisations sociales pour dirigeant SASU"""
+    if remuneration_brute <= 0:
+        return 0.0
+    
+    # Approximation globale des cotisations dirigeant SASU (≈ 45%)
+    return remuneration_brute * TAUX_COTISATIONS_DIRIGEANT
+
+def calcul_ir_dividendes(dividendes_nets: float) -> float:
+    """Calcul IR sur dividendes avec flat tax 12.8%"""
+    return dividendes_nets * TAUX_IR_DIVIDENDES
+
+def calcul_prelevements_sociaux_dividendes(dividendes_nets: float) -> float:
+    """Calcul prélèvements sociaux sur dividendes 17.2%"""
+    return dividendes_nets * TAUX_PRELEVEMENTS_SOCIAUX
@@ -0,0 +1,663 @@
+"""Scénarios fiscaux SASU, simulation par salaire net et optimisation rémunération / dividendes
+
+Module sans dépendance web ni base de données : utilisable par l'API, la CLI et les workers de calcul.
+"""
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import List, Optional
+
+from . import baremes
+from .baremes import (
+    calcul_cotisations_sociales_dirigeant,
+    calcul_ir_2025,
+    calcul_ir_dividendes,
+    calcul_is_2025,
+    calcul_prelevements_sociaux_dividendes,
+)
+
+class ErreurCalculFiscal(ValueError):
+    """Situation impossible à calculer (résultat négatif, contrainte irréalisable...)"""
+
+class SituationFamiliale(str, Enum):
+    CELIBATAIRE = "celibataire"
+    MARIE = "marie"
+    PACS = "pacs"
+
+@dataclass
+class ParametresOptimisation:
+    ca_previsionnel: float
+    charges_deductibles: float = 0.0
+    situation_familiale: SituationFamiliale = SituationFamiliale.CELIBATAIRE
+    nombre_parts: float = 1.0
+    autres_revenus: float = 0.0
+    patrimoine_existant: float = 0.0
+    remuneration_nette_souhaitee: Optional[float] = None
+    include_curve: bool = False
+    # Bornes de l'optimisation sous contraintes (salaire net = après cotisations et IR)
+    remuneration_brute_min: Optional[float] = None
+    remuneration_brute_max: Optional[float] = None
+    remuneration_nette_min: Optional[float] = None
+    remuneration_nette_max: Optional[float] = None
+    dividendes_min: Optional[float] = None
+    dividendes_max: Optional[float] = None
+
+BORNES_OPTIMISATION = (
+    'remuneration_brute_min', 'remuneration_brute_max',
+    'remuneration_nette_min', 'remuneration_nette_max',
+    'dividendes_min', 'dividendes_max',
+)
+
+@dataclass
+class ParametresSimulationNet:
+    salaire_net_souhaite: float
+    situation_familiale: SituationFamiliale = SituationFamiliale.CELIBATAIRE
+    nombre_parts: float = 1.0
+    autres_revenus: float = 0.0
+
+@dataclass
+class ScenarioFiscal:
+    remuneration_brute: float
+    dividendes_bruts: float
+    is_a_payer: float
+    cotisations_sociales: float
+    ir_sur_remuneration: float
+    ir_sur_dividendes: float
+    prelevement_sociaux_dividendes: float
+    total_impots_et_charges: float
+    net_disponible: float  # Salaire net avant IR + dividendes nets
+    taux_global_imposition: float
+
+@dataclass
+class CourbeOptimisation:
+    """Courbe complète de l'optimisation en colonnes : l'indice i de chaque liste est le même scénario"""
+    part_remuneration: List[float]
+    remuneration_brute: List[float]
+    dividendes_bruts: List[float]
+    is_a_payer: List[float]
+    cotisations_sociales: List[float]
+    ir_sur_remuneration: List[float]
+    ir_sur_dividendes: List[float]
+    prelevement_sociaux_dividendes: List[float]
+    total_impots_et_charges: List[float]
+    net_disponible: List[float]
+    taux_global_imposition: List[float]
+
+@dataclass
+class ResultatOptimisation:
+    ca_previsionnel: float
+    resultat_avant_is: float
+    scenario_optimal: ScenarioFiscal
+    scenario_remuneration_max: ScenarioFiscal
+    scenario_dividendes_max: ScenarioFiscal
+    recommandations: List[str]
+    courbe: Optional[CourbeOptimisation] = None
+
+@dataclass
+class ResultatSimulationNet:
+    salaire_net_souhaite: float
+    salaire_brut_necessaire: float
+    cotisations_sociales: float
+    ir_sur_salaire: float
+    salaire_net_reel: float
+    charges_patronales_estimees: float
+    cout_total_entreprise: float
+    taux_charges_sociales: float
+    taux_prelevement_total: float
+    recommandations: List[str]
+
+def calculer_scenario(ca: float, charges: float, remuneration_brute: float, 
+                     situation_familiale: SituationFamiliale, nombre_parts: float,
+                     autres_revenus: float) -> ScenarioFiscal:
+    """Calcule un scénario fiscal complet"""
+    
+    # Calcul du résultat avant IS
+    cotisations_sociales = calcul_cotisations_sociales_dirigeant(remuneration_brute)
+    resultat_avant_is = ca - charges - remuneration_brute - cotisations_sociales
+    
+    # IS
+    is_a_payer = calcul_is_2025(resultat_avant_is)
+    
+    # Dividendes disponibles
+    resultat_net = resultat_avant_is - is_a_payer
+    dividendes_bruts = max(0, resultat_net)
+    
+    # IR sur rémunération (avec abattement de 10% plafonné)
+    remuneration_nette = remuneration_brute - cotisations_sociales
+    abattement = min(remuneration_nette * 0.10, baremes.PLAFOND_ABATTEMENT_2025)  # Plafond 2025
+    base_ir_remuneration = max(0, remuneration_nette - abattement)
+    revenu_total_ir = base_ir_remuneration + autres_revenus
+    
+    ir_sur_remuneration = calcul_ir_2025(revenu_total_ir, nombre_parts)
+    
+    # Fiscalité des dividendes
+    ir_sur_dividendes = calcul_ir_dividendes(dividendes_bruts)
+    prelevement_sociaux_dividendes = calcul_prelevements_sociaux_dividendes(dividendes_bruts)
+    
+    # Totaux
+    total_impots_et_charges = (cotisations_sociales + is_a_payer + ir_sur_remuneration + 
+                              ir_sur_dividendes + prelevement_sociaux_dividendes)
+    
+    dividendes_nets = dividendes_bruts - ir_sur_dividendes - prelevement_sociaux_dividendes
+    net_disponible = remuneration_nette + dividendes_nets
+    
+    taux_global = (total_impots_et_charges / ca * 100) if ca > 0 else 0
+    
+    return ScenarioFiscal(
+        remuneration_brute=remuneration_brute,
+        dividendes_bruts=dividendes_bruts,
+        is_a_payer=is_a_payer,
+        cotisations_sociales=cotisations_sociales,
+        ir_sur_remuneration=ir_sur_remuneration,
+        ir_sur_dividendes=ir_sur_dividendes,
+        prelevement_sociaux_dividendes=prelevement_sociaux_dividendes,
+        total_impots_et_charges=total_impots_et_charges,
+        net_disponible=net_disponible,
+        taux_global_imposition=taux_global
+    )
+
+def generer_recommandations(ca: float, scenario_optimal: ScenarioFiscal, 
+                           scenario_rem: ScenarioFiscal, scenario_div: ScenarioFiscal) -> List[str]:
+    """Génère des recommandations personnalisées"""
+    recommandations = []
+    
+    if scenario_optimal.remuneration_brute > 0:
+        recommandations.append(
+            f"💡 Rémunération optimale : {scenario_optimal.remuneration_brute:,.0f}€ bruts annuels"
+        )
+    
+    if scenario_optimal.dividendes_bruts > 0:
+        recommandations.append(
+            f"💰 Dividendes optimaux : {scenario_optimal.dividendes_bruts:,.0f}€ bruts"
+        )
+    
+    if scenario_optimal.taux_global_imposition < 35:
+        recommandations.append("✅ Votre taux global d'imposition est très avantageux")
+    elif scenario_optimal.taux_global_imposition < 45:
+        recommandations.append("⚠️ Taux d'imposition modéré, possibilité d'optimisation")
+    else:
+        recommandations.append("🔍 Taux d'imposition élevé, optimisation recommandée")
+    
+    if ca > 100000:
+        recommandations.append("📈 Avec ce niveau de CA, pensez aux investissements déductibles")
+    
+    if scenario_optimal.remuneration_brute < 45000:
+        recommandations.append("💼 Profitez du taux réduit IS de 15% jusqu'à 42 500€ de bénéfices")
+    
+    return recommandations
+
+def salaire_net_apres_ir(salaire_brut: float, nombre_parts: float, autres_revenus: float) -> float:
+    """Salaire net après cotisations et IR (l'IR du foyer est imputé sur le salaire)"""
+    salaire_net_avant_ir = salaire_brut - calcul_cotisations_sociales_dirigeant(salaire_brut)
+    abattement = min(salaire_net_avant_ir * 0.10, baremes.PLAFOND_ABATTEMENT_2025)
+    base_ir = max(0, salaire_net_avant_ir - abattement)
+    return salaire_net_avant_ir - calcul_ir_2025(base_ir + autres_revenus, nombre_parts)
+
+def points_de_rupture_salaire(nombre_parts: float, autres_revenus: float) -> List[float]:
+    """Salaires bruts où la fonction brut -> net change de pente (plafond d'abattement, tranches IR)
+
+    Entre deux points consécutifs, le salaire net est une fonction affine du brut.
+    """
+    taux_net = 1 - baremes.TAUX_COTISATIONS_DIRIGEANT
+    brut_plafond_abattement = baremes.PLAFOND_ABATTEMENT_2025 / (0.10 * taux_net)
+    points = {0.0, brut_plafond_abattement}
+    for min_tranche, _, _ in baremes.TRANCHES_IR_2025[1:]:
+        base_seuil = min_tranche * nombre_parts - autres_revenus
+        if base_seuil <= 0:
+            continue
+        # Base IR = 90% du net tant que l'abattement n'est pas plafonné, net - plafond ensuite
+        brut_avant_plafond = base_seuil / (0.90 * taux_net)
+        if brut_avant_plafond <= brut_plafond_abattement:
+            points.add(brut_avant_plafond)
+        brut_apres_plafond = (base_seuil + baremes.PLAFOND_ABATTEMENT_2025) / taux_net
+        if brut_apres_plafond >= brut_plafond_abattement:
+            points.add(brut_apres_plafond)
+    return sorted(points)
+
+def salaire_brut_pour_net(salaire_net_cible: float, nombre_parts: float, autres_revenus: float,
+                          points: Optional[List[float]] = None) -> float:
+    """Inverse exacte de salaire_net_apres_ir : interpolation sur le segment affine qui contient la cible
+
+    points : points de rupture du foyer s'ils sont déjà calculés (points_de_rupture_salaire)
+    """
+    if points is None:
+        points = points_de_rupture_salaire(nombre_parts, autres_revenus)
+    brut_precedent = points[0]
+    net_precedent = salaire_net_apres_ir(brut_precedent, nombre_parts, autres_revenus)
+    if salaire_net_cible <= net_precedent:
+        return brut_precedent
+
+    # Le dernier segment est prolongé au-delà du dernier point de rupture
+    points = points + [points[-1] * 2 + 1.0]
+    for brut in points[1:]:
+        net = salaire_net_apres_ir(brut, nombre_parts, autres_revenus)
+        if net >= salaire_net_cible or brut == points[-1]:
+            return brut_precedent + (salaire_net_cible - net_precedent) * (brut - brut_precedent) / (net - net_precedent)
+        brut_precedent, net_precedent = brut, net
+
+# Table net -> brut précalculée (moteur_fiscal.table_net_brut), consultée avant le solveur exact
+_table_net_brut = None
+
+def utiliser_table_net_brut(table) -> None:
+    """Active (ou désactive avec None) la table précalculée pour les simulations par salaire net"""
+    global _table_net_brut
+    _table_net_brut = table
+
+def calculer_salaire_brut_depuis_net(salaire_net_cible: float, situation_familiale: SituationFamiliale, 
+                                   nombre_parts: float, autres_revenus: float) -> dict:
+    """Calcule le salaire brut nécessaire pour obtenir un salaire net donné"""
+    salaire_brut = None
+    if _table_net_brut is not None:
+        salaire_brut = _table_net_brut.salaire_brut(salaire_net_cible, nombre_parts, autres_revenus)
+    if salaire_brut is None:
+        salaire_brut = salaire_brut_pour_net(salaire_net_cible, nombre_parts, autres_revenus)
+    cotisations = calcul_cotisations_sociales_dirigeant(salaire_brut)
+    salaire_net_avant_ir = salaire_brut - cotisations
+    
+    # Calcul IR avec abattement
+    abattement = min(salaire_net_avant_ir * 0.10, baremes.PLAFOND_ABATTEMENT_2025)
+    base_ir = max(0, salaire_net_avant_ir - abattement)
+    ir_sur_salaire = calcul_ir_2025(base_ir + autres_revenus, nombre_parts)
+    
+    return {
+        'salaire_brut': salaire_brut,
+        'cotisations_sociales': cotisations,
+        'ir_sur_salaire': ir_sur_salaire,
+        'salaire_net_reel': salaire_net_avant_ir - ir_sur_salaire
+    }
+
+def calculer_charges_patronales_estimees(salaire_brut: float) -> float:
+    """Estimation des charges patronales (approximation)"""
+    # Charges patronales approximatives : 42% du brut
+    return salaire_brut * 0.42
+
+def generer_recommandations_salaire_net(salaire_net_souhaite: float, calculs: dict, 
+                                       charges_patronales: float) -> List[str]:
+    """Génère des recommandations pour la simulation par salaire net"""
+    recommandations = []
+    
+    cout_total = calculs['salaire_brut'] + charges_patronales
+    taux_prelevement = ((calculs['salaire_brut'] - calculs['salaire_net_reel']) / calculs['salaire_brut'] * 100) if calculs['salaire_brut'] > 0 else 0
+    
+    recommandations.append(
+        f"💰 Pour {salaire_net_souhaite:,.0f}€ net, il faut {calculs['salaire_brut']:,.0f}€ brut"
+    )
+    
+    recommandations.append(
+        f"🏢 Coût total pour l'entreprise : {cout_total:,.0f}€ (charges patronales incluses)"
+    )
+    
+    if taux_prelevement < 35:
+        recommandations.append("✅ Taux de prélèvement avantageux pour ce niveau de salaire")
+    elif taux_prelevement < 45:
+        recommandations.append("⚠️ Taux de prélèvement modéré, optimisation possible")
+    else:
+        recommandations.append("🔍 Taux de prélèvement élevé, envisager l'optimisation dividendes")
+    
+    if salaire_net_souhaite > 50000:
+        recommandations.append("💡 Avec ce niveau de salaire, pensez à la répartition rémunération/dividendes")
+    
+    if calculs['ir_sur_salaire'] > 10000:
+        recommandations.append("📋 IR élevé : vérifiez les possibilités de défiscalisation")
+    
+    return recommandations
+
+def simuler_salaire_net(parametres: ParametresSimulationNet) -> ResultatSimulationNet:
+    """Simule les charges et impacts fiscaux à partir d'un salaire net souhaité"""
+    if parametres.salaire_net_souhaite <= 0:
+        raise ErreurCalculFiscal("Le salaire net souhaité doit être positif")
+    
+    # Calculs pour obtenir le salaire net souhaité
+    calculs = calculer_salaire_brut_depuis_net(
+        parametres.salaire_net_souhaite,
+        parametres.situation_familiale,
+        parametres.nombre_parts,
+        parametres.autres_revenus
+    )
+    
+    # Estimation des charges patronales
+    charges_patronales = calculer_charges_patronales_estimees(calculs['salaire_brut'])
+    cout_total_entreprise = calculs['salaire_brut'] + charges_patronales
+    
+    # Taux de charges
+    taux_charges_sociales = (calculs['cotisations_sociales'] / calculs['salaire_brut'] * 100) if calculs['salaire_brut'] > 0 else 0
+    taux_prelevement_total = ((calculs['salaire_brut'] - calculs['salaire_net_reel']) / calculs['salaire_brut'] * 100) if calculs['salaire_brut'] > 0 else 0
+    
+    # Recommandations
+    recommandations = generer_recommandations_salaire_net(
+        parametres.salaire_net_souhaite, calculs, charges_patronales
+    )
+    
+    return ResultatSimulationNet(
+        salaire_net_souhaite=parametres.salaire_net_souhaite,
+        salaire_brut_necessaire=calculs['salaire_brut'],
+        cotisations_sociales=calculs['cotisations_sociales'],
+        ir_sur_salaire=calculs['ir_sur_salaire'],
+        salaire_net_reel=calculs['salaire_net_reel'],
+        charges_patronales_estimees=charges_patronales,
+        cout_total_entreprise=cout_total_entreprise,
+        taux_charges_sociales=taux_charges_sociales,
+        taux_prelevement_total=taux_prelevement_total,
+        recommandations=recommandations
+    )
+
+def generer_recommandations_avec_contrainte(ca: float, scenario_contraint: ScenarioFiscal, 
+                                          remuneration_nette_souhaitee: float) -> List[str]:
+    """Génère des recommandations pour un scénario avec contrainte de rémunération"""
+    recommandations = []
+    
+    recommandations.append(
+        f"🎯 Rémunération nette respectée : {remuneration_nette_souhaitee:,.0f}€ comme souhaité"
+    )
+    
+    recommandations.append(
+        f"💼 Salaire brut nécessaire : {scenario_contraint.remuneration_brute:,.0f}€ "
+        f"(charges sociales : {scenario_contraint.cotisations_sociales:,.0f}€)"
+    )
+    
+    if scenario_contraint.dividendes_bruts > 0:
+        dividendes_nets = scenario_contraint.dividendes_bruts - scenario_contraint.ir_sur_dividendes - scenario_contraint.prelevement_sociaux_dividendes
+        recommandations.append(
+            f"💰 Dividendes disponibles : {scenario_contraint.dividendes_bruts:,.0f}€ bruts "
+            f"({dividendes_nets:,.0f}€ nets après fiscalité 30%)"
+        )
+    else:
+        recommandations.append("⚠️ Aucun dividende possible avec cette contrainte de rémunération")
+    
+    if scenario_contraint.taux_global_imposition < 35:
+        recommandations.append("✅ Taux global d'imposition avantageux malgré la contrainte")
+    elif scenario_contraint.taux_global_imposition < 45:
+        recommandations.append("📊 Taux d'imposition modéré avec cette répartition imposée")
+    else:
+        recommandations.append("🔍 Taux d'imposition élevé : la contrainte limite l'optimisation")
+    
+    cout_total_remuneration = scenario_contraint.remuneration_brute + scenario_contraint.cotisations_sociales
+    if cout_total_remuneration > ca * 0.6:
+        recommandations.append("⚠️ Coût de la rémunération élevé par rapport au CA (>60%)")
+    
+    return recommandations
+
+def remuneration_pour_dividendes(resultat_avant_is: float, dividendes_bruts: float) -> float:
+    """Salaire brut qui laisse exactement dividendes_bruts après IS (inverse du calcul de scénario)"""
+    taux_cout = 1 + baremes.TAUX_COTISATIONS_DIRIGEANT
+    if dividendes_bruts <= 0:
+        return resultat_avant_is / taux_cout
+    dividendes_seuil = baremes.SEUIL_IS_TAUX_REDUIT_2025 * (1 - baremes.TAUX_IS_REDUIT_2025)
+    if dividendes_bruts <= dividendes_seuil:
+        benefice = dividendes_bruts / (1 - baremes.TAUX_IS_REDUIT_2025)
+    else:
+        benefice = (baremes.SEUIL_IS_TAUX_REDUIT_2025
+                    + (dividendes_bruts - dividendes_seuil) / (1 - baremes.TAUX_IS_NORMAL_2025))
+    return (resultat_avant_is - benefice) / taux_cout
+
+# Domaine de recherche du salaire brut, commun à l'optimisation libre et sous contraintes :
+# de 0 à 80% du résultat ; la courbe l'échantillonne par pas de 5%
+PART_REMUNERATION_MAX = 80
+PAS_PART_REMUNERATION = 5
+
+def salaires_candidats(resultat_avant_is: float, bas: float, haut: float) -> List[float]:
+    """Salaires bruts où le net disponible peut atteindre son maximum sur [bas, haut]
+
+    Le net disponible (salaire net avant IR + dividendes nets) est affine par morceaux en
+    fonction du brut : il ne change de pente qu'au seuil du taux réduit d'IS et là où les
+    dividendes s'annulent. Son maximum est donc atteint à une extrémité ou à l'un de ces coudes.
+    """
+    taux_cout = 1 + baremes.TAUX_COTISATIONS_DIRIGEANT
+    coudes = ((resultat_avant_is - baremes.SEUIL_IS_TAUX_REDUIT_2025) / taux_cout, resultat_avant_is / taux_cout)
+    return sorted({bas, haut} | {c for c in coudes if bas < c < haut})
+
+def optimiser_sous_contraintes(parametres: ParametresOptimisation) -> tuple:
+    """Optimum exact du net disponible, sous bornes de salaire brut, de salaire net et de dividendes
+
+    Sans borne, c'est l'optimisation libre : les deux modes cherchent le salaire brut sur le
+    même domaine (0 à PART_REMUNERATION_MAX % du résultat), si bien qu'une borne non atteinte
+    ne change pas l'optimum. Chaque borne se traduit en intervalle sur le salaire brut (toutes
+    les relations sont monotones) ; seuls les candidats de salaires_candidats sont évalués.
+    Retourne (scénario optimal, libellés des contraintes actives).
+    """
+    ca = parametres.ca_previsionnel
+    charges = parametres.charges_deductibles
+    resultat_avant_is = ca - charges
+    nombre_parts = parametres.nombre_parts
+    autres_revenus = parametres.autres_revenus
+
+    net_min = parametres.remuneration_nette_min
+    net_max = parametres.remuneration_nette_max
+    remuneration_nette_souhaitee = parametres.remuneration_nette_souhaitee
+    remuneration_imposee = bool(remuneration_nette_souhaitee and remuneration_nette_souhaitee > 0)
+    if remuneration_imposee:
+        net_min = max(net_min or 0, remuneration_nette_souhaitee)
+        net_max = min(net_max if net_max is not None else float('inf'), remuneration_nette_souhaitee)
+
+    # Bornes de salaire net (après IR) : points de rupture du foyer calculés une fois, chaque
+    # salaire net visé inversé une fois (la rémunération imposée est à la fois le net minimum,
+    # le net maximum et la cible vérifiée)
+    ruptures_salaire = None
+    if net_min is not None or net_max is not None:
+        ruptures_salaire = points_de_rupture_salaire(nombre_parts, autres_revenus)
+    bruts_pour_net = {}
+
+    def brut_pour_net(net: float) -> float:
+        if net not in bruts_pour_net:
+            bruts_pour_net[net] = salaire_brut_pour_net(net, nombre_parts, autres_revenus, ruptures_salaire)
+        return bruts_pour_net[net]
+
+    if remuneration_imposee:
+        # Vérification que la contrainte est réalisable
+        salaire_brut = brut_pour_net(remuneration_nette_souhaitee)
+        cout_total_remuneration = salaire_brut + calcul_cotisations_sociales_dirigeant(salaire_brut)
+        if cout_total_remuneration > resultat_avant_is:
+            raise ErreurCalculFiscal(
+                f"Rémunération nette de {remuneration_nette_souhaitee:,.0f}€ impossible avec ce CA. "
+                f"Coût total : {cout_total_remuneration:,.0f}€, disponible : {resultat_avant_is:,.0f}€"
+            )
+
+    # (salaire brut correspondant, borne inférieure ?, libellé, valeur de la borne) ; les libellés
+    # ne sont mis en forme que pour les contraintes actives
+    bornes = []
+    if parametres.remuneration_brute_min is not None:
+        bornes.append((parametres.remuneration_brute_min, True, "salaire brut minimum",
+                       parametres.remuneration_brute_min))
+    if parametres.remuneration_brute_max is not None:
+        bornes.append((parametres.remuneration_brute_max, False, "salaire brut maximum",
+                       parametres.remuneration_brute_max))
+    if net_min is not None:
+        bornes.append((brut_pour_net(net_min), True, "salaire net minimum", net_min))
+    if net_max is not None:
+        bornes.append((brut_pour_net(net_max), False, "salaire net maximum", net_max))
+    if parametres.dividendes_max is not None:
+        bornes.append((remuneration_pour_dividendes(resultat_avant_is, parametres.dividendes_max), True,
+                       "dividendes maximum", parametres.dividendes_max))
+    if parametres.dividendes_min is not None:
+        bornes.append((remuneration_pour_dividendes(resultat_avant_is, parametres.dividendes_min), False,
+                       "dividendes minimum", parametres.dividendes_min))
+
+    bas = max([0.0] + [brut for brut, inferieure, _, _ in bornes if inferieure])
+    haut = min([resultat_avant_is * PART_REMUNERATION_MAX / 100]
+               + [brut for brut, inferieure, _, _ in bornes if not inferieure])
+    if bas > haut + 0.01:
+        raise ErreurCalculFiscal(
+            f"Contraintes incompatibles : salaire brut d'au moins {bas:,.0f}€ "
+            f"et d'au plus {haut:,.0f}€"
+        )
+    # Intervalle réduit à un point (rémunération nette imposée) : seul candidat
+    candidats = [bas] if haut <= bas else salaires_candidats(resultat_avant_is, bas, haut)
+    scenarios = [
+        calculer_scenario(ca, charges, r, parametres.situation_familiale, nombre_parts, autres_revenus)
+        for r in candidats
+    ]
+    scenario_optimal = max(scenarios, key=lambda s: s.net_disponible)
+
+    contraintes_actives = [
+        f"{libelle} ({valeur:,.0f}€)" for brut, _, libelle, valeur in bornes
+        if abs(brut - scenario_optimal.remuneration_brute) < 0.01
+    ]
+    return scenario_optimal, contraintes_actives
+
+def calculer_courbe(ca: float, charges: float, parametres: ParametresOptimisation) -> List[ScenarioFiscal]:
+    """Scénarios de la grille de rémunération, du 100% dividendes au maximum de rémunération"""
+    resultat_avant_is = ca - charges
+    return [
+        calculer_scenario(
+            ca, charges, resultat_avant_is * i / 100,
+            parametres.situation_familiale, parametres.nombre_parts, parametres.autres_revenus
+        )
+        for i in range(0, PART_REMUNERATION_MAX + 1, PAS_PART_REMUNERATION)
+    ]
+
+def courbe_en_colonnes(scenarios: List[ScenarioFiscal]) -> CourbeOptimisation:
+    colonnes = {f.name: [getattr(s, f.name) for s in scenarios] for f in fields(ScenarioFiscal)}
+    parts = [i / 100 for i in range(0, PART_REMUNERATION_MAX + 1, PAS_PART_REMUNERATION)]
+    return CourbeOptimisation(part_remuneration=parts[:len(scenarios)], **colonnes)
+
+def optimiser_fiscalite(parametres: ParametresOptimisation) -> ResultatOptimisation:
+    """Calcule l'optimisation fiscale pour une SASU"""
+    ca = parametres.ca_previsionnel
+    charges = parametres.charges_deductibles
+    resultat_avant_is = ca - charges
+    
+    if resultat_avant_is <= 0:
+        raise ErreurCalculFiscal("Le résultat avant IS doit être positif")
+    
+    # Optimum exact, libre ou sous contraintes (réalisabilité de la rémunération imposée comprise) :
+    # même moteur et même domaine de salaire brut dans les deux cas
+    scenario_optimal, contraintes_actives = optimiser_sous_contraintes(parametres)
+    
+    # Scénarios de comparaison (sans contrainte), extrémités de la courbe
+    courbe = None
+    if parametres.include_curve:
+        scenarios = calculer_courbe(ca, charges, parametres)
+        courbe = courbe_en_colonnes(scenarios)
+        scenario_remuneration_max = scenarios[-1]  # 80% en rémunération
+        scenario_dividendes_max = scenarios[0]  # 0% en rémunération
+    else:
+        scenario_remuneration_max = calculer_scenario(
+            ca, charges, resultat_avant_is * PART_REMUNERATION_MAX / 100,
+            parametres.situation_familiale, parametres.nombre_parts, parametres.autres_revenus
+        )
+        
+        scenario_dividendes_max = calculer_scenario(
+            ca, charges, 0,
+            parametres.situation_familiale, parametres.nombre_parts, parametres.autres_revenus
+        )
+    
+    if parametres.remuneration_nette_souhaitee and parametres.remuneration_nette_souhaitee > 0:
+        recommandations = generer_recommandations_avec_contrainte(
+            ca, scenario_optimal, parametres.remuneration_nette_souhaitee
+        )
+    else:
+        recommandations = generer_recommandations(
+            ca, scenario_optimal, scenario_remuneration_max, scenario_dividendes_max
+        )
+        recommandations.extend(f"📌 Contrainte active : {libelle}" for libelle in contraintes_actives)
+    
+    return ResultatOptimisation(
+        ca_previsionnel=ca,
+        resultat_avant_is=resultat_avant_is,
+        scenario_optimal=scenario_optimal,
+        scenario_remuneration_max=scenario_remuneration_max,
+        scenario_dividendes_max=scenario_dividendes_max,
+        recommandations=recommandations,
+        courbe=courbe
+    )
+
+@dataclass
+class ParametresObjectifNet:
+    net_disponible_cible: float
+    charges_deductibles: float = 0.0
+    situation_familiale: SituationFamiliale = SituationFamiliale.CELIBATAIRE
+    nombre_parts: float = 1.0
+    autres_revenus: float = 0.0
+    part_remuneration: Optional[float] = None  # None : répartition optimale à chaque CA
+    precision: float = 1.0  # Précision souhaitée sur le CA (€)
+
+@dataclass
+class ResultatObjectifNet:
+    net_disponible_cible: float
+    ca_minimum: float
+    net_disponible_obtenu: float
+    part_remuneration: float
+    scenario: ScenarioFiscal
+    evaluations: int
+    precision_atteinte: float
+    converge: bool
+
+# Bornes du goal-seek : doublements pour encadrer, puis dichotomie
+OBJECTIF_MAX_DOUBLEMENTS = 40
+OBJECTIF_MAX_DICHOTOMIES = 60
+
+def ca_minimum_pour_net(parametres: ParametresObjectifNet) -> ResultatObjectifNet:
+    """CA minimum qui permet d'atteindre un net disponible cible
+
+    Le net disponible (à part de rémunération fixe, ou à répartition optimale) est croissant
+    avec le CA : on encadre la solution par doublements puis on la resserre par dichotomie.
+    Le CA retourné est la borne haute de l'encadrement : il atteint toujours la cible.
+    """
+    cible = parametres.net_disponible_cible
+    charges = parametres.charges_deductibles
+    if cible <= 0:
+        raise ErreurCalculFiscal("Le net disponible cible doit être positif")
+    if parametres.precision <= 0:
+        raise ErreurCalculFiscal("La précision doit être positive")
+    evaluations = 0
+
+    def meilleur_scenario(ca: float) -> tuple:
+        nonlocal evaluations
+        evaluations += 1
+        if ca <= charges:
+            return 0.0, calculer_scenario(ca, charges, 0, parametres.situation_familiale,
+                                          parametres.nombre_parts, parametres.autres_revenus)
+        if parametres.part_remuneration is not None:
+            return parametres.part_remuneration, calculer_scenario(
+                ca, charges, (ca - charges) * parametres.part_remuneration,
+                parametres.situation_familiale, parametres.nombre_parts, parametres.autres_revenus
+            )
+        scenario, _ = optimiser_sous_contraintes(ParametresOptimisation(
+            ca, charges, parametres.situation_familiale, parametres.nombre_parts, parametres.autres_revenus
+        ))
+        return scenario.remuneration_brute / (ca - charges), scenario
+
+    # Encadrement : net(bas) < cible <= net(haut)
+    bas = charges
+    ecart = max(cible, 1000.0)
+    haut = charges + ecart
+    part, scenario = meilleur_scenario(haut)
+    for _ in range(OBJECTIF_MAX_DOUBLEMENTS):
+        if scenario.net_disponible >= cible:
+            break
+        bas, ecart = haut, ecart * 2
+        haut = charges + ecart
+        part, scenario = meilleur_scenario(haut)
+    else:
+        raise ErreurCalculFiscal(f"Net disponible de {cible:,.0f}€ inatteignable avec cette répartition")
+
+    # Dichotomie : chaque itération divise l'encadrement par deux
+    for _ in range(OBJECTIF_MAX_DICHOTOMIES):
+        if haut - bas <= parametres.precision:
+            break
+        milieu = (bas + haut) / 2
+        part_milieu, scenario_milieu = meilleur_scenario(milieu)
+        if scenario_milieu.net_disponible >= cible:
+            haut, part, scenario = milieu, part_milieu, scenario_milieu
+        else:
+            bas = milieu
+
+    return ResultatObjectifNet(
+        net_disponible_cible=cible,
+        ca_minimum=haut,
+        net_disponible_obtenu=scenario.net_disponible,
+        part_remuneration=part,
+        scenario=scenario,
+        evaluations=evaluations,
+        precision_atteinte=haut - bas,
+        converge=haut - bas <= parametres.precision
+    )
+
+def optimiser_lot(situations: List[ParametresOptimisation]) -> List[dict]:
+    """Optimise un lot de situations ; une situation impossible n'interrompt pas le lot"""
+    resultats = []
+    for index, parametres in enumerate(situations):
+        try:
+            resultats.append({"index": index, "resultat": optimiser_fiscalite(parametres), "erreur": None})
+        except ErreurCalculFiscal as e:
+            resultats.append({"index": index, "resultat": None, "erreur": str(e)})
+    return resultats
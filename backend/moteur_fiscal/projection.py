@@ -0,0 +1,112 @@
+"""Projection Monte Carlo pluriannuelle : CA incertain, politique rémunération / dividendes, patrimoine"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .vectorise import calculer_scenarios_vectorises, part_remuneration_optimale
+
+@dataclass
+class ParametresProjection:
+    ca_previsionnel: float
+    charges_deductibles: float = 0.0
+    nombre_parts: float = 1.0
+    autres_revenus: float = 0.0
+    patrimoine_existant: float = 0.0
+    annees: int = 5
+    nombre_trajectoires: int = 10000
+    croissance_ca: float = 0.03  # Tendance annuelle du CA
+    volatilite_ca: float = 0.15  # Écart-type annuel (log-normal)
+    volatilite_charges: float = 0.05
+    part_remuneration: Optional[float] = None  # Part du résultat versée en salaire brut (None = optimum)
+    taux_distribution: float = 1.0  # Part du résultat net distribuée en dividendes
+    taux_epargne: float = 0.3  # Part du net disponible qui alimente le patrimoine
+    rendement_patrimoine: float = 0.02
+    graine: Optional[int] = None
+
+# Taille fixe des lots : le résultat pour une graine donnée ne dépend pas du nombre de processus
+PROJECTION_TAILLE_LOT = 10000
+PERCENTILES = (5, 25, 50, 75, 95)
+
+def simuler_trajectoires(parametres: ParametresProjection, part_remuneration: float,
+                         nombre: int, seed_sequence) -> dict:
+    """Simule un lot de trajectoires ; retourne des tableaux (annees, nombre) par indicateur"""
+    rng = np.random.default_rng(seed_sequence)
+    forme = (parametres.annees, nombre)
+    resultats = {nom: np.empty(forme) for nom in ('ca', 'net_disponible', 'reserves_societe', 'patrimoine')}
+
+    ca = np.full(nombre, parametres.ca_previsionnel, dtype=np.float64)
+    ratio_charges = parametres.charges_deductibles / parametres.ca_previsionnel if parametres.ca_previsionnel > 0 else 0.0
+    reserves = np.zeros(nombre)
+    patrimoine = np.full(nombre, parametres.patrimoine_existant, dtype=np.float64)
+    derive = parametres.croissance_ca - parametres.volatilite_ca ** 2 / 2
+    derive_charges = -parametres.volatilite_charges ** 2 / 2
+
+    for annee in range(parametres.annees):
+        if annee > 0:
+            ca = ca * np.exp(derive + parametres.volatilite_ca * rng.standard_normal(nombre))
+        charges = ca * ratio_charges * np.exp(derive_charges + parametres.volatilite_charges * rng.standard_normal(nombre))
+        remuneration = np.maximum(ca - charges, 0.0) * part_remuneration
+
+        annee_calculee = calculer_scenarios_vectorises(
+            ca, charges, remuneration, parametres.nombre_parts, parametres.autres_revenus, parametres.taux_distribution
+        )
+        # Le résultat non distribué (ou la perte) reste dans la société
+        resultat_net = annee_calculee['resultat_net']
+        reserves = reserves + np.where(resultat_net > 0, resultat_net * (1 - parametres.taux_distribution), resultat_net)
+        net_disponible = annee_calculee['net_disponible']
+        patrimoine = patrimoine * (1 + parametres.rendement_patrimoine) + np.maximum(net_disponible, 0.0) * parametres.taux_epargne
+
+        resultats['ca'][annee] = ca
+        resultats['net_disponible'][annee] = net_disponible
+        resultats['reserves_societe'][annee] = reserves
+        resultats['patrimoine'][annee] = patrimoine
+
+    return resultats
+
+def simuler_lot(args) -> dict:
+    return simuler_trajectoires(*args)
+
+def preparer_projection(parametres: ParametresProjection) -> tuple:
+    """Fixe la graine et la politique de rémunération, puis découpe les trajectoires en lots"""
+    graine = parametres.graine if parametres.graine is not None else int(np.random.SeedSequence().entropy % 2**32)
+    part_remuneration = parametres.part_remuneration
+    if part_remuneration is None:
+        part_remuneration = part_remuneration_optimale(
+            parametres.ca_previsionnel, parametres.charges_deductibles, parametres.nombre_parts, parametres.autres_revenus
+        )
+
+    tailles = [PROJECTION_TAILLE_LOT] * (parametres.nombre_trajectoires // PROJECTION_TAILLE_LOT)
+    if parametres.nombre_trajectoires % PROJECTION_TAILLE_LOT:
+        tailles.append(parametres.nombre_trajectoires % PROJECTION_TAILLE_LOT)
+    graines = np.random.SeedSequence(graine).spawn(len(tailles))
+    lots = [(parametres, part_remuneration, taille, seed) for taille, seed in zip(tailles, graines)]
+    return graine, part_remuneration, lots
+
+def agreger_projection(parametres: ParametresProjection, graine: int, part_remuneration: float,
+                       resultats_lots: list) -> dict:
+    """Bandes de percentiles par année à partir des lots simulés"""
+    bandes = {}
+    for nom in resultats_lots[0]:
+        valeurs = np.concatenate([lot[nom] for lot in resultats_lots], axis=1)
+        bandes[nom] = np.percentile(valeurs, PERCENTILES, axis=1)
+
+    projection = []
+    for annee in range(parametres.annees):
+        ligne = {"annee": annee + 1}
+        for nom, b in bandes.items():
+            ligne[nom] = {f"p{p}": float(b[i, annee]) for i, p in enumerate(PERCENTILES)}
+        projection.append(ligne)
+
+    return {
+        "nombre_trajectoires": parametres.nombre_trajectoires,
+        "annees": parametres.annees,
+        "graine": graine,
+        "part_remuneration": part_remuneration,
+        "projection": projection
+    }
+
+def calculer_projection(parametres: ParametresProjection) -> dict:
+    """Projection Monte Carlo pluriannuelle du CA, de la rémunération et du patrimoine"""
+    graine, part_remuneration, lots = preparer_projection(parametres)
+    return agreger_projection(parametres, graine, part_remuneration, [simuler_lot(lot) for lot in lots])
@@ -0,0 +1,169 @@
+"""Table précalculée salaire net -> salaire brut, stockée sur disque et lue par mmap
+
+    python -m moteur_fiscal.table_net_brut table_net_brut.bin
+
+Le fichier contient un en-tête (magique, longueur, JSON des axes et de la version du barème)
+suivi d'un tableau float64 [nombre_parts, autres_revenus, salaire_net]. Ouvert en lecture
+seule par mmap, ses pages sont partagées par tous les workers uvicorn de la machine.
+Les valeurs sont interpolées entre les points de grille (linéaire sur le net et les autres
+revenus, valeur exacte requise pour le nombre de parts) puis corrigées d'un pas de Newton
+sur le calcul exact du net, ce qui rend le résultat exact dès que l'estimation tombe sur le
+bon segment affine. Hors grille, la consultation renvoie None et l'appelant utilise le
+solveur exact.
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .baremes import version_bareme
+from .calculs import points_de_rupture_salaire, salaire_net_apres_ir
+
+MAGIQUE = b'NETBRUT1'
+ALIGNEMENT = 64
+
+NET_MAX = 400000.0
+NET_PAS = 250.0
+NOMBRE_PARTS = (1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0)
+AUTRES_REVENUS_MAX = 150000.0
+AUTRES_REVENUS_PAS = 2500.0
+
+NEWTON_PAS_MAX = 3
+NEWTON_TOLERANCE = 1e-3
+
+def colonne_brut(nets: np.ndarray, nombre_parts: float, autres_revenus: float) -> np.ndarray:
+    """Salaires bruts exacts pour un axe de nets : brut -> net est affine entre les points de rupture"""
+    points = points_de_rupture_salaire(nombre_parts, autres_revenus)
+    while salaire_net_apres_ir(points[-1], nombre_parts, autres_revenus) < nets[-1]:
+        points.append(points[-1] * 2 + 1.0)
+    nets_points = [salaire_net_apres_ir(brut, nombre_parts, autres_revenus) for brut in points]
+    return np.interp(nets, nets_points, points)
+
+def construire_table(chemin: str, net_max: float = NET_MAX, net_pas: float = NET_PAS,
+                     nombre_parts: Sequence[float] = NOMBRE_PARTS,
+                     autres_revenus_max: float = AUTRES_REVENUS_MAX,
+                     autres_revenus_pas: float = AUTRES_REVENUS_PAS) -> dict:
+    """Calcule la table et l'écrit de façon atomique (fichier temporaire puis renommage)"""
+    nets = np.arange(0.0, net_max + net_pas / 2, net_pas)
+    autres = np.arange(0.0, autres_revenus_max + autres_revenus_pas / 2, autres_revenus_pas)
+    entete = {
+        "version_bareme": version_bareme(),
+        "net_pas": net_pas,
+        "net_points": len(nets),
+        "autres_revenus_pas": autres_revenus_pas,
+        "autres_revenus_points": len(autres),
+        "nombre_parts": [float(p) for p in nombre_parts],
+    }
+    donnees = np.empty((len(nombre_parts), len(autres), len(nets)), dtype='<f8')
+    for i, parts in enumerate(nombre_parts):
+        for j, revenus in enumerate(autres):
+            donnees[i, j] = colonne_brut(nets, parts, float(revenus))
+
+    json_entete = json.dumps(entete, sort_keys=True).encode()
+    taille_entete = len(MAGIQUE) + 4 + len(json_entete)
+    remplissage = -taille_entete % ALIGNEMENT
+    temporaire = f"{chemin}.tmp"
+    with open(temporaire, 'wb') as fichier:
+        fichier.write(MAGIQUE)
+        fichier.write(struct.pack('<I', len(json_entete) + remplissage))
+        fichier.write(json_entete + b' ' * remplissage)
+        fichier.write(donnees.tobytes())
+    os.replace(temporaire, chemin)
+    return entete
+
+class TableNetBrut:
+    """Consultation d'une table mappée en mémoire (lecture seule, partagée entre processus)"""
+
+    def __init__(self, chemin: str):
+        with open(chemin, 'rb') as fichier:
+            if fichier.read(len(MAGIQUE)) != MAGIQUE:
+                raise ValueError(f"{chemin} n'est pas une table net -> brut")
+            (taille_entete,) = struct.unpack('<I', fichier.read(4))
+            self.entete = json.loads(fichier.read(taille_entete))
+            self._mmap = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        self.chemin = chemin
+        self.version_bareme = self.entete["version_bareme"]
+        self.net_pas = self.entete["net_pas"]
+        self.autres_revenus_pas = self.entete["autres_revenus_pas"]
+        self.nombre_parts = {parts: i for i, parts in enumerate(self.entete["nombre_parts"])}
+        forme = (len(self.nombre_parts), self.entete["autres_revenus_points"], self.entete["net_points"])
+        # Vue ndarray simple sur le mmap : l'accès par .item() évite la création de sous-tableaux
+        self._donnees = np.frombuffer(
+            self._mmap, dtype='<f8', count=int(np.prod(forme)), offset=len(MAGIQUE) + 4 + taille_entete
+        ).reshape(forme)
+        self.consultations = 0
+        self.hors_grille = 0
+
+    def a_jour(self) -> bool:
+        return self.version_bareme == version_bareme()
+
+    def salaire_brut(self, salaire_net: float, nombre_parts: float, autres_revenus: float) -> Optional[float]:
+        """Brut interpolé, ou None si la situation sort de la grille"""
+        self.consultations += 1
+        i = self.nombre_parts.get(float(nombre_parts))
+        _, nb_autres, nb_nets = self._donnees.shape
+        x = salaire_net / self.net_pas
+        y = autres_revenus / self.autres_revenus_pas
+        if i is None or not (0 <= x <= nb_nets - 1 and 0 <= y <= nb_autres - 1):
+            self.hors_grille += 1
+            return None
+
+        k = min(int(x), nb_nets - 2)
+        j = min(int(y), nb_autres - 2)
+        fx, fy = x - k, y - j
+        valeur = self._donnees.item
+        b00, b01 = valeur(i, j, k), valeur(i, j, k + 1)
+        b10, b11 = valeur(i, j + 1, k), valeur(i, j + 1, k + 1)
+        estimation = (b00 * (1 - fx) + b01 * fx) * (1 - fy) + (b10 * (1 - fx) + b11 * fx) * fy
+        if estimation <= 0:
+            return 0.0
+
+        # Pas de Newton (pente initiale lue dans la table, puis sécante), net recalculé exactement :
+        # l'estimation n'a besoin de plus d'un pas que si elle a franchi un point de rupture
+        pente = ((b01 - b00) * (1 - fy) + (b11 - b10) * fy) / self.net_pas
+        net = salaire_net_apres_ir(estimation, nombre_parts, autres_revenus)
+        for _ in range(NEWTON_PAS_MAX):
+            if abs(salaire_net - net) < NEWTON_TOLERANCE:
+                break
+            suivante = max(0.0, estimation + (salaire_net - net) * pente)
+            net_suivant = salaire_net_apres_ir(suivante, nombre_parts, autres_revenus)
+            if net_suivant != net:
+                pente = (suivante - estimation) / (net_suivant - net)
+            estimation, net = suivante, net_suivant
+        return estimation
+
+    def stats(self) -> dict:
+        return {
+            "chemin": self.chemin,
+            "version_bareme": self.version_bareme,
+            "consultations": self.consultations,
+            "hors_grille": self.hors_grille,
+        }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m moteur_fiscal.table_net_brut',
+        description="Construit la table salaire net -> salaire brut pour le barème courant"
+    )
+    parser.add_argument('chemin', help="Fichier de sortie")
+    parser.add_argument('--net-max', type=float, default=NET_MAX)
+    parser.add_argument('--net-pas', type=float, default=NET_PAS)
+    parser.add_argument('--autres-revenus-max', type=float, default=AUTRES_REVENUS_MAX)
+    parser.add_argument('--autres-revenus-pas', type=float, default=AUTRES_REVENUS_PAS)
+    args = parser.parse_args(argv)
+
+    entete = construire_table(
+        args.chemin, net_max=args.net_max, net_pas=args.net_pas,
+        autres_revenus_max=args.autres_revenus_max, autres_revenus_pas=args.autres_revenus_pas
+    )
+    print(f"{args.chemin} : {os.path.getsize(args.chemin)} octets, barème {entete['version_bareme']}",
+          file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Moteur fiscal vectorisé (numpy) : grilles de sensibilité et calculs en masse
+
+Mêmes formules que les fonctions scalaires de calculs.py, appliquées à des tableaux.
+"""
+import io
+import json
+
+import numpy as np
+
+from . import baremes
+from .calculs import PART_REMUNERATION_MAX, salaires_candidats
+
+FORMAT_JSON = "json"
+FORMAT_NPZ = "npz"
+
+def calcul_is_2025_vectorise(benefice: np.ndarray) -> np.ndarray:
+    """Calcul vectorisé de l'IS 2025"""
+    benefice = np.maximum(np.asarray(benefice, dtype=np.float64), 0.0)
+    return np.where(
+        benefice <= baremes.SEUIL_IS_TAUX_REDUIT_2025,
+        benefice * baremes.TAUX_IS_REDUIT_2025,
+        baremes.SEUIL_IS_TAUX_REDUIT_2025 * baremes.TAUX_IS_REDUIT_2025
+        + (benefice - baremes.SEUIL_IS_TAUX_REDUIT_2025) * baremes.TAUX_IS_NORMAL_2025
+    )
+
+def calcul_ir_2025_vectorise(revenu_imposable: np.ndarray, nombre_parts=1.0) -> np.ndarray:
+    """Calcul vectorisé de l'IR 2025 avec barème progressif"""
+    quotient = np.maximum(np.asarray(revenu_imposable, dtype=np.float64), 0.0) / nombre_parts
+    ir_par_part = np.zeros_like(quotient)
+    for min_tranche, max_tranche, taux in baremes.TRANCHES_IR_2025:
+        ir_par_part += np.clip(quotient - min_tranche, 0.0, max_tranche - min_tranche) * taux
+    return ir_par_part * nombre_parts
+
+def calculer_scenarios_vectorises(ca, charges, remuneration_brute, nombre_parts=1.0,
+                                  autres_revenus=0.0, taux_distribution=1.0) -> dict:
+    """Calcule les champs de ScenarioFiscal pour des tableaux d'entrées (avec broadcasting)
+
+    taux_distribution : part du résultat net versée en dividendes (le reste est mis en réserve).
+    """
+    ca = np.asarray(ca, dtype=np.float64)
+    remuneration_brute = np.asarray(remuneration_brute, dtype=np.float64)
+
+    cotisations_sociales = np.maximum(remuneration_brute, 0.0) * baremes.TAUX_COTISATIONS_DIRIGEANT
+    resultat_avant_is = ca - charges - remuneration_brute - cotisations_sociales
+    is_a_payer = calcul_is_2025_vectorise(resultat_avant_is)
+    resultat_net = resultat_avant_is - is_a_payer
+    dividendes_bruts = np.maximum(resultat_net, 0.0) * taux_distribution
+
+    remuneration_nette = remuneration_brute - cotisations_sociales
+    abattement = np.minimum(remuneration_nette * 0.10, baremes.PLAFOND_ABATTEMENT_2025)
+    base_ir_remuneration = np.maximum(remuneration_nette - abattement, 0.0)
+    ir_sur_remuneration = calcul_ir_2025_vectorise(base_ir_remuneration + autres_revenus, nombre_parts)
+
+    ir_sur_dividendes = dividendes_bruts * baremes.TAUX_IR_DIVIDENDES
+    prelevement_sociaux_dividendes = dividendes_bruts * baremes.TAUX_PRELEVEMENTS_SOCIAUX
+    total_impots_et_charges = (cotisations_sociales + is_a_payer + ir_sur_remuneration +
+                               ir_sur_dividendes + prelevement_sociaux_dividendes)
+    net_disponible = remuneration_nette + dividendes_bruts - ir_sur_dividendes - prelevement_sociaux_dividendes
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taux_global = np.where(ca > 0, total_impots_et_charges / ca * 100, 0.0)
+
+    return {
+        'remuneration_brute': np.broadcast_to(remuneration_brute, net_disponible.shape),
+        'dividendes_bruts': dividendes_bruts,
+        'is_a_payer': is_a_payer,
+        'cotisations_sociales': np.broadcast_to(cotisations_sociales, net_disponible.shape),
+        'ir_sur_remuneration': ir_sur_remuneration,
+        'ir_sur_dividendes': ir_sur_dividendes,
+        'prelevement_sociaux_dividendes': prelevement_sociaux_dividendes,
+        'total_impots_et_charges': total_impots_et_charges,
+        'net_disponible': net_disponible,
+        'taux_global_imposition': taux_global,
+        'resultat_net': resultat_net
+    }
+
+def part_remuneration_optimale(ca: float, charges: float, nombre_parts: float, autres_revenus: float) -> float:
+    """Part du résultat en rémunération qui maximise le net disponible (mêmes candidats que l'optimiseur)"""
+    resultat_avant_is = ca - charges
+    if resultat_avant_is <= 0:
+        return 0.0
+    bruts = np.array(salaires_candidats(resultat_avant_is, 0.0, resultat_avant_is * PART_REMUNERATION_MAX / 100))
+    resultats = calculer_scenarios_vectorises(ca, charges, bruts, nombre_parts, autres_revenus)
+    return float(bruts[int(np.argmax(resultats['net_disponible']))] / resultat_avant_is)
+
+def calculer_grille_sensibilite(ca_min: float, ca_max: float, ca_points: int,
+                                remuneration_min: float, remuneration_max: float, remuneration_points: int,
+                                charges_deductibles: float = 0.0, nombre_parts: float = 1.0,
+                                autres_revenus: float = 0.0, format: str = FORMAT_JSON) -> tuple:
+    """Évalue la grille CA × rémunération brute ; retourne (contenu, media_type)"""
+    ca = np.linspace(ca_min, ca_max, ca_points)
+    remuneration = np.linspace(remuneration_min, remuneration_max, remuneration_points)
+
+    # Lignes = CA, colonnes = rémunération brute
+    resultats = calculer_scenarios_vectorises(
+        ca[:, np.newaxis], charges_deductibles, remuneration[np.newaxis, :],
+        nombre_parts, autres_revenus
+    )
+    net_disponible = resultats['net_disponible']
+    taux_global = resultats['taux_global_imposition']
+
+    if format == FORMAT_NPZ:
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            ca_previsionnel=ca,
+            remuneration_brute=remuneration,
+            net_disponible=net_disponible,
+            taux_global_imposition=taux_global
+        )
+        return buffer.getvalue(), "application/octet-stream"
+
+    contenu = {
+        "shape": [ca_points, remuneration_points],
+        "ca_previsionnel": ca.round(2).tolist(),
+        "remuneration_brute": remuneration.round(2).tolist(),
+        "net_disponible": net_disponible.round(2).tolist(),
+        "taux_global_imposition": taux_global.round(4).tolist()
+    }
+    return json.dumps(contenu, separators=(',', ':')).encode(), "application/json"
@@ -0,0 +1,29 @@
+"""Observabilité du backend : métriques Prometheus, journal des requêtes lentes, traces, profilage"""
+from .metriques import (
+    CONTENT_TYPE_PROMETHEUS,
+    EcouteurCommandesMongo,
+    MiddlewareMetriques,
+    registre,
+)
+from .profilage import MiddlewareProfilage, Profileur, profil_courant, profil_explicite
+from .requetes_lentes import EcouteurCommandesLentes, JournalLent, MiddlewareRequetesLentes
+from .traces import EcouteurTraces, MiddlewareTraces, RouteTracee, Traceur, span
+
+__all__ = [
+    'CONTENT_TYPE_PROMETHEUS',
+    'EcouteurCommandesLentes',
+    'EcouteurCommandesMongo',
+    'EcouteurTraces',
+    'JournalLent',
+    'MiddlewareMetriques',
+    'MiddlewareProfilage',
+    'MiddlewareRequetesLentes',
+    'MiddlewareTraces',
+    'Profileur',
+    'RouteTracee',
+    'Traceur',
+    'profil_courant',
+    'profil_explicite',
+    'registre',
+    'span',
+]
@@ -0,0 +1,250 @@
+"""Métriques au format texte Prometheus : requêtes HTTP par route et commandes MongoDB
+
+Implémentation volontairement minimale (compteurs, jauges, histogrammes à étiquettes)
+pour ne pas ajouter de dépendance : un dictionnaire par métrique et un verrou, les
+commandes Mongo étant notifiées depuis les threads du driver.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_MONGO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Requêtes qui ne correspondent à aucune route : une seule série, quel que soit le chemin
+ROUTE_INCONNUE = "<inconnue>"
+
+def echapper(valeur: str) -> str:
+    return str(valeur).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def formater_etiquettes(noms: Sequence[str], valeurs: Sequence[str], extra: str = '') -> str:
+    paires = [f'{nom}="{echapper(valeur)}"' for nom, valeur in zip(noms, valeurs)]
+    if extra:
+        paires.append(extra)
+    return '{' + ','.join(paires) + '}' if paires else ''
+
+def formater_nombre(valeur: float) -> str:
+    if valeur == float('inf'):
+        return '+Inf'
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+class Metrique:
+    type_metrique = 'untyped'
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = ()):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self._verrou = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def entete(self) -> Iterable[str]:
+        yield f"# HELP {self.nom} {self.aide}"
+        yield f"# TYPE {self.nom} {self.type_metrique}"
+
+class Compteur(Metrique):
+    type_metrique = 'counter'
+
+    def inc(self, *valeurs: str, montant: float = 1.0):
+        with self._verrou:
+            self._series[valeurs] = self._series.get(valeurs, 0.0) + montant
+
+    def valeur(self, *valeurs: str) -> float:
+        return self._series.get(valeurs, 0.0)
+
+    def lignes(self) -> Iterable[str]:
+        yield from self.entete()
+        with self._verrou:
+            series = list(self._series.items())
+        for valeurs, total in series:
+            yield f"{self.nom}{formater_etiquettes(self.etiquettes, valeurs)} {formater_nombre(total)}"
+
+class Jauge(Compteur):
+    type_metrique = 'gauge'
+
+    def dec(self, *valeurs: str, montant: float = 1.0):
+        self.inc(*valeurs, montant=-montant)
+
+class Histogramme(Metrique):
+    type_metrique = 'histogram'
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = (), buckets: Sequence[float] = BUCKETS_HTTP):
+        super().__init__(nom, aide, etiquettes)
+        self.buckets = tuple(sorted(buckets))
+
+    def observer(self, valeur: float, *valeurs: str):
+        # Comptes par intervalle (non cumulés) : un seul incrément par observation
+        indice = bisect_left(self.buckets, valeur)
+        with self._verrou:
+            serie = self._series.get(valeurs)
+            if serie is None:
+                serie = self._series[valeurs] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valeur
+
+    def compte(self, *valeurs: str) -> int:
+        serie = self._series.get(valeurs)
+        return sum(serie[0]) if serie else 0
+
+    def lignes(self) -> Iterable[str]:
+        yield from self.entete()
+        with self._verrou:
+            series = [(valeurs, list(comptes), somme) for valeurs, (comptes, somme) in self._series.items()]
+        for valeurs, comptes, somme in series:
+            cumul = 0
+            for borne, compte in zip(self.buckets + (float('inf'),), comptes):
+                cumul += compte
+                etiquettes = formater_etiquettes(self.etiquettes, valeurs, f'le="{formater_nombre(borne)}"')
+                yield f"{self.nom}_bucket{etiquettes} {cumul}"
+            etiquettes = formater_etiquettes(self.etiquettes, valeurs)
+            yield f"{self.nom}_sum{etiquettes} {formater_nombre(somme)}"
+            yield f"{self.nom}_count{etiquettes} {cumul}"
+
+class Registre:
+    def __init__(self):
+        self.metriques = []
+
+    def enregistrer(self, metrique: Metrique) -> Metrique:
+        self.metriques.append(metrique)
+        return metrique
+
+    def compteur(self, nom: str, aide: str, etiquettes: Sequence[str] = ()) -> Compteur:
+        return self.enregistrer(Compteur(nom, aide, etiquettes))
+
+    def jauge(self, nom: str, aide: str, etiquettes: Sequence[str] = ()) -> Jauge:
+        return self.enregistrer(Jauge(nom, aide, etiquettes))
+
+    def histogramme(self, nom: str, aide: str, etiquettes: Sequence[str] = (),
+                    buckets: Sequence[float] = BUCKETS_HTTP) -> Histogramme:
+        return self.enregistrer(Histogramme(nom, aide, etiquettes, buckets))
+
+    def exposer(self) -> str:
+        """Texte d'exposition Prometheus (version 0.0.4)"""
+        return '\n'.join(ligne for metrique in self.metriques for ligne in metrique.lignes()) + '\n'
+
+CONTENT_TYPE_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+registre = Registre()
+
+http_requetes = registre.compteur(
+    'http_requests_total', "Requêtes HTTP traitées", ('method', 'route', 'status')
+)
+http_duree = registre.histogramme(
+    'http_request_duration_seconds', "Durée des requêtes HTTP", ('method', 'route')
+)
+http_en_cours = registre.jauge(
+    'http_requests_in_flight', "Requêtes HTTP en cours", ('method', 'route')
+)
+mongo_duree = registre.histogramme(
+    'mongodb_command_duration_seconds', "Durée des commandes MongoDB", ('collection', 'command'), BUCKETS_MONGO
+)
+mongo_erreurs = registre.compteur(
+    'mongodb_command_errors_total', "Commandes MongoDB en échec", ('collection', 'command')
+)
+
+class ModelesRoutes:
+    """Résolution rapide du modèle de chemin (/api/clients/{client_id}) d'une requête
+
+    Les expressions des routes sont relues une fois ; seule la regex est évaluée par requête,
+    sans la conversion des paramètres de Route.matches. Les chemins déjà vus sont mémorisés
+    (mémoire vidée quand elle est pleine : les identifiants rendent les chemins non bornés).
+    """
+
+    def __init__(self, routes, taille_memoire: int = 4096):
+        self.modeles = [
+            (route.path_regex, getattr(route, 'methods', None), route.path)
+            for route in routes if hasattr(route, 'path_regex')
+        ]
+        self.taille_memoire = taille_memoire
+        self._memoire = {}
+
+    def resoudre(self, methode: str, chemin: str) -> str:
+        cle = (methode, chemin)
+        modele = self._memoire.get(cle)
+        if modele is None:
+            if len(self._memoire) >= self.taille_memoire:
+                self._memoire.clear()
+            modele = self._memoire[cle] = self._chercher(methode, chemin)
+        return modele
+
+    def _chercher(self, methode: str, chemin: str) -> str:
+        partielle = ROUTE_INCONNUE
+        for regex, methodes, modele in self.modeles:
+            if regex.match(chemin):
+                if not methodes or methode in methodes or (methode == 'HEAD' and 'GET' in methodes):
+                    return modele
+                if partielle == ROUTE_INCONNUE:
+                    # Chemin connu mais méthode non autorisée (405)
+                    partielle = modele
+        return partielle
+
+class MiddlewareMetriques:
+    """Middleware ASGI pur : compte, durée et requêtes en cours par méthode et modèle de route"""
+
+    def __init__(self, app, routes: Optional[list] = None):
+        self.app = app
+        self.routes = routes
+        self._modeles = ModelesRoutes(routes) if routes is not None else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        if self._modeles is None:
+            # Routes de l'application lues à la première requête (toutes déclarées à ce stade)
+            self._modeles = ModelesRoutes(scope['app'].router.routes)
+        methode = scope['method']
+        route = self._modeles.resoudre(methode, scope['path'])
+        statut = [500]
+
+        async def envoyer(message):
+            if message['type'] == 'http.response.start':
+                statut[0] = message['status']
+            await send(message)
+
+        http_en_cours.inc(methode, route)
+        debut = time.perf_counter()
+        try:
+            await self.app(scope, receive, envoyer)
+        finally:
+            http_duree.observer(time.perf_counter() - debut, methode, route)
+            http_en_cours.dec(methode, route)
+            http_requetes.inc(methode, route, str(statut[0]))
+
+class EcouteurCommandesMongo(monitoring.CommandListener):
+    """Durée et erreurs des commandes MongoDB par collection et commande"""
+
+    def __init__(self):
+        self._collections = {}
+        self._verrou = threading.Lock()
+
+    @staticmethod
+    def cle(event):
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        if event.command_name == 'getMore':
+            collection = event.command.get('collection', '')
+        else:
+            collection = event.command.get(event.command_name)
+            if not isinstance(collection, str):
+                collection = ''  # Commandes sans collection (ping, endSessions...)
+        with self._verrou:
+            self._collections[self.cle(event)] = collection
+
+    def _terminer(self, event) -> str:
+        with self._verrou:
+            return self._collections.pop(self.cle(event), '')
+
+    def succeeded(self, event):
+        collection = self._terminer(event)
+        mongo_duree.observer(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._terminer(event)
+        mongo_duree.observer(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_erreurs.inc(collection, event.command_name)
@@ -0,0 +1,215 @@
+"""Profilage à la demande d'une requête : en-tête X-Profile, résultat conservé sous un identifiant
+
+Activé seulement si PROFILAGE_TOKEN est défini. Une requête portant X-Profile et le jeton dans
+X-Profile-Token est exécutée sous profileur :
+    X-Profile: 1 (ou cprofile)      profileur déterministe, sortie pstats
+    X-Profile: echantillonnage      échantillonneur de piles, sortie collapsed (flamegraph.pl, speedscope)
+PROFILAGE_TAUX profile en plus une fraction des requêtes par échantillonnage (faible surcoût).
+La réponse porte X-Profile-Id ; le profil est relu via les routes d'administration, dans la
+limite des PROFILAGE_MAX derniers profils conservés dans PROFILAGE_DOSSIER.
+
+Un seul profil à la fois : le profileur couvre tout le thread de la boucle asyncio, donc aussi
+les requêtes concurrentes. Pendant un profil demandé par X-Profile, les calculs du pool de
+processus sont exécutés dans le processus courant (voir profil_explicite) pour apparaître dans
+le résultat ; un profil tiré par PROFILAGE_TAUX laisse les calculs au pool, sans quoi une
+fraction du trafic de production bloquerait la boucle asyncio.
+"""
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+FORMAT_PSTATS = "pstats"
+FORMAT_COLLAPSED = "collapsed"
+
+# Identifiant du profil en cours dans ce contexte (None hors profilage)
+profil_courant: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('profil_courant', default=None)
+# Vrai si ce profil a été demandé par un administrateur (X-Profile et jeton valide), pas tiré au sort
+profil_explicite: contextvars.ContextVar[bool] = contextvars.ContextVar('profil_explicite', default=False)
+
+class EchantillonneurPiles:
+    """Relève périodiquement la pile d'un thread et compte les piles identiques"""
+
+    def __init__(self, thread_id: int, intervalle: float = 0.002):
+        self.thread_id = thread_id
+        self.intervalle = intervalle
+        self.piles = Counter()
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._boucle, name="echantillonneur-piles", daemon=True)
+
+    def demarrer(self):
+        self._thread.start()
+
+    def _boucle(self):
+        while not self._arret.wait(self.intervalle):
+            frame = sys._current_frames().get(self.thread_id)
+            pile = []
+            while frame is not None:
+                code = frame.f_code
+                pile.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if pile:
+                self.piles[';'.join(reversed(pile))] += 1
+
+    def arreter(self) -> str:
+        self._arret.set()
+        self._thread.join()
+        return ''.join(f"{pile} {compte}\n" for pile, compte in self.piles.most_common())
+
+class Profileur:
+    def __init__(self, jeton: Optional[str], dossier: str, taux_echantillon: float = 0.0, profils_max: int = 50):
+        self.jeton = jeton
+        self.dossier = Path(dossier)
+        self.taux_echantillon = taux_echantillon
+        self.profils_max = profils_max
+        self._verrou = threading.Lock()
+        self._occupe = False
+
+    @classmethod
+    def depuis_environnement(cls) -> "Profileur":
+        return cls(
+            os.environ.get('PROFILAGE_TOKEN') or None,
+            os.environ.get('PROFILAGE_DOSSIER', os.path.join(tempfile.gettempdir(), 'profils')),
+            float(os.environ.get('PROFILAGE_TAUX', '0')),
+            int(os.environ.get('PROFILAGE_MAX', '50'))
+        )
+
+    @property
+    def actif(self) -> bool:
+        return self.jeton is not None
+
+    def jeton_valide(self, jeton: Optional[str]) -> bool:
+        return self.actif and jeton is not None and hmac.compare_digest(jeton.encode(), self.jeton.encode())
+
+    def format_demande(self, valeur_profil: Optional[str], jeton: Optional[str]) -> Optional[str]:
+        """Format de profil à produire pour cette requête, ou None"""
+        if valeur_profil and self.jeton_valide(jeton):
+            if valeur_profil.lower() in ('echantillonnage', 'sampling'):
+                return FORMAT_COLLAPSED
+            if valeur_profil.lower() in ('1', 'true', 'cprofile'):
+                return FORMAT_PSTATS
+            return None
+        if self.actif and self.taux_echantillon > 0 and random.random() < self.taux_echantillon:
+            return FORMAT_COLLAPSED
+        return None
+
+    def reserver(self) -> bool:
+        with self._verrou:
+            if self._occupe:
+                return False
+            self._occupe = True
+            return True
+
+    def liberer(self):
+        with self._verrou:
+            self._occupe = False
+
+    def demarrer(self, format_profil: str):
+        if format_profil == FORMAT_PSTATS:
+            profil = cProfile.Profile()
+            profil.enable()
+            return profil
+        echantillonneur = EchantillonneurPiles(threading.get_ident())
+        echantillonneur.demarrer()
+        return echantillonneur
+
+    def enregistrer(self, profil_id: str, format_profil: str, profil, metadonnees: dict):
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        if format_profil == FORMAT_PSTATS:
+            profil.disable()
+            profil.dump_stats(str(self.dossier / f"{profil_id}.{FORMAT_PSTATS}"))
+        else:
+            (self.dossier / f"{profil_id}.{FORMAT_COLLAPSED}").write_text(profil.arreter(), encoding='utf-8')
+        (self.dossier / f"{profil_id}.json").write_text(
+            json.dumps({"id": profil_id, "format": format_profil, **metadonnees}, ensure_ascii=False),
+            encoding='utf-8'
+        )
+        self._purger()
+
+    def _purger(self):
+        index = sorted(self.dossier.glob('*.json'), key=lambda f: f.stat().st_mtime)
+        for ancien in index[:max(0, len(index) - self.profils_max)]:
+            for fichier in self.dossier.glob(f"{ancien.stem}.*"):
+                fichier.unlink(missing_ok=True)
+
+    def lister(self) -> List[dict]:
+        if not self.dossier.exists():
+            return []
+        profils = [json.loads(f.read_text(encoding='utf-8')) for f in self.dossier.glob('*.json')]
+        return sorted(profils, key=lambda p: p["date"], reverse=True)
+
+    def lire(self, profil_id: str, texte: bool = False):
+        """(contenu, format) du profil, None s'il n'existe pas ; texte=True résume un pstats"""
+        if not all(c in '0123456789abcdef' for c in profil_id):
+            return None
+        for format_profil in (FORMAT_PSTATS, FORMAT_COLLAPSED):
+            chemin = self.dossier / f"{profil_id}.{format_profil}"
+            if not chemin.exists():
+                continue
+            if format_profil == FORMAT_PSTATS and texte:
+                sortie = io.StringIO()
+                pstats.Stats(str(chemin), stream=sortie).sort_stats('cumulative').print_stats(60)
+                return sortie.getvalue(), 'texte'
+            return chemin.read_bytes(), format_profil
+        return None
+
+class MiddlewareProfilage:
+    """Middleware ASGI pur : exécute la requête sous profileur quand elle le demande"""
+
+    def __init__(self, app, profileur: Profileur):
+        self.app = app
+        self.profileur = profileur
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.profileur.actif:
+            await self.app(scope, receive, send)
+            return
+
+        entetes = {nom: valeur.decode('latin-1') for nom, valeur in scope.get('headers', ())
+                   if nom in (b'x-profile', b'x-profile-token')}
+        format_profil = self.profileur.format_demande(entetes.get(b'x-profile'), entetes.get(b'x-profile-token'))
+        if format_profil is None or not self.profileur.reserver():
+            await self.app(scope, receive, send)
+            return
+
+        profil_id = secrets.token_hex(8)
+        statut = [500]
+        explicite = bool(entetes.get(b'x-profile')) and self.profileur.jeton_valide(entetes.get(b'x-profile-token'))
+
+        async def envoyer(message):
+            if message['type'] == 'http.response.start':
+                statut[0] = message['status']
+                message = {**message, 'headers': [*message.get('headers', []), (b'x-profile-id', profil_id.encode())]}
+            await send(message)
+
+        jeton = profil_courant.set(profil_id)
+        jeton_explicite = profil_explicite.set(explicite)
+        debut = time.time()
+        profil = self.profileur.demarrer(format_profil)
+        try:
+            await self.app(scope, receive, envoyer)
+        finally:
+            try:
+                self.profileur.enregistrer(profil_id, format_profil, profil, {
+                    "methode": scope['method'],
+                    "chemin": scope['path'],
+                    "statut": statut[0],
+                    "date": debut,
+                    "duree_ms": round((time.time() - debut) * 1000, 3),
+                })
+            finally:
+                profil_explicite.reset(jeton_explicite)
+                profil_courant.reset(jeton)
+                self.profileur.liberer()
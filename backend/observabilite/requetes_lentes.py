@@ -0,0 +1,236 @@
+"""Journal JSON des requêtes HTTP et commandes MongoDB lentes, avec la forme des filtres
+
+Au-delà d'un seuil (SLOW_REQUEST_MS pour les requêtes HTTP, SLOW_QUERY_MS pour les commandes),
+une ligne JSON est écrite sur le logger "requetes_lentes", pour une fraction SLOW_LOG_SAMPLE_RATE
+des cas seulement. Les filtres sont journalisés sans leurs valeurs ({"client_id": "?"}) : la forme
+suffit à retrouver l'index manquant et aucune donnée client n'apparaît dans les logs.
+Avec SLOW_QUERY_EXPLAIN=1, le plan retenu par MongoDB est ajouté, obtenu en arrière-plan par un
+client synchrone séparé (sans écouteur, pour ne pas se journaliser lui-même).
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bson
+from pymongo import MongoClient, monitoring
+
+from .metriques import ModelesRoutes
+
+logger = logging.getLogger("requetes_lentes")
+
+# Requête HTTP en cours : partagée avec les threads de Motor, qui copient le contexte
+requete_courante: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar('requete_courante', default=None)
+
+COMMANDES_EXPLICABLES = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+
+def forme(valeur):
+    """Structure d'un filtre sans ses valeurs : clés et opérateurs conservés, valeurs remplacées par "?" """
+    if isinstance(valeur, dict):
+        return {cle: forme(v) for cle, v in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        if any(isinstance(v, dict) for v in valeur):
+            return [forme(v) for v in valeur]
+        return ["?"]
+    return "?"
+
+def forme_commande(nom: str, commande: dict) -> dict:
+    """Filtre, tri et étapes d'une commande, réduits à leur forme"""
+    if nom in ('find', 'findAndModify'):
+        resume = {"filtre": forme(commande.get('filter', commande.get('query', {})))}
+        if commande.get('sort'):
+            resume["tri"] = dict(commande['sort'])
+        return resume
+    if nom in ('count', 'distinct'):
+        return {"filtre": forme(commande.get('query', {}))}
+    if nom in ('update', 'delete'):
+        operations = commande.get('updates' if nom == 'update' else 'deletes') or [{}]
+        return {"filtre": forme(operations[0].get('q', {})), "operations": len(operations)}
+    if nom == 'aggregate':
+        return {"pipeline": [
+            {etape: forme(contenu) if etape in ('$match', '$sort') else "..."}
+            for etape_dict in commande.get('pipeline', []) for etape, contenu in etape_dict.items()
+        ]}
+    if nom == 'insert':
+        return {"documents": len(commande.get('documents', []))}
+    return {}
+
+def documents_reponse(nom: str, reponse: dict) -> Optional[int]:
+    curseur = reponse.get('cursor')
+    if isinstance(curseur, dict):
+        return len(curseur.get('firstBatch', curseur.get('nextBatch', [])))
+    if 'n' in reponse:
+        return reponse['n']
+    if nom == 'distinct':
+        return len(reponse.get('values', []))
+    return None
+
+def resumer_plan(explication: dict) -> dict:
+    """Étapes du plan gagnant (COLLSCAN, IXSCAN...) et index utilisés"""
+    plan = explication.get('queryPlanner', {}).get('winningPlan')
+    if plan is None:
+        # aggregate : plan de la première étape $cursor
+        for etape in explication.get('stages', []):
+            plan = etape.get('$cursor', {}).get('queryPlanner', {}).get('winningPlan')
+            if plan:
+                break
+    etapes, index = [], []
+    while isinstance(plan, dict):
+        plan = plan.get('queryPlan', plan)
+        etapes.append(plan.get('stage'))
+        if plan.get('indexName'):
+            index.append(plan['indexName'])
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0]
+    return {"etapes": etapes, "index": index}
+
+class JournalLent:
+    def __init__(self, seuil_requete_ms: float, seuil_commande_ms: float, taux_echantillon: float = 1.0,
+                 explain_url: Optional[str] = None):
+        self.seuil_requete_ms = seuil_requete_ms
+        self.seuil_commande_ms = seuil_commande_ms
+        self.taux_echantillon = taux_echantillon
+        self.explain_url = explain_url
+        self._client_explain = None
+        self._executor_explain = ThreadPoolExecutor(max_workers=1) if explain_url else None
+
+    @classmethod
+    def depuis_environnement(cls, mongo_url: Optional[str] = None) -> "JournalLent":
+        explain = os.environ.get('SLOW_QUERY_EXPLAIN', '').lower() in ('1', 'true', 'oui')
+        return cls(
+            float(os.environ.get('SLOW_REQUEST_MS', '500')),
+            float(os.environ.get('SLOW_QUERY_MS', '100')),
+            float(os.environ.get('SLOW_LOG_SAMPLE_RATE', '1.0')),
+            mongo_url if explain else None
+        )
+
+    def echantillonne(self) -> bool:
+        return self.taux_echantillon >= 1 or random.random() < self.taux_echantillon
+
+    def ecrire(self, entree: dict):
+        logger.warning(json.dumps(entree, ensure_ascii=False, default=str))
+
+    def commande_lente(self, entree: dict, base: str, commande: Optional[dict]):
+        if self._executor_explain is not None and commande is not None:
+            # L'explain coûte une commande de plus : fait hors du thread du driver, puis journalisé
+            self._executor_explain.submit(self._expliquer_puis_ecrire, entree, base, commande)
+        else:
+            self.ecrire(entree)
+
+    def _expliquer_puis_ecrire(self, entree: dict, base: str, commande: dict):
+        try:
+            if self._client_explain is None:
+                self._client_explain = MongoClient(self.explain_url, serverSelectionTimeoutMS=2000)
+            commande = {cle: valeur for cle, valeur in commande.items() if cle not in ('lsid', '$db', '$clusterTime')}
+            explication = self._client_explain[base].command({'explain': commande, 'verbosity': 'queryPlanner'})
+            entree["explain"] = resumer_plan(explication)
+        except Exception as e:
+            entree["explain"] = {"erreur": str(e)}
+        self.ecrire(entree)
+
+class EcouteurCommandesLentes(monitoring.CommandListener):
+    """Journalise les commandes MongoDB plus lentes que le seuil, avec la route HTTP d'origine"""
+
+    def __init__(self, journal: JournalLent):
+        self.journal = journal
+        self._en_cours = {}
+        self._verrou = threading.Lock()
+
+    def started(self, event):
+        requete = requete_courante.get()
+        if requete is not None:
+            requete["mongo_commandes"] += 1
+        collection = event.command.get(event.command_name)
+        with self._verrou:
+            self._en_cours[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else event.command.get('collection', ''),
+                event.database_name,
+                # Copie conservée seulement si elle peut servir à un explain
+                event.command if event.command_name in COMMANDES_EXPLICABLES else None,
+                requete,
+            )
+
+    def _terminer(self, event, reponse: Optional[dict], erreur: Optional[str] = None):
+        with self._verrou:
+            en_cours = self._en_cours.pop((event.connection_id, event.request_id), None)
+        if en_cours is None:
+            return
+        collection, base, commande, requete = en_cours
+        duree_ms = event.duration_micros / 1000
+        if requete is not None:
+            requete["mongo_ms"] += duree_ms
+        if duree_ms < self.journal.seuil_commande_ms or not self.journal.echantillonne():
+            return
+
+        entree = {
+            "type": "commande_lente",
+            "route": requete["route"] if requete else None,
+            "collection": collection,
+            "commande": event.command_name,
+            "duree_ms": round(duree_ms, 3),
+            **forme_commande(event.command_name, commande or {}),
+        }
+        if reponse is not None:
+            entree["documents"] = documents_reponse(event.command_name, reponse)
+            entree["octets"] = len(bson.encode(reponse))
+        if erreur is not None:
+            entree["erreur"] = erreur
+        self.journal.commande_lente(entree, base, commande)
+
+    def succeeded(self, event):
+        self._terminer(event, event.reply)
+
+    def failed(self, event):
+        self._terminer(event, None, str(event.failure.get('errmsg', event.failure)))
+
+class MiddlewareRequetesLentes:
+    """Middleware ASGI pur : journalise les requêtes HTTP plus lentes que le seuil"""
+
+    def __init__(self, app, journal: JournalLent):
+        self.app = app
+        self.journal = journal
+        self._modeles = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        if self._modeles is None:
+            self._modeles = ModelesRoutes(scope['app'].router.routes)
+        requete = {
+            "route": self._modeles.resoudre(scope['method'], scope['path']),
+            "mongo_commandes": 0,
+            "mongo_ms": 0.0,
+        }
+        reponse = {"statut": 500, "octets": 0}
+
+        async def envoyer(message):
+            if message['type'] == 'http.response.start':
+                reponse["statut"] = message['status']
+            elif message['type'] == 'http.response.body':
+                reponse["octets"] += len(message.get('body', b''))
+            await send(message)
+
+        jeton = requete_courante.set(requete)
+        debut = time.perf_counter()
+        try:
+            await self.app(scope, receive, envoyer)
+        finally:
+            duree_ms = (time.perf_counter() - debut) * 1000
+            requete_courante.reset(jeton)
+            if duree_ms >= self.journal.seuil_requete_ms and self.journal.echantillonne():
+                self.journal.ecrire({
+                    "type": "requete_lente",
+                    "methode": scope['method'],
+                    "route": requete["route"],
+                    "statut": reponse["statut"],
+                    "duree_ms": round(duree_ms, 3),
+                    "octets": reponse["octets"],
+                    "mongo_commandes": requete["mongo_commandes"],
+                    "mongo_ms": round(requete["mongo_ms"], 3),
+                })
@@ -0,0 +1,331 @@
+"""Traces par requête : spans imbriqués, propagation W3C traceparent, export local
+
+Aucun collecteur externe : les spans d'une trace sont regroupés en mémoire puis exportés en
+une fois à la fin de la requête, en JSON lines (TRACES_EXPORT=jsonl, fichier TRACES_FICHIER)
+ou en arbre lisible sur le logger "traces" (TRACES_EXPORT=console). TRACES_TAUX fixe la part
+des requêtes tracées ; une requête arrivant avec un en-tête traceparent échantillonné l'est
+toujours.
+
+Phases mesurées automatiquement : la requête (middleware), chaque commande MongoDB (écouteur
+pymongo, Motor copiant le contexte dans ses threads), et pour les routes de l'API la
+validation de l'entrée, le handler et la sérialisation de la réponse (RouteTracee). Les
+handlers ajoutent leurs propres phases avec span("nom").
+"""
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+
+from .metriques import ModelesRoutes
+
+logger = logging.getLogger("traces")
+
+span_courant: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar('span_courant', default=None)
+
+class Trace:
+    def __init__(self, trace_id: str, exportateur):
+        self.trace_id = trace_id
+        self.exportateur = exportateur
+        self.spans: List["Span"] = []
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'nom', 'attributs', 'debut', '_t0', 'duree_ms', 'enfant_handler')
+
+    def __init__(self, trace: Trace, nom: str, parent_id: Optional[str] = None, attributs: Optional[dict] = None,
+                 debut: Optional[float] = None, duree_ms: Optional[float] = None):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.nom = nom
+        self.attributs = attributs or {}
+        self.debut = time.time() if debut is None else debut
+        self._t0 = time.perf_counter()
+        self.duree_ms = duree_ms
+        self.enfant_handler = None
+        if duree_ms is not None:
+            trace.spans.append(self)
+
+    def terminer(self):
+        self.duree_ms = (time.perf_counter() - self._t0) * 1000
+        self.trace.spans.append(self)
+
+    @property
+    def fin(self) -> float:
+        return self.debut + (self.duree_ms or 0) / 1000
+
+    def enfant(self, nom: str, debut: float, fin: float, **attributs) -> "Span":
+        """Span enfant déjà terminé, reconstruit à partir d'horodatages"""
+        return Span(self.trace, nom, self.span_id, attributs, debut=debut, duree_ms=max(0.0, (fin - debut) * 1000))
+
+    def en_dict(self) -> dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "nom": self.nom,
+            "debut": self.debut,
+            "duree_ms": round(self.duree_ms, 3),
+            "attributs": self.attributs,
+        }
+
+@contextmanager
+def span(nom: str, **attributs):
+    """Span enfant du span courant ; sans trace active, ne fait rien"""
+    parent = span_courant.get()
+    if parent is None:
+        yield None
+        return
+    courant = Span(parent.trace, nom, parent.span_id, attributs)
+    jeton = span_courant.set(courant)
+    try:
+        yield courant
+    except BaseException as e:
+        courant.attributs["erreur"] = type(e).__name__
+        raise
+    finally:
+        span_courant.reset(jeton)
+        courant.terminer()
+
+# --- Exportateurs ---
+
+class ExportateurJsonLignes:
+    """Un span par ligne JSON, ajoutés au fichier (écriture groupée par trace)"""
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self._verrou = threading.Lock()
+
+    def exporter(self, spans: List[Span]):
+        lignes = ''.join(json.dumps(s.en_dict(), ensure_ascii=False, default=str) + '\n' for s in spans)
+        with self._verrou, open(self.chemin, 'a', encoding='utf-8') as fichier:
+            fichier.write(lignes)
+
+class ExportateurConsole:
+    """Arbre des spans d'une trace, indenté, sur le logger "traces" """
+
+    def exporter(self, spans: List[Span]):
+        enfants = {}
+        for s in sorted(spans, key=lambda s: s.debut):
+            enfants.setdefault(s.parent_id, []).append(s)
+        ids = {s.span_id for s in spans}
+        racines = [s for s in spans if s.parent_id not in ids]
+        lignes = [f"trace {spans[0].trace.trace_id}"]
+
+        def ajouter(s: Span, niveau: int):
+            attributs = ' '.join(f"{cle}={valeur}" for cle, valeur in s.attributs.items())
+            lignes.append(f"{'  ' * niveau}{s.nom} {s.duree_ms:.3f} ms {attributs}".rstrip())
+            for enfant in enfants.get(s.span_id, []):
+                ajouter(enfant, niveau + 1)
+
+        for racine in racines:
+            ajouter(racine, 1)
+        logger.info('\n'.join(lignes))
+
+class ExportateurMemoire:
+    def __init__(self):
+        self.traces: List[List[Span]] = []
+
+    def exporter(self, spans: List[Span]):
+        self.traces.append(list(spans))
+
+class Traceur:
+    def __init__(self, exportateur=None, taux_echantillon: float = 1.0):
+        self.exportateur = exportateur
+        self.taux_echantillon = taux_echantillon
+
+    @property
+    def actif(self) -> bool:
+        return self.exportateur is not None
+
+    @classmethod
+    def depuis_environnement(cls) -> "Traceur":
+        mode = os.environ.get('TRACES_EXPORT', '').lower()
+        if mode == 'jsonl':
+            exportateur = ExportateurJsonLignes(os.environ.get('TRACES_FICHIER', 'traces.jsonl'))
+        elif mode == 'console':
+            exportateur = ExportateurConsole()
+        else:
+            exportateur = None
+        return cls(exportateur, float(os.environ.get('TRACES_TAUX', '1.0')))
+
+    def echantillonne(self) -> bool:
+        return self.taux_echantillon >= 1 or random.random() < self.taux_echantillon
+
+# --- Propagation W3C (traceparent: 00-<trace_id>-<parent_id>-<flags>) ---
+
+def lire_traceparent(valeur: str):
+    """(trace_id, parent_id, échantillonné) ou None si l'en-tête est invalide"""
+    morceaux = valeur.strip().split('-')
+    if len(morceaux) != 4 or len(morceaux[1]) != 32 or len(morceaux[2]) != 16:
+        return None
+    try:
+        int(morceaux[1], 16), int(morceaux[2], 16), int(morceaux[3], 16)
+    except ValueError:
+        return None
+    if set(morceaux[1]) == {'0'} or set(morceaux[2]) == {'0'}:
+        return None
+    return morceaux[1], morceaux[2], bool(int(morceaux[3], 16) & 1)
+
+def ecrire_traceparent(s: Span) -> str:
+    return f"00-{s.trace.trace_id}-{s.span_id}-01"
+
+class MiddlewareTraces:
+    """Middleware ASGI pur : span racine par requête, export de la trace à la fin de la réponse"""
+
+    def __init__(self, app, traceur: Traceur):
+        self.app = app
+        self.traceur = traceur
+        self._modeles = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.traceur.actif:
+            await self.app(scope, receive, send)
+            return
+
+        entrant = None
+        for nom, valeur in scope.get('headers', ()):
+            if nom == b'traceparent':
+                entrant = lire_traceparent(valeur.decode('latin-1'))
+                break
+        if (entrant is not None and not entrant[2]) or (entrant is None and not self.traceur.echantillonne()):
+            await self.app(scope, receive, send)
+            return
+
+        if self._modeles is None:
+            self._modeles = ModelesRoutes(scope['app'].router.routes)
+        trace = Trace(entrant[0] if entrant else secrets.token_hex(16), self.traceur.exportateur)
+        racine = Span(trace, f"{scope['method']} {self._modeles.resoudre(scope['method'], scope['path'])}",
+                      entrant[1] if entrant else None, {"chemin": scope['path']})
+
+        async def envoyer(message):
+            if message['type'] == 'http.response.start':
+                racine.attributs["statut"] = message['status']
+                message = {**message, 'headers': [
+                    *message.get('headers', []), (b'traceparent', ecrire_traceparent(racine).encode())
+                ]}
+            await send(message)
+
+        jeton = span_courant.set(racine)
+        try:
+            await self.app(scope, receive, envoyer)
+        finally:
+            span_courant.reset(jeton)
+            racine.terminer()
+            try:
+                trace.exportateur.exporter(trace.spans)
+            except Exception:
+                logger.exception("Export de la trace %s impossible", trace.trace_id)
+
+class RouteTracee(APIRoute):
+    """Route FastAPI découpée en phases : validation de l'entrée, handler, sérialisation de la réponse
+
+    La validation et la sérialisation sont déduites des bornes du span du handler, ce qui évite
+    de dupliquer la logique interne de FastAPI.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, tracer_handler(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        gestionnaire = super().get_route_handler()
+
+        async def gestionnaire_trace(request):
+            parent = span_courant.get()
+            if parent is None:
+                return await gestionnaire(request)
+            with span("route", route=self.path) as route:
+                reponse = await gestionnaire(request)
+            handler = route.enfant_handler
+            if handler is not None:
+                route.enfant("validation_entree", route.debut, handler.debut)
+                route.enfant("serialisation", handler.fin, route.fin)
+            return reponse
+
+        return gestionnaire_trace
+
+def tracer_handler(endpoint):
+    """Enveloppe le handler dans un span "handler" (signature conservée pour FastAPI)"""
+    if getattr(endpoint, '_handler_trace', False):
+        # include_router recrée les routes à partir de l'endpoint déjà enveloppé
+        return endpoint
+
+    def ouvrir():
+        parent = span_courant.get()
+        if parent is None:
+            return None, None
+        courant = Span(parent.trace, "handler", parent.span_id, {"fonction": endpoint.__name__})
+        parent.enfant_handler = courant
+        return courant, span_courant.set(courant)
+
+    def fermer(courant, jeton):
+        span_courant.reset(jeton)
+        courant.terminer()
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def handler(*args, **kwargs):
+            courant, jeton = ouvrir()
+            if courant is None:
+                return await endpoint(*args, **kwargs)
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                fermer(courant, jeton)
+    else:
+        @functools.wraps(endpoint)
+        def handler(*args, **kwargs):
+            courant, jeton = ouvrir()
+            if courant is None:
+                return endpoint(*args, **kwargs)
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                fermer(courant, jeton)
+    handler._handler_trace = True
+    return handler
+
+class EcouteurTraces(monitoring.CommandListener):
+    """Un span par commande MongoDB, rattaché au span actif au moment de l'envoi"""
+
+    def __init__(self):
+        self._en_cours = {}
+        self._verrou = threading.Lock()
+
+    def started(self, event):
+        parent = span_courant.get()
+        if parent is None:
+            return
+        collection = event.command.get(event.command_name)
+        with self._verrou:
+            self._en_cours[(event.connection_id, event.request_id)] = (
+                parent, time.time(), collection if isinstance(collection, str) else None
+            )
+
+    def _terminer(self, event, erreur: bool):
+        with self._verrou:
+            en_cours = self._en_cours.pop((event.connection_id, event.request_id), None)
+        if en_cours is None:
+            return
+        parent, debut, collection = en_cours
+        attributs = {"collection": collection} if collection else {}
+        if erreur:
+            attributs["erreur"] = True
+        Span(parent.trace, f"mongo {event.command_name}", parent.span_id, attributs,
+             debut=debut, duree_ms=event.duration_micros / 1000)
+
+    def succeeded(self, event):
+        self._terminer(event, False)
+
+    def failed(self, event):
+        self._terminer(event, True)
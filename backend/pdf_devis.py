@@ -0,0 +1,250 @@
+"""Rendu PDF des devis et cache d'artefacts adressé par contenu
+
+Le PDF (1.4) est écrit directement : polices standard Helvetica et Courier en WinAnsiEncoding
+(accents et €), flux de contenu compressés, pagination du tableau des lignes. Pas de date de
+production dans le fichier : même devis, même gabarit -> mêmes octets, ce qui permet de
+l'adresser par l'empreinte de son contenu.
+
+rendre_devis_pdf est une fonction pure de (devis, client), exécutable dans le pool de processus.
+"""
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# À incrémenter à chaque modification du rendu : les PDF en cache sont alors régénérés
+VERSION_GABARIT = "1"
+
+LARGEUR, HAUTEUR = 595.28, 841.89  # A4, en points
+MARGE = 50
+DROITE = LARGEUR - MARGE
+INTERLIGNE = 14
+HAUT_TABLEAU_PREMIERE_PAGE = 560
+HAUT_TABLEAU = HAUTEUR - MARGE - 20
+BAS_TABLEAU = 80
+HAUTEUR_TOTAUX = 70
+DESCRIPTION_MAX = 55
+CHASSE_COURIER = 0.6  # largeur d'un caractère Courier, en corps
+
+LIBELLES_STATUT = {"brouillon": "Brouillon", "envoye": "Envoyé", "accepte": "Accepté", "refuse": "Refusé",
+                   "expire": "Expiré"}
+
+def _sans_date_modification(document: Optional[dict]) -> Optional[dict]:
+    return {cle: v for cle, v in document.items() if cle != "date_modification"} if document else document
+
+def empreinte_devis(devis: dict, client: Optional[dict]) -> str:
+    """Empreinte du contenu rendu : devis, client et version du gabarit. La date de modification,
+    absente du PDF, n'y entre pas : une modification sans effet sur le rendu garde le même artefact"""
+    contenu = json.dumps(
+        {"gabarit": VERSION_GABARIT, "devis": _sans_date_modification(devis), "client": _sans_date_modification(client)},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(contenu.encode()).hexdigest()
+
+def _chaine(texte: str) -> bytes:
+    octets = texte.encode('cp1252', errors='replace')
+    return b'(' + octets.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+def montant_fr(montant: float) -> str:
+    return f"{montant:,.2f} €".replace(',', ' ').replace('.', ',')
+
+def quantite_fr(quantite: float) -> str:
+    return f"{quantite:.3f}".rstrip('0').rstrip('.').replace('.', ',')
+
+def date_fr(valeur) -> str:
+    texte = str(valeur or '')
+    return f"{texte[8:10]}/{texte[5:7]}/{texte[0:4]}" if len(texte) >= 10 else ''
+
+class Page:
+    def __init__(self):
+        self.operations: List[bytes] = []
+
+    def texte(self, x: float, y: float, texte: str, police: str = 'F1', corps: float = 9):
+        self.operations.append(b'BT /%s %g Tf %.2f %.2f Td %s Tj ET' % (police.encode(), corps, x, y, _chaine(texte)))
+
+    def texte_droite(self, droite: float, y: float, texte: str, corps: float = 9):
+        """Aligné à droite en Courier (chasse fixe : largeur connue sans table de métriques)"""
+        largeur = len(texte) * CHASSE_COURIER * corps
+        self.texte(droite - largeur, y, texte, 'F3', corps)
+
+    def trait(self, y: float, epaisseur: float = 0.5):
+        self.operations.append(b'%g w %.2f %.2f m %.2f %.2f l S' % (epaisseur, MARGE, y, DROITE, y))
+
+    def flux(self) -> bytes:
+        return b'\n'.join(self.operations)
+
+COLONNES = ((MARGE, "Description"), (380, "Qté"), (465, "PU HT"), (DROITE, "Montant HT"))
+
+def _entete_tableau(page: Page, y: float) -> float:
+    page.texte(MARGE, y, COLONNES[0][1], 'F2')
+    for droite, libelle in COLONNES[1:]:
+        page.texte(droite - len(libelle) * 5.2, y, libelle, 'F2')
+    page.trait(y - 5)
+    return y - INTERLIGNE - 4
+
+def _entete_devis(page: Page, devis: dict, client: Optional[dict]) -> float:
+    page.texte(MARGE, HAUTEUR - MARGE - 10, f"DEVIS {devis.get('numero', '')}", 'F2', 18)
+    page.texte(MARGE, HAUTEUR - MARGE - 32, devis.get('titre', ''), 'F1', 12)
+    y = HAUTEUR - MARGE - 60
+    for libelle, valeur in (("Date", date_fr(devis.get('date_creation'))),
+                            ("Valable jusqu'au", date_fr(devis.get('date_validite'))),
+                            ("Statut", LIBELLES_STATUT.get(devis.get('statut'), ''))):
+        if valeur:
+            page.texte(MARGE, y, f"{libelle} : {valeur}")
+            y -= INTERLIGNE
+    client = client or {}
+    bloc = [
+        client.get('entreprise'), client.get('adresse'), client.get('email'), client.get('telephone'),
+        f"SIRET {client['siret']}" if client.get('siret') else None,
+    ]
+    page.texte(340, HAUTEUR - MARGE - 60,
+               " ".join(filter(None, (client.get('prenom'), client.get('nom')))) or "Client inconnu", 'F2')
+    for rang, ligne in enumerate(filter(None, bloc), start=1):
+        page.texte(340, HAUTEUR - MARGE - 60 - rang * INTERLIGNE, ligne)
+    return HAUT_TABLEAU_PREMIERE_PAGE
+
+def _totaux(page: Page, devis: dict, y: float):
+    page.trait(y + 8)
+    lignes = (
+        ("Total HT", devis.get('montant_ht', 0), 'F1'),
+        (f"TVA {quantite_fr(devis.get('taux_tva', 0))} %", devis.get('montant_tva', 0), 'F1'),
+        ("Total TTC", devis.get('montant_ttc', 0), 'F2'),
+    )
+    for libelle, valeur, police in lignes:
+        page.texte(360, y - 8, libelle, police, 10)
+        page.texte_droite(DROITE, y - 8, montant_fr(valeur), 10)
+        y -= INTERLIGNE + 2
+
+def paginer(devis: dict, client: Optional[dict]) -> List[Page]:
+    pages = [Page()]
+    y = _entete_tableau(pages[0], _entete_devis(pages[0], devis, client))
+    for ligne in devis.get('lignes', []):
+        if y < BAS_TABLEAU:
+            pages.append(Page())
+            y = _entete_tableau(pages[-1], HAUT_TABLEAU)
+        page = pages[-1]
+        description = str(ligne.get('description', ''))
+        if len(description) > DESCRIPTION_MAX:
+            description = description[:DESCRIPTION_MAX - 1] + '…'
+        page.texte(MARGE, y, description)
+        page.texte_droite(380, y, quantite_fr(ligne.get('quantite', 0)))
+        page.texte_droite(465, y, montant_fr(ligne.get('prix_unitaire', 0)))
+        page.texte_droite(DROITE, y, montant_fr(ligne.get('montant', 0)))
+        y -= INTERLIGNE
+    if y - HAUTEUR_TOTAUX < BAS_TABLEAU - INTERLIGNE:
+        pages.append(Page())
+        y = HAUT_TABLEAU
+    _totaux(pages[-1], devis, y)
+    for numero, page in enumerate(pages, start=1):
+        page.texte(MARGE, 40, f"{devis.get('numero', '')} - page {numero} / {len(pages)}", 'F1', 8)
+    return pages
+
+def assembler(pages: List[Page], titre: str) -> bytes:
+    """Objets PDF : catalogue, arbre des pages, polices, puis (page, contenu) par page ; table xref"""
+    polices = {'F1': 'Helvetica', 'F2': 'Helvetica-Bold', 'F3': 'Courier'}
+    premier_objet_page = 4 + len(polices)
+    objets = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % (premier_objet_page + 2 * i) for i in range(len(pages))), len(pages)),
+        b'<< /Title %s /Producer (colcomapp) >>' % _chaine(titre),
+    ]
+    for nom in polices.values():
+        objets.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % nom.encode())
+    ressources = b'<< /Font << %s >> >>' % b' '.join(
+        b'/%s %d 0 R' % (cle.encode(), 4 + i) for i, cle in enumerate(polices))
+    for i, page in enumerate(pages):
+        objets.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources %s /Contents %d 0 R >>' % (
+            LARGEUR, HAUTEUR, ressources, premier_objet_page + 2 * i + 1))
+        contenu = zlib.compress(page.flux(), 6)
+        objets.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(contenu), contenu))
+
+    sortie = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    positions = []
+    for numero, objet in enumerate(objets, start=1):
+        positions.append(len(sortie))
+        sortie += b'%d 0 obj\n%s\nendobj\n' % (numero, objet)
+    xref = len(sortie)
+    sortie += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objets) + 1)
+    sortie += b''.join(b'%010d 00000 n \n' % position for position in positions)
+    sortie += b'trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objets) + 1, xref)
+    return bytes(sortie)
+
+def rendre_devis_pdf(devis: dict, client: Optional[dict]) -> bytes:
+    return assembler(paginer(devis, client), f"Devis {devis.get('numero', '')}")
+
+class CacheArtefacts:
+    """PDF indexés par empreinte de contenu, LRU borné en octets
+
+    Un second index associe une version de document (id, dates de modification) à son
+    empreinte : tant que les dates ne changent pas, un PDF est servi sans relire ni hacher le
+    devis. Deux versions au contenu identique partagent le même artefact.
+    """
+
+    def __init__(self, taille_max_octets: int = 64 * 1024 * 1024, versions_max: int = 10000):
+        self.taille_max_octets = taille_max_octets
+        self.versions_max = versions_max
+        self._artefacts: "OrderedDict[str, bytes]" = OrderedDict()
+        self._versions: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._octets = 0
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def empreinte(self, version: Tuple) -> Optional[str]:
+        with self._verrou:
+            empreinte = self._versions.get(version)
+            if empreinte is not None:
+                self._versions.move_to_end(version)
+            return empreinte
+
+    def lire(self, empreinte: str) -> Optional[bytes]:
+        with self._verrou:
+            contenu = self._artefacts.get(empreinte)
+            if contenu is None:
+                self.misses += 1
+                return None
+            self._artefacts.move_to_end(empreinte)
+            self.hits += 1
+            return contenu
+
+    def associer(self, version: Tuple, empreinte: str):
+        with self._verrou:
+            self._versions[version] = empreinte
+            self._versions.move_to_end(version)
+            while len(self._versions) > self.versions_max:
+                self._versions.popitem(last=False)
+
+    def enregistrer(self, empreinte: str, contenu: bytes):
+        with self._verrou:
+            if empreinte in self._artefacts or len(contenu) > self.taille_max_octets:
+                return
+            self._artefacts[empreinte] = contenu
+            self._octets += len(contenu)
+            while self._octets > self.taille_max_octets:
+                _, evince = self._artefacts.popitem(last=False)
+                self._octets -= len(evince)
+                self.evictions += 1
+
+    def vider(self):
+        with self._verrou:
+            self._artefacts.clear()
+            self._versions.clear()
+            self._octets = 0
+
+    def stats(self) -> Dict[str, object]:
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                "artefacts": len(self._artefacts),
+                "octets": self._octets,
+                "taille_max_octets": self.taille_max_octets,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total > 0 else 0.0,
+                "evictions": self.evictions,
+                "version_gabarit": VERSION_GABARIT,
+            }
@@ -0,0 +1,117 @@
+"""Recherche transverse (prospects, clients, affaires, devis) : entrées d'index et classement
+
+Chaque document indexable donne une entrée : libellé et détail affichés, et ses termes, les
+préfixes (edge n-grams) de chaque mot normalisé (minuscules, sans accents), de
+LONGUEUR_MIN à LONGUEUR_MAX caractères. Une requête « dur ann » cherche les entrées
+contenant les termes « dur » et « ann » : une saisie partielle suffit, à chaque frappe. Les
+numéros perdent aussi leurs zéros de tête (DEV-0042 est trouvé par « 42 »). Chaque mot
+entier est en outre indexé avec la marque MOT_ENTIER (« =durand »), sans limite de longueur.
+
+Le dépôt de recherche ne renvoie qu'un nombre borné de candidats (les plus récents) ; le
+classement fin se fait ici, sur ces seuls candidats. Les mots entiers sont lus à part, pour
+qu'une entrée ancienne qui contient le mot exact ne soit pas évincée par des entrées plus
+récentes qui n'en partagent que le préfixe (« du » face à des dizaines de « Durand »).
+"""
+import re
+import unicodedata
+from typing import Iterable, List, Optional, Sequence
+
+LONGUEUR_MIN = 2
+LONGUEUR_MAX = 15
+MOT_ENTIER = "="
+
+# À score égal : les clients, puis les prospects, les affaires et les devis
+TYPES = ("client", "prospect", "affaire", "devis")
+PRIORITE_TYPE = {type_entite: len(TYPES) - rang for rang, type_entite in enumerate(TYPES)}
+
+_MOT = re.compile(r"[a-z0-9]+")
+
+def normaliser(texte: str) -> str:
+    decompose = unicodedata.normalize("NFKD", texte.casefold())
+    return "".join(c for c in decompose if not unicodedata.combining(c))
+
+def mots(texte: Optional[str]) -> List[str]:
+    return _MOT.findall(normaliser(texte)) if texte else []
+
+def jetons_requete(requete: str) -> List[str]:
+    """Mots de la requête assez longs pour être cherchés, sans doublon, dans l'ordre de saisie"""
+    return list(dict.fromkeys(mot for mot in mots(requete) if len(mot) >= LONGUEUR_MIN))
+
+def terme(jeton: str) -> str:
+    """Terme d'index d'un jeton de requête : les préfixes s'arrêtent à LONGUEUR_MAX"""
+    return jeton[:LONGUEUR_MAX]
+
+def terme_entier(jeton: str) -> str:
+    """Terme d'index des seules entrées où le jeton est un mot entier"""
+    return MOT_ENTIER + jeton
+
+def termes(textes: Iterable[Optional[str]]) -> List[str]:
+    resultat = set()
+    for texte in textes:
+        for mot in mots(texte):
+            variantes = (mot, mot.lstrip("0")) if mot.isdigit() else (mot,)
+            for variante in variantes:
+                for longueur in range(LONGUEUR_MIN, min(len(variante), LONGUEUR_MAX) + 1):
+                    resultat.add(variante[:longueur])
+                if len(variante) >= LONGUEUR_MIN:
+                    resultat.add(terme_entier(variante))
+    return sorted(resultat)
+
+def requetes_candidats(jetons: Sequence[str]) -> List[List[str]]:
+    """Listes de termes à chercher dans l'index : préfixes de tous les jetons, tous les jetons en
+    mots entiers, puis chaque jeton en mot entier avec les préfixes des autres"""
+    prefixes = [terme(jeton) for jeton in jetons]
+    requetes = [prefixes, [terme_entier(jeton) for jeton in jetons]]
+    if len(jetons) > 1:
+        requetes += [prefixes[:rang] + [terme_entier(jeton)] + prefixes[rang + 1:] for rang, jeton in enumerate(jetons)]
+    return requetes
+
+def _personne(document: dict):
+    libelle = " ".join(filter(None, (document.get("prenom"), document.get("nom"))))
+    detail = " · ".join(filter(None, (document.get("entreprise"), document.get("email"))))
+    return libelle, detail or None
+
+def _affaire(document: dict):
+    return document.get("titre", ""), None
+
+def _devis(document: dict):
+    return " · ".join(filter(None, (document.get("numero"), document.get("titre")))), None
+
+PRESENTATIONS = {"prospect": _personne, "client": _personne, "affaire": _affaire, "devis": _devis}
+
+def entree_recherche(type_entite: str, document: dict) -> dict:
+    libelle, detail = PRESENTATIONS[type_entite](document)
+    date = document.get("date_modification") or document.get("date_creation")
+    return {
+        "cle": f"{type_entite}:{document['id']}",
+        "type": type_entite,
+        "id": document["id"],
+        "libelle": libelle,
+        "detail": detail,
+        "date": date.isoformat() if hasattr(date, "isoformat") else date,
+        "termes": termes((libelle, detail)),
+    }
+
+def _score(entree: dict, jetons: Sequence[str]) -> Optional[tuple]:
+    mots_libelle = mots(entree["libelle"])
+    mots_entree = mots_libelle + mots(entree.get("detail"))
+    mots_numeriques = [mot.lstrip("0") for mot in mots_entree if mot.isdigit()]
+    exacts = dans_libelle = 0
+    for jeton in jetons:
+        if not any(mot.startswith(jeton) for mot in mots_entree + mots_numeriques):
+            return None  # jeton plus long que LONGUEUR_MAX qui ne correspond qu'en préfixe
+        exacts += jeton in mots_entree or jeton in mots_numeriques
+        dans_libelle += any(mot.startswith(jeton) for mot in mots_libelle)
+    debut = bool(mots_libelle) and mots_libelle[0].startswith(jetons[0])
+    return exacts, dans_libelle, debut, PRIORITE_TYPE.get(entree["type"], 0), entree.get("date") or ""
+
+def classer(candidats: Iterable[dict], jetons: Sequence[str], limite: int) -> List[dict]:
+    """Meilleurs candidats : mots entiers, puis correspondances dans le libellé, libellé qui
+    commence par le premier mot, type, et enfin les plus récents"""
+    notes = []
+    for entree in candidats:
+        score = _score(entree, jetons)
+        if score is not None:
+            notes.append((score, entree))
+    notes.sort(key=lambda note: note[0], reverse=True)
+    return [entree for _, entree in notes[:limite]]
@@ -1,29 +1,94 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
+import hashlib
+import json
+import base64
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import functools
+import multiprocessing
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone
 from enum import Enum
+from calcul_devis import LIGNES_MAX as DEVIS_LIGNES_MAX, ErreurMontant, en_centimes, en_euros, montants_lignes, totaux
+from compression import MiddlewareCompression
+from depots import Depots
+from doublons import CHAMPS_CLES, CLES_BLOCAGE, IndexDoublons, cles_contact, fiche, rapport_doublons
+from pdf_devis import VERSION_GABARIT, CacheArtefacts, empreinte_devis, rendre_devis_pdf
+from recherche import TYPES as TYPES_RECHERCHE, classer, entree_recherche, jetons_requete, requetes_candidats
+from moteur_fiscal import (
+    ErreurCalculFiscal,
+    ParametresObjectifNet,
+    ParametresOptimisation,
+    ParametresSimulationNet,
+    SituationFamiliale,
+    ca_minimum_pour_net,
+    optimiser_fiscalite,
+    optimiser_lot,
+    simuler_salaire_net,
+    version_bareme,
+)
+from moteur_fiscal.calculs import utiliser_table_net_brut
+from moteur_fiscal.projection import (
+    ParametresProjection,
+    agreger_projection,
+    calculer_projection,
+    preparer_projection,
+    simuler_lot,
+)
+from moteur_fiscal.table_net_brut import TableNetBrut
+from moteur_fiscal.vectorise import calculer_grille_sensibilite
+from observabilite import (
+    CONTENT_TYPE_PROMETHEUS,
+    EcouteurCommandesLentes,
+    EcouteurCommandesMongo,
+    EcouteurTraces,
+    JournalLent,
+    MiddlewareMetriques,
+    MiddlewareProfilage,
+    MiddlewareRequetesLentes,
+    MiddlewareTraces,
+    Profileur,
+    RouteTracee,
+    Traceur,
+    profil_explicite,
+    registre,
+    span,
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+journal_lent = JournalLent.depuis_environnement(mongo_url)
+traceur = Traceur.depuis_environnement()
+profileur = Profileur.depuis_environnement()
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[EcouteurCommandesMongo(), EcouteurCommandesLentes(journal_lent), EcouteurTraces()]
+)
 db = client[os.environ['DB_NAME']]
+# Collections du CRM ; remplaçable par Depots.memoire() (tests, benchmarks, tirs de charge)
+depots = Depots.mongo(db)
 
 # Create the main app without a prefix
 app = FastAPI()
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=RouteTracee)
 
 # Enums
 class StatutProspect(str, Enum):
@@ -109,6 +174,20 @@ class ClientCreate(BaseModel):
     siret: Optional[str] = None
     notes: Optional[str] = None
 
+class DoublonProbable(BaseModel):
+    type: str
+    id: str
+    libelle: str
+    score: float
+    raisons: List[str]
+
+# Réponses de création : le contact enregistré et ses doublons probables (signalés, pas refusés)
+class ProspectCree(Prospect):
+    doublons: List[DoublonProbable] = []
+
+class ClientCree(Client):
+    doublons: List[DoublonProbable] = []
+
 class Affaire(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     client_id: str
@@ -151,7 +230,7 @@ class LigneDevis(BaseModel):
     description: str
     quantite: float
     prix_unitaire: float
-    montant: float
+    montant: float = 0.0  # recalculé par le serveur : quantite × prix_unitaire au centime
 
 class Devis(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -177,6 +256,54 @@ class DevisCreate(BaseModel):
     taux_tva: float = 20.0
     date_validite: Optional[datetime] = None
 
+class PageLignesDevis(BaseModel):
+    devis_id: str
+    saut: int
+    total: int
+    lignes: List[LigneDevis]
+    montant_ht: float
+    montant_tva: float
+    montant_ttc: float
+
+class ResultatLigneDevis(BaseModel):
+    devis_id: str
+    index: int
+    ligne: LigneDevis
+    montant_ht: float
+    montant_tva: float
+    montant_ttc: float
+
+# Modifications en lot : champs modifiables depuis le calendrier et les listes
+class ChampsAction(BaseModel):
+    type_action: Optional[TypeAction] = None
+    titre: Optional[str] = None
+    description: Optional[str] = None
+    date_prevue: Optional[datetime] = None
+    statut: Optional[StatutAction] = None
+
+class ModificationAction(BaseModel):
+    id: str
+    champs: ChampsAction
+
+class ResultatModificationAction(BaseModel):
+    id: str
+    action: Optional[Action] = None
+    erreur: Optional[str] = None
+
+class ChampsDevis(BaseModel):
+    titre: Optional[str] = None
+    statut: Optional[StatutDevis] = None
+    date_validite: Optional[datetime] = None
+
+class ModificationDevis(BaseModel):
+    id: str
+    champs: ChampsDevis
+
+class ResultatModificationDevis(BaseModel):
+    id: str
+    devis: Optional[Devis] = None
+    erreur: Optional[str] = None
+
 # Helper functions
 def prepare_for_mongo(data):
     if isinstance(data, dict):
@@ -195,53 +322,137 @@ def parse_from_mongo(item):
                     pass
     return item
 
+# Index de recherche, tenu à jour à chaque écriture d'un prospect, client, affaire ou devis
+async def indexer(type_entite: str, *documents: dict):
+    await depots.recherche.indexer([entree_recherche(type_entite, document) for document in documents])
+
+async def desindexer(type_entite: str, identifiant: str):
+    await depots.recherche.retirer([f"{type_entite}:{identifiant}"])
+
+# Doublons de contacts : clés normalisées (doublons.py) stockées et indexées avec chaque
+# prospect et client ; les candidats au rapprochement sont lus par ces clés
+DOUBLONS_CANDIDATS = 50
+SOURCES_CONTACTS = (("prospect", "prospects"), ("client", "clients"))
+# Un prospect converti a donné son client : la paire n'est pas un doublon
+FILTRES_CONTACTS = {"prospect": {"statut": {"$ne": StatutProspect.CONVERTI}}, "client": {}}
+
+doublons_signales = registre.compteur(
+    'contacts_duplicates_flagged_total', "Contacts créés ou importés signalés comme doublons probables",
+    ('origine',)
+)
+
+async def candidats_doublons(fiches: List[dict]) -> List[dict]:
+    """Fiches des contacts en base qui partagent une clé de blocage avec l'une des fiches"""
+    conditions = []
+    for champ in CLES_BLOCAGE:
+        valeurs = sorted({fiche_contact[champ] for fiche_contact in fiches if fiche_contact[champ]})
+        if valeurs:
+            conditions.append({champ: {"$in": valeurs}})
+    if not conditions:
+        return []
+    candidats = []
+    for type_entite, nom in SOURCES_CONTACTS:
+        documents = await getattr(depots, nom).lister(
+            {"$or": conditions, **FILTRES_CONTACTS[type_entite]}, limite=DOUBLONS_CANDIDATS * len(fiches)
+        )
+        candidats += [fiche(type_entite, document) for document in documents]
+    return candidats
+
+async def doublons_probables(type_entite: str, contact: dict) -> List[DoublonProbable]:
+    fiche_contact = fiche(type_entite, contact)
+    doublons = IndexDoublons(await candidats_doublons([fiche_contact])).doublons(fiche_contact)
+    if doublons:
+        doublons_signales.inc('creation')
+    return [DoublonProbable(**doublon) for doublon in doublons]
+
+MODIFICATIONS_LOT_MAX = int(os.environ.get('MODIFICATIONS_LOT_MAX', '500'))
+
+async def modifier_en_lot(depot, modifications: list, introuvable: str) -> List[tuple]:
+    """Applique les modifications valides en un seul modifier_lot du dépôt
+
+    Renvoie, dans l'ordre de la requête, (id, document modifié ou None, erreur ou None). Une valeur
+    nulle laisse le champ inchangé ; un id présent deux fois n'est appliqué qu'à sa première occurrence.
+    """
+    if len(modifications) > MODIFICATIONS_LOT_MAX:
+        raise HTTPException(status_code=400, detail=f"Lot trop grand : {MODIFICATIONS_LOT_MAX} modifications maximum")
+    maintenant = datetime.now(timezone.utc)
+    erreurs = {}
+    a_appliquer = []
+    vus = set()
+    for index, modification in enumerate(modifications):
+        champs = modification.champs.model_dump(exclude_none=True)
+        if modification.id in vus:
+            erreurs[index] = "Modifié plusieurs fois dans le même lot"
+            continue
+        # Première occurrence, même vide : les suivantes sont refusées
+        vus.add(modification.id)
+        if not champs:
+            erreurs[index] = "Aucun champ à modifier"
+        else:
+            champs["date_modification"] = maintenant
+            a_appliquer.append((modification.id, prepare_for_mongo(champs)))
+    modifies = await depot.modifier_lot(a_appliquer)
+    resultats = []
+    for index, modification in enumerate(modifications):
+        if index in erreurs:
+            resultats.append((modification.id, None, erreurs[index]))
+        elif modification.id in modifies:
+            resultats.append((modification.id, parse_from_mongo(modifies[modification.id]), None))
+        else:
+            resultats.append((modification.id, None, introuvable))
+    return resultats
+
 # Routes CRM
 
 # --- PROSPECTS ---
 @api_router.get("/prospects", response_model=List[Prospect])
 async def get_prospects():
-    prospects = await db.prospects.find().to_list(1000)
-    return [Prospect(**parse_from_mongo(prospect)) for prospect in prospects]
+    prospects = await depots.prospects.lister()
+    with span("parse_from_mongo", documents=len(prospects)):
+        prospects = [parse_from_mongo(prospect) for prospect in prospects]
+    with span("validation"):
+        return [Prospect(**prospect) for prospect in prospects]
 
-@api_router.post("/prospects", response_model=Prospect)
+@api_router.post("/prospects", response_model=ProspectCree)
 async def create_prospect(prospect_data: ProspectCreate):
     prospect = Prospect(**prospect_data.dict())
     prospect_dict = prepare_for_mongo(prospect.dict())
-    await db.prospects.insert_one(prospect_dict)
-    return prospect
+    prospect_dict.update(cles_contact(prospect_dict))
+    doublons = await doublons_probables("prospect", prospect_dict)
+    await depots.prospects.inserer(prospect_dict)
+    await indexer("prospect", prospect_dict)
+    return ProspectCree(**prospect.dict(), doublons=doublons)
 
 @api_router.get("/prospects/{prospect_id}", response_model=Prospect)
 async def get_prospect(prospect_id: str):
-    prospect = await db.prospects.find_one({"id": prospect_id})
+    prospect = await depots.prospects.trouver(prospect_id)
     if not prospect:
         raise HTTPException(status_code=404, detail="Prospect non trouvé")
     return Prospect(**parse_from_mongo(prospect))
 
 @api_router.put("/prospects/{prospect_id}", response_model=Prospect)
 async def update_prospect(prospect_id: str, prospect_data: ProspectCreate):
-    prospect = await db.prospects.find_one({"id": prospect_id})
-    if not prospect:
-        raise HTTPException(status_code=404, detail="Prospect non trouvé")
-    
     updated_data = prospect_data.dict()
     updated_data["date_modification"] = datetime.now(timezone.utc)
     updated_data = prepare_for_mongo(updated_data)
+    updated_data.update(cles_contact(updated_data))
     
-    await db.prospects.update_one({"id": prospect_id}, {"$set": updated_data})
-    
-    updated_prospect = await db.prospects.find_one({"id": prospect_id})
+    updated_prospect = await depots.prospects.modifier(prospect_id, updated_data)
+    if not updated_prospect:
+        raise HTTPException(status_code=404, detail="Prospect non trouvé")
+    await indexer("prospect", updated_prospect)
     return Prospect(**parse_from_mongo(updated_prospect))
 
 @api_router.delete("/prospects/{prospect_id}")
 async def delete_prospect(prospect_id: str):
-    result = await db.prospects.delete_one({"id": prospect_id})
-    if result.deleted_count == 0:
+    if not await depots.prospects.supprimer(prospect_id):
         raise HTTPException(status_code=404, detail="Prospect non trouvé")
+    await desindexer("prospect", prospect_id)
     return {"message": "Prospect supprimé"}
 
 @api_router.post("/prospects/{prospect_id}/convert")
 async def convert_prospect_to_client(prospect_id: str):
-    prospect = await db.prospects.find_one({"id": prospect_id})
+    prospect = await depots.prospects.trouver(prospect_id)
     if not prospect:
         raise HTTPException(status_code=404, detail="Prospect non trouvé")
     
@@ -257,12 +468,14 @@ async def convert_prospect_to_client(prospect_id: str):
     }
     client = Client(**client_data)
     client_dict = prepare_for_mongo(client.dict())
-    await db.clients.insert_one(client_dict)
+    client_dict.update(cles_contact(client_dict))
+    await depots.clients.inserer(client_dict)
+    await indexer("client", client_dict)
     
     # Mettre à jour le statut du prospect
-    await db.prospects.update_one(
-        {"id": prospect_id}, 
-        {"$set": {"statut": StatutProspect.CONVERTI, "date_modification": datetime.now(timezone.utc).isoformat()}}
+    await depots.prospects.modifier(
+        prospect_id,
+        {"statut": StatutProspect.CONVERTI, "date_modification": datetime.now(timezone.utc).isoformat()}
     )
     
     return client
@@ -270,244 +483,579 @@ async def convert_prospect_to_client(prospect_id: str):
 # --- CLIENTS ---
 @api_router.get("/clients", response_model=List[Client])
 async def get_clients():
-    clients = await db.clients.find().to_list(1000)
-    return [Client(**parse_from_mongo(client)) for client in clients]
+    clients = await depots.clients.lister()
+    with span("parse_from_mongo", documents=len(clients)):
+        clients = [parse_from_mongo(client) for client in clients]
+    with span("validation"):
+        return [Client(**client) for client in clients]
 
-@api_router.post("/clients", response_model=Client)
+@api_router.post("/clients", response_model=ClientCree)
 async def create_client(client_data: ClientCreate):
     client = Client(**client_data.dict())
     client_dict = prepare_for_mongo(client.dict())
-    await db.clients.insert_one(client_dict)
-    return client
+    client_dict.update(cles_contact(client_dict))
+    doublons = await doublons_probables("client", client_dict)
+    await depots.clients.inserer(client_dict)
+    await indexer("client", client_dict)
+    return ClientCree(**client.dict(), doublons=doublons)
 
 @api_router.get("/clients/{client_id}", response_model=Client)
 async def get_client(client_id: str):
-    client = await db.clients.find_one({"id": client_id})
+    client = await depots.clients.trouver(client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client non trouvé")
     return Client(**parse_from_mongo(client))
 
 @api_router.put("/clients/{client_id}", response_model=Client)
 async def update_client(client_id: str, client_data: ClientCreate):
-    client = await db.clients.find_one({"id": client_id})
-    if not client:
-        raise HTTPException(status_code=404, detail="Client non trouvé")
-    
     updated_data = client_data.dict()
     updated_data["date_modification"] = datetime.now(timezone.utc)
     updated_data = prepare_for_mongo(updated_data)
+    updated_data.update(cles_contact(updated_data))
     
-    await db.clients.update_one({"id": client_id}, {"$set": updated_data})
-    
-    updated_client = await db.clients.find_one({"id": client_id})
+    updated_client = await depots.clients.modifier(client_id, updated_data)
+    if not updated_client:
+        raise HTTPException(status_code=404, detail="Client non trouvé")
+    await indexer("client", updated_client)
     return Client(**parse_from_mongo(updated_client))
 
 @api_router.delete("/clients/{client_id}")
 async def delete_client(client_id: str):
-    result = await db.clients.delete_one({"id": client_id})
-    if result.deleted_count == 0:
+    if not await depots.clients.supprimer(client_id):
         raise HTTPException(status_code=404, detail="Client non trouvé")
+    await depots.simulations.supprimer_selon({"client_id": client_id})
+    await desindexer("client", client_id)
     return {"message": "Client supprimé"}
 
 # --- AFFAIRES ---
 @api_router.get("/affaires", response_model=List[Affaire])
 async def get_affaires():
-    affaires = await db.affaires.find().to_list(1000)
-    return [Affaire(**parse_from_mongo(affaire)) for affaire in affaires]
+    affaires = await depots.affaires.lister()
+    with span("parse_from_mongo", documents=len(affaires)):
+        affaires = [parse_from_mongo(affaire) for affaire in affaires]
+    with span("validation"):
+        return [Affaire(**affaire) for affaire in affaires]
 
 @api_router.post("/affaires", response_model=Affaire)
 async def create_affaire(affaire_data: AffaireCreate):
     # Vérifier que le client existe
-    client = await db.clients.find_one({"id": affaire_data.client_id})
-    if not client:
+    if not await depots.clients.existe(affaire_data.client_id):
         raise HTTPException(status_code=404, detail="Client non trouvé")
     
     affaire = Affaire(**affaire_data.dict())
     affaire_dict = prepare_for_mongo(affaire.dict())
-    await db.affaires.insert_one(affaire_dict)
+    await depots.affaires.inserer(affaire_dict)
+    await indexer("affaire", affaire_dict)
     return affaire
 
 @api_router.get("/affaires/{affaire_id}", response_model=Affaire)
 async def get_affaire(affaire_id: str):
-    affaire = await db.affaires.find_one({"id": affaire_id})
+    affaire = await depots.affaires.trouver(affaire_id)
     if not affaire:
         raise HTTPException(status_code=404, detail="Affaire non trouvée")
     return Affaire(**parse_from_mongo(affaire))
 
 @api_router.put("/affaires/{affaire_id}", response_model=Affaire)
 async def update_affaire(affaire_id: str, affaire_data: AffaireCreate):
-    affaire = await db.affaires.find_one({"id": affaire_id})
-    if not affaire:
-        raise HTTPException(status_code=404, detail="Affaire non trouvée")
-    
     updated_data = affaire_data.dict()
     updated_data["date_modification"] = datetime.now(timezone.utc)
     updated_data = prepare_for_mongo(updated_data)
     
-    await db.affaires.update_one({"id": affaire_id}, {"$set": updated_data})
-    
-    updated_affaire = await db.affaires.find_one({"id": affaire_id})
+    updated_affaire = await depots.affaires.modifier(affaire_id, updated_data)
+    if not updated_affaire:
+        raise HTTPException(status_code=404, detail="Affaire non trouvée")
+    await indexer("affaire", updated_affaire)
     return Affaire(**parse_from_mongo(updated_affaire))
 
 @api_router.delete("/affaires/{affaire_id}")
 async def delete_affaire(affaire_id: str):
-    result = await db.affaires.delete_one({"id": affaire_id})
-    if result.deleted_count == 0:
+    if not await depots.affaires.supprimer(affaire_id):
         raise HTTPException(status_code=404, detail="Affaire non trouvée")
+    await desindexer("affaire", affaire_id)
     return {"message": "Affaire supprimée"}
 
 # --- ACTIONS ---
 @api_router.get("/actions", response_model=List[Action])
 async def get_actions():
-    actions = await db.actions.find().to_list(1000)
-    return [Action(**parse_from_mongo(action)) for action in actions]
+    actions = await depots.actions.lister()
+    with span("parse_from_mongo", documents=len(actions)):
+        actions = [parse_from_mongo(action) for action in actions]
+    with span("validation"):
+        return [Action(**action) for action in actions]
 
 @api_router.post("/actions", response_model=Action)
 async def create_action(action_data: ActionCreate):
     # Vérifier que l'affaire existe
-    affaire = await db.affaires.find_one({"id": action_data.affaire_id})
-    if not affaire:
+    if not await depots.affaires.existe(action_data.affaire_id):
         raise HTTPException(status_code=404, detail="Affaire non trouvée")
     
     action = Action(**action_data.dict())
     action_dict = prepare_for_mongo(action.dict())
-    await db.actions.insert_one(action_dict)
+    await depots.actions.inserer(action_dict)
     return action
 
 @api_router.get("/actions/{action_id}", response_model=Action)
 async def get_action(action_id: str):
-    action = await db.actions.find_one({"id": action_id})
+    action = await depots.actions.trouver(action_id)
     if not action:
         raise HTTPException(status_code=404, detail="Action non trouvée")
     return Action(**parse_from_mongo(action))
 
 @api_router.put("/actions/{action_id}", response_model=Action)
 async def update_action(action_id: str, action_data: ActionCreate):
-    action = await db.actions.find_one({"id": action_id})
-    if not action:
-        raise HTTPException(status_code=404, detail="Action non trouvée")
-    
     updated_data = action_data.dict()
     updated_data["date_modification"] = datetime.now(timezone.utc)
     updated_data = prepare_for_mongo(updated_data)
     
-    await db.actions.update_one({"id": action_id}, {"$set": updated_data})
-    
-    updated_action = await db.actions.find_one({"id": action_id})
+    updated_action = await depots.actions.modifier(action_id, updated_data)
+    if not updated_action:
+        raise HTTPException(status_code=404, detail="Action non trouvée")
     return Action(**parse_from_mongo(updated_action))
 
+@api_router.patch("/actions/bulk", response_model=List[ResultatModificationAction])
+async def update_actions_bulk(modifications: List[ModificationAction]):
+    """Replanifie ou clôture plusieurs actions en une requête (sélection multiple du calendrier)"""
+    resultats = await modifier_en_lot(depots.actions, modifications, "Action non trouvée")
+    return [
+        ResultatModificationAction(id=identifiant, action=Action(**action) if action else None, erreur=erreur)
+        for identifiant, action, erreur in resultats
+    ]
+
 @api_router.delete("/actions/{action_id}")
 async def delete_action(action_id: str):
-    result = await db.actions.delete_one({"id": action_id})
-    if result.deleted_count == 0:
+    if not await depots.actions.supprimer(action_id):
         raise HTTPException(status_code=404, detail="Action non trouvée")
     return {"message": "Action supprimée"}
 
 # --- DEVIS ---
 @api_router.get("/devis", response_model=List[Devis])
 async def get_devis():
-    devis_list = await db.devis.find().to_list(1000)
-    return [Devis(**parse_from_mongo(devis)) for devis in devis_list]
+    devis_list = await depots.devis.lister()
+    with span("parse_from_mongo", documents=len(devis_list)):
+        devis_list = [parse_from_mongo(devis) for devis in devis_list]
+    with span("validation"):
+        return [Devis(**devis) for devis in devis_list]
+
+def calculer_montants_devis(lignes: List[LigneDevis], taux_tva: float) -> dict:
+    """Recalcule le montant de chaque ligne (en place) et renvoie les totaux du devis, au centime"""
+    try:
+        with span("calcul_lignes", lignes=len(lignes)):
+            centimes = montants_lignes([ligne.quantite for ligne in lignes], [ligne.prix_unitaire for ligne in lignes])
+    except ErreurMontant as erreur:
+        raise HTTPException(status_code=400, detail=str(erreur))
+    for ligne, montant in zip(lignes, en_euros(centimes)):
+        ligne.montant = montant
+    montant_ht, montant_tva, montant_ttc = totaux(centimes.sum(), taux_tva)
+    return {
+        "montant_ht": en_euros(montant_ht),
+        "montant_tva": en_euros(montant_tva),
+        "montant_ttc": en_euros(montant_ttc),
+    }
 
 @api_router.post("/devis", response_model=Devis)
 async def create_devis(devis_data: DevisCreate):
     # Vérifier que le client existe
-    client = await db.clients.find_one({"id": devis_data.client_id})
-    if not client:
+    if not await depots.clients.existe(devis_data.client_id):
         raise HTTPException(status_code=404, detail="Client non trouvé")
     
     # Générer un numéro de devis unique
-    count = await db.devis.count_documents({})
+    count = await depots.devis.compter()
     numero = f"DEV-{(count + 1):04d}"
     
-    # Calculer les montants
-    montant_ht = sum(ligne.montant for ligne in devis_data.lignes)
-    montant_tva = montant_ht * (devis_data.taux_tva / 100)
-    montant_ttc = montant_ht + montant_tva
-    
-    devis = Devis(
-        numero=numero,
-        montant_ht=montant_ht,
-        montant_tva=montant_tva,
-        montant_ttc=montant_ttc,
-        **devis_data.dict()
-    )
+    montants = calculer_montants_devis(devis_data.lignes, devis_data.taux_tva)
+    devis = Devis(numero=numero, **montants, **devis_data.dict())
     devis_dict = prepare_for_mongo(devis.dict())
-    await db.devis.insert_one(devis_dict)
+    # Champ de stockage (absent du modèle) : taille du tableau pour les pages de lignes
+    devis_dict["nombre_lignes"] = len(devis.lignes)
+    await depots.devis.inserer(devis_dict)
+    await indexer("devis", devis_dict)
     return devis
 
 @api_router.get("/devis/{devis_id}", response_model=Devis)
 async def get_devis_by_id(devis_id: str):
-    devis = await db.devis.find_one({"id": devis_id})
+    devis = await depots.devis.trouver(devis_id)
     if not devis:
         raise HTTPException(status_code=404, detail="Devis non trouvé")
     return Devis(**parse_from_mongo(devis))
 
 @api_router.put("/devis/{devis_id}", response_model=Devis)
 async def update_devis(devis_id: str, devis_data: DevisCreate):
-    devis = await db.devis.find_one({"id": devis_id})
-    if not devis:
-        raise HTTPException(status_code=404, detail="Devis non trouvé")
-    
-    # Recalculer les montants
-    montant_ht = sum(ligne.montant for ligne in devis_data.lignes)
-    montant_tva = montant_ht * (devis_data.taux_tva / 100)
-    montant_ttc = montant_ht + montant_tva
-    
+    montants = calculer_montants_devis(devis_data.lignes, devis_data.taux_tva)
     updated_data = devis_data.dict()
-    updated_data.update({
-        "montant_ht": montant_ht,
-        "montant_tva": montant_tva,
-        "montant_ttc": montant_ttc,
-        "date_modification": datetime.now(timezone.utc)
-    })
+    updated_data.update(montants)
+    updated_data["nombre_lignes"] = len(devis_data.lignes)
+    updated_data["date_modification"] = datetime.now(timezone.utc)
     updated_data = prepare_for_mongo(updated_data)
     
-    await db.devis.update_one({"id": devis_id}, {"$set": updated_data})
-    
-    updated_devis = await db.devis.find_one({"id": devis_id})
+    updated_devis = await depots.devis.modifier(devis_id, updated_data)
+    if not updated_devis:
+        raise HTTPException(status_code=404, detail="Devis non trouvé")
+    await indexer("devis", updated_devis)
     return Devis(**parse_from_mongo(updated_devis))
 
+# --- LIGNES DE DEVIS : pages et modification unitaire, sans transférer tout le devis ---
+DEVIS_LIGNES_PAGE_MAX = 1000
+# Écriture optimiste : nouvel essai si le devis a changé entre la lecture et l'écriture
+DEVIS_LIGNES_ESSAIS = 3
+
+async def nombre_lignes_devis(devis_id: str, devis: dict) -> int:
+    if "nombre_lignes" in devis:
+        return devis["nombre_lignes"]
+    # Devis antérieur au champ nombre_lignes : une lecture complète
+    complet = await depots.devis.trouver(devis_id)
+    return len(complet.get("lignes", [])) if complet else 0
+
+@api_router.get("/devis/{devis_id}/lignes", response_model=PageLignesDevis)
+async def get_lignes_devis(devis_id: str, saut: int = 0, limite: int = 100):
+    if saut < 0 or not 1 <= limite <= DEVIS_LIGNES_PAGE_MAX:
+        raise HTTPException(status_code=400,
+                            detail=f"Pagination invalide : saut ≥ 0, limite entre 1 et {DEVIS_LIGNES_PAGE_MAX}")
+    devis = await depots.devis.trouver_tranche(devis_id, "lignes", saut, limite)
+    if not devis:
+        raise HTTPException(status_code=404, detail="Devis non trouvé")
+    return PageLignesDevis(
+        devis_id=devis_id,
+        saut=saut,
+        total=await nombre_lignes_devis(devis_id, devis),
+        lignes=devis.get("lignes", []),
+        montant_ht=devis["montant_ht"],
+        montant_tva=devis["montant_tva"],
+        montant_ttc=devis["montant_ttc"],
+    )
+
+async def ecrire_ligne_devis(devis_id: str, ligne: LigneDevis, index: Optional[int]) -> ResultatLigneDevis:
+    """Remplace la ligne `index` (ou ajoute la ligne si index est None) et met les totaux à jour
+    par différence, en deux allers-retours qui ne transportent qu'une ligne"""
+    for _ in range(DEVIS_LIGNES_ESSAIS):
+        devis = await depots.devis.trouver_tranche(devis_id, "lignes", index or 0, 1)
+        if not devis:
+            raise HTTPException(status_code=404, detail="Devis non trouvé")
+        nombre = await nombre_lignes_devis(devis_id, devis)
+        if index is not None and not devis.get("lignes"):
+            raise HTTPException(status_code=404, detail="Ligne de devis non trouvée")
+        if index is None and nombre >= DEVIS_LIGNES_MAX:
+            raise HTTPException(status_code=400, detail=f"Devis trop grand : {DEVIS_LIGNES_MAX} lignes maximum")
+        ancien = en_centimes(devis["lignes"][0]["montant"]) if index is not None else 0
+        calculer_montants_devis([ligne], devis["taux_tva"])
+        montant_ht, montant_tva, montant_ttc = totaux(
+            en_centimes(devis["montant_ht"]) - ancien + en_centimes(ligne.montant), devis["taux_tva"]
+        )
+        montants = {
+            "montant_ht": en_euros(montant_ht),
+            "montant_tva": en_euros(montant_tva),
+            "montant_ttc": en_euros(montant_ttc),
+        }
+        champs = {**montants, "date_modification": datetime.now(timezone.utc).isoformat()}
+        if index is None:
+            champs["nombre_lignes"] = nombre + 1
+            ecrit = await depots.devis.modifier_si(
+                devis_id, {"date_modification": devis["date_modification"]}, champs, ajouts={"lignes": ligne.dict()}
+            )
+        else:
+            champs[f"lignes.{index}"] = ligne.dict()
+            ecrit = await depots.devis.modifier_si(devis_id, {"date_modification": devis["date_modification"]}, champs)
+        if ecrit:
+            return ResultatLigneDevis(devis_id=devis_id, index=nombre if index is None else index, ligne=ligne,
+                                      **montants)
+    raise HTTPException(status_code=409, detail="Devis modifié simultanément, veuillez réessayer")
+
+@api_router.post("/devis/{devis_id}/lignes", response_model=ResultatLigneDevis)
+async def add_ligne_devis(devis_id: str, ligne: LigneDevis):
+    return await ecrire_ligne_devis(devis_id, ligne, None)
+
+@api_router.put("/devis/{devis_id}/lignes/{index}", response_model=ResultatLigneDevis)
+async def update_ligne_devis(devis_id: str, index: int, ligne: LigneDevis):
+    if index < 0:
+        raise HTTPException(status_code=404, detail="Ligne de devis non trouvée")
+    return await ecrire_ligne_devis(devis_id, ligne, index)
+
+# --- PDF DES DEVIS ---
+cache_pdf = CacheArtefacts(int(os.environ.get('DEVIS_PDF_CACHE_MO', '64')) * 1024 * 1024)
+devis_pdf_requetes = registre.compteur(
+    'devis_pdf_requests_total', "Demandes de PDF de devis par origine (cache, artefact partagé, rendu, 304)",
+    ('resultat',)
+)
+devis_pdf_rendu = registre.histogramme(
+    'devis_pdf_render_seconds', "Durée du rendu d'un PDF de devis, attente du pool comprise", (),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+# Un seul rendu par empreinte : les demandes simultanées attendent le même
+rendus_pdf_en_cours = {}
+
+async def rendre_pdf(empreinte: str, devis: dict, client_devis: Optional[dict]) -> bytes:
+    async def rendre():
+        debut = time.perf_counter()
+        try:
+            return await pool_calcul.executer(rendre_devis_pdf, devis, client_devis)
+        finally:
+            devis_pdf_rendu.observer(time.perf_counter() - debut)
+            rendus_pdf_en_cours.pop(empreinte, None)
+
+    tache = rendus_pdf_en_cours.get(empreinte)
+    if tache is None:
+        tache = rendus_pdf_en_cours[empreinte] = asyncio.ensure_future(rendre())
+    return await asyncio.shield(tache)
+
+def pdf_non_modifie(empreinte: str) -> Response:
+    devis_pdf_requetes.inc('non_modifie')
+    return Response(status_code=304, headers={"ETag": f'"{empreinte}"', "Cache-Control": "private, no-cache"})
+
+@api_router.get("/devis/{devis_id}/pdf")
+async def get_devis_pdf(devis_id: str, if_none_match: Optional[str] = Header(None)):
+    """PDF du devis, rendu dans le pool de calcul et mis en cache par empreinte de contenu
+
+    Tant que ni le devis ni son client n'ont changé (dates de modification), le PDF est servi
+    sans relire les lignes. L'ETag est l'empreinte : If-None-Match évite le transfert.
+    """
+    devis = await depots.devis.trouver(devis_id, sans=("lignes",))
+    if not devis:
+        raise HTTPException(status_code=404, detail="Devis non trouvé")
+    client_devis = await depots.clients.trouver(devis["client_id"])
+    version = (devis_id, devis.get("date_modification"), (client_devis or {}).get("date_modification"),
+               VERSION_GABARIT)
+    empreinte = cache_pdf.empreinte(version)
+    if empreinte is not None and if_none_match == f'"{empreinte}"':
+        return pdf_non_modifie(empreinte)
+    contenu = cache_pdf.lire(empreinte) if empreinte is not None else None
+    resultat = 'cache'
+    if contenu is None:
+        complet = await depots.devis.trouver(devis_id)
+        if not complet:
+            raise HTTPException(status_code=404, detail="Devis non trouvé")
+        empreinte = empreinte_devis(complet, client_devis)
+        cache_pdf.associer(version, empreinte)
+        if if_none_match == f'"{empreinte}"':
+            return pdf_non_modifie(empreinte)
+        contenu = cache_pdf.lire(empreinte)
+        resultat = 'partage'
+        if contenu is None:
+            contenu = await rendre_pdf(empreinte, complet, client_devis)
+            cache_pdf.enregistrer(empreinte, contenu)
+            resultat = 'rendu'
+    devis_pdf_requetes.inc(resultat)
+    return Response(content=contenu, media_type="application/pdf", headers={
+        "ETag": f'"{empreinte}"',
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'inline; filename="{devis.get("numero", devis_id)}.pdf"',
+    })
+
 @api_router.patch("/devis/{devis_id}/statut")
 async def update_devis_statut(devis_id: str, statut: dict):
     """Met à jour le statut d'un devis"""
-    devis = await db.devis.find_one({"id": devis_id})
-    if not devis:
+    updated_devis = await depots.devis.modifier(devis_id, {
+        "statut": statut.get("statut"),
+        "date_modification": datetime.now(timezone.utc).isoformat()
+    })
+    if not updated_devis:
         raise HTTPException(status_code=404, detail="Devis non trouvé")
-    
-    await db.devis.update_one(
-        {"id": devis_id}, 
-        {"$set": {
-            "statut": statut.get("statut"),
-            "date_modification": datetime.now(timezone.utc).isoformat()
-        }}
-    )
-    
-    updated_devis = await db.devis.find_one({"id": devis_id})
     return Devis(**parse_from_mongo(updated_devis))
 
+@api_router.patch("/devis/bulk", response_model=List[ResultatModificationDevis])
+async def update_devis_bulk(modifications: List[ModificationDevis]):
+    """Statut, titre ou validité de plusieurs devis en une requête ; les lignes passent par PUT"""
+    resultats = await modifier_en_lot(depots.devis, modifications, "Devis non trouvé")
+    await indexer("devis", *(devis for _, devis, _ in resultats if devis))
+    return [
+        ResultatModificationDevis(id=identifiant, devis=Devis(**devis) if devis else None, erreur=erreur)
+        for identifiant, devis, erreur in resultats
+    ]
+
 @api_router.delete("/devis/{devis_id}")
 async def delete_devis(devis_id: str):
-    result = await db.devis.delete_one({"id": devis_id})
-    if result.deleted_count == 0:
+    if not await depots.devis.supprimer(devis_id):
         raise HTTPException(status_code=404, detail="Devis non trouvé")
+    await desindexer("devis", devis_id)
     return {"message": "Devis supprimé"}
 
-# --- OPTIMISATION FISCALE SASU ---
+# --- RECHERCHE ---
+class ResultatRecherche(BaseModel):
+    type: str
+    id: str
+    libelle: str
+    detail: Optional[str] = None
+
+# Candidats lus dans l'index (les plus récents) avant classement, par requête (voir requetes_candidats)
+RECHERCHE_CANDIDATS = int(os.environ.get('RECHERCHE_CANDIDATS', '200'))
+RECHERCHE_LIMITE_MAX = 50
+SOURCES_RECHERCHE = (("prospect", "prospects"), ("client", "clients"), ("affaire", "affaires"), ("devis", "devis"))
+
+@api_router.get("/search", response_model=List[ResultatRecherche])
+async def rechercher(q: str = "", limite: int = 10, types: Optional[str] = None):
+    """Recherche à la frappe dans les prospects, clients, affaires et devis : résultats typés et classés"""
+    if not 1 <= limite <= RECHERCHE_LIMITE_MAX:
+        raise HTTPException(status_code=400, detail=f"La limite doit être comprise entre 1 et {RECHERCHE_LIMITE_MAX}")
+    filtre_types = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    inconnus = set(filtre_types or ()) - set(TYPES_RECHERCHE)
+    if inconnus:
+        raise HTTPException(status_code=400, detail=f"Types inconnus : {', '.join(sorted(inconnus))}")
+    jetons = jetons_requete(q)
+    if not jetons:
+        return []
+    # Préfixes et mots entiers lus séparément : un mot exact ancien n'est pas évincé par des préfixes récents
+    lots = await asyncio.gather(*(
+        depots.recherche.chercher(termes, filtre_types, RECHERCHE_CANDIDATS) for termes in requetes_candidats(jetons)
+    ))
+    candidats = list({entree["cle"]: entree for lot in lots for entree in lot}.values())
+    with span("classement", candidats=len(candidats)):
+        return [ResultatRecherche(**entree) for entree in classer(candidats, jetons, limite)]
+
+async def reconstruire_index_recherche(taille_lot: int = 1000) -> int:
+    """Réindexe toutes les entités (première mise en service, données importées hors de l'API)
+
+    L'index reste interrogeable pendant la reconstruction : les entrées sont remplacées en place,
+    puis celles qui existaient avant et dont l'entité a disparu sont retirées. Une entrée indexée
+    par l'API pendant la reconstruction n'est pas dans cet inventaire et reste en place.
+    """
+    anciennes = await depots.recherche.cles()
+    total = 0
+    for type_entite, nom in SOURCES_RECHERCHE:
+        depot = getattr(depots, nom)
+        dernier = None
+        while True:
+            filtre = {"id": {"$gt": dernier}} if dernier is not None else None
+            documents = await depot.lister(filtre, tri=[("id", 1)], limite=taille_lot)
+            if not documents:
+                break
+            await indexer(type_entite, *documents)
+            anciennes.difference_update(f"{type_entite}:{document['id']}" for document in documents)
+            total += len(documents)
+            dernier = documents[-1]["id"]
+    perimees = sorted(anciennes)
+    for debut in range(0, len(perimees), taille_lot):
+        await depots.recherche.retirer(perimees[debut:debut + taille_lot])
+    logger.info("Index de recherche reconstruit : %d entrées, %d périmées retirées", total, len(perimees))
+    return total
+
+# --- DOUBLONS DE CONTACTS : import en lot et rapport ---
+class ResultatImport(BaseModel):
+    id: Optional[str] = None  # absent quand la ligne n'a pas été importée
+    importe: bool
+    doublons: List[DoublonProbable] = []
+
+class ContactDoublon(BaseModel):
+    type: str
+    id: str
+    libelle: str
+
+class GroupeDoublons(BaseModel):
+    contacts: List[ContactDoublon]
+    score: float
+    raisons: List[str]
+
+class RapportDoublons(BaseModel):
+    contacts_analyses: int
+    comparaisons: int
+    doublons: int
+    groupes: List[GroupeDoublons]
+
+IMPORT_CONTACTS_MAX = int(os.environ.get('IMPORT_CONTACTS_MAX', '1000'))
+
+async def importer_contacts(type_entite: str, modele, contacts: list, ignorer_doublons: bool) -> List[ResultatImport]:
+    """Rapproche chaque ligne des contacts en base et des lignes précédentes du lot, puis insère
+    le lot en un aller-retour ; avec ignorer_doublons, les doublons probables ne sont pas insérés"""
+    if len(contacts) > IMPORT_CONTACTS_MAX:
+        raise HTTPException(status_code=400, detail=f"Import limité à {IMPORT_CONTACTS_MAX} contacts")
+    documents = []
+    for contact in contacts:
+        document = prepare_for_mongo(modele(**contact.dict()).dict())
+        document.update(cles_contact(document))
+        documents.append(document)
+    fiches = [fiche(type_entite, document) for document in documents]
+    index = IndexDoublons(await candidats_doublons(fiches))
+
+    resultats, a_inserer = [], []
+    for document, fiche_contact in zip(documents, fiches):
+        doublons = [DoublonProbable(**doublon) for doublon in index.doublons(fiche_contact)]
+        if doublons:
+            doublons_signales.inc('import')
+        importe = not (doublons and ignorer_doublons)
+        if importe:
+            index.ajouter(fiche_contact)
+            a_inserer.append(document)
+        resultats.append(ResultatImport(id=document["id"] if importe else None, importe=importe, doublons=doublons))
+    await getattr(depots, dict(SOURCES_CONTACTS)[type_entite]).inserer_plusieurs(a_inserer)
+    await indexer(type_entite, *a_inserer)
+    return resultats
+
+@api_router.post("/prospects/import", response_model=List[ResultatImport])
+async def import_prospects(prospects: List[ProspectCreate], ignorer_doublons: bool = False):
+    return await importer_contacts("prospect", Prospect, prospects, ignorer_doublons)
+
+@api_router.post("/clients/import", response_model=List[ResultatImport])
+async def import_clients(clients: List[ClientCreate], ignorer_doublons: bool = False):
+    return await importer_contacts("client", Client, clients, ignorer_doublons)
+
+CHAMPS_CONTACT = ("id", "nom", "prenom", "email", "telephone", "entreprise")
+
+async def lire_contacts(taille_lot: int = 1000) -> List[tuple]:
+    """(type, champs utiles) de tous les contacts rapprochables, par pages sur l'id"""
+    contacts = []
+    for type_entite, nom in SOURCES_CONTACTS:
+        depot = getattr(depots, nom)
+        dernier = None
+        while True:
+            filtre = dict(FILTRES_CONTACTS[type_entite])
+            if dernier is not None:
+                filtre["id"] = {"$gt": dernier}
+            documents = await depot.lister(filtre, tri=[("id", 1)], limite=taille_lot)
+            if not documents:
+                break
+            contacts += [(type_entite, {champ: document.get(champ) for champ in CHAMPS_CONTACT}) for document in documents]
+            dernier = documents[-1]["id"]
+    return contacts
+
+@api_router.get("/contacts/doublons", response_model=RapportDoublons)
+async def get_rapport_doublons():
+    """Groupes de doublons probables parmi tous les prospects (non convertis) et clients"""
+    contacts = await lire_contacts()
+    with span("rapprochement", contacts=len(contacts)):
+        return await pool_calcul.executer(rapport_doublons, contacts)
+
+async def renseigner_cles_contacts(taille_lot: int = 1000) -> int:
+    """Calcule les clés de doublons des contacts qui n'en ont pas (créés avant leur introduction)"""
+    total = 0
+    for _, nom in SOURCES_CONTACTS:
+        depot = getattr(depots, nom)
+        while True:
+            documents = await depot.lister({"cle_nom": {"$exists": False}}, limite=taille_lot)
+            if not documents:
+                break
+            await depot.modifier_lot([(document["id"], cles_contact(document)) for document in documents])
+            total += len(documents)
+    if total:
+        logger.info("Clés de doublons renseignées pour %d contacts", total)
+    return total
 
-class SituationFamiliale(str, Enum):
-    CELIBATAIRE = "celibataire"
-    MARIE = "marie"
-    PACS = "pacs"
+# --- OPTIMISATION FISCALE SASU ---
 
 class OptimisationRequest(BaseModel):
+    """Optimisation libre, ou sous contraintes si une rémunération nette ou une borne est donnée
+
+    Les deux modes cherchent le salaire brut sur le même domaine (0 à 80% du résultat avant IS).
+    Conventions de net : la rémunération nette souhaitée et les bornes de salaire net sont des
+    salaires nets après cotisations ET après IR (ce que le dirigeant perçoit) ; le net_disponible
+    des scénarios compte, lui, le salaire net avant IR plus les dividendes nets. À rémunération
+    imposée, net_disponible dépasse donc la somme « net souhaité + dividendes nets » de l'IR
+    sur le salaire.
+    """
     ca_previsionnel: float
     charges_deductibles: float = 0.0
     situation_familiale: SituationFamiliale = SituationFamiliale.CELIBATAIRE
     nombre_parts: float = 1.0
     autres_revenus: float = 0.0
     patrimoine_existant: float = 0.0
-    remuneration_nette_souhaitee: Optional[float] = None
+    remuneration_nette_souhaitee: Optional[float] = Field(
+        None, description="Salaire net imposé, après cotisations et après IR")
+    include_curve: bool = False  # Renvoie la courbe complète en colonnes
+    # Bornes optionnelles : l'optimum est alors calculé sous contraintes
+    remuneration_brute_min: Optional[float] = None
+    remuneration_brute_max: Optional[float] = None
+    remuneration_nette_min: Optional[float] = Field(
+        None, description="Salaire net minimum, après cotisations et après IR")
+    remuneration_nette_max: Optional[float] = Field(
+        None, description="Salaire net maximum, après cotisations et après IR")
+    dividendes_min: Optional[float] = None
+    dividendes_max: Optional[float] = None
 
 class ScenarioFiscal(BaseModel):
     remuneration_brute: float
@@ -518,9 +1066,23 @@ class ScenarioFiscal(BaseModel):
     ir_sur_dividendes: float
     prelevement_sociaux_dividendes: float
     total_impots_et_charges: float
-    net_disponible: float
+    net_disponible: float = Field(
+        description="Salaire net de cotisations (avant IR) + dividendes nets de flat tax")
     taux_global_imposition: float
 
+class CourbeOptimisation(BaseModel):
+    part_remuneration: List[float]
+    remuneration_brute: List[float]
+    dividendes_bruts: List[float]
+    is_a_payer: List[float]
+    cotisations_sociales: List[float]
+    ir_sur_remuneration: List[float]
+    ir_sur_dividendes: List[float]
+    prelevement_sociaux_dividendes: List[float]
+    total_impots_et_charges: List[float]
+    net_disponible: List[float]
+    taux_global_imposition: List[float]
+
 class OptimisationResponse(BaseModel):
     ca_previsionnel: float
     resultat_avant_is: float
@@ -528,146 +1090,7 @@ class OptimisationResponse(BaseModel):
     scenario_remuneration_max: ScenarioFiscal
     scenario_dividendes_max: ScenarioFiscal
     recommandations: List[str]
-
-def calcul_is_2025(benefice: float) -> float:
-    """Calcul de l'impôt sur les sociétés 2025"""
-    if benefice <= 0:
-        return 0.0
-    
-    is_total = 0.0
-    
-    # Tranche à 15% jusqu'à 42 500€
-    if benefice <= 42500:
-        is_total = benefice * 0.15
-    else:
-        # 15% sur les premiers 42 500€
-        is_total = 42500 * 0.15
-        # 25% sur le surplus
-        is_total += (benefice - 42500) * 0.25
-    
-    return is_total
-
-def calcul_ir_2025(revenu_imposable: float, nombre_parts: float = 1.0) -> float:
-    """Calcul de l'impôt sur le revenu 2025 avec barème progressif"""
-    if revenu_imposable <= 0:
-        return 0.0
-    
-    # Quotient familial
-    quotient = revenu_imposable / nombre_parts
-    
-    # Barème IR 2025 par part
-    tranches = [
-        (0, 11294, 0.0),      # 0%
-        (11294, 28797, 0.11), # 11%
-        (28797, 82341, 0.30), # 30%
-        (82341, 177106, 0.41), # 41%
-        (177106, float('inf'), 0.45) # 45%
-    ]
-    
-    ir_par_part = 0.0
-    
-    for i, (min_tranche, max_tranche, taux) in enumerate(tranches):
-        if quotient > min_tranche:
-            base_imposable = min(quotient, max_tranche) - min_tranche
-            ir_par_part += base_imposable * taux
-    
-    return ir_par_part * nombre_parts
-
-def calcul_cotisations_sociales_dirigeant(remuneration_brute: float) -> float:
-    """Calcul des cotisations sociales pour dirigeant SASU"""
-    if remuneration_brute <= 0:
-        return 0.0
-    
-    # Approximation globale des cotisations dirigeant SASU (≈ 45%)
-    return remuneration_brute * 0.45
-
-def calcul_ir_dividendes(dividendes_nets: float) -> float:
-    """Calcul IR sur dividendes avec flat tax 12.8%"""
-    return dividendes_nets * 0.128
-
-def calcul_prelevements_sociaux_dividendes(dividendes_nets: float) -> float:
-    """Calcul prélèvements sociaux sur dividendes 17.2%"""
-    return dividendes_nets * 0.172
-
-def calculer_scenario(ca: float, charges: float, remuneration_brute: float, 
-                     situation_familiale: SituationFamiliale, nombre_parts: float,
-                     autres_revenus: float) -> ScenarioFiscal:
-    """Calcule un scénario fiscal complet"""
-    
-    # Calcul du résultat avant IS
-    cotisations_sociales = calcul_cotisations_sociales_dirigeant(remuneration_brute)
-    resultat_avant_is = ca - charges - remuneration_brute - cotisations_sociales
-    
-    # IS
-    is_a_payer = calcul_is_2025(resultat_avant_is)
-    
-    # Dividendes disponibles
-    resultat_net = resultat_avant_is - is_a_payer
-    dividendes_bruts = max(0, resultat_net)
-    
-    # IR sur rémunération (avec abattement de 10% plafonné)
-    remuneration_nette = remuneration_brute - cotisations_sociales
-    abattement = min(remuneration_nette * 0.10, 12829)  # Plafond 2025
-    base_ir_remuneration = max(0, remuneration_nette - abattement)
-    revenu_total_ir = base_ir_remuneration + autres_revenus
-    
-    ir_sur_remuneration = calcul_ir_2025(revenu_total_ir, nombre_parts)
-    
-    # Fiscalité des dividendes
-    ir_sur_dividendes = calcul_ir_dividendes(dividendes_bruts)
-    prelevement_sociaux_dividendes = calcul_prelevements_sociaux_dividendes(dividendes_bruts)
-    
-    # Totaux
-    total_impots_et_charges = (cotisations_sociales + is_a_payer + ir_sur_remuneration + 
-                              ir_sur_dividendes + prelevement_sociaux_dividendes)
-    
-    dividendes_nets = dividendes_bruts - ir_sur_dividendes - prelevement_sociaux_dividendes
-    net_disponible = remuneration_nette + dividendes_nets
-    
-    taux_global = (total_impots_et_charges / ca * 100) if ca > 0 else 0
-    
-    return ScenarioFiscal(
-        remuneration_brute=remuneration_brute,
-        dividendes_bruts=dividendes_bruts,
-        is_a_payer=is_a_payer,
-        cotisations_sociales=cotisations_sociales,
-        ir_sur_remuneration=ir_sur_remuneration,
-        ir_sur_dividendes=ir_sur_dividendes,
-        prelevement_sociaux_dividendes=prelevement_sociaux_dividendes,
-        total_impots_et_charges=total_impots_et_charges,
-        net_disponible=net_disponible,
-        taux_global_imposition=taux_global
-    )
-
-def generer_recommandations(ca: float, scenario_optimal: ScenarioFiscal, 
-                           scenario_rem: ScenarioFiscal, scenario_div: ScenarioFiscal) -> List[str]:
-    """Génère des recommandations personnalisées"""
-    recommandations = []
-    
-    if scenario_optimal.remuneration_brute > 0:
-        recommandations.append(
-            f"💡 Rémunération optimale : {scenario_optimal.remuneration_brute:,.0f}€ bruts annuels"
-        )
-    
-    if scenario_optimal.dividendes_bruts > 0:
-        recommandations.append(
-            f"💰 Dividendes optimaux : {scenario_optimal.dividendes_bruts:,.0f}€ bruts"
-        )
-    
-    if scenario_optimal.taux_global_imposition < 35:
-        recommandations.append("✅ Votre taux global d'imposition est très avantageux")
-    elif scenario_optimal.taux_global_imposition < 45:
-        recommandations.append("⚠️ Taux d'imposition modéré, possibilité d'optimisation")
-    else:
-        recommandations.append("🔍 Taux d'imposition élevé, optimisation recommandée")
-    
-    if ca > 100000:
-        recommandations.append("📈 Avec ce niveau de CA, pensez aux investissements déductibles")
-    
-    if scenario_optimal.remuneration_brute < 45000:
-        recommandations.append("💼 Profitez du taux réduit IS de 15% jusqu'à 42 500€ de bénéfices")
-    
-    return recommandations
+    courbe: Optional[CourbeOptimisation] = None
 
 class SimulationNetRequest(BaseModel):
     salaire_net_souhaite: float
@@ -687,307 +1110,450 @@ class SimulationNetResponse(BaseModel):
     taux_prelevement_total: float
     recommandations: List[str]
 
-def calculer_salaire_brut_depuis_net(salaire_net_cible: float, situation_familiale: SituationFamiliale, 
-                                   nombre_parts: float, autres_revenus: float) -> dict:
-    """Calcule le salaire brut nécessaire pour obtenir un salaire net donné"""
-    
-    # Estimation initiale (approximation)
-    salaire_brut_estime = salaire_net_cible * 1.8  # Point de départ
-    
-    # Méthode itérative pour converger vers le bon salaire brut
-    for iteration in range(10):  # Maximum 10 itérations
-        cotisations = calcul_cotisations_sociales_dirigeant(salaire_brut_estime)
-        salaire_net_avant_ir = salaire_brut_estime - cotisations
-        
-        # Calcul IR avec abattement
-        abattement = min(salaire_net_avant_ir * 0.10, 12829)
-        base_ir = max(0, salaire_net_avant_ir - abattement)
-        revenu_total_ir = base_ir + autres_revenus
-        ir_sur_salaire = calcul_ir_2025(revenu_total_ir, nombre_parts)
-        
-        salaire_net_reel = salaire_net_avant_ir - ir_sur_salaire
-        
-        # Si on est proche du net souhaité, on arrête
-        ecart = abs(salaire_net_reel - salaire_net_cible)
-        if ecart < 100:  # Précision de 100€
-            break
-            
-        # Ajustement pour la prochaine itération
-        ratio = salaire_net_cible / salaire_net_reel if salaire_net_reel > 0 else 1.1
-        salaire_brut_estime *= ratio
-    
-    return {
-        'salaire_brut': salaire_brut_estime,
-        'cotisations_sociales': cotisations,
-        'ir_sur_salaire': ir_sur_salaire,
-        'salaire_net_reel': salaire_net_reel
-    }
+cache_fiscal_requetes = registre.compteur(
+    'fiscal_cache_requests_total', "Consultations du cache des calculs fiscaux par opération et résultat (hit, miss)",
+    ('operation', 'resultat')
+)
+cache_fiscal_evictions = registre.compteur(
+    'fiscal_cache_evictions_total', "Résultats fiscaux évincés du cache (LRU)"
+)
+cache_fiscal_invalidations = registre.compteur(
+    'fiscal_cache_invalidations_total', "Vidages du cache fiscal (changement de barème, route d'administration)"
+)
 
-def calculer_charges_patronales_estimees(salaire_brut: float) -> float:
-    """Estimation des charges patronales (approximation)"""
-    # Charges patronales approximatives : 42% du brut
-    return salaire_brut * 0.42
+class CacheFiscal:
+    """Cache LRU borné des résultats fiscaux, indexé par requête normalisée et version du barème
+
+    La version du barème est calculée à la création et recalculée par invalider() : un
+    changement de barème en cours de fonctionnement doit être suivi d'une invalidation.
+    """
+
+    def __init__(self, taille_max: int = 1024):
+        self.taille_max = taille_max
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self._version = version_bareme()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    @staticmethod
+    def normaliser(request: BaseModel) -> dict:
+        """Forme canonique d'une requête : mêmes entrées -> même clé"""
+        data = {}
+        for key, value in request.model_dump().items():
+            if isinstance(value, Enum):
+                value = value.value
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = float(value)
+            data[key] = value
+        # Une contrainte nulle ou négative est ignorée par l'optimiseur
+        if 'remuneration_nette_souhaitee' in data and not (data['remuneration_nette_souhaitee'] or 0) > 0:
+            data['remuneration_nette_souhaitee'] = None
+        return data
+
+    def cle(self, operation: str, request: BaseModel, version: str) -> tuple:
+        """Clé en mémoire : un tuple se hache sans sérialisation"""
+        return (operation, version, *self.normaliser(request).items())
+
+    def empreinte(self, operation: str, request: BaseModel, version: str) -> str:
+        """Clé stable entre processus et versions de Python, pour les résultats archivés"""
+        contenu = json.dumps(
+            {"operation": operation, "version": version, "request": self.normaliser(request)},
+            sort_keys=True, separators=(',', ':')
+        )
+        return hashlib.sha256(contenu.encode()).hexdigest()
+
+    def obtenir(self, operation: str, request: BaseModel, calcul):
+        """Retourne le résultat en cache ou l'obtient via calcul() puis le mémorise"""
+        version = self._version
+        cle = self.cle(operation, request, version)
+        with self._verrou:
+            resultat = self._entrees.get(cle)
+            if resultat is not None:
+                self._entrees.move_to_end(cle)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if resultat is not None:
+            cache_fiscal_requetes.inc(operation, 'hit')
+            return resultat
+        cache_fiscal_requetes.inc(operation, 'miss')
+
+        resultat = calcul()
+
+        evincees = 0
+        with self._verrou:
+            # Un résultat calculé pendant une invalidation n'est pas mémorisé
+            if version == self._version and self.taille_max > 0:
+                self._entrees[cle] = resultat
+                self._entrees.move_to_end(cle)
+                while len(self._entrees) > self.taille_max:
+                    self._entrees.popitem(last=False)
+                    evincees += 1
+                self.evictions += evincees
+        if evincees:
+            cache_fiscal_evictions.inc(montant=evincees)
+        return resultat
+
+    def invalider(self):
+        """Vide le cache et relit la version du barème"""
+        with self._verrou:
+            self._entrees.clear()
+            self._version = version_bareme()
+            self.invalidations += 1
+        cache_fiscal_invalidations.inc()
+
+    def stats(self) -> dict:
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                "taille": len(self._entrees),
+                "taille_max": self.taille_max,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total > 0 else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "version_bareme": self._version
+            }
+
+cache_fiscal = CacheFiscal(int(os.environ.get('FISCAL_CACHE_SIZE', '1024')))
+
+def charger_table_net_brut(chemin: Optional[str]):
+    """Table net -> brut mappée en mémoire (partagée entre workers), ignorée si absente ou périmée"""
+    if not chemin:
+        return None
+    try:
+        table = TableNetBrut(chemin)
+    except (OSError, ValueError) as e:
+        logging.getLogger(__name__).warning("Table net -> brut %s inutilisable : %s", chemin, e)
+        return None
+    if not table.a_jour():
+        logging.getLogger(__name__).warning(
+            "Table net -> brut %s construite pour le barème %s (courant : %s), ignorée",
+            chemin, table.version_bareme, version_bareme()
+        )
+        return None
+    utiliser_table_net_brut(table)
+    return table
 
-def generer_recommandations_salaire_net(salaire_net_souhaite: float, calculs: dict, 
-                                       charges_patronales: float) -> List[str]:
-    """Génère des recommandations pour la simulation par salaire net"""
-    recommandations = []
-    
-    cout_total = calculs['salaire_brut'] + charges_patronales
-    taux_prelevement = ((calculs['salaire_brut'] - calculs['salaire_net_reel']) / calculs['salaire_brut'] * 100) if calculs['salaire_brut'] > 0 else 0
-    
-    recommandations.append(
-        f"💰 Pour {salaire_net_souhaite:,.0f}€ net, il faut {calculs['salaire_brut']:,.0f}€ brut"
-    )
-    
-    recommandations.append(
-        f"🏢 Coût total pour l'entreprise : {cout_total:,.0f}€ (charges patronales incluses)"
-    )
-    
-    if taux_prelevement < 35:
-        recommandations.append("✅ Taux de prélèvement avantageux pour ce niveau de salaire")
-    elif taux_prelevement < 45:
-        recommandations.append("⚠️ Taux de prélèvement modéré, optimisation possible")
-    else:
-        recommandations.append("🔍 Taux de prélèvement élevé, envisager l'optimisation dividendes")
-    
-    if salaire_net_souhaite > 50000:
-        recommandations.append("💡 Avec ce niveau de salaire, pensez à la répartition rémunération/dividendes")
-    
-    if calculs['ir_sur_salaire'] > 10000:
-        recommandations.append("📋 IR élevé : vérifiez les possibilités de défiscalisation")
-    
-    return recommandations
+table_net_brut = charger_table_net_brut(os.environ.get('TABLE_NET_BRUT_PATH'))
 
 @api_router.post("/simulation-salaire-net", response_model=SimulationNetResponse)
 async def simuler_par_salaire_net(request: SimulationNetRequest):
     """Simule les charges et impacts fiscaux à partir d'un salaire net souhaité"""
-    
-    if request.salaire_net_souhaite <= 0:
-        raise HTTPException(status_code=400, detail="Le salaire net souhaité doit être positif")
-    
-    # Calculs pour obtenir le salaire net souhaité
-    calculs = calculer_salaire_brut_depuis_net(
-        request.salaire_net_souhaite,
-        request.situation_familiale,
-        request.nombre_parts,
-        request.autres_revenus
-    )
-    
-    # Estimation des charges patronales
-    charges_patronales = calculer_charges_patronales_estimees(calculs['salaire_brut'])
-    cout_total_entreprise = calculs['salaire_brut'] + charges_patronales
-    
-    # Taux de charges
-    taux_charges_sociales = (calculs['cotisations_sociales'] / calculs['salaire_brut'] * 100) if calculs['salaire_brut'] > 0 else 0
-    taux_prelevement_total = ((calculs['salaire_brut'] - calculs['salaire_net_reel']) / calculs['salaire_brut'] * 100) if calculs['salaire_brut'] > 0 else 0
-    
-    # Recommandations
-    recommandations = generer_recommandations_salaire_net(
-        request.salaire_net_souhaite, calculs, charges_patronales
-    )
-    
-    return SimulationNetResponse(
-        salaire_net_souhaite=request.salaire_net_souhaite,
-        salaire_brut_necessaire=calculs['salaire_brut'],
-        cotisations_sociales=calculs['cotisations_sociales'],
-        ir_sur_salaire=calculs['ir_sur_salaire'],
-        salaire_net_reel=calculs['salaire_net_reel'],
-        charges_patronales_estimees=charges_patronales,
-        cout_total_entreprise=cout_total_entreprise,
-        taux_charges_sociales=taux_charges_sociales,
-        taux_prelevement_total=taux_prelevement_total,
-        recommandations=recommandations
+    return cache_fiscal.obtenir(
+        "simulation-salaire-net", request, lambda: calculer_simulation_salaire_net(request)
     )
 
-def calculer_scenario_avec_contrainte_remuneration(ca: float, charges: float, 
-                                                remuneration_nette_cible: float,
-                                                situation_familiale: SituationFamiliale, 
-                                                nombre_parts: float, autres_revenus: float) -> ScenarioFiscal:
-    """Calcule un scénario en respectant une contrainte de rémunération nette"""
-    
-    # Calcul du salaire brut nécessaire pour obtenir le net souhaité
-    calculs_salaire = calculer_salaire_brut_depuis_net(
-        remuneration_nette_cible, situation_familiale, nombre_parts, autres_revenus
-    )
-    
-    remuneration_brute = calculs_salaire['salaire_brut']
-    cotisations_sociales = calculs_salaire['cotisations_sociales']
-    ir_sur_remuneration = calculs_salaire['ir_sur_salaire']
-    
-    # Calcul du résultat après rémunération
-    resultat_avant_is = ca - charges - remuneration_brute - cotisations_sociales
-    
-    # IS
-    is_a_payer = calcul_is_2025(resultat_avant_is)
-    
-    # Dividendes disponibles
-    resultat_net = resultat_avant_is - is_a_payer
-    dividendes_bruts = max(0, resultat_net)
-    
-    # Fiscalité des dividendes
-    ir_sur_dividendes = calcul_ir_dividendes(dividendes_bruts)
-    prelevement_sociaux_dividendes = calcul_prelevements_sociaux_dividendes(dividendes_bruts)
-    
-    # Totaux
-    total_impots_et_charges = (cotisations_sociales + is_a_payer + ir_sur_remuneration + 
-                              ir_sur_dividendes + prelevement_sociaux_dividendes)
-    
-    dividendes_nets = dividendes_bruts - ir_sur_dividendes - prelevement_sociaux_dividendes
-    net_disponible = remuneration_nette_cible + dividendes_nets  # On utilise le net cible exact
-    
-    taux_global = (total_impots_et_charges / ca * 100) if ca > 0 else 0
-    
-    return ScenarioFiscal(
-        remuneration_brute=remuneration_brute,
-        dividendes_bruts=dividendes_bruts,
-        is_a_payer=is_a_payer,
-        cotisations_sociales=cotisations_sociales,
-        ir_sur_remuneration=ir_sur_remuneration,
-        ir_sur_dividendes=ir_sur_dividendes,
-        prelevement_sociaux_dividendes=prelevement_sociaux_dividendes,
-        total_impots_et_charges=total_impots_et_charges,
-        net_disponible=net_disponible,
-        taux_global_imposition=taux_global
-    )
+def calculer_simulation_salaire_net(request: SimulationNetRequest) -> SimulationNetResponse:
+    try:
+        resultat = simuler_salaire_net(ParametresSimulationNet(**request.model_dump()))
+    except ErreurCalculFiscal as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return SimulationNetResponse.model_validate(resultat, from_attributes=True)
 
-def generer_recommandations_avec_contrainte(ca: float, scenario_contraint: ScenarioFiscal, 
-                                          remuneration_nette_souhaitee: float) -> List[str]:
-    """Génère des recommandations pour un scénario avec contrainte de rémunération"""
-    recommandations = []
-    
-    recommandations.append(
-        f"🎯 Rémunération nette respectée : {remuneration_nette_souhaitee:,.0f}€ comme souhaité"
-    )
-    
-    recommandations.append(
-        f"💼 Salaire brut nécessaire : {scenario_contraint.remuneration_brute:,.0f}€ "
-        f"(charges sociales : {scenario_contraint.cotisations_sociales:,.0f}€)"
-    )
-    
-    if scenario_contraint.dividendes_bruts > 0:
-        dividendes_nets = scenario_contraint.dividendes_bruts - scenario_contraint.ir_sur_dividendes - scenario_contraint.prelevement_sociaux_dividendes
-        recommandations.append(
-            f"💰 Dividendes disponibles : {scenario_contraint.dividendes_bruts:,.0f}€ bruts "
-            f"({dividendes_nets:,.0f}€ nets après fiscalité 30%)"
-        )
-    else:
-        recommandations.append("⚠️ Aucun dividende possible avec cette contrainte de rémunération")
-    
-    if scenario_contraint.taux_global_imposition < 35:
-        recommandations.append("✅ Taux global d'imposition avantageux malgré la contrainte")
-    elif scenario_contraint.taux_global_imposition < 45:
-        recommandations.append("📊 Taux d'imposition modéré avec cette répartition imposée")
-    else:
-        recommandations.append("🔍 Taux d'imposition élevé : la contrainte limite l'optimisation")
-    
-    cout_total_remuneration = scenario_contraint.remuneration_brute + scenario_contraint.cotisations_sociales
-    if cout_total_remuneration > ca * 0.6:
-        recommandations.append("⚠️ Coût de la rémunération élevé par rapport au CA (>60%)")
-    
-    return recommandations
 @api_router.post("/optimisation-fiscale", response_model=OptimisationResponse)
 async def optimiser_fiscalite_sasu(request: OptimisationRequest):
     """Calcule l'optimisation fiscale pour une SASU"""
-    
-    ca = request.ca_previsionnel
-    charges = request.charges_deductibles
-    resultat_avant_is = ca - charges
-    
-    if resultat_avant_is <= 0:
-        raise HTTPException(status_code=400, detail="Le résultat avant IS doit être positif")
-    
-    # Si une contrainte de rémunération nette est spécifiée
-    if request.remuneration_nette_souhaitee and request.remuneration_nette_souhaitee > 0:
-        # Vérification que la contrainte est réalisable
-        cout_remuneration_max = resultat_avant_is * 0.8  # Maximum raisonnable
-        calculs_test = calculer_salaire_brut_depuis_net(
-            request.remuneration_nette_souhaitee,
-            request.situation_familiale,
-            request.nombre_parts,
-            request.autres_revenus
-        )
-        cout_total_remuneration = calculs_test['salaire_brut'] + calculs_test['cotisations_sociales']
-        
-        if cout_total_remuneration > resultat_avant_is:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Rémunération nette de {request.remuneration_nette_souhaitee:,.0f}€ impossible avec ce CA. "
-                       f"Coût total : {cout_total_remuneration:,.0f}€, disponible : {resultat_avant_is:,.0f}€"
+    return cache_fiscal.obtenir(
+        "optimisation-fiscale", request, lambda: calculer_optimisation_fiscale(request)
+    )
+
+def calculer_optimisation_fiscale(request: OptimisationRequest) -> OptimisationResponse:
+    try:
+        resultat = optimiser_fiscalite(ParametresOptimisation(**request.model_dump()))
+    except ErreurCalculFiscal as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Lu attribut par attribut sur les dataclasses du moteur : asdict copierait d'abord tout le résultat
+    return OptimisationResponse.model_validate(resultat, from_attributes=True)
+
+class ObjectifNetRequest(BaseModel):
+    net_disponible_cible: float
+    charges_deductibles: float = 0.0
+    situation_familiale: SituationFamiliale = SituationFamiliale.CELIBATAIRE
+    nombre_parts: float = 1.0
+    autres_revenus: float = 0.0
+    part_remuneration: Optional[float] = None  # Part fixe du résultat en salaire (None = répartition optimale)
+    precision: float = 1.0
+
+class ObjectifNetResponse(BaseModel):
+    net_disponible_cible: float
+    ca_minimum: float
+    net_disponible_obtenu: float
+    part_remuneration: float
+    scenario: ScenarioFiscal
+    evaluations: int
+    precision_atteinte: float
+    converge: bool
+
+def calculer_objectif_net(request: ObjectifNetRequest) -> ObjectifNetResponse:
+    try:
+        resultat = ca_minimum_pour_net(ParametresObjectifNet(**request.model_dump()))
+    except ErreurCalculFiscal as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ObjectifNetResponse.model_validate(resultat, from_attributes=True)
+
+@api_router.post("/optimisation-fiscale/objectif-net", response_model=ObjectifNetResponse)
+async def chercher_ca_pour_objectif_net(request: ObjectifNetRequest):
+    """CA minimum nécessaire pour atteindre un net disponible cible"""
+    if request.part_remuneration is not None and not 0 <= request.part_remuneration <= 1:
+        raise HTTPException(status_code=400, detail="La part de rémunération doit être comprise entre 0 et 1")
+    return cache_fiscal.obtenir(
+        "objectif-net", request, lambda: calculer_objectif_net(request)
+    )
+
+class PoolCalcul:
+    """Pool de processus borné pour les calculs lourds (grilles, lots, Monte Carlo)
+
+    Les calculs légers (un scénario) restent dans la boucle asyncio. Au-delà de
+    workers + file_max calculs en cours, les nouvelles demandes sont refusées en 503
+    avec un en-tête Retry-After plutôt que de s'accumuler.
+    """
+
+    def __init__(self, workers: int, file_max: int, retry_after: int):
+        self.workers = workers
+        self.file_max = file_max
+        self.retry_after = retry_after
+        self.en_cours = 0
+        self.rejets = 0
+        self._executor = None
+
+    @property
+    def capacite(self) -> int:
+        return self.workers + self.file_max
+
+    def _obtenir_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
             )
-        
-        # Calcul du scénario avec contrainte
-        scenario_contraint = calculer_scenario_avec_contrainte_remuneration(
-            ca, charges, request.remuneration_nette_souhaitee,
-            request.situation_familiale, request.nombre_parts, request.autres_revenus
-        )
-        
-        # Scénarios de comparaison (sans contrainte)
-        scenario_remuneration_max = calculer_scenario(
-            ca, charges, resultat_avant_is * 0.8,
-            request.situation_familiale, request.nombre_parts, request.autres_revenus
-        )
-        
-        scenario_dividendes_max = calculer_scenario(
-            ca, charges, 0,
-            request.situation_familiale, request.nombre_parts, request.autres_revenus
-        )
-        
-        recommandations = generer_recommandations_avec_contrainte(
-            ca, scenario_contraint, request.remuneration_nette_souhaitee
-        )
-        
-        return OptimisationResponse(
-            ca_previsionnel=ca,
-            resultat_avant_is=resultat_avant_is,
-            scenario_optimal=scenario_contraint,  # Le scénario contraint devient l'optimal
-            scenario_remuneration_max=scenario_remuneration_max,
-            scenario_dividendes_max=scenario_dividendes_max,
-            recommandations=recommandations
-        )
-    
-    else:
-        # Comportement normal (optimisation libre)
-        scenarios = []
-        
-        # Teste différents niveaux de rémunération (de 0 à 80% du résultat)
-        for i in range(0, 81, 5):  # Par pas de 5%
-            rem_test = (resultat_avant_is * i / 100)
-            scenario = calculer_scenario(
-                ca, charges, rem_test, 
-                request.situation_familiale, request.nombre_parts, request.autres_revenus
+        return self._executor
+
+    def _admettre(self, unites: int = 1):
+        if self.en_cours + unites > self.capacite:
+            self.rejets += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Serveur de calcul saturé, réessayez dans quelques instants",
+                headers={"Retry-After": str(self.retry_after)}
             )
-            scenarios.append(scenario)
-        
-        # Trouve le scénario optimal (net disponible maximum)
-        scenario_optimal = max(scenarios, key=lambda s: s.net_disponible)
-        
-        # Scénarios de comparaison
-        scenario_remuneration_max = calculer_scenario(
-            ca, charges, resultat_avant_is * 0.8,  # 80% en rémunération
-            request.situation_familiale, request.nombre_parts, request.autres_revenus
+        self.en_cours += unites
+
+    async def executer(self, fonction, *args, **kwargs):
+        """Exécute fonction(*args, **kwargs) dans le pool (ou directement si le pool est désactivé)"""
+        self._admettre()
+        try:
+            # Sous profil demandé par X-Profile, le calcul reste dans ce processus pour apparaître
+            # dans le profil ; un profil échantillonné ne doit pas bloquer la boucle
+            if self.workers <= 0 or profil_explicite.get():
+                return fonction(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._obtenir_executor(), functools.partial(fonction, *args, **kwargs))
+        finally:
+            self.en_cours -= 1
+
+    async def executer_plusieurs(self, fonction, liste_args: list, parallelisme: Optional[int] = None) -> list:
+        """Exécute fonction sur chaque argument, au plus `workers` tâches soumises à la fois
+
+        Chaque tâche en vol compte dans la capacité : un lot ne remplit pas la file de
+        l'executor au-delà de workers + file_max, quelle que soit sa taille. `parallelisme`
+        abaisse ce plafond pour l'appelant (jamais au-dessus de `workers`).
+        """
+        if not liste_args:
+            return []
+        en_vol = min(len(liste_args), max(self.workers, 1), max(parallelisme or self.workers, 1))
+        self._admettre(en_vol)
+        try:
+            if self.workers <= 0 or profil_explicite.get():
+                return [fonction(args) for args in liste_args]
+            loop = asyncio.get_running_loop()
+            executor = self._obtenir_executor()
+            places = asyncio.Semaphore(en_vol)
+
+            async def soumettre(args):
+                async with places:
+                    return await loop.run_in_executor(executor, fonction, args)
+
+            return await asyncio.gather(*(soumettre(args) for args in liste_args))
+        finally:
+            self.en_cours -= en_vol
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "file_max": self.file_max,
+            "en_cours": self.en_cours,
+            "rejets": self.rejets
+        }
+
+    def arreter(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+pool_calcul = PoolCalcul(
+    workers=int(os.environ.get('FISCAL_POOL_WORKERS', str(min(4, os.cpu_count() or 1)))),
+    file_max=int(os.environ.get('FISCAL_POOL_QUEUE', '16')),
+    retry_after=int(os.environ.get('FISCAL_POOL_RETRY_AFTER', '2'))
+)
+
+class ResultatBatch(BaseModel):
+    index: int
+    resultat: Optional[OptimisationResponse] = None
+    erreur: Optional[str] = None
+
+FISCAL_BATCH_MAX = int(os.environ.get('FISCAL_BATCH_MAX', '1000'))
+
+@api_router.post("/optimisation-fiscale/batch", response_model=List[ResultatBatch])
+async def optimiser_fiscalite_batch(requests: List[OptimisationRequest]):
+    """Optimisation fiscale d'un lot de situations, calculée hors de la boucle asyncio"""
+    if len(requests) > FISCAL_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Lot trop grand : {FISCAL_BATCH_MAX} situations maximum")
+    resultats = await pool_calcul.executer(
+        optimiser_lot, [ParametresOptimisation(**request.model_dump()) for request in requests]
+    )
+    return [
+        ResultatBatch(
+            index=r["index"],
+            resultat=(OptimisationResponse.model_validate(r["resultat"], from_attributes=True)
+                      if r["resultat"] else None),
+            erreur=r["erreur"]
         )
-        
-        scenario_dividendes_max = calculer_scenario(
-            ca, charges, 0,  # 0% en rémunération
-            request.situation_familiale, request.nombre_parts, request.autres_revenus
+        for r in resultats
+    ]
+
+class FormatGrille(str, Enum):
+    JSON = "json"
+    NPZ = "npz"
+
+class GrilleSensibiliteRequest(BaseModel):
+    ca_min: float
+    ca_max: float
+    ca_points: int = 50
+    remuneration_min: float = 0.0
+    remuneration_max: float
+    remuneration_points: int = 50
+    charges_deductibles: float = 0.0
+    situation_familiale: SituationFamiliale = SituationFamiliale.CELIBATAIRE
+    nombre_parts: float = 1.0
+    autres_revenus: float = 0.0
+    format: FormatGrille = FormatGrille.JSON
+
+GRILLE_MAX_CELLULES = int(os.environ.get('FISCAL_GRID_MAX_CELLS', '4000000'))
+
+@api_router.post("/optimisation-fiscale/grid")
+async def calculer_grille_optimisation(request: GrilleSensibiliteRequest):
+    """Grille de sensibilité du net disponible et du taux global (CA × rémunération brute)"""
+    if request.ca_points < 1 or request.remuneration_points < 1:
+        raise HTTPException(status_code=400, detail="La grille doit contenir au moins un point par axe")
+    if request.ca_points * request.remuneration_points > GRILLE_MAX_CELLULES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Grille trop grande : {GRILLE_MAX_CELLULES:,} cellules maximum"
         )
-        
-        recommandations = generer_recommandations(ca, scenario_optimal, scenario_remuneration_max, scenario_dividendes_max)
-        
-        return OptimisationResponse(
-            ca_previsionnel=ca,
-            resultat_avant_is=resultat_avant_is,
-            scenario_optimal=scenario_optimal,
-            scenario_remuneration_max=scenario_remuneration_max,
-            scenario_dividendes_max=scenario_dividendes_max,
-            recommandations=recommandations
+    if request.ca_min > request.ca_max or request.remuneration_min > request.remuneration_max:
+        raise HTTPException(status_code=400, detail="Bornes de grille invalides (min > max)")
+
+    parametres = request.dict(exclude={'situation_familiale'})
+    parametres['format'] = request.format.value
+    contenu, media_type = await pool_calcul.executer(calculer_grille_sensibilite, **parametres)
+    return Response(content=contenu, media_type=media_type)
+
+class ProjectionRequest(BaseModel):
+    ca_previsionnel: float
+    charges_deductibles: float = 0.0
+    situation_familiale: SituationFamiliale = SituationFamiliale.CELIBATAIRE
+    nombre_parts: float = 1.0
+    autres_revenus: float = 0.0
+    patrimoine_existant: float = 0.0
+    annees: int = 5
+    nombre_trajectoires: int = 10000
+    croissance_ca: float = 0.03  # Tendance annuelle du CA
+    volatilite_ca: float = 0.15  # Écart-type annuel (log-normal)
+    volatilite_charges: float = 0.05
+    part_remuneration: Optional[float] = None  # Part du résultat versée en salaire brut (None = optimum)
+    taux_distribution: float = 1.0  # Part du résultat net distribuée en dividendes
+    taux_epargne: float = 0.3  # Part du net disponible qui alimente le patrimoine
+    rendement_patrimoine: float = 0.02
+    graine: Optional[int] = None
+    processus: int = 1  # > 1 : au plus `processus` lots de trajectoires à la fois sur le pool de calcul
+
+class BandePercentiles(BaseModel):
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+
+class ProjectionAnnee(BaseModel):
+    annee: int
+    ca: BandePercentiles
+    net_disponible: BandePercentiles
+    reserves_societe: BandePercentiles
+    patrimoine: BandePercentiles
+
+class ProjectionResponse(BaseModel):
+    nombre_trajectoires: int
+    annees: int
+    graine: int
+    part_remuneration: float
+    projection: List[ProjectionAnnee]
+
+PROJECTION_MAX_TRAJECTOIRES = int(os.environ.get('FISCAL_PROJECTION_MAX_PATHS', '200000'))
+PROJECTION_MAX_ANNEES = 30
+@api_router.post("/optimisation-fiscale/projection", response_model=ProjectionResponse)
+async def projeter_optimisation_fiscale(request: ProjectionRequest):
+    """Projection Monte Carlo sur plusieurs années (bandes de percentiles)"""
+    if request.ca_previsionnel <= 0:
+        raise HTTPException(status_code=400, detail="Le CA prévisionnel doit être positif")
+    if not 1 <= request.annees <= PROJECTION_MAX_ANNEES:
+        raise HTTPException(status_code=400, detail=f"Nombre d'années entre 1 et {PROJECTION_MAX_ANNEES}")
+    if not 1 <= request.nombre_trajectoires <= PROJECTION_MAX_TRAJECTOIRES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Nombre de trajectoires entre 1 et {PROJECTION_MAX_TRAJECTOIRES:,}"
         )
+    if request.part_remuneration is not None and not 0 <= request.part_remuneration <= 1:
+        raise HTTPException(status_code=400, detail="La part de rémunération doit être comprise entre 0 et 1")
+    if not 0 <= request.taux_distribution <= 1:
+        raise HTTPException(status_code=400, detail="Le taux de distribution doit être compris entre 0 et 1")
+    if request.processus < 1:
+        raise HTTPException(status_code=400, detail="Le nombre de processus doit être au moins 1")
+
+    parametres = ParametresProjection(**request.dict(exclude={'situation_familiale', 'processus'}))
+    if request.processus > 1:
+        # Lots répartis sur le pool partagé : au plus `processus` à la fois, et jamais plus que ses workers
+        graine, part_remuneration, lots = preparer_projection(parametres)
+        resultats_lots = await pool_calcul.executer_plusieurs(simuler_lot, lots, parallelisme=request.processus)
+        return agreger_projection(parametres, graine, part_remuneration, resultats_lots)
+    return await pool_calcul.executer(calculer_projection, parametres)
+
+@api_router.get("/optimisation-fiscale/cache")
+async def get_cache_fiscal_stats():
+    """Statistiques du cache et du pool des calculs fiscaux"""
+    return {
+        **cache_fiscal.stats(),
+        "pool": pool_calcul.stats(),
+        "table_net_brut": table_net_brut.stats() if table_net_brut else None
+    }
+
+@api_router.delete("/optimisation-fiscale/cache")
+async def invalider_cache_fiscal():
+    cache_fiscal.invalider()
+    return {"message": "Cache fiscal vidé"}
 
 @api_router.get("/baremes-fiscaux-2025")
 async def get_baremes_fiscaux():
     """Retourne les barèmes fiscaux 2025"""
     return {
+        "version": version_bareme(),
         "is": {
             "description": "Impôt sur les sociétés 2025",
             "tranches": [
@@ -1017,21 +1583,173 @@ async def get_baremes_fiscaux():
         }
     }
 
+# --- HISTORIQUE DES SIMULATIONS ---
+class TypeSimulation(str, Enum):
+    OPTIMISATION = "optimisation-fiscale"
+    SALAIRE_NET = "simulation-salaire-net"
+    OBJECTIF_NET = "objectif-net"
+
+# Modèle de requête et calcul associés à chaque type de simulation
+CALCULS_SIMULATION = {
+    TypeSimulation.OPTIMISATION: (OptimisationRequest, calculer_optimisation_fiscale),
+    TypeSimulation.SALAIRE_NET: (SimulationNetRequest, calculer_simulation_salaire_net),
+    TypeSimulation.OBJECTIF_NET: (ObjectifNetRequest, calculer_objectif_net),
+}
+
+class SimulationCreate(BaseModel):
+    type: TypeSimulation
+    parametres: dict
+    libelle: Optional[str] = None
+
+class SimulationResume(BaseModel):
+    id: str
+    client_id: str
+    type: TypeSimulation
+    cle: str  # Empreinte des paramètres normalisés et du barème
+    version_bareme: str
+    libelle: Optional[str] = None
+    executions: int = 1
+    date_creation: datetime
+    date_modification: datetime
+
+class Simulation(SimulationResume):
+    parametres: dict
+    resultat: dict
+
+class PageSimulations(BaseModel):
+    simulations: List[SimulationResume]
+    curseur_suivant: Optional[str] = None
+
+SIMULATIONS_PAGE_MAX = 100
+
+def encoder_curseur(simulation: dict) -> str:
+    """Curseur opaque de pagination : position (date, id) du dernier élément renvoyé"""
+    return base64.urlsafe_b64encode(
+        json.dumps([simulation["date_creation"], simulation["id"]]).encode()
+    ).decode()
+
+def decoder_curseur(curseur: str) -> tuple:
+    try:
+        date_creation, simulation_id = json.loads(base64.urlsafe_b64decode(curseur.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    return date_creation, simulation_id
+
+@api_router.post("/clients/{client_id}/simulations", response_model=Simulation)
+async def create_simulation(client_id: str, simulation_data: SimulationCreate):
+    """Calcule et archive une simulation ; une simulation identique déjà archivée est renvoyée telle quelle"""
+    if not await depots.clients.existe(client_id):
+        raise HTTPException(status_code=404, detail="Client non trouvé")
+
+    modele_requete, calcul = CALCULS_SIMULATION[simulation_data.type]
+    try:
+        request = modele_requete(**simulation_data.parametres)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    operation = simulation_data.type.value
+    version = cache_fiscal.version
+    cle = cache_fiscal.empreinte(operation, request, version)
+    maintenant = datetime.now(timezone.utc).isoformat()
+
+    # Relance d'une simulation connue : lecture indexée, sans recalcul
+    existante = await depots.simulations.modifier_selon(
+        {"client_id": client_id, "cle": cle}, {"date_modification": maintenant}, {"executions": 1}
+    )
+    if existante:
+        return Simulation(**parse_from_mongo(existante))
+
+    resultat = cache_fiscal.obtenir(operation, request, lambda: calcul(request))
+    simulation = Simulation(
+        id=str(uuid.uuid4()),
+        client_id=client_id,
+        type=simulation_data.type,
+        cle=cle,
+        version_bareme=version,
+        libelle=simulation_data.libelle,
+        parametres=cache_fiscal.normaliser(request),
+        resultat=resultat.dict(),
+        date_creation=maintenant,
+        date_modification=maintenant
+    )
+    try:
+        await depots.simulations.inserer(prepare_for_mongo(simulation.dict()))
+    except DuplicateKeyError:
+        # Insertion concurrente de la même simulation : on renvoie celle qui a gagné
+        existantes = await depots.simulations.lister({"client_id": client_id, "cle": cle}, limite=1)
+        return Simulation(**parse_from_mongo(existantes[0]))
+    return simulation
+
+@api_router.get("/clients/{client_id}/simulations", response_model=PageSimulations)
+async def get_simulations_client(client_id: str, limite: int = 20, curseur: Optional[str] = None):
+    """Historique des simulations d'un client, de la plus récente à la plus ancienne (pagination par curseur)"""
+    limite = max(1, min(limite, SIMULATIONS_PAGE_MAX))
+    filtre = {"client_id": client_id}
+    if curseur:
+        date_creation, simulation_id = decoder_curseur(curseur)
+        filtre["$or"] = [
+            {"date_creation": {"$lt": date_creation}},
+            {"date_creation": date_creation, "id": {"$lt": simulation_id}}
+        ]
+    # Les paramètres et résultats ne sont pas relus pour les listes
+    simulations = await depots.simulations.lister(
+        filtre, tri=[("date_creation", DESCENDING), ("id", DESCENDING)], limite=limite + 1,
+        sans=("parametres", "resultat")
+    )
+
+    curseur_suivant = encoder_curseur(simulations[limite - 1]) if len(simulations) > limite else None
+    return PageSimulations(
+        simulations=[SimulationResume(**parse_from_mongo(s)) for s in simulations[:limite]],
+        curseur_suivant=curseur_suivant
+    )
+
+@api_router.get("/clients/{client_id}/simulations/{simulation_id}", response_model=Simulation)
+async def get_simulation_client(client_id: str, simulation_id: str):
+    simulation = await depots.simulations.trouver(simulation_id)
+    if not simulation or simulation["client_id"] != client_id:
+        raise HTTPException(status_code=404, detail="Simulation non trouvée")
+    return Simulation(**parse_from_mongo(simulation))
+
+@api_router.delete("/clients/{client_id}/simulations/{simulation_id}")
+async def delete_simulation_client(client_id: str, simulation_id: str):
+    if not await depots.simulations.supprimer_selon({"client_id": client_id, "id": simulation_id}):
+        raise HTTPException(status_code=404, detail="Simulation non trouvée")
+    return {"message": "Simulation supprimée"}
+
+# --- PROFILAGE (administration) ---
+def verifier_jeton_profilage(jeton: Optional[str]):
+    if not profileur.jeton_valide(jeton):
+        raise HTTPException(status_code=403, detail="Accès réservé aux administrateurs")
+
+@api_router.get("/profils")
+async def get_profils(x_profile_token: Optional[str] = Header(None)):
+    """Profils de requêtes conservés, du plus récent au plus ancien"""
+    verifier_jeton_profilage(x_profile_token)
+    return profileur.lister()
+
+@api_router.get("/profils/{profil_id}")
+async def get_profil(profil_id: str, texte: bool = False, x_profile_token: Optional[str] = Header(None)):
+    """Profil brut (pstats ou collapsed), ou résumé lisible d'un pstats avec texte=true"""
+    verifier_jeton_profilage(x_profile_token)
+    profil = profileur.lire(profil_id, texte)
+    if profil is None:
+        raise HTTPException(status_code=404, detail="Profil non trouvé")
+    contenu, format_profil = profil
+    if format_profil == "pstats":
+        return Response(content=contenu, media_type="application/octet-stream", headers={
+            "Content-Disposition": f'attachment; filename="{profil_id}.pstats"'
+        })
+    return Response(content=contenu, media_type="text/plain; charset=utf-8")
+
 # --- DASHBOARD ---
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats():
-    prospects_count = await db.prospects.count_documents({})
-    clients_count = await db.clients.count_documents({})
-    affaires_ouvertes = await db.affaires.count_documents({"statut": {"$ne": "gagne"}})
-    affaires_gagnees = await db.affaires.count_documents({"statut": "gagne"})
+    prospects_count = await depots.prospects.compter()
+    clients_count = await depots.clients.compter()
+    affaires_ouvertes = await depots.affaires.compter({"statut": {"$ne": "gagne"}})
+    affaires_gagnees = await depots.affaires.compter({"statut": "gagne"})
     
     # Calcul du chiffre d'affaires prévisionnel
-    pipeline = [
-        {"$match": {"statut": {"$ne": "perdu"}}},
-        {"$group": {"_id": None, "total": {"$sum": "$montant_previsionnel"}}}
-    ]
-    ca_previsionnel = await db.affaires.aggregate(pipeline).to_list(1)
-    ca_previsionnel = ca_previsionnel[0]["total"] if ca_previsionnel else 0
+    ca_previsionnel = await depots.affaires.sommer("montant_previsionnel", {"statut": {"$ne": "perdu"}})
     
     return {
         "prospects_count": prospects_count,
@@ -1044,6 +1762,15 @@ async def get_dashboard_stats():
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def exposer_metriques():
+    """Métriques au format texte Prometheus (requêtes HTTP par route, commandes MongoDB)"""
+    return Response(content=registre.exposer(), media_type=CONTENT_TYPE_PROMETHEUS)
+
+# Le plus interne : le profil ne couvre que l'application
+if profileur.actif:
+    app.add_middleware(MiddlewareProfilage, profileur=profileur)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1051,6 +1778,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MiddlewareRequetesLentes, journal=journal_lent)
+if traceur.actif:
+    app.add_middleware(MiddlewareTraces, traceur=traceur)
+# Compression au plus près de la sortie, son coût restant compté dans les métriques HTTP
+app.add_middleware(
+    MiddlewareCompression,
+    seuil=int(os.environ.get('COMPRESSION_SEUIL', '1024')),
+    niveau_gzip=int(os.environ.get('COMPRESSION_NIVEAU_GZIP', '4')),
+    qualite_brotli=int(os.environ.get('COMPRESSION_QUALITE_BROTLI', '4'))
+)
+# Ajouté en dernier : le plus externe, il mesure aussi le temps passé dans les autres middlewares
+app.add_middleware(MiddlewareMetriques)
 
 # Configure logging
 logging.basicConfig(
@@ -1059,6 +1798,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def creer_index_depots():
+    """Index des dépôts, déclarés au démarrage (et par les tests sur dépôts en mémoire)"""
+    # Déduplication des simulations par client et historique trié par date
+    await depots.simulations.creer_index([("client_id", ASCENDING), ("cle", ASCENDING)], unique=True)
+    await depots.simulations.creer_index(
+        [("client_id", ASCENDING), ("date_creation", DESCENDING), ("id", DESCENDING)]
+    )
+    for depot in (depots.prospects, depots.clients):
+        for champ in CHAMPS_CLES:
+            await depot.creer_index([(champ, ASCENDING)])
+    await depots.recherche.creer_index()
+
+@app.on_event("startup")
+async def create_indexes():
+    await creer_index_depots()
+    app.state.cles_contacts = asyncio.create_task(renseigner_cles_contacts())
+    if await depots.recherche.compter() == 0:
+        # Index vide (première mise en service, base chargée hors de l'API) : reconstruit en tâche de fond
+        app.state.reconstruction_recherche = asyncio.create_task(reconstruire_index_recherche())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+    pool_calcul.arreter()
\ No newline at end of file
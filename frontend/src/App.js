@@ -21,6 +21,77 @@ import { toast } from "sonner";
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+const PAGES_RECHERCHE = {
+  client: { path: "/clients", label: "Client" },
+  prospect: { path: "/prospects", label: "Prospect" },
+  affaire: { path: "/affaires", label: "Affaire" },
+  devis: { path: "/devis", label: "Devis" },
+};
+
+// Recherche globale à la frappe : requête différée, réponse d'une frappe dépassée ignorée
+const RechercheGlobale = () => {
+  const [saisie, setSaisie] = useState("");
+  const [resultats, setResultats] = useState([]);
+
+  useEffect(() => {
+    if (saisie.trim().length < 2) {
+      setResultats([]);
+      return;
+    }
+    const controleur = new AbortController();
+    const minuterie = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API}/search`, { params: { q: saisie }, signal: controleur.signal });
+        setResultats(response.data);
+      } catch (error) {
+        if (!axios.isCancel(error)) console.error("Erreur lors de la recherche:", error);
+      }
+    }, 150);
+    return () => {
+      clearTimeout(minuterie);
+      controleur.abort();
+    };
+  }, [saisie]);
+
+  return (
+    <div className="relative mb-6">
+      <Search className="absolute left-3 top-3 h-4 w-4 text-gray-400" />
+      <Input
+        placeholder="Rechercher partout..."
+        value={saisie}
+        onChange={(e) => setSaisie(e.target.value)}
+        className="pl-10"
+      />
+      {resultats.length > 0 && (
+        <ul className="absolute z-10 mt-1 w-full bg-white border border-gray-200 rounded-lg shadow-lg">
+          {resultats.map((resultat) => (
+            <li key={`${resultat.type}:${resultat.id}`}>
+              <Link
+                to={PAGES_RECHERCHE[resultat.type].path}
+                onClick={() => setSaisie("")}
+                className="block px-3 py-2 hover:bg-gray-100"
+              >
+                <div className="flex items-center justify-between">
+                  <span className="text-sm font-medium text-gray-900 truncate">{resultat.libelle}</span>
+                  <Badge variant="outline" className="ml-2">{PAGES_RECHERCHE[resultat.type].label}</Badge>
+                </div>
+                {resultat.detail && <p className="text-xs text-gray-500 truncate">{resultat.detail}</p>}
+              </Link>
+            </li>
+          ))}
+        </ul>
+      )}
+    </div>
+  );
+};
+
+// Doublons probables renvoyés à la création d'un prospect ou d'un client
+const signalerDoublons = (doublons = []) => {
+  if (doublons.length > 0) {
+    toast.warning(`Doublon probable : ${doublons.map((doublon) => doublon.libelle).join(", ")}`);
+  }
+};
+
 // Composant de navigation
 const Navigation = () => {
   const location = useLocation();
@@ -42,6 +113,8 @@ const Navigation = () => {
         <h1 className="text-2xl font-bold text-gray-900">SmartBiz CRM</h1>
         <p className="text-sm text-gray-600">Gestion d'entreprise</p>
       </div>
+
+      <RechercheGlobale />
       
       <ul className="space-y-2">
         {navItems.map((item) => {
@@ -863,8 +936,9 @@ const Prospects = () => {
         await axios.put(`${API}/prospects/${editingProspect.id}`, formData);
         toast.success("Prospect modifié avec succès");
       } else {
-        await axios.post(`${API}/prospects`, formData);
+        const response = await axios.post(`${API}/prospects`, formData);
         toast.success("Prospect créé avec succès");
+        signalerDoublons(response.data.doublons);
       }
       setShowForm(false);
       setEditingProspect(null);
@@ -1222,8 +1296,9 @@ const Clients = () => {
         await axios.put(`${API}/clients/${editingClient.id}`, formData);
         toast.success("Client modifié avec succès");
       } else {
-        await axios.post(`${API}/clients`, formData);
+        const response = await axios.post(`${API}/clients`, formData);
         toast.success("Client créé avec succès");
+        signalerDoublons(response.data.doublons);
       }
       setShowForm(false);
       setEditingClient(null);
@@ -2840,6 +2915,15 @@ const Devis = () => {
                         <Edit className="w-3 h-3" />
                       </Button>
                       
+                      <Button
+                        size="sm"
+                        variant="outline"
+                        title="Télécharger le PDF"
+                        onClick={() => window.open(`${API}/devis/${devis.id}/pdf`, '_blank')}
+                      >
+                        <FileText className="w-3 h-3" />
+                      </Button>
+                      
                       {/* Menu de changement de statut */}
                       <Select
                         value={devis.statut}
@@ -0,0 +1,378 @@
+"""Base MongoDB en mémoire, compatible avec le sous-ensemble de l'API Motor utilisé par DepotMongo
+
+Sert aux tests de DepotMongo et de l'index de recherche sans serveur MongoDB : filtres de
+depots.filtres, projections (inclusion, exclusion, $slice), tri, mises à jour ($set, $unset,
+$inc, $push, $pull, $setOnInsert) et remplacements, agrégations simples ($match, $group,
+$sort, $skip, $limit, $project), bulk_write (InsertOne, UpdateOne, UpdateMany, ReplaceOne,
+DeleteOne, DeleteMany) et index uniques. Les documents sont copiés à l'entrée et à la
+sortie, comme s'ils traversaient le réseau.
+"""
+import copy
+import itertools
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from depots.filtres import _ABSENT, cle_tri, correspond, ecrire_champ, lire_champ, trier
+
+def supprimer_champ(document: dict, chemin: str):
+    *parents, dernier = chemin.split('.')
+    conteneur = lire_champ(document, '.'.join(parents)) if parents else document
+    if isinstance(conteneur, dict):
+        conteneur.pop(dernier, None)
+
+def projeter(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return document
+    tranches = {cle: v['$slice'] for cle, v in projection.items() if isinstance(v, dict) and '$slice' in v}
+    if tranches:
+        # $slice seul n'est ni une inclusion ni une exclusion : les autres champs restent
+        resultat = projeter(document, {cle: v for cle, v in projection.items() if cle not in tranches})
+        for cle, tranche in tranches.items():
+            valeur = lire_champ(resultat, cle)
+            if isinstance(valeur, list):
+                saut, limite = tranche if isinstance(tranche, list) else (0, tranche)
+                if saut < 0:
+                    saut = max(len(valeur) + saut, 0)
+                ecrire_champ(resultat, cle, valeur[saut:saut + limite])
+        return resultat
+    inclusions = {cle for cle, v in projection.items() if v and cle != '_id'}
+    if inclusions:
+        resultat = {}
+        if projection.get('_id', 1) and '_id' in document:
+            resultat['_id'] = document['_id']
+        for cle in inclusions:
+            valeur = lire_champ(document, cle)
+            if valeur is not _ABSENT:
+                ecrire_champ(resultat, cle, valeur)
+        return resultat
+    resultat = dict(document)
+    for cle, v in projection.items():
+        if not v:
+            supprimer_champ(resultat, cle)
+    return resultat
+
+def appliquer_mise_a_jour(document: dict, mise_a_jour: dict, insertion: bool = False):
+    for operateur, champs in mise_a_jour.items():
+        for chemin, valeur in champs.items():
+            if operateur == '$set' or (operateur == '$setOnInsert' and insertion):
+                ecrire_champ(document, chemin, copy.deepcopy(valeur))
+            elif operateur == '$unset':
+                supprimer_champ(document, chemin)
+            elif operateur == '$inc':
+                actuelle = lire_champ(document, chemin)
+                ecrire_champ(document, chemin, (0 if actuelle is _ABSENT else actuelle) + valeur)
+            elif operateur == '$push':
+                liste = lire_champ(document, chemin)
+                if liste is _ABSENT:
+                    liste = []
+                    ecrire_champ(document, chemin, liste)
+                if isinstance(valeur, dict) and '$each' in valeur:
+                    liste.extend(copy.deepcopy(valeur['$each']))
+                else:
+                    liste.append(copy.deepcopy(valeur))
+            elif operateur == '$pull':
+                liste = lire_champ(document, chemin)
+                if isinstance(liste, list):
+                    liste[:] = [
+                        v for v in liste
+                        if not (correspond(v, valeur) if isinstance(valeur, dict) else v == valeur)
+                    ]
+            elif operateur != '$setOnInsert':
+                raise NotImplementedError(f"Opérateur {operateur} non géré par la base en mémoire")
+
+class CurseurMemoire:
+    def __init__(self, producteur):
+        self._producteur = producteur
+        self._tri = None
+        self._saut = 0
+        self._limite = 0
+
+    def sort(self, cle, sens=None):
+        self._tri = [(cle, sens if sens is not None else 1)] if isinstance(cle, str) else cle
+        return self
+
+    def skip(self, nombre: int):
+        self._saut = nombre
+        return self
+
+    def limit(self, nombre: int):
+        self._limite = nombre
+        return self
+
+    def _documents(self) -> List[dict]:
+        documents = self._producteur()
+        if self._tri:
+            documents = trier(documents, self._tri)
+        documents = documents[self._saut:]
+        if self._limite:
+            documents = documents[:self._limite]
+        return documents
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        documents = self._documents()
+        return documents[:length] if length else documents
+
+    def __aiter__(self):
+        return self._iterer()
+
+    async def _iterer(self):
+        for document in self._documents():
+            yield document
+
+def valeur_expression(document: dict, expression):
+    if isinstance(expression, str) and expression.startswith('$'):
+        valeur = lire_champ(document, expression[1:])
+        return None if valeur is _ABSENT else valeur
+    if isinstance(expression, dict):
+        return {cle: valeur_expression(document, v) for cle, v in expression.items()}
+    return expression
+
+def grouper(documents: List[dict], specification: dict) -> List[dict]:
+    groupes = {}
+    for document in documents:
+        identifiant = valeur_expression(document, specification['_id'])
+        cle = repr(identifiant)
+        groupe = groupes.setdefault(cle, {'_id': identifiant, '_valeurs': {}})
+        for champ, accumulateur in specification.items():
+            if champ == '_id':
+                continue
+            (operateur, expression), = accumulateur.items()
+            groupe['_valeurs'].setdefault(champ, (operateur, []))[1].append(valeur_expression(document, expression))
+    resultats = []
+    for groupe in groupes.values():
+        resultat = {'_id': groupe['_id']}
+        for champ, (operateur, valeurs) in groupe['_valeurs'].items():
+            nombres = [v for v in valeurs if isinstance(v, (int, float)) and not isinstance(v, bool)]
+            if operateur == '$sum':
+                resultat[champ] = sum(nombres)
+            elif operateur == '$avg':
+                resultat[champ] = sum(nombres) / len(nombres) if nombres else None
+            elif operateur == '$min':
+                resultat[champ] = min(nombres) if nombres else None
+            elif operateur == '$max':
+                resultat[champ] = max(nombres) if nombres else None
+            elif operateur == '$first':
+                resultat[champ] = valeurs[0]
+            elif operateur == '$push':
+                resultat[champ] = valeurs
+            else:
+                raise NotImplementedError(f"Accumulateur {operateur} non géré par la base en mémoire")
+        resultats.append(resultat)
+    return resultats
+
+class CollectionMemoire:
+    def __init__(self, nom: str):
+        self.name = nom
+        self._documents: List[dict] = []
+        self._index_uniques: List[List[str]] = []
+
+    # --- Lecture ---
+
+    def _selection(self, filtre) -> List[dict]:
+        return [d for d in self._documents if correspond(d, filtre)]
+
+    def find(self, filtre: Optional[dict] = None, projection: Optional[dict] = None) -> CurseurMemoire:
+        return CurseurMemoire(lambda: [copy.deepcopy(projeter(d, projection)) for d in self._selection(filtre)])
+
+    async def find_one(self, filtre: Optional[dict] = None, projection: Optional[dict] = None, sort=None):
+        documents = self._selection(filtre)
+        if sort:
+            documents = trier(documents, sort)
+        return copy.deepcopy(projeter(documents[0], projection)) if documents else None
+
+    async def count_documents(self, filtre: dict) -> int:
+        return len(self._selection(filtre))
+
+    def aggregate(self, pipeline: List[dict]) -> CurseurMemoire:
+        def executer():
+            documents = [copy.deepcopy(d) for d in self._documents]
+            for etape in pipeline:
+                (nom, specification), = etape.items()
+                if nom == '$match':
+                    documents = [d for d in documents if correspond(d, specification)]
+                elif nom == '$group':
+                    documents = grouper(documents, specification)
+                elif nom == '$sort':
+                    documents = trier(documents, specification)
+                elif nom == '$skip':
+                    documents = documents[specification:]
+                elif nom == '$limit':
+                    documents = documents[:specification]
+                elif nom == '$project':
+                    documents = [projeter(d, specification) for d in documents]
+                else:
+                    raise NotImplementedError(f"Étape {nom} non gérée par la base en mémoire")
+            return documents
+        return CurseurMemoire(executer)
+
+    # --- Écriture ---
+
+    def _verifier_unicite(self, document: dict, ignorer: Optional[dict] = None):
+        for champs in self._index_uniques:
+            valeurs = [lire_champ(document, champ) for champ in champs]
+            for autre in self._documents:
+                if autre is not ignorer and [lire_champ(autre, champ) for champ in champs] == valeurs:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {champs}")
+
+    async def create_index(self, cles, unique: bool = False, **options) -> str:
+        cles = cle_tri(cles)
+        if unique and [c for c, _ in cles] not in self._index_uniques:
+            self._index_uniques.append([c for c, _ in cles])
+        return '_'.join(f"{champ}_{sens}" for champ, sens in cles)
+
+    async def insert_one(self, document: dict):
+        document.setdefault('_id', ObjectId())
+        copie = copy.deepcopy(document)
+        self._verifier_unicite(copie)
+        self._documents.append(copie)
+        return SimpleNamespace(inserted_id=document['_id'], acknowledged=True)
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True):
+        inseres = []
+        for document in documents:
+            try:
+                inseres.append((await self.insert_one(document)).inserted_id)
+            except DuplicateKeyError:
+                if ordered:
+                    raise
+        return SimpleNamespace(inserted_ids=inseres, acknowledged=True)
+
+    def _modifier(self, document: dict, mise_a_jour: dict) -> bool:
+        avant = copy.deepcopy(document)
+        apres = copy.deepcopy(document)
+        appliquer_mise_a_jour(apres, mise_a_jour)
+        if apres == avant:
+            return False
+        self._verifier_unicite(apres, ignorer=document)
+        document.clear()
+        document.update(apres)
+        return True
+
+    def _inserer_depuis_filtre(self, filtre: dict, mise_a_jour: dict):
+        document = {cle: v for cle, v in filtre.items() if not cle.startswith('$') and not isinstance(v, dict)}
+        appliquer_mise_a_jour(document, mise_a_jour, insertion=True)
+        document.setdefault('_id', ObjectId())
+        self._verifier_unicite(document)
+        self._documents.append(document)
+        return document
+
+    async def update_one(self, filtre: dict, mise_a_jour: dict, upsert: bool = False):
+        documents = self._selection(filtre)
+        if not documents:
+            if upsert:
+                document = self._inserer_depuis_filtre(filtre, mise_a_jour)
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document['_id'])
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+        modifie = self._modifier(documents[0], mise_a_jour)
+        return SimpleNamespace(matched_count=1, modified_count=int(modifie), upserted_id=None)
+
+    async def replace_one(self, filtre: dict, remplacement: dict, upsert: bool = False):
+        documents = self._selection(filtre)
+        if not documents:
+            if upsert:
+                document = self._inserer_depuis_filtre(filtre, {'$set': copy.deepcopy(remplacement)})
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document['_id'])
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+        document = documents[0]
+        nouveau = {'_id': document['_id'], **copy.deepcopy(remplacement)}
+        self._verifier_unicite(nouveau, ignorer=document)
+        modifie = nouveau != document
+        document.clear()
+        document.update(nouveau)
+        return SimpleNamespace(matched_count=1, modified_count=int(modifie), upserted_id=None)
+
+    async def update_many(self, filtre: dict, mise_a_jour: dict, upsert: bool = False):
+        documents = self._selection(filtre)
+        modifies = sum(self._modifier(d, mise_a_jour) for d in documents)
+        return SimpleNamespace(matched_count=len(documents), modified_count=modifies, upserted_id=None)
+
+    async def find_one_and_update(self, filtre: dict, mise_a_jour: dict, projection: Optional[dict] = None,
+                                  upsert: bool = False, return_document=ReturnDocument.BEFORE, sort=None):
+        documents = self._selection(filtre)
+        if sort:
+            documents = trier(documents, sort)
+        if not documents:
+            if not upsert:
+                return None
+            document = self._inserer_depuis_filtre(filtre, mise_a_jour)
+            return copy.deepcopy(projeter(document, projection)) if return_document == ReturnDocument.AFTER else None
+        avant = copy.deepcopy(documents[0])
+        self._modifier(documents[0], mise_a_jour)
+        resultat = documents[0] if return_document == ReturnDocument.AFTER else avant
+        return copy.deepcopy(projeter(resultat, projection))
+
+    async def delete_one(self, filtre: dict):
+        for i, document in enumerate(self._documents):
+            if correspond(document, filtre):
+                del self._documents[i]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, filtre: dict):
+        avant = len(self._documents)
+        self._documents = [d for d in self._documents if not correspond(d, filtre)]
+        return SimpleNamespace(deleted_count=avant - len(self._documents))
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        """Opérations appliquées dans l'ordre ; la première erreur interrompt le lot s'il est ordonné"""
+        totaux = dict(inserted_count=0, matched_count=0, modified_count=0, deleted_count=0, upserted_count=0)
+        for operation in operations:
+            try:
+                if isinstance(operation, InsertOne):
+                    await self.insert_one(operation._doc)
+                    totaux['inserted_count'] += 1
+                elif isinstance(operation, (UpdateOne, UpdateMany)):
+                    modification = self.update_one if isinstance(operation, UpdateOne) else self.update_many
+                    resultat = await modification(operation._filter, operation._doc, upsert=bool(operation._upsert))
+                    totaux['matched_count'] += resultat.matched_count
+                    totaux['modified_count'] += resultat.modified_count
+                    totaux['upserted_count'] += resultat.upserted_id is not None
+                elif isinstance(operation, ReplaceOne):
+                    resultat = await self.replace_one(operation._filter, operation._doc, upsert=bool(operation._upsert))
+                    totaux['matched_count'] += resultat.matched_count
+                    totaux['modified_count'] += resultat.modified_count
+                    totaux['upserted_count'] += resultat.upserted_id is not None
+                elif isinstance(operation, (DeleteOne, DeleteMany)):
+                    suppression = self.delete_one if isinstance(operation, DeleteOne) else self.delete_many
+                    totaux['deleted_count'] += (await suppression(operation._filter)).deleted_count
+                else:
+                    raise NotImplementedError(f"Opération {type(operation).__name__} non gérée par la base en mémoire")
+            except DuplicateKeyError:
+                if ordered:
+                    raise
+        return SimpleNamespace(acknowledged=True, **totaux)
+
+    async def drop(self):
+        self._documents = []
+        self._index_uniques = []
+
+class BaseMemoire:
+    """Remplace db = client[DB_NAME] : db.clients, db['devis']..."""
+
+    _compteur = itertools.count()
+
+    def __init__(self, nom: Optional[str] = None):
+        self.name = nom or f"memoire_{next(self._compteur)}"
+        self._collections = {}
+
+    def __getitem__(self, nom: str) -> CollectionMemoire:
+        if nom not in self._collections:
+            self._collections[nom] = CollectionMemoire(nom)
+        return self._collections[nom]
+
+    def __getattr__(self, nom: str) -> CollectionMemoire:
+        if nom.startswith('_'):
+            raise AttributeError(nom)
+        return self[nom]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, commande: Any, *args, **kwargs):
+        if commande == 'ping':
+            return {'ok': 1.0}
+        raise NotImplementedError(f"Commande {commande} non gérée par la base en mémoire")
@@ -0,0 +1,65 @@
+"""Benchmarks des routes CRM sur dépôts en mémoire : coût de l'application seule, sans MongoDB
+
+Même usage que test_bench_moteur_fiscal.py (--benchmark-compare pour détecter les régressions).
+"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import server  # noqa: E402
+from depots import Depots  # noqa: E402
+from server import (  # noqa: E402
+    Affaire,
+    Client,
+    Devis,
+    LigneDevis,
+    get_affaires,
+    get_clients,
+    get_dashboard_stats,
+    get_devis,
+    prepare_for_mongo,
+)
+
+NOMBRE_DOCUMENTS = 1000
+
+def executer(coroutine):
+    """Exécute un handler qui n'attend rien (les dépôts en mémoire ne suspendent jamais)"""
+    try:
+        coroutine.send(None)
+    except StopIteration as fin:
+        return fin.value
+    raise RuntimeError("Le handler a suspendu son exécution")
+
+@pytest.fixture(scope="module", autouse=True)
+def depots_memoire():
+    depots = Depots.memoire()
+    for i in range(NOMBRE_DOCUMENTS):
+        client = Client(nom=f"Nom{i}", prenom="Prenom", email=f"c{i}@exemple.fr", telephone="0600000000",
+                        entreprise=f"Entreprise {i % 50}", notes="Client suivi depuis 2021. " * 5)
+        affaire = Affaire(client_id=client.id, titre=f"Affaire {i}", montant_previsionnel=1000.0 * (i % 90))
+        lignes = [LigneDevis(description=f"Prestation {j}", quantite=j + 1, prix_unitaire=250.0, montant=250.0 * (j + 1))
+                  for j in range(i % 12 + 1)]
+        devis = Devis(client_id=client.id, numero=f"DEV-{i:04d}", titre=f"Devis {i}", lignes=lignes,
+                      montant_ht=0, montant_tva=0, montant_ttc=0)
+        for depot, modele in ((depots.clients, client), (depots.affaires, affaire), (depots.devis, devis)):
+            executer(depot.inserer(prepare_for_mongo(modele.dict())))
+    anciens_depots = server.depots
+    server.depots = depots
+    yield depots
+    server.depots = anciens_depots
+
+
+def test_bench_get_clients(benchmark):
+    assert len(benchmark(lambda: executer(get_clients()))) == NOMBRE_DOCUMENTS
+
+
+def test_bench_get_affaires(benchmark):
+    benchmark(lambda: executer(get_affaires()))
+
+
+def test_bench_get_devis(benchmark):
+    benchmark(lambda: executer(get_devis()))
+
+
+def test_bench_dashboard_stats(benchmark):
+    benchmark(lambda: executer(get_dashboard_stats()))
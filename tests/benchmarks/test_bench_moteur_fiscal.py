@@ -0,0 +1,81 @@
+"""Benchmarks du moteur fiscal (pytest-benchmark)
+
+Comparaison avec la référence enregistrée, en échec au-delà de 25 % de régression
+du minimum :
+
+    pytest tests/benchmarks --benchmark-storage=file://tests/benchmarks/.reference \
+        --benchmark-disable-gc --benchmark-warmup=on --benchmark-max-time=2 \
+        --benchmark-compare=0001 --benchmark-compare-fail=min:25%
+
+La plupart de ces mesures se comptent en microsecondes : leur médiane varie de plus
+de 40 % d'un passage à l'autre sur une machine partagée, pas leur minimum, une fois le
+ramasse-miettes coupé et le préchauffage fait.
+
+Mise à jour de la référence (même machine que la CI, mêmes options, à refaire quand
+une évolution change volontairement un coût) :
+
+    rm tests/benchmarks/.reference/*/0001_reference.json
+    pytest tests/benchmarks --benchmark-storage=file://tests/benchmarks/.reference \
+        --benchmark-disable-gc --benchmark-warmup=on --benchmark-max-time=2 \
+        --benchmark-save=reference
+"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from moteur_fiscal import (  # noqa: E402
+    SituationFamiliale,
+    calcul_ir_2025,
+    calcul_is_2025,
+    calculer_salaire_brut_depuis_net,
+    calculer_scenario,
+)
+from server import (  # noqa: E402
+    OptimisationRequest,
+    cache_fiscal,
+    calculer_optimisation_fiscale,
+    optimiser_fiscalite_sasu,
+)
+
+def executer(coroutine):
+    """Exécute un handler qui n'attend rien, sans le coût de création d'une boucle asyncio"""
+    try:
+        coroutine.send(None)
+    except StopIteration as fin:
+        return fin.value
+    raise RuntimeError("Le handler a suspendu son exécution")
+
+
+REQUEST_LIBRE = OptimisationRequest(ca_previsionnel=150000, charges_deductibles=30000, nombre_parts=2.0)
+REQUEST_CONTRAINTE = OptimisationRequest(
+    ca_previsionnel=150000, charges_deductibles=30000, remuneration_nette_souhaitee=30000
+)
+
+
+def test_bench_calcul_ir_2025(benchmark):
+    benchmark(calcul_ir_2025, 95000, 2.0)
+
+
+def test_bench_calcul_is_2025(benchmark):
+    benchmark(calcul_is_2025, 85000)
+
+
+def test_bench_calculer_scenario(benchmark):
+    benchmark(calculer_scenario, 150000, 30000, 40000, SituationFamiliale.MARIE, 2.0, 0.0)
+
+
+def test_bench_calculer_salaire_brut_depuis_net(benchmark):
+    benchmark(calculer_salaire_brut_depuis_net, 45000, SituationFamiliale.CELIBATAIRE, 1.0, 0.0)
+
+
+def test_bench_optimisation_libre(benchmark):
+    benchmark(calculer_optimisation_fiscale, REQUEST_LIBRE)
+
+
+def test_bench_optimisation_avec_contrainte(benchmark):
+    benchmark(calculer_optimisation_fiscale, REQUEST_CONTRAINTE)
+
+
+def test_bench_optimiser_fiscalite_sasu_cache(benchmark):
+    cache_fiscal.invalider()
+    benchmark(lambda: executer(optimiser_fiscalite_sasu(REQUEST_LIBRE)))
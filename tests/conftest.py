@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+# server.py lit sa configuration à l'import : valeurs locales par défaut, aucune connexion n'est ouverte
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'colcomapp_test')
+os.environ.setdefault('FISCAL_POOL_WORKERS', '0')
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,319 @@
+"""Tests des routes fiscales : cache des résultats, pool de calcul, grille de sensibilité, projection Monte Carlo"""
+import asyncio
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from moteur_fiscal import projection as module_projection
+from moteur_fiscal.vectorise import calculer_scenarios_vectorises
+from observabilite import profil_courant, profil_explicite
+from server import CacheFiscal, OptimisationRequest, PoolCalcul, SimulationNetRequest
+
+
+@pytest.fixture
+def cache():
+    return CacheFiscal(taille_max=2)
+
+
+def calcul_compte(appels, valeur):
+    def calcul():
+        appels.append(valeur)
+        return valeur
+    return calcul
+
+
+def test_cache_cle_normalisee():
+    cache = CacheFiscal()
+    assert cache.cle("optimisation-fiscale", OptimisationRequest(ca_previsionnel=100000), "v") == \
+        cache.cle("optimisation-fiscale", OptimisationRequest(ca_previsionnel=100000.0, nombre_parts=1), "v")
+    # Contrainte nulle ou négative ignorée par l'optimiseur : même clé que sans contrainte
+    assert cache.cle("optimisation-fiscale", OptimisationRequest(ca_previsionnel=1e5, remuneration_nette_souhaitee=0),
+                     "v") == cache.cle("optimisation-fiscale", OptimisationRequest(ca_previsionnel=1e5), "v")
+    assert cache.cle("optimisation-fiscale", OptimisationRequest(ca_previsionnel=100000), "v") != \
+        cache.cle("optimisation-fiscale", OptimisationRequest(ca_previsionnel=100001), "v")
+    assert cache.cle("a", SimulationNetRequest(salaire_net_souhaite=30000), "v") != \
+        cache.cle("b", SimulationNetRequest(salaire_net_souhaite=30000), "v")
+    assert cache.cle("a", SimulationNetRequest(salaire_net_souhaite=30000), "v1") != \
+        cache.cle("a", SimulationNetRequest(salaire_net_souhaite=30000), "v2")
+
+
+def test_cache_lru_et_statistiques(cache):
+    appels = []
+    requetes = [OptimisationRequest(ca_previsionnel=ca) for ca in (1e5, 2e5, 3e5)]
+
+    assert cache.obtenir("op", requetes[0], calcul_compte(appels, "a")) == "a"
+    assert cache.obtenir("op", requetes[1], calcul_compte(appels, "b")) == "b"
+    assert cache.obtenir("op", requetes[0], calcul_compte(appels, "x")) == "a"  # a devient le plus récent
+    assert cache.obtenir("op", requetes[2], calcul_compte(appels, "c")) == "c"  # évince b
+    assert cache.obtenir("op", requetes[0], calcul_compte(appels, "x")) == "a"
+    assert cache.obtenir("op", requetes[1], calcul_compte(appels, "b2")) == "b2"
+    assert appels == ["a", "b", "c", "b2"]
+
+    stats = cache.stats()
+    assert (stats["taille"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 4, 2)
+    assert stats["hit_rate"] == pytest.approx(2 / 6)
+
+
+def test_cache_invalide_quand_le_bareme_change(cache, monkeypatch):
+    appels = []
+    requete = OptimisationRequest(ca_previsionnel=1e5)
+    monkeypatch.setattr(server, "version_bareme", lambda: "2025-a")
+    cache.invalider()
+    cache.obtenir("op", requete, calcul_compte(appels, "ancien"))
+    assert cache.obtenir("op", requete, calcul_compte(appels, "x")) == "ancien"
+
+    # Version lue une fois : le changement de barème est pris en compte à l'invalidation
+    monkeypatch.setattr(server, "version_bareme", lambda: "2025-b")
+    assert cache.obtenir("op", requete, calcul_compte(appels, "x")) == "ancien"
+    cache.invalider()
+    assert cache.obtenir("op", requete, calcul_compte(appels, "nouveau")) == "nouveau"
+    stats = cache.stats()
+    assert (stats["version_bareme"], stats["taille"], stats["invalidations"]) == ("2025-b", 1, 2)
+    assert appels == ["ancien", "nouveau"]
+
+
+def test_cache_cle_en_memoire_et_empreinte_archivee(cache):
+    requete = OptimisationRequest(ca_previsionnel=1e5, situation_familiale="marie")
+    assert cache.cle("op", requete, "v") == cache.cle("op", OptimisationRequest(**requete.model_dump()), "v")
+    empreinte = cache.empreinte("op", requete, "v")
+    assert len(empreinte) == 64 and empreinte == cache.empreinte("op", OptimisationRequest(
+        ca_previsionnel=100000, situation_familiale="marie", nombre_parts=1), "v")
+
+
+def test_cache_expose_ses_compteurs(cache):
+    avant = {resultat: server.cache_fiscal_requetes.valeur("op-metriques", resultat) for resultat in ("hit", "miss")}
+    evictions = server.cache_fiscal_evictions.valeur()
+    for ca in (1e5, 2e5, 1e5, 3e5):
+        cache.obtenir("op-metriques", OptimisationRequest(ca_previsionnel=ca), lambda: "r")
+    assert server.cache_fiscal_requetes.valeur("op-metriques", "hit") - avant["hit"] == 1
+    assert server.cache_fiscal_requetes.valeur("op-metriques", "miss") - avant["miss"] == 3
+    assert server.cache_fiscal_evictions.valeur() - evictions == 1
+    assert 'fiscal_cache_requests_total{operation="op-metriques",resultat="hit"}' in server.registre.exposer()
+
+
+GRILLE = {"ca_min": 50000, "ca_max": 150000, "ca_points": 3, "remuneration_min": 0, "remuneration_max": 40000,
+          "remuneration_points": 5, "charges_deductibles": 10000}
+
+
+@pytest.fixture
+def api():
+    return TestClient(server.app)
+
+
+@pytest.mark.parametrize("modification, message", [
+    ({"ca_points": 0}, "au moins un point"),
+    ({"remuneration_points": 0}, "au moins un point"),
+    ({"ca_min": 200000}, "min > max"),
+    ({"remuneration_min": 50000}, "min > max"),
+    ({"ca_points": 3000, "remuneration_points": 3000}, "Grille trop grande"),
+])
+def test_grille_validation(api, modification, message):
+    reponse = api.post("/api/optimisation-fiscale/grid", json={**GRILLE, **modification})
+    assert reponse.status_code == 400 and message in reponse.json()["detail"]
+
+
+def test_grille_taille_max_configurable(api, monkeypatch):
+    monkeypatch.setattr(server, "GRILLE_MAX_CELLULES", 14)
+    assert api.post("/api/optimisation-fiscale/grid", json=GRILLE).status_code == 400
+    monkeypatch.setattr(server, "GRILLE_MAX_CELLULES", 15)
+    assert api.post("/api/optimisation-fiscale/grid", json=GRILLE).status_code == 200
+
+
+def test_grille_json_en_colonnes(api):
+    reponse = api.post("/api/optimisation-fiscale/grid", json=GRILLE)
+    assert reponse.headers["content-type"] == "application/json"
+    grille = reponse.json()
+    assert grille["shape"] == [3, 5]
+    assert grille["ca_previsionnel"] == [50000.0, 100000.0, 150000.0]
+    assert grille["remuneration_brute"] == [0.0, 10000.0, 20000.0, 30000.0, 40000.0]
+    assert np.array(grille["net_disponible"]).shape == (3, 5)
+    # Lignes = CA, colonnes = rémunération brute
+    attendu = calculer_scenarios_vectorises(np.array(100000.0), 10000, np.array(30000.0), 1.0, 0.0)
+    assert grille["net_disponible"][1][3] == pytest.approx(float(attendu["net_disponible"]), abs=0.01)
+    assert grille["taux_global_imposition"][1][3] == pytest.approx(float(attendu["taux_global_imposition"]), abs=1e-4)
+
+
+def test_grille_npz_relue_par_numpy(api):
+    reponse = api.post("/api/optimisation-fiscale/grid", json={**GRILLE, "format": "npz"})
+    assert reponse.headers["content-type"] == "application/octet-stream"
+    colonnes = json.loads(api.post("/api/optimisation-fiscale/grid", json=GRILLE).content)
+    with np.load(io.BytesIO(reponse.content)) as grille:
+        assert set(grille.files) == {"ca_previsionnel", "remuneration_brute", "net_disponible", "taux_global_imposition"}
+        assert grille["net_disponible"].shape == (3, 5)
+        np.testing.assert_allclose(grille["ca_previsionnel"], colonnes["ca_previsionnel"])
+        np.testing.assert_allclose(grille["net_disponible"], colonnes["net_disponible"], atol=0.005)
+
+
+PROJECTION = {"ca_previsionnel": 120000, "charges_deductibles": 20000, "annees": 4, "nombre_trajectoires": 2500,
+              "graine": 7}
+
+
+def projeter(api, **modifications):
+    reponse = api.post("/api/optimisation-fiscale/projection", json={**PROJECTION, **modifications})
+    assert reponse.status_code == 200, reponse.text
+    return reponse.json()
+
+
+def test_projection_bandes_ordonnees(api):
+    resultat = projeter(api)
+    assert (resultat["annees"], resultat["nombre_trajectoires"], resultat["graine"]) == (4, 2500, 7)
+    assert [annee["annee"] for annee in resultat["projection"]] == [1, 2, 3, 4]
+    for annee in resultat["projection"]:
+        for indicateur in ("ca", "net_disponible", "reserves_societe", "patrimoine"):
+            bande = annee[indicateur]
+            assert bande["p5"] <= bande["p25"] <= bande["p50"] <= bande["p75"] <= bande["p95"]
+    # Première année : CA non encore tiré au hasard
+    assert resultat["projection"][0]["ca"]["p5"] == resultat["projection"][0]["ca"]["p95"] == 120000
+
+
+def test_projection_identique_quel_que_soit_le_nombre_de_processus(api, monkeypatch):
+    # Lots de 1000 trajectoires : 2500 trajectoires font trois lots, répartis ou non sur le pool
+    monkeypatch.setattr(module_projection, "PROJECTION_TAILLE_LOT", 1000)
+    assert projeter(api, processus=1) == projeter(api, processus=3)
+    assert projeter(api, processus=1) != projeter(api, graine=8)
+
+
+def test_projection_patrimoine_existant_reporte(api):
+    sans = projeter(api, rendement_patrimoine=0.05)
+    avec = projeter(api, rendement_patrimoine=0.05, patrimoine_existant=100000)
+    for rang, (annee_sans, annee_avec) in enumerate(zip(sans["projection"], avec["projection"]), start=1):
+        # Même graine, mêmes trajectoires : l'écart est le patrimoine initial capitalisé
+        assert annee_avec["patrimoine"]["p50"] - annee_sans["patrimoine"]["p50"] == \
+            pytest.approx(100000 * 1.05 ** rang, rel=1e-9)
+        assert annee_avec["net_disponible"] == annee_sans["net_disponible"]
+
+
+@pytest.mark.parametrize("modification", [
+    {"ca_previsionnel": 0}, {"annees": 0}, {"annees": 31}, {"nombre_trajectoires": 0},
+    {"part_remuneration": 1.5}, {"taux_distribution": -0.1}, {"processus": 0},
+])
+def test_projection_validation(api, modification):
+    reponse = api.post("/api/optimisation-fiscale/projection", json={**PROJECTION, **modification})
+    assert reponse.status_code == 400
+
+
+def test_pool_sature_refuse_en_503(api, monkeypatch):
+    pool = PoolCalcul(workers=0, file_max=1, retry_after=7)
+    monkeypatch.setattr(server, "pool_calcul", pool)
+    pool.en_cours = 1
+    reponse = api.post("/api/optimisation-fiscale/grid", json=GRILLE)
+    assert reponse.status_code == 503 and reponse.headers["retry-after"] == "7"
+    assert api.post("/api/optimisation-fiscale/projection", json=PROJECTION).status_code == 503
+    assert pool.stats()["rejets"] == 2
+    pool.en_cours = 0
+    assert api.post("/api/optimisation-fiscale/grid", json=GRILLE).status_code == 200
+    assert pool.stats()["en_cours"] == 0
+
+
+def test_pool_sans_workers_calcule_dans_le_processus():
+    pool = PoolCalcul(workers=0, file_max=4, retry_after=1)
+    fil = threading.get_ident()
+    # Une fermeture n'est pas sérialisable : elle ne peut tourner que dans ce processus
+    assert asyncio.run(pool.executer(lambda x: (x * 2, threading.get_ident()), 21)) == (42, fil)
+    assert asyncio.run(pool.executer_plusieurs(lambda x: x + 1, [1, 2, 3])) == [2, 3, 4]
+    assert pool._executor is None and pool.en_cours == 0
+
+
+def test_pool_en_processus_seulement_sous_profil_explicite(monkeypatch):
+    pool = PoolCalcul(workers=2, file_max=4, retry_after=1)
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(pool, "_obtenir_executor", lambda: executor)
+    fil = threading.get_ident()
+
+    async def fils(explicite):
+        # Comme le middleware de profilage : profil en cours, demandé ou tiré au sort
+        profil_courant.set("abc123")
+        profil_explicite.set(explicite)
+        seul = await pool.executer(threading.get_ident)
+        lot = await pool.executer_plusieurs(lambda _: threading.get_ident(), [1, 2])
+        return {seul, *lot}
+
+    try:
+        assert asyncio.run(fils(True)) == {fil}
+        assert fil not in asyncio.run(fils(False))
+    finally:
+        executor.shutdown()
+
+
+def test_pool_lot_borne_aux_workers(monkeypatch):
+    pool = PoolCalcul(workers=2, file_max=1, retry_after=1)
+    executor = ThreadPoolExecutor(max_workers=8)
+    monkeypatch.setattr(pool, "_obtenir_executor", lambda: executor)
+    verrou, en_cours, maximum = threading.Lock(), [0], [0]
+
+    def tache(x):
+        with verrou:
+            en_cours[0] += 1
+            maximum[0] = max(maximum[0], en_cours[0])
+        time.sleep(0.01)
+        with verrou:
+            en_cours[0] -= 1
+        return x
+
+    async def scenario():
+        lot = asyncio.ensure_future(pool.executer_plusieurs(tache, list(range(10))))
+        await asyncio.sleep(0.005)
+        # Le lot occupe deux places sur trois : un second lot est refusé, un calcul seul passe
+        assert pool.en_cours == 2
+        with pytest.raises(server.HTTPException) as refus:
+            await pool.executer_plusieurs(tache, [1, 2])
+        assert refus.value.status_code == 503
+        assert await pool.executer(tache, 5) == 5
+        return await lot
+
+    try:
+        assert asyncio.run(scenario()) == list(range(10))
+    finally:
+        executor.shutdown()
+    assert maximum[0] <= 3 and pool.en_cours == 0
+
+
+def test_pool_lot_borne_au_parallelisme_demande(monkeypatch):
+    pool = PoolCalcul(workers=4, file_max=0, retry_after=1)
+    executor = ThreadPoolExecutor(max_workers=8)
+    monkeypatch.setattr(pool, "_obtenir_executor", lambda: executor)
+    verrou, en_cours, maximum = threading.Lock(), [0], [0]
+
+    def tache(x):
+        with verrou:
+            en_cours[0] += 1
+            maximum[0] = max(maximum[0], en_cours[0])
+        time.sleep(0.01)
+        with verrou:
+            en_cours[0] -= 1
+        return x
+
+    async def scenario():
+        lot = asyncio.ensure_future(pool.executer_plusieurs(tache, list(range(8)), parallelisme=2))
+        await asyncio.sleep(0.005)
+        # Deux places sur quatre : il en reste pour un second lot du même parallélisme
+        assert pool.en_cours == 2
+        assert await pool.executer_plusieurs(tache, [1, 2], parallelisme=2) == [1, 2]
+        return await lot
+
+    try:
+        assert asyncio.run(scenario()) == list(range(8))
+    finally:
+        executor.shutdown()
+    assert maximum[0] <= 4 and pool.en_cours == 0
+
+
+def test_projection_transmet_le_nombre_de_processus(api, monkeypatch):
+    monkeypatch.setattr(module_projection, "PROJECTION_TAILLE_LOT", 1000)
+    demandes = []
+    executer_plusieurs = server.pool_calcul.executer_plusieurs
+
+    async def espion(fonction, liste_args, parallelisme=None):
+        demandes.append((len(liste_args), parallelisme))
+        return await executer_plusieurs(fonction, liste_args, parallelisme=parallelisme)
+
+    monkeypatch.setattr(server.pool_calcul, "executer_plusieurs", espion)
+    projeter(api, processus=2)
+    assert demandes == [(3, 2)]
@@ -0,0 +1,39 @@
+"""Tests du calcul des montants de devis en centimes"""
+import numpy as np
+import pytest
+
+from calcul_devis import ErreurMontant, LIGNES_MAX, en_centimes, en_euros, montants_lignes, totaux
+
+
+def test_montants_exacts_au_centime():
+    centimes = montants_lignes([3, 1.5, -2, 0.333, 7], [0.1, 0.01, 19.99, 3, 1234.56])
+    assert centimes.tolist() == [30, 2, -3998, 100, 864192]
+    assert en_euros(centimes) == [0.3, 0.02, -39.98, 1.0, 8641.92]
+    # Le calcul flottant naïf donne 0.30000000000000004
+    assert en_euros(montants_lignes([3], [0.1]))[0] == 0.3
+
+
+def test_tva_arrondie_une_fois_sur_le_ht():
+    assert totaux(1005, 5.5) == (1005, 55, 1060)
+    assert totaux(np.int64(10000), 20.0) == (10000, 2000, 12000)
+    assert totaux(-250, 20.0) == (-250, -50, -300)
+    # Vingt lignes à 0,05 € HT : la TVA par ligne (0,01 €) sommée donnerait 0,20 €
+    assert totaux(montants_lignes([1] * 20, [0.05] * 20).sum(), 20.0)[1] == 20
+    assert en_centimes(8641.92) == 864192
+
+
+@pytest.mark.parametrize("quantites, prix", [
+    ([1e7], [1]),
+    ([1], [float("nan")]),
+    ([1] * (LIGNES_MAX + 1), [1] * (LIGNES_MAX + 1)),
+])
+def test_bornes(quantites, prix):
+    with pytest.raises(ErreurMontant):
+        montants_lignes(quantites, prix)
+
+
+def test_grand_devis_vectorise():
+    quantites = np.full(LIGNES_MAX, 1_000_000.0)
+    prix = np.full(LIGNES_MAX, 1_000_000.0)
+    # 10 000 lignes au maximum des bornes : toujours exact en int64
+    assert int(montants_lignes(quantites, prix).sum()) == LIGNES_MAX * 10 ** 14
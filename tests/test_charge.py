@@ -0,0 +1,127 @@
+"""Tests du tir de charge : jeu de données synthétique, paliers et scénarios contre l'application en processus"""
+import asyncio
+
+import httpx
+import pytest
+
+from charge.generateur import Generateur, Volumes, semer
+from charge.harnais import Palier, executer_tir, lire_melange, lire_paliers
+from charge.latences import REQUETES, combiner, comparer, mesurer, routes_api, selectionner_routes
+from charge.scenarios import SCENARIOS
+from depots import Depots
+
+
+def executer(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_lecture_paliers_et_melange():
+    assert lire_paliers("1:10,20:5.5") == [Palier(1, 10.0), Palier(20, 5.5)]
+    assert lire_melange("crud=3,dashboard") == {"crud": 3.0, "dashboard": 1.0}
+
+
+def test_tir_en_processus_sans_erreur():
+    import server
+
+    anciens_depots = server.depots
+    server.depots = Depots.memoire()
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        rapport = executer(executer_tir(
+            lambda: httpx.AsyncClient(transport=transport, base_url="http://charge"),
+            SCENARIOS, {nom: 1 for nom in SCENARIOS}, [Palier(4, 0.5)]
+        ))
+    finally:
+        server.depots = anciens_depots
+
+    palier = rapport["paliers"][0]
+    assert palier["erreurs"] == 0, palier["exemples_erreurs"]
+    assert all(palier["scenarios"][nom] > 0 for nom in SCENARIOS)
+    routes = palier["routes"]
+    for route in ("POST /api/clients", "GET /api/dashboard/stats", "POST /api/optimisation-fiscale"):
+        assert routes[route]["requetes"] > 0
+        assert routes[route]["p50_ms"] <= routes[route]["p95_ms"] <= routes[route]["p99_ms"]
+
+
+def test_executer_tir_refuse_un_scenario_inconnu():
+    with pytest.raises(ValueError, match="inconnus"):
+        executer(executer_tir(lambda: None, SCENARIOS, {"inexistant": 1}, [Palier(1, 0.1)]))
+
+
+def test_generateur_deterministe_et_coherent():
+    import server
+
+    volumes = Volumes(clients=60, prospects=120)
+    documents = list(Generateur(volumes, graine=5).documents())
+    assert documents == list(Generateur(volumes, graine=5).documents())
+    assert documents != list(Generateur(volumes, graine=6).documents())
+
+    par_collection = {}
+    for nom, document in documents:
+        par_collection.setdefault(nom, []).append(document)
+    assert len(par_collection["clients"]) == 60 and len(par_collection["prospects"]) == 120
+
+    clients = {c["id"] for c in par_collection["clients"]}
+    affaires = {a["id"]: a for a in par_collection["affaires"]}
+    assert all(a["client_id"] in clients for a in affaires.values())
+    assert all(a["affaire_id"] in affaires for a in par_collection["actions"])
+    for devis in par_collection["devis"]:
+        affaire = affaires[devis["affaire_id"]]
+        assert devis["client_id"] == affaire["client_id"]
+        assert devis["montant_ht"] == pytest.approx(sum(ligne["montant"] for ligne in devis["lignes"]))
+        assert devis["statut"] == "accepte" if affaire["statut"] == "gagne" else devis["statut"] != "accepte"
+    assert len({d["numero"] for d in par_collection["devis"]}) == len(par_collection["devis"])
+
+    modeles = {"prospects": server.Prospect, "clients": server.Client, "affaires": server.Affaire,
+               "actions": server.Action, "devis": server.Devis}
+    for nom, document in documents:
+        modeles[nom](**document)
+
+
+def test_semer_par_lots_non_ordonnes():
+    class Collection:
+        def __init__(self):
+            self.lots = []
+
+        async def insert_many(self, documents, ordered=True):
+            assert ordered is False
+            self.lots.append(len(documents))
+
+    collections = {}
+    db = type("Db", (), {"__getitem__": lambda self, nom: collections.setdefault(nom, Collection())})()
+    ecrits = executer(semer(db, Generateur(Volumes(clients=50, prospects=250)), taille_lot=40, paralleles=2))
+
+    assert ecrits["prospects"] == 250 and ecrits["clients"] == 50
+    assert collections["prospects"].lots == [40] * 6 + [10]
+    assert all(taille <= 40 for collection in collections.values() for taille in collection.lots)
+
+
+def test_latences_requete_de_reference_pour_chaque_route():
+    assert sorted(routes_api()) == sorted(REQUETES)
+    # Une passe courte : chaque requête de référence aboutit (HTTP 200) sur le jeu de données fixe
+    mesure = executer(mesurer(selectionner_routes(), iterations=1, echauffement=0,
+                              volumes=Volumes(clients=30, prospects=30)))
+    assert set(mesure["routes"]) == set(REQUETES)
+    assert all(stats["n"] == 1 for stats in mesure["routes"].values())
+
+
+def test_latences_comparaison_avec_tolerances():
+    reference = {"routes": {
+        "GET /api/clients": {"n": 200, "mediane_ms": 10.0, "p99_ms": 20.0, "min_ms": 9.0},
+        "GET /api/devis": {"n": 200, "mediane_ms": 0.2, "p99_ms": 0.4, "min_ms": 0.1},
+    }}
+    mesure = {"routes": {
+        "GET /api/clients": {"n": 200, "mediane_ms": 13.0, "p99_ms": 25.0, "min_ms": 9.0},
+        "GET /api/devis": {"n": 200, "mediane_ms": 0.29, "p99_ms": 0.5, "min_ms": 0.1},
+        "GET /api/nouvelle": {"n": 200, "mediane_ms": 1.0, "p99_ms": 2.0, "min_ms": 1.0},
+    }}
+    ecarts = {e.route: e for e in comparer(reference, mesure, 0.25, 0.5, marge_ms=0.1, marge_p99_ms=0.1)}
+
+    assert ecarts["GET /api/clients"].regressions == ["mediane 10.000 -> 13.000 ms"]
+    # +45 % sur 0,2 ms reste dans la marge absolue
+    assert ecarts["GET /api/devis"].regressions == []
+    assert ecarts["GET /api/nouvelle"].reference is None and ecarts["GET /api/nouvelle"].regressions == []
+
+    meilleure = combiner([mesure, {"routes": {"GET /api/clients": {"n": 50, "mediane_ms": 10.5, "p99_ms": 30.0,
+                                                                    "min_ms": 8.0}}}], min)
+    assert meilleure["routes"]["GET /api/clients"] == {"n": 250, "mediane_ms": 10.5, "p99_ms": 25.0, "min_ms": 8.0}
@@ -0,0 +1,127 @@
+"""Tests de la compression des réponses : négociation, seuil, types ignorés, flux morceau par morceau"""
+import asyncio
+import json
+import zlib
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from compression import (
+    MiddlewareCompression,
+    choisir_encodage,
+    compression_ignorees,
+    compression_ratio,
+)
+
+LISTE = [{"id": i, "titre": f"Devis {i}", "lignes": [{"description": "Prestation", "montant": 100.0}] * 5}
+         for i in range(200)]
+
+
+def creer_app(seuil=1024, encodages=('gzip',)):
+    app = FastAPI()
+
+    @app.get("/liste")
+    async def liste():
+        return LISTE
+
+    @app.get("/petit")
+    async def petit():
+        return {"ok": True}
+
+    @app.get("/image")
+    async def image():
+        return Response(content=b"\x89PNG" + b"\x00" * 5000, media_type="image/png")
+
+    @app.get("/etag")
+    async def etag():
+        return Response(content=json.dumps(LISTE), media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/export")
+    async def export():
+        async def lignes():
+            for i in range(50):
+                yield f"{i};Devis {i};{i * 100}\n".encode() * 20
+        return StreamingResponse(lignes(), media_type="text/csv")
+
+    app.add_middleware(MiddlewareCompression, seuil=seuil, encodages=encodages)
+    return app
+
+
+def test_choix_de_l_encodage():
+    assert choisir_encodage("gzip, deflate, br", ('br', 'gzip')) == 'br'
+    assert choisir_encodage("gzip, deflate, br", ('gzip',)) == 'gzip'
+    assert choisir_encodage("br;q=0.5, gzip", ('br', 'gzip')) == 'gzip'
+    assert choisir_encodage("gzip;q=0, *", ('gzip',)) is None
+    assert choisir_encodage("*;q=0.3", ('br', 'gzip')) == 'br'
+    assert choisir_encodage("identity", ('br', 'gzip')) is None
+
+
+def test_liste_json_compressee_au_dela_du_seuil():
+    client = TestClient(creer_app())
+    ratios_avant = compression_ratio.compte('gzip')
+    reponse = client.get("/liste", headers={"Accept-Encoding": "gzip"})
+
+    assert reponse.headers["content-encoding"] == "gzip"
+    assert reponse.headers["vary"] == "Accept-Encoding"
+    assert reponse.json() == LISTE
+    brut = json.dumps(LISTE, separators=(',', ':')).encode()
+    assert int(reponse.headers["content-length"]) < len(brut) / 5
+    assert compression_ratio.compte('gzip') == ratios_avant + 1
+
+
+def test_reponses_laissees_telles_quelles():
+    client = TestClient(creer_app())
+    petites = compression_ignorees.valeur('petite')
+    images = compression_ignorees.valeur('type_compresse')
+
+    assert "content-encoding" not in client.get("/petit", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/liste", headers={"Accept-Encoding": "identity"}).headers
+    assert compression_ignorees.valeur('petite') == petites + 1
+    assert compression_ignorees.valeur('type_compresse') == images + 1
+
+
+def test_etag_affaibli_quand_le_corps_est_compresse():
+    reponse = TestClient(creer_app()).get("/etag", headers={"Accept-Encoding": "gzip"})
+    assert reponse.headers["etag"] == 'W/"v1"'
+
+
+def test_flux_compresse_morceau_par_morceau():
+    messages = []
+    requete_lue = []
+
+    async def recevoir():
+        if not requete_lue:
+            requete_lue.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Client toujours connecté : la réponse en flux va à son terme
+        await asyncio.Event().wait()
+
+    async def envoyer(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/export", "raw_path": b"/export", "root_path": "",
+             "scheme": "http", "query_string": b"", "headers": [(b"accept-encoding", b"gzip")],
+             "server": ("test", 80), "client": ("test", 1234), "http_version": "1.1"}
+    asyncio.run(creer_app()(scope, recevoir, envoyer))
+
+    entetes = dict(messages[0]["headers"])
+    assert entetes[b"content-encoding"] == b"gzip" and b"content-length" not in entetes
+    corps = [m for m in messages[1:] if m["type"] == "http.response.body"]
+    # Chaque morceau produit une sortie décodable immédiatement (flush), le dernier ferme le flux
+    assert len(corps) >= 50
+    assert all(m["more_body"] for m in corps[:-1]) and not corps[-1]["more_body"]
+    decompresseur = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    premier = decompresseur.decompress(corps[0]["body"])
+    assert premier == b"0;Devis 0;0\n" * 20
+    reste = b"".join(decompresseur.decompress(m["body"]) for m in corps[1:]) + decompresseur.flush()
+    assert premier + reste == b"".join(f"{i};Devis {i};{i * 100}\n".encode() * 20 for i in range(50))
+
+
+def test_brotli_prefere_si_disponible():
+    pytest.importorskip('brotli')
+    reponse = TestClient(creer_app(encodages=('br', 'gzip'))).get("/liste", headers={"Accept-Encoding": "gzip, br"})
+    assert reponse.headers["content-encoding"] == "br"
+    assert reponse.json() == LISTE  # httpx décode br quand brotli est installé
@@ -0,0 +1,348 @@
+"""Tests des routes CRM sur dépôts en mémoire"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from depots import Depots
+
+
+@pytest.fixture
+def client():
+    anciens_depots = server.depots
+    server.depots = Depots.memoire()
+    try:
+        yield TestClient(server.app)
+    finally:
+        server.depots = anciens_depots
+
+
+@pytest.fixture
+def actions(client):
+    nouveau = client.post("/api/clients", json={"nom": "Durand", "prenom": "Anne", "email": "anne@exemple.fr",
+                                                "telephone": "0600000000", "entreprise": "Durand SARL"}).json()
+    affaire = client.post("/api/affaires", json={"client_id": nouveau["id"], "titre": "Affaire",
+                                                 "montant_previsionnel": 5000}).json()
+    return [
+        client.post("/api/actions", json={"affaire_id": affaire["id"], "type_action": "appel", "titre": f"Appel {i}",
+                                          "date_prevue": "2025-07-01T09:00:00+00:00"}).json()
+        for i in range(3)
+    ]
+
+
+def test_actions_modifiees_en_lot(client, actions):
+    reponse = client.patch("/api/actions/bulk", json=[
+        {"id": actions[0]["id"], "champs": {"date_prevue": "2025-07-08T09:00:00+00:00"}},
+        {"id": actions[1]["id"], "champs": {"statut": "termine", "titre": "Appel fait"}},
+        {"id": "inconnue", "champs": {"statut": "termine"}},
+        {"id": actions[0]["id"], "champs": {"statut": "annule"}},
+        {"id": actions[2]["id"], "champs": {}},
+        # Première occurrence vide : la suivante reste refusée
+        {"id": actions[2]["id"], "champs": {"statut": "termine"}},
+    ])
+    assert reponse.status_code == 200
+    resultats = reponse.json()
+    assert [r["id"] for r in resultats] == [actions[0]["id"], actions[1]["id"], "inconnue", actions[0]["id"],
+                                            actions[2]["id"], actions[2]["id"]]
+    assert resultats[0]["action"]["date_prevue"].startswith("2025-07-08T09:00:00")
+    assert resultats[0]["action"]["statut"] == "a_faire"
+    assert resultats[1]["action"]["titre"] == "Appel fait" and resultats[1]["erreur"] is None
+    assert [r["erreur"] for r in resultats[2:]] == [
+        "Action non trouvée", "Modifié plusieurs fois dans le même lot", "Aucun champ à modifier",
+        "Modifié plusieurs fois dans le même lot"]
+
+    relue = client.get(f"/api/actions/{actions[1]['id']}").json()
+    assert relue["statut"] == "termine" and relue["date_modification"] > actions[1]["date_modification"]
+    assert client.get(f"/api/actions/{actions[2]['id']}").json() == actions[2]
+
+
+def test_devis_modifies_en_lot(client, actions):
+    client_id = client.get("/api/clients").json()[0]["id"]
+    devis = [client.post("/api/devis", json={"client_id": client_id, "titre": f"Devis {i}"}).json() for i in range(2)]
+    reponse = client.patch("/api/devis/bulk", json=[{"id": d["id"], "champs": {"statut": "envoye"}} for d in devis])
+    assert [r["devis"]["statut"] for r in reponse.json()] == ["envoye", "envoye"]
+
+    assert client.patch("/api/devis/bulk", json=[{"id": devis[0]["id"], "champs": {"statut": "inconnu"}}]
+                        ).status_code == 422
+
+
+def test_lot_trop_grand_refuse(client, monkeypatch):
+    monkeypatch.setattr(server, "MODIFICATIONS_LOT_MAX", 2)
+    reponse = client.patch("/api/actions/bulk", json=[{"id": str(i), "champs": {"statut": "termine"}} for i in range(3)])
+    assert reponse.status_code == 400
+
+
+def test_montants_du_devis_recalcules_au_centime(client, actions):
+    client_id = client.get("/api/clients").json()[0]["id"]
+    devis = client.post("/api/devis", json={"client_id": client_id, "titre": "Devis", "taux_tva": 5.5, "lignes": [
+        {"description": "Vis", "quantite": 3, "prix_unitaire": 0.1, "montant": 999},
+        {"description": "Pose", "quantite": 1.5, "prix_unitaire": 45.5},
+    ]}).json()
+    assert [ligne["montant"] for ligne in devis["lignes"]] == [0.3, 68.25]
+    assert (devis["montant_ht"], devis["montant_tva"], devis["montant_ttc"]) == (68.55, 3.77, 72.32)
+
+    reponse = client.put(f"/api/devis/{devis['id']}", json={"client_id": client_id, "titre": "Devis", "lignes": [
+        {"description": "Vis", "quantite": 1e9, "prix_unitaire": 0.1}]})
+    assert reponse.status_code == 400
+
+
+def test_lignes_de_devis_par_page(client, actions):
+    client_id = client.get("/api/clients").json()[0]["id"]
+    lignes = [{"description": f"Poste {i}", "quantite": 1, "prix_unitaire": 10 + i} for i in range(250)]
+    devis = client.post("/api/devis", json={"client_id": client_id, "titre": "Grand devis", "lignes": lignes}).json()
+
+    page = client.get(f"/api/devis/{devis['id']}/lignes", params={"saut": 200, "limite": 100}).json()
+    assert page["total"] == 250 and page["saut"] == 200
+    assert [ligne["description"] for ligne in page["lignes"]] == [f"Poste {i}" for i in range(200, 250)]
+    assert client.get(f"/api/devis/{devis['id']}/lignes", params={"limite": 0}).status_code == 400
+
+    modifiee = client.put(f"/api/devis/{devis['id']}/lignes/10",
+                          json={"description": "Poste 10 revu", "quantite": 2, "prix_unitaire": 20}).json()
+    assert modifiee["ligne"]["montant"] == 40.0
+    assert modifiee["montant_ht"] == devis["montant_ht"] - 20 + 40
+    ajoutee = client.post(f"/api/devis/{devis['id']}/lignes",
+                          json={"description": "Option", "quantite": 0.5, "prix_unitaire": 99.99}).json()
+    assert ajoutee["index"] == 250 and ajoutee["ligne"]["montant"] == 50.0
+
+    complet = client.get(f"/api/devis/{devis['id']}").json()
+    assert complet["lignes"][10]["description"] == "Poste 10 revu" and len(complet["lignes"]) == 251
+    assert complet["montant_ht"] == ajoutee["montant_ht"] == round(sum(l["montant"] for l in complet["lignes"]), 2)
+    assert complet["montant_ttc"] == ajoutee["montant_ttc"]
+    assert client.put(f"/api/devis/{devis['id']}/lignes/251", json=lignes[0]).status_code == 404
+
+
+def test_ligne_de_devis_ecrite_apres_modification_concurrente(client, actions, monkeypatch):
+    client_id = client.get("/api/clients").json()[0]["id"]
+    devis = client.post("/api/devis", json={"client_id": client_id, "titre": "Devis", "lignes": [
+        {"description": "Pose", "quantite": 1, "prix_unitaire": 100}]}).json()
+    modifier_si = server.depots.devis.modifier_si
+    essais = []
+
+    async def modifier_apres_concurrent(identifiant, condition, champs, ajouts=None):
+        if not essais:
+            # Un autre utilisateur change le devis entre la lecture et l'écriture
+            await server.depots.devis.modifier(identifiant, {"date_modification": "2030-01-01T00:00:00+00:00"})
+        essais.append(condition)
+        return await modifier_si(identifiant, condition, champs, ajouts)
+
+    monkeypatch.setattr(server.depots.devis, "modifier_si", modifier_apres_concurrent)
+    reponse = client.put(f"/api/devis/{devis['id']}/lignes/0", json={"description": "Pose", "quantite": 2,
+                                                                      "prix_unitaire": 100})
+    assert reponse.status_code == 200 and reponse.json()["montant_ht"] == 200.0
+    assert [c["date_modification"] for c in essais][1] == "2030-01-01T00:00:00+00:00"
+
+
+def test_pdf_du_devis_mis_en_cache_par_contenu(client, actions):
+    client_id = client.get("/api/clients").json()[0]["id"]
+    devis = client.post("/api/devis", json={"client_id": client_id, "titre": "Rénovation (lot 2)", "lignes": [
+        {"description": f"Poste n°{i} – main d'œuvre", "quantite": 1.5, "prix_unitaire": 42} for i in range(150)]}).json()
+    resultats = server.devis_pdf_requetes
+    avant = {r: resultats.valeur(r) for r in ('rendu', 'cache', 'partage', 'non_modifie')}
+
+    def compte(resultat):
+        return resultats.valeur(resultat) - avant[resultat]
+
+    premier = client.get(f"/api/devis/{devis['id']}/pdf")
+    assert premier.status_code == 200 and premier.headers["content-type"] == "application/pdf"
+    assert premier.content.startswith(b"%PDF-1.4") and premier.content.rstrip().endswith(b"%%EOF")
+    assert premier.headers["content-disposition"] == f'inline; filename="{devis["numero"]}.pdf"'
+    assert b"/Count 4" in premier.content  # 150 lignes sur quatre pages
+    etag = premier.headers["etag"]
+
+    assert client.get(f"/api/devis/{devis['id']}/pdf").content == premier.content
+    non_modifie = client.get(f"/api/devis/{devis['id']}/pdf", headers={"If-None-Match": etag})
+    assert non_modifie.status_code == 304 and non_modifie.headers["etag"] == etag
+    assert (compte('rendu'), compte('cache'), compte('non_modifie')) == (1, 1, 1)
+
+    # Statut inchangé : nouvelle date, même contenu, même artefact
+    client.patch(f"/api/devis/{devis['id']}/statut", json={"statut": "brouillon"})
+    assert client.get(f"/api/devis/{devis['id']}/pdf").headers["etag"] == etag
+    assert (compte('rendu'), compte('partage')) == (1, 1)
+
+    client.put(f"/api/devis/{devis['id']}/lignes/3", json={"description": "Dépose", "quantite": 1, "prix_unitaire": 80})
+    modifie = client.get(f"/api/devis/{devis['id']}/pdf", headers={"If-None-Match": etag})
+    assert modifie.status_code == 200 and modifie.headers["etag"] != etag and compte('rendu') == 2
+
+    assert client.get("/api/devis/inconnu/pdf").status_code == 404
+
+
+def test_recherche_transverse_tenue_a_jour(client, actions):
+    client_id = client.get("/api/clients").json()[0]["id"]
+    prospect = client.post("/api/prospects", json={"nom": "Durandet", "prenom": "Léa", "email": "lea@exemple.fr",
+                                                   "telephone": "0611111111", "entreprise": "Conseil Léa"}).json()
+    devis = client.post("/api/devis", json={"client_id": client_id, "titre": "Toiture Durand", "lignes": []}).json()
+
+    resultats = client.get("/api/search", params={"q": "durand"}).json()
+    assert [(r["type"], r["id"]) for r in resultats][:2] == [("client", client_id), ("devis", devis["id"])]
+    assert ("prospect", prospect["id"]) in [(r["type"], r["id"]) for r in resultats]
+    assert resultats[0]["libelle"] == "Anne Durand"
+    assert [r["id"] for r in client.get("/api/search", params={"q": devis["numero"], "types": "devis"}).json()] \
+        == [devis["id"]]
+
+    client.put(f"/api/prospects/{prospect['id']}", json={"nom": "Martin", "prenom": "Léa", "email": "lea@exemple.fr",
+                                                         "telephone": "0611111111", "entreprise": "Conseil Léa"})
+    assert client.get("/api/search", params={"q": "lea mart"}).json()[0]["id"] == prospect["id"]
+    assert all(r["id"] != prospect["id"] for r in client.get("/api/search", params={"q": "durandet"}).json())
+    client.delete(f"/api/devis/{devis['id']}")
+    assert client.get("/api/search", params={"q": "toiture"}).json() == []
+
+    assert client.get("/api/search", params={"q": "d"}).json() == []
+    assert client.get("/api/search", params={"q": "du", "types": "facture"}).status_code == 400
+    assert client.get("/api/search", params={"q": "du", "limite": 0}).status_code == 400
+
+
+def test_recherche_mot_entier_ancien_parmi_des_prefixes_recents(client, monkeypatch):
+    monkeypatch.setattr(server, "RECHERCHE_CANDIDATS", 2)
+    ancien = client.post("/api/clients", json={"nom": "Du", "prenom": "Anne", "email": "anne@exemple.fr",
+                                               "telephone": "0600000000", "entreprise": "Conseil"}).json()
+    for i in range(3):
+        client.post("/api/prospects", json={"nom": f"Durand{i}", "prenom": "Paul", "email": f"p{i}@exemple.fr",
+                                            "telephone": "0611111111", "entreprise": "Exemple"})
+    # Les deux candidats les plus récents ne sont que des préfixes : le mot entier est lu à part
+    assert client.get("/api/search", params={"q": "du"}).json()[0]["id"] == ancien["id"]
+    assert client.get("/api/search", params={"q": "anne du"}).json()[0]["id"] == ancien["id"]
+
+
+def test_index_de_recherche_reconstruit(client, actions):
+    asyncio.run(server.depots.recherche.vider())
+    assert client.get("/api/search", params={"q": "durand"}).json() == []
+    assert asyncio.run(server.reconstruire_index_recherche(taille_lot=1)) == 2
+    assert [r["type"] for r in client.get("/api/search", params={"q": "durand"}).json()] == ["client"]
+
+
+def test_index_de_recherche_interrogeable_pendant_la_reconstruction(client, actions, monkeypatch):
+    index = server.depots.recherche
+    asyncio.run(index.indexer([{"cle": "client:disparu", "type": "client", "id": "disparu", "libelle": "Paul Durand",
+                                "detail": None, "date": "2020-01-01", "termes": ["=durand", "du", "dur", "durand"]}]))
+    pendant = []
+    indexer = index.indexer
+
+    async def espion(entrees):
+        pendant.append(len(await index.chercher(["durand"])))
+        await indexer(entrees)
+
+    monkeypatch.setattr(index, "indexer", espion)
+    assert asyncio.run(server.reconstruire_index_recherche(taille_lot=1)) == 2
+    # Jamais vidé ; l'entrée dont l'entité n'existe plus est retirée à la fin
+    assert pendant and min(pendant) >= 1
+    assert "client:disparu" not in asyncio.run(index.cles())
+    assert [r["type"] for r in client.get("/api/search", params={"q": "durand"}).json()] == ["client"]
+
+
+def test_doublons_signales_a_la_creation_et_a_l_import(client, actions):
+    client_id = client.get("/api/clients").json()[0]["id"]
+    cree = client.post("/api/prospects", json={"nom": "Durant", "prenom": "Anne", "email": "anne.d@autre.fr",
+                                               "telephone": "+33 6 00 00 00 00", "entreprise": "Autre"}).json()
+    assert [(d["type"], d["id"], d["raisons"]) for d in cree["doublons"]] == \
+        [("client", client_id, ["telephone", "nom"])]
+    assert client.post("/api/prospects", json={"nom": "Martin", "prenom": "Paul", "email": "paul@exemple.fr",
+                                               "telephone": "0611111111", "entreprise": "Martin SAS"}).json()["doublons"] == []
+
+    lot = [
+        {"nom": "Leroy", "prenom": "Hugo", "email": "hugo@exemple.fr", "telephone": "0622222222", "entreprise": "Leroy"},
+        {"nom": "Leroy", "prenom": "Hugo", "email": "HUGO+crm@exemple.fr", "telephone": "06 22 22 22 22",
+         "entreprise": "Leroy SA"},
+        {"nom": "Durand", "prenom": "Anne", "email": "anne@exemple.fr", "telephone": "0600000000", "entreprise": "Durand"},
+    ]
+    resultats = client.post("/api/prospects/import", params={"ignorer_doublons": True}, json=lot).json()
+    assert [r["importe"] for r in resultats] == [True, False, False]
+    assert resultats[1]["doublons"][0]["id"] == resultats[0]["id"]
+    assert {d["id"] for d in resultats[2]["doublons"]} == {client_id, cree["id"]}
+    assert all(r["importe"] for r in client.post("/api/clients/import", json=lot[1:]).json())
+
+    rapport = client.get("/api/contacts/doublons").json()
+    groupes = [sorted(c["libelle"] for c in groupe["contacts"]) for groupe in rapport["groupes"]]
+    assert sorted(groupes) == [["Anne Durand", "Anne Durand", "Anne Durant"], ["Hugo Leroy", "Hugo Leroy"]]
+    assert rapport["doublons"] == 3
+
+
+def test_cles_de_doublons_renseignees_apres_coup(client):
+    asyncio.run(server.depots.clients.inserer({"id": "ancien", "nom": "Morel", "prenom": "Léa",
+                                               "email": "Lea.Morel@Exemple.fr", "telephone": "06.33.33.33.33"}))
+    assert asyncio.run(server.renseigner_cles_contacts()) == 1
+    ancien = asyncio.run(server.depots.clients.trouver("ancien"))
+    assert (ancien["cle_email"], ancien["cle_telephone"], ancien["cle_nom"]) == \
+        ("lea.morel@exemple.fr", "0633333333", "more l")
+    assert asyncio.run(server.renseigner_cles_contacts()) == 0
+
+
+def test_suppression_du_client_et_de_ses_simulations(client):
+    clients = [client.post("/api/clients", json={"nom": nom, "prenom": "Anne", "email": f"{nom}@exemple.fr",
+                                                 "telephone": "0600000000", "entreprise": f"{nom} SAS"}).json()
+               for nom in ("Durand", "Martin")]
+    for nouveau in clients:
+        reponse = client.post(f"/api/clients/{nouveau['id']}/simulations",
+                              json={"type": "simulation-salaire-net", "parametres": {"salaire_net_souhaite": 30000}})
+        assert reponse.status_code == 200
+
+    assert client.delete(f"/api/clients/{clients[0]['id']}").status_code == 200
+    assert client.get(f"/api/clients/{clients[0]['id']}").status_code == 404
+    # Les simulations du client supprimé disparaissent avec lui, pas celles des autres
+    assert asyncio.run(server.depots.simulations.compter({"client_id": clients[0]["id"]})) == 0
+    assert asyncio.run(server.depots.simulations.compter({"client_id": clients[1]["id"]})) == 1
+    assert client.delete(f"/api/clients/{clients[0]['id']}").status_code == 404
+
+
+@pytest.fixture
+def client_simule(client):
+    return client.post("/api/clients", json={"nom": "Petit", "prenom": "Paul", "email": "paul@exemple.fr",
+                                             "telephone": "0611111111", "entreprise": "Petit SAS"}).json()
+
+
+def simuler(client, client_id, salaire_net, **options):
+    reponse = client.post(f"/api/clients/{client_id}/simulations", json={
+        "type": "simulation-salaire-net", "parametres": {"salaire_net_souhaite": salaire_net}, **options
+    })
+    assert reponse.status_code == 200, reponse.text
+    return reponse.json()
+
+
+def test_simulation_relancee_dedupliquee(client, client_simule):
+    premiere = simuler(client, client_simule["id"], 30000, libelle="Premier essai")
+    assert premiere["executions"] == 1 and premiere["resultat"]["salaire_net_souhaite"] == 30000
+
+    # Mêmes paramètres une fois normalisés : même simulation, comptée une fois de plus, sans recalcul
+    relance = simuler(client, client_simule["id"], 30000.0)
+    assert relance["id"] == premiere["id"] and relance["executions"] == 2
+    assert relance["libelle"] == "Premier essai" and relance["resultat"] == premiere["resultat"]
+    assert relance["date_modification"] >= premiere["date_modification"]
+
+    autre = simuler(client, client_simule["id"], 35000)
+    assert autre["id"] != premiere["id"] and autre["executions"] == 1
+    assert asyncio.run(server.depots.simulations.compter({"client_id": client_simule["id"]})) == 2
+
+
+def test_historique_des_simulations_pagine_par_curseur(client, client_simule):
+    creees = [simuler(client, client_simule["id"], 20000 + 1000 * i) for i in range(5)]
+    attendus = [s["id"] for s in sorted(creees, key=lambda s: (s["date_creation"], s["id"]), reverse=True)]
+
+    lus, curseur, pages = [], None, 0
+    while True:
+        page = client.get(f"/api/clients/{client_simule['id']}/simulations",
+                          params={"limite": 2, **({"curseur": curseur} if curseur else {})}).json()
+        assert len(page["simulations"]) <= 2
+        assert all("resultat" not in s and "parametres" not in s for s in page["simulations"])
+        lus += [s["id"] for s in page["simulations"]]
+        pages += 1
+        curseur = page["curseur_suivant"]
+        if curseur is None:
+            break
+    assert lus == attendus and pages == 3
+
+    reponse = client.get(f"/api/clients/{client_simule['id']}/simulations", params={"curseur": "pas-un-curseur"})
+    assert reponse.status_code == 400
+
+
+def test_simulation_inseree_en_concurrence(client, client_simule, monkeypatch):
+    asyncio.run(server.creer_index_depots())
+    gagnante = simuler(client, client_simule["id"], 30000)
+
+    # La relance ne voit pas encore la simulation (insertion concurrente) : l'index unique
+    # (client, empreinte) refuse la seconde insertion et la simulation gagnante est renvoyée
+    async def pas_encore_inseree(filtre, champs, increments=None):
+        return None
+    monkeypatch.setattr(server.depots.simulations, "modifier_selon", pas_encore_inseree)
+    perdante = simuler(client, client_simule["id"], 30000)
+    assert perdante["id"] == gagnante["id"]
+    assert asyncio.run(server.depots.simulations.compter({"client_id": client_simule["id"]})) == 1
@@ -0,0 +1,216 @@
+"""Tests des dépôts : même contrat pour DepotMongo (sur BaseMemoire) et DepotMemoire"""
+import asyncio
+
+import pytest
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from depots import DepotMemoire, DepotMongo, Depots, IndexRechercheMemoire, IndexRechercheMongo
+
+from .base_memoire import BaseMemoire
+
+
+def executer(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture(params=["mongo", "memoire"])
+def depot(request):
+    if request.param == "mongo":
+        return DepotMongo(BaseMemoire().affaires)
+    return DepotMemoire("affaires")
+
+
+def affaire(numero: int, statut: str, montant: float) -> dict:
+    return {
+        "id": f"a{numero}",
+        "titre": f"Affaire {numero}",
+        "statut": statut,
+        "montant_previsionnel": montant,
+        "date_creation": f"2025-01-{numero + 1:02d}T00:00:00+00:00",
+        "lignes": [{"montant": montant}],
+    }
+
+
+def remplir(depot):
+    statuts = ["prospect", "qualification", "gagne", "perdu"]
+    for i in range(8):
+        executer(depot.inserer(affaire(i, statuts[i % 4], 1000.0 * (i + 1))))
+
+
+def test_lecture_filtres_tri_et_pagination(depot):
+    remplir(depot)
+    assert executer(depot.compter()) == 8
+    assert executer(depot.compter({"statut": {"$ne": "gagne"}})) == 6
+
+    premiers = executer(depot.lister(tri=[("date_creation", -1)], limite=3))
+    assert [a["id"] for a in premiers] == ["a7", "a6", "a5"]
+    assert all("_id" not in a for a in premiers)
+    suivants = executer(depot.lister(tri=[("date_creation", -1)], saut=3, limite=3))
+    assert [a["id"] for a in suivants] == ["a4", "a3", "a2"]
+
+    gagnees = executer(depot.lister({"statut": {"$in": ["gagne", "perdu"]}, "montant_previsionnel": {"$gte": 4000}},
+                                    tri=[("statut", 1), ("montant_previsionnel", -1)]))
+    assert [a["id"] for a in gagnees] == ["a6", "a7", "a3"]
+
+    assert executer(depot.trouver("a2"))["statut"] == "gagne"
+    assert executer(depot.trouver("inconnu")) is None
+    assert executer(depot.existe("a0")) and not executer(depot.existe("inconnu"))
+
+
+def test_agregat_somme(depot):
+    remplir(depot)
+    # 1000 + 2000 + ... + 8000, moins les affaires perdues (4000 et 8000)
+    assert executer(depot.sommer("montant_previsionnel", {"statut": {"$ne": "perdu"}})) == 24000
+    assert executer(depot.sommer("montant_previsionnel", {"statut": "inexistant"})) == 0
+
+
+def test_ecritures(depot):
+    remplir(depot)
+    modifiee = executer(depot.modifier("a1", {"statut": "gagne", "notes": "Signée"}))
+    assert modifiee["statut"] == "gagne" and modifiee["titre"] == "Affaire 1"
+    assert executer(depot.modifier("inconnu", {"statut": "gagne"})) is None
+
+    assert executer(depot.supprimer("a1"))
+    assert not executer(depot.supprimer("a1"))
+    assert executer(depot.supprimer_selon({"statut": "perdu"})) == 2
+    assert executer(depot.compter()) == 5
+
+
+def test_modification_en_lot(depot):
+    remplir(depot)
+    modifies = executer(depot.modifier_lot([("a1", {"statut": "gagne"}), ("inconnu", {"statut": "perdu"}),
+                                            ("a4", {"statut": "perdu", "notes": "Sans suite"})]))
+    assert sorted(modifies) == ["a1", "a4"]
+    assert modifies["a4"]["notes"] == "Sans suite" and "_id" not in modifies["a4"]
+    assert executer(depot.trouver("a1"))["statut"] == "gagne"
+    assert executer(depot.compter({"statut": "perdu"})) == 3
+    assert executer(depot.modifier_lot([])) == {}
+
+
+def test_tranche_de_tableau_et_ecriture_conditionnelle(depot):
+    executer(depot.inserer({"id": "d1", "version": 1, "lignes": [{"n": i} for i in range(10)]}))
+    tranche = executer(depot.trouver_tranche("d1", "lignes", 8, 5))
+    assert tranche == {"id": "d1", "version": 1, "lignes": [{"n": 8}, {"n": 9}]}
+    assert executer(depot.trouver_tranche("inconnu", "lignes", 0, 5)) is None
+
+    assert executer(depot.modifier_si("d1", {"version": 1}, {"version": 2, "lignes.3": {"n": 30}},
+                                      ajouts={"lignes": {"n": 10}}))
+    assert not executer(depot.modifier_si("d1", {"version": 1}, {"version": 3}))
+    assert not executer(depot.modifier_si("inconnu", {}, {"version": 3}))
+    document = executer(depot.trouver("d1"))
+    assert document["version"] == 2 and document["lignes"][3] == {"n": 30} and document["lignes"][-1] == {"n": 10}
+
+
+def test_index_unique_et_modification_selon_filtre(depot):
+    executer(depot.creer_index([("client_id", 1), ("cle", 1)], unique=True))
+    executer(depot.creer_index([("client_id", 1), ("date_creation", -1)]))
+    executer(depot.inserer({"id": "s1", "client_id": "c1", "cle": "k", "executions": 1, "resultat": {"net": 1}}))
+    executer(depot.inserer({"id": "s2", "client_id": "c2", "cle": "k", "executions": 1}))
+    with pytest.raises(DuplicateKeyError):
+        executer(depot.inserer({"id": "s3", "client_id": "c1", "cle": "k"}))
+
+    modifie = executer(depot.modifier_selon({"client_id": "c1", "cle": "k"}, {"libelle": "Relance"}, {"executions": 1}))
+    assert modifie["executions"] == 2 and modifie["libelle"] == "Relance" and "_id" not in modifie
+    assert executer(depot.modifier_selon({"client_id": "c3"}, {"libelle": "Inconnu"})) is None
+    assert executer(depot.lister({"client_id": "c1"}, sans=("resultat",))) == [
+        {"id": "s1", "client_id": "c1", "cle": "k", "executions": 2, "libelle": "Relance"}
+    ]
+    assert executer(depot.trouver("s1"))["resultat"] == {"net": 1}
+    assert executer(depot.compter()) == 2
+
+
+def test_documents_copies_a_la_sortie(depot):
+    remplir(depot)
+    lu = executer(depot.trouver("a0"))
+    lu["lignes"].append({"montant": 1})
+    lu["statut"] = "modifie"
+    assert executer(depot.trouver("a0")) == affaire(0, "prospect", 1000.0)
+
+
+@pytest.fixture(params=["mongo", "memoire"])
+def index_recherche(request):
+    if request.param == "mongo":
+        index = IndexRechercheMongo(BaseMemoire().recherche)
+        executer(index.creer_index())
+        return index
+    return IndexRechercheMemoire()
+
+
+def entree(cle: str, termes: list, date: str) -> dict:
+    type_entite, identifiant = cle.split(":")
+    return {"cle": cle, "type": type_entite, "id": identifiant, "libelle": identifiant, "detail": None,
+            "date": date, "termes": termes}
+
+
+def test_index_de_recherche(index_recherche):
+    executer(index_recherche.indexer([
+        entree("client:c1", ["du", "dur", "an"], "2025-01-01"),
+        entree("prospect:p1", ["du", "dup", "an"], "2025-03-01"),
+        entree("devis:d1", ["du", "dur"], "2025-02-01"),
+    ]))
+    assert executer(index_recherche.compter()) == 3
+
+    # Tous les termes requis, les plus récents d'abord, sans les termes
+    assert [e["cle"] for e in executer(index_recherche.chercher(["du"]))] == ["prospect:p1", "devis:d1", "client:c1"]
+    assert [e["cle"] for e in executer(index_recherche.chercher(["dur", "an"]))] == ["client:c1"]
+    assert [e["cle"] for e in executer(index_recherche.chercher(["du"], limite=1))] == ["prospect:p1"]
+    assert [e["cle"] for e in executer(index_recherche.chercher(["du"], types=["client", "devis"]))] \
+        == ["devis:d1", "client:c1"]
+    assert all("termes" not in e and "_id" not in e for e in executer(index_recherche.chercher(["du"])))
+    assert executer(index_recherche.chercher(["zz"])) == []
+
+    # Réindexer remplace l'entrée, retirer la supprime
+    executer(index_recherche.indexer([entree("client:c1", ["ma"], "2025-04-01")]))
+    assert [e["cle"] for e in executer(index_recherche.chercher(["dur"]))] == ["devis:d1"]
+    executer(index_recherche.retirer(["devis:d1", "inconnu:x"]))
+    assert executer(index_recherche.chercher(["dur"])) == []
+    assert executer(index_recherche.compter()) == 2
+    assert executer(index_recherche.cles()) == {"client:c1", "prospect:p1"}
+    executer(index_recherche.vider())
+    assert executer(index_recherche.compter()) == 0
+
+
+def test_depots_memoire_regroupe_les_collections_crm():
+    depots = Depots.memoire()
+    executer(depots.clients.inserer({"id": "c1", "nom": "Durand"}))
+    assert executer(depots.clients.compter()) == 1
+    assert executer(depots.prospects.compter()) == 0
+    assert executer(depots.simulations.compter()) == 0
+    with pytest.raises(DuplicateKeyError):
+        executer(depots.clients.inserer({"id": "c1", "nom": "Martin"}))
+
+
+def test_base_memoire_operations_courantes():
+    async def scenario():
+        db = BaseMemoire()
+        await db.clients.insert_many([{"id": str(i), "nom": f"N{i}", "statut": "actif" if i % 2 else "inactif"}
+                                      for i in range(5)])
+        actifs = await db.clients.find({"statut": "actif"}, {"_id": 0}).sort("id", -1).to_list(10)
+        assert [c["id"] for c in actifs] == ["3", "1"]
+        assert "_id" not in actifs[0]
+
+        await db.clients.update_one({"id": "0"}, {"$set": {"notes": "ok"}, "$inc": {"visites": 2}})
+        assert (await db.clients.find_one({"id": "0"}))["visites"] == 2
+        assert await db.clients.count_documents({"statut": {"$in": ["actif", "inactif"]}}) == 5
+
+        groupes = await db.clients.aggregate([{"$group": {"_id": "$statut", "n": {"$sum": 1}}}]).to_list(None)
+        assert {g["_id"]: g["n"] for g in groupes} == {"actif": 2, "inactif": 3}
+
+        await db.clients.create_index("id", unique=True)
+        with pytest.raises(DuplicateKeyError):
+            await db.clients.insert_one({"id": "1"})
+
+        assert (await db.clients.delete_many({"statut": "inactif"})).deleted_count == 3
+
+        resultat = await db.clients.bulk_write([
+            UpdateOne({"id": "1"}, {"$set": {"statut": "inactif"}}),
+            UpdateOne({"id": "9"}, {"$set": {"statut": "actif"}}, upsert=True),
+            InsertOne({"id": "1"}),
+            DeleteOne({"id": "3"}),
+        ], ordered=False)
+        assert (resultat.matched_count, resultat.upserted_count, resultat.inserted_count, resultat.deleted_count) \
+            == (1, 1, 0, 1)
+        assert sorted(c["id"] for c in await db.clients.find().to_list(None)) == ["1", "9"]
+
+    executer(scenario())
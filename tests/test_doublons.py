@@ -0,0 +1,69 @@
+"""Tests des doublons de contacts : clés normalisées, ressemblance, index et rapport"""
+from charge.generateur import PRENOMS
+from doublons import (
+    IndexDoublons,
+    cle_email,
+    cle_entreprise,
+    cle_nom,
+    cle_telephone,
+    fiche,
+    rapport_doublons,
+    ressemblance,
+)
+
+
+def contact(identifiant, prenom, nom, email="", telephone="", entreprise=""):
+    return {"id": identifiant, "prenom": prenom, "nom": nom, "email": email, "telephone": telephone,
+            "entreprise": entreprise}
+
+
+def test_cles_normalisees():
+    assert cle_email(" Jean.Dupont+crm@GoogleMail.com") == "jeandupont@gmail.com"
+    assert cle_email("jean.dupont+crm@exemple.fr") == "jean.dupont@exemple.fr"
+    assert cle_email("") is None
+    for variante in ("06 12 34 56 78", "06.12.34.56.78", "+33 6 12 34 56 78", "+33 (0)6 12 34 56 78", "0033612345678"):
+        assert cle_telephone(variante) == "0612345678"
+    assert cle_telephone("12") is None
+    assert cle_entreprise("Ets Dupont & Fils SARL") == cle_entreprise("DUPONT FILS") == "dupont fils"
+    assert cle_nom("Le Goff", "Élodie") == "lego e"
+    assert cle_nom("", "Anne") is None
+
+
+def test_ressemblance():
+    anne = fiche("client", contact("c1", "Anne", "Durand", "anne@exemple.fr", "0600000001", "Durand SARL"))
+    faute = fiche("prospect", contact("p1", "Anne", "Durant", "a.durand@autre.fr", "06 00 00 00 01"))
+    collegue = fiche("prospect", contact("p2", "Marc", "Petit", "marc@exemple.fr", "0600000001", "Durand SAS"))
+    meme_email = fiche("prospect", contact("p3", "A.", "D.", "ANNE@exemple.fr"))
+
+    assert ressemblance(anne, faute) == (0.85, ["telephone", "nom"])
+    score, raisons = ressemblance(anne, collegue)
+    assert raisons == ["telephone", "entreprise"] and score < 0.65  # standard et entreprise partagés
+    assert ressemblance(anne, meme_email)[1] == ["email"]
+
+
+def test_index_de_doublons_au_fil_de_l_eau():
+    index = IndexDoublons([fiche("client", contact("c1", "Anne", "Durand", "anne@exemple.fr"))])
+    nouvelle = fiche("prospect", contact("p1", "Anne", "Durand", "anne+pro@exemple.fr"))
+    assert [(d["type"], d["id"], d["raisons"]) for d in index.doublons(nouvelle)] == \
+        [("client", "c1", ["email", "nom"])]
+    index.ajouter(nouvelle)
+    assert index.doublons(nouvelle)[0]["id"] == "c1"  # une fiche n'est pas son propre doublon
+    assert index.doublons(fiche("prospect", contact("p2", "Paul", "Martin", "paul@exemple.fr"))) == []
+
+
+def test_rapport_groupes_par_transitivite():
+    contacts = [
+        ("client", contact("c1", "Anne", "Durand", "anne@exemple.fr", "0600000001")),
+        ("prospect", contact("p1", "Anne", "Durant", "autre@exemple.fr", "+33 6 00 00 00 01")),
+        ("prospect", contact("p2", "Anne", "Durant", "autre@exemple.fr")),
+        ("client", contact("c2", "Paul", "Martin", "paul@exemple.fr", "0600000009")),
+    ] + [("prospect", contact(f"s{i}", prenom, "Standard", f"s{i}@exemple.fr", "0100000000"))
+         for i, prenom in enumerate(PRENOMS)]
+    rapport = rapport_doublons(contacts, fenetre=5)
+
+    assert rapport["contacts_analyses"] == 4 + len(PRENOMS)
+    assert [[c["id"] for c in groupe["contacts"]] for groupe in rapport["groupes"]] == [["c1", "p1", "p2"]]
+    assert rapport["doublons"] == 2
+    assert rapport["groupes"][0]["raisons"] == ["email", "nom", "telephone"]
+    # Bloc du standard : chaque contact comparé à ses 5 voisins, pas à tout le bloc
+    assert rapport["comparaisons"] < len(PRENOMS) * 5 + 10
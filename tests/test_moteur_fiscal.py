@@ -0,0 +1,360 @@
+"""Tests de non-régression du moteur fiscal SASU : valeurs de référence et propriétés"""
+import csv
+import io
+import json
+import subprocess
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from moteur_fiscal import (
+    ErreurCalculFiscal,
+    ParametresObjectifNet,
+    ParametresOptimisation,
+    SituationFamiliale,
+    TRANCHES_IR_2025,
+    SEUIL_IS_TAUX_REDUIT_2025,
+    calcul_ir_2025,
+    calcul_is_2025,
+    ca_minimum_pour_net,
+    calculer_salaire_brut_depuis_net,
+    calculer_scenario,
+    optimiser_fiscalite,
+)
+from moteur_fiscal.calculs import (
+    OBJECTIF_MAX_DICHOTOMIES,
+    OBJECTIF_MAX_DOUBLEMENTS,
+    PART_REMUNERATION_MAX,
+    salaire_brut_pour_net,
+    salaire_net_apres_ir,
+    utiliser_table_net_brut,
+)
+from moteur_fiscal.__main__ import lire_parametres
+from moteur_fiscal.table_net_brut import TableNetBrut, construire_table
+from moteur_fiscal.vectorise import calculer_scenarios_vectorises
+
+REFERENCES = json.loads(
+    (Path(__file__).parent / 'fixtures' / 'valeurs_reference_2025.json').read_text(encoding='utf-8')
+)
+
+
+def assert_proche(obtenu: dict, attendu: dict):
+    for cle, valeur in attendu.items():
+        if isinstance(valeur, dict):
+            assert_proche(obtenu[cle], valeur)
+        else:
+            assert obtenu[cle] == pytest.approx(valeur, abs=1e-6), cle
+
+
+# --- Valeurs de référence ---
+
+@pytest.mark.parametrize('cas', REFERENCES['ir'])
+def test_ir_valeurs_reference(cas):
+    assert calcul_ir_2025(cas['revenu_imposable'], cas['nombre_parts']) == pytest.approx(cas['attendu'], abs=1e-6)
+
+
+@pytest.mark.parametrize('cas', REFERENCES['is'])
+def test_is_valeurs_reference(cas):
+    assert calcul_is_2025(cas['benefice']) == pytest.approx(cas['attendu'], abs=1e-6)
+
+
+@pytest.mark.parametrize('cas', REFERENCES['scenarios'])
+def test_scenario_valeurs_reference(cas):
+    scenario = calculer_scenario(
+        cas['ca'], cas['charges'], cas['remuneration_brute'],
+        SituationFamiliale.CELIBATAIRE, cas['nombre_parts'], cas['autres_revenus']
+    )
+    assert_proche(asdict(scenario), cas['attendu'])
+
+
+@pytest.mark.parametrize('cas', REFERENCES['salaire_net'])
+def test_salaire_brut_depuis_net_valeurs_reference(cas):
+    calculs = calculer_salaire_brut_depuis_net(
+        cas['salaire_net_cible'], SituationFamiliale.CELIBATAIRE, cas['nombre_parts'], cas['autres_revenus']
+    )
+    assert_proche(calculs, cas['attendu'])
+
+
+@pytest.mark.parametrize('cas', REFERENCES['optimisation'])
+def test_optimisation_valeurs_reference(cas):
+    resultat = optimiser_fiscalite(ParametresOptimisation(**cas['request']))
+    assert_proche(asdict(resultat), cas['attendu'])
+
+
+# --- Propriétés ---
+
+REVENUS = np.linspace(0, 400000, 2001)
+
+
+@pytest.mark.parametrize('nombre_parts', [1.0, 1.5, 2.0, 3.0])
+def test_ir_croissant(nombre_parts):
+    impots = [calcul_ir_2025(r, nombre_parts) for r in REVENUS]
+    assert all(b >= a for a, b in zip(impots, impots[1:]))
+
+
+def test_is_croissant():
+    impots = [calcul_is_2025(b) for b in REVENUS]
+    assert all(b >= a for a, b in zip(impots, impots[1:]))
+
+
+@pytest.mark.parametrize('seuil', [t[0] for t in TRANCHES_IR_2025[1:]])
+def test_ir_continu_aux_bornes_de_tranche(seuil):
+    epsilon = 1e-3
+    assert calcul_ir_2025(seuil + epsilon) - calcul_ir_2025(seuil - epsilon) < 0.01
+
+
+def test_is_continu_au_seuil_taux_reduit():
+    epsilon = 1e-3
+    ecart = calcul_is_2025(SEUIL_IS_TAUX_REDUIT_2025 + epsilon) - calcul_is_2025(SEUIL_IS_TAUX_REDUIT_2025 - epsilon)
+    assert ecart < 0.01
+
+
+@pytest.mark.parametrize('ca,charges', [(30000, 0), (80000, 15000), (150000, 30000), (500000, 100000)])
+def test_net_disponible_inferieur_au_ca(ca, charges):
+    for part in range(0, 81, 5):
+        scenario = calculer_scenario(
+            ca, charges, (ca - charges) * part / 100, SituationFamiliale.CELIBATAIRE, 1.0, 0.0
+        )
+        assert scenario.net_disponible <= ca
+        assert scenario.net_disponible <= ca - charges
+
+
+def test_optimum_net_croissant_avec_le_ca():
+    nets = [
+        optimiser_fiscalite(ParametresOptimisation(ca_previsionnel=ca, charges_deductibles=10000))
+        .scenario_optimal.net_disponible
+        for ca in range(20000, 400001, 10000)
+    ]
+    assert all(b >= a for a, b in zip(nets, nets[1:]))
+
+
+def test_moteur_vectorise_identique_au_moteur_scalaire():
+    rng = np.random.default_rng(2025)
+    for _ in range(500):
+        ca = rng.uniform(0, 500000)
+        charges = rng.uniform(0, ca)
+        remuneration = rng.uniform(0, ca)
+        nombre_parts = rng.choice([1.0, 1.5, 2.0, 3.0])
+        autres_revenus = rng.uniform(0, 50000)
+        scenario = calculer_scenario(
+            ca, charges, remuneration, SituationFamiliale.CELIBATAIRE, nombre_parts, autres_revenus
+        )
+        vectorise = calculer_scenarios_vectorises(ca, charges, remuneration, nombre_parts, autres_revenus)
+        for cle, valeur in asdict(scenario).items():
+            assert float(vectorise[cle]) == pytest.approx(valeur, rel=1e-9, abs=1e-6), cle
+
+
+@pytest.mark.parametrize('remuneration_nette_souhaitee', [None, 20000])
+def test_courbe_complete_et_scenarios_de_comparaison(remuneration_nette_souhaitee):
+    parametres = ParametresOptimisation(
+        ca_previsionnel=180000, charges_deductibles=30000,
+        remuneration_nette_souhaitee=remuneration_nette_souhaitee, include_curve=True
+    )
+    resultat = optimiser_fiscalite(parametres)
+    courbe = resultat.courbe
+
+    assert len(courbe.part_remuneration) == 17
+    assert courbe.part_remuneration[0] == 0 and courbe.part_remuneration[-1] == pytest.approx(0.8)
+    assert all(len(colonne) == 17 for colonne in asdict(courbe).values())
+    assert courbe.net_disponible[0] == resultat.scenario_dividendes_max.net_disponible
+    assert courbe.net_disponible[-1] == resultat.scenario_remuneration_max.net_disponible
+    if remuneration_nette_souhaitee is None:
+        assert resultat.scenario_optimal.net_disponible == max(courbe.net_disponible)
+
+    sans_courbe = optimiser_fiscalite(
+        ParametresOptimisation(**{**asdict(parametres), 'include_curve': False})
+    )
+    assert sans_courbe.courbe is None
+    assert asdict(sans_courbe.scenario_optimal) == pytest.approx(asdict(resultat.scenario_optimal))
+
+
+@pytest.mark.parametrize('cible,part', [(30000, None), (80000, None), (45000, 0.5), (150000, None)])
+def test_ca_minimum_pour_net(cible, part):
+    parametres = ParametresObjectifNet(
+        net_disponible_cible=cible, charges_deductibles=15000, nombre_parts=2.0, part_remuneration=part
+    )
+    resultat = ca_minimum_pour_net(parametres)
+
+    assert resultat.converge
+    assert resultat.precision_atteinte <= parametres.precision
+    assert resultat.evaluations <= OBJECTIF_MAX_DOUBLEMENTS + OBJECTIF_MAX_DICHOTOMIES + 1
+    assert resultat.net_disponible_obtenu >= cible
+    # Un peu moins de CA ne suffit plus
+    ca_inferieur = resultat.ca_minimum - 2 * parametres.precision
+    if part is None:
+        optimisation = optimiser_fiscalite(ParametresOptimisation(
+            ca_previsionnel=ca_inferieur, charges_deductibles=15000, nombre_parts=2.0
+        ))
+        assert optimisation.scenario_optimal.net_disponible < cible
+    else:
+        scenario = calculer_scenario(
+            ca_inferieur, 15000, (ca_inferieur - 15000) * part, SituationFamiliale.CELIBATAIRE, 2.0, 0.0
+        )
+        assert scenario.net_disponible < cible
+
+
+def test_ca_minimum_pour_net_cible_invalide():
+    with pytest.raises(ErreurCalculFiscal):
+        ca_minimum_pour_net(ParametresObjectifNet(net_disponible_cible=0))
+
+
+@pytest.mark.parametrize('nombre_parts,autres_revenus', [(1.0, 0.0), (2.0, 15000.0), (3.0, 80000.0)])
+def test_inversion_net_brut_exacte(nombre_parts, autres_revenus):
+    for net in np.linspace(0, 300000, 301):
+        brut = salaire_brut_pour_net(net, nombre_parts, autres_revenus)
+        assert salaire_net_apres_ir(brut, nombre_parts, autres_revenus) == pytest.approx(net, abs=1e-6)
+
+
+BORNES = [
+    {'remuneration_brute_min': 40000},
+    {'remuneration_brute_max': 20000},
+    {'remuneration_nette_min': 35000, 'remuneration_nette_max': 50000},
+    {'dividendes_min': 60000},
+    {'dividendes_max': 30000, 'remuneration_brute_max': 100000},
+]
+
+
+def respecte_bornes(scenario, nombre_parts, autres_revenus, bornes, tolerance=0.01):
+    net = salaire_net_apres_ir(scenario.remuneration_brute, nombre_parts, autres_revenus)
+    valeurs = {
+        'remuneration_brute': scenario.remuneration_brute,
+        'remuneration_nette': net,
+        'dividendes': scenario.dividendes_bruts,
+    }
+    for cle, borne in bornes.items():
+        nom, sens = cle.rsplit('_', 1)
+        if sens == 'min' and valeurs[nom] < borne - tolerance:
+            return False
+        if sens == 'max' and valeurs[nom] > borne + tolerance:
+            return False
+    return True
+
+
+@pytest.mark.parametrize('bornes', BORNES)
+def test_optimisation_sous_contraintes(bornes):
+    parametres = ParametresOptimisation(
+        ca_previsionnel=200000, charges_deductibles=30000, nombre_parts=2.0, **bornes
+    )
+    optimal = optimiser_fiscalite(parametres).scenario_optimal
+    assert respecte_bornes(optimal, 2.0, 0.0, bornes)
+
+    # Aucun point admissible d'une grille fine du domaine de recherche ne fait mieux
+    resultat_avant_is = 170000
+    for remuneration in np.linspace(0, resultat_avant_is * PART_REMUNERATION_MAX / 100, 2001):
+        scenario = calculer_scenario(200000, 30000, remuneration, SituationFamiliale.CELIBATAIRE, 2.0, 0.0)
+        if respecte_bornes(scenario, 2.0, 0.0, bornes, tolerance=0):
+            assert scenario.net_disponible <= optimal.net_disponible + 1e-6
+
+
+@pytest.mark.parametrize('ca,charges,nombre_parts', [(60000, 5000, 1.0), (200000, 30000, 2.0), (900000, 100000, 1.0)])
+def test_borne_non_atteinte_sans_effet(ca, charges, nombre_parts):
+    situation = dict(ca_previsionnel=ca, charges_deductibles=charges, nombre_parts=nombre_parts)
+    libre = optimiser_fiscalite(ParametresOptimisation(**situation)).scenario_optimal
+    # Même domaine de recherche dans les deux modes : une borne qui laisse l'optimum libre
+    # admissible ne le change pas, et aucune borne ne fait mieux que l'optimisation libre
+    large = optimiser_fiscalite(ParametresOptimisation(
+        **situation, remuneration_brute_max=libre.remuneration_brute + 10000,
+        dividendes_max=libre.dividendes_bruts + 1000
+    ))
+    assert large.scenario_optimal == libre
+    assert not any('Contrainte active' in r for r in large.recommandations)
+    for bornes in BORNES:
+        try:
+            contraint = optimiser_fiscalite(ParametresOptimisation(**situation, **bornes)).scenario_optimal
+        except ErreurCalculFiscal:
+            continue
+        assert contraint.net_disponible <= libre.net_disponible + 1e-6
+
+
+def test_optimisation_contraintes_incompatibles():
+    with pytest.raises(ErreurCalculFiscal):
+        optimiser_fiscalite(ParametresOptimisation(
+            ca_previsionnel=100000, remuneration_brute_min=50000, dividendes_min=40000
+        ))
+
+
+@pytest.mark.parametrize('nombre_parts,autres_revenus', [(1.0, 0.0), (2.0, 15000.0)])
+def test_remuneration_imposee_net_disponible_avant_ir(nombre_parts, autres_revenus):
+    optimal = optimiser_fiscalite(ParametresOptimisation(
+        ca_previsionnel=150000, charges_deductibles=30000, nombre_parts=nombre_parts,
+        autres_revenus=autres_revenus, remuneration_nette_souhaitee=30000
+    )).scenario_optimal
+    # La rémunération imposée est un salaire net après IR ; le net disponible, comme pour les
+    # scénarios libres, compte le salaire net de cotisations (avant IR) plus les dividendes nets
+    assert salaire_net_apres_ir(optimal.remuneration_brute, nombre_parts, autres_revenus) == pytest.approx(30000)
+    dividendes_nets = optimal.dividendes_bruts - optimal.ir_sur_dividendes - optimal.prelevement_sociaux_dividendes
+    assert optimal.net_disponible == pytest.approx(
+        optimal.remuneration_brute - optimal.cotisations_sociales + dividendes_nets
+    )
+
+
+def test_remuneration_imposee_irrealisable():
+    with pytest.raises(ErreurCalculFiscal, match='impossible avec ce CA'):
+        optimiser_fiscalite(ParametresOptimisation(ca_previsionnel=60000, remuneration_nette_souhaitee=50000))
+
+
+@pytest.fixture
+def table_net_brut(tmp_path):
+    chemin = tmp_path / 'table_net_brut.bin'
+    construire_table(str(chemin), net_max=150000, net_pas=500, nombre_parts=(1.0, 2.0),
+                     autres_revenus_max=50000, autres_revenus_pas=5000)
+    return TableNetBrut(str(chemin))
+
+
+def test_table_net_brut_proche_du_solveur_exact(table_net_brut):
+    assert table_net_brut.a_jour()
+    rng = np.random.default_rng(36)
+    for _ in range(2000):
+        net, nombre_parts, autres_revenus = rng.uniform(0, 150000), rng.choice([1.0, 2.0]), rng.uniform(0, 50000)
+        brut = table_net_brut.salaire_brut(net, nombre_parts, autres_revenus)
+        assert salaire_net_apres_ir(brut, nombre_parts, autres_revenus) == pytest.approx(net, abs=0.5)
+
+
+@pytest.mark.parametrize('net,nombre_parts,autres_revenus', [(200000, 1.0, 0), (30000, 1.5, 0), (30000, 1.0, 80000)])
+def test_table_net_brut_hors_grille(table_net_brut, net, nombre_parts, autres_revenus):
+    assert table_net_brut.salaire_brut(net, nombre_parts, autres_revenus) is None
+    utiliser_table_net_brut(table_net_brut)
+    try:
+        calculs = calculer_salaire_brut_depuis_net(net, SituationFamiliale.CELIBATAIRE, nombre_parts, autres_revenus)
+    finally:
+        utiliser_table_net_brut(None)
+    assert calculs['salaire_brut'] == pytest.approx(salaire_brut_pour_net(net, nombre_parts, autres_revenus))
+
+
+def test_table_net_brut_fichier_invalide(tmp_path):
+    chemin = tmp_path / 'invalide.bin'
+    chemin.write_bytes(b'pas une table')
+    with pytest.raises(ValueError):
+        TableNetBrut(str(chemin))
+
+
+# --- CLI CSV ---
+
+def test_cli_lecture_des_colonnes():
+    parametres = lire_parametres({"ca_previsionnel": "100000", "nombre_parts": "2,5",
+                                  "situation_familiale": "Marie", "include_curve": "true", "inconnue": "x"})
+    assert (parametres.ca_previsionnel, parametres.nombre_parts, parametres.include_curve) == (100000, 2.5, True)
+    assert parametres.situation_familiale == SituationFamiliale.MARIE
+    assert lire_parametres({"ca_previsionnel": "1", "include_curve": "Non"}).include_curve is False
+    with pytest.raises(ValueError, match="include_curve"):
+        lire_parametres({"ca_previsionnel": "1", "include_curve": "peut-être"})
+
+
+def test_cli_entree_standard_vers_sortie_standard():
+    entree = ("ca_previsionnel;charges_deductibles;include_curve\n"
+              "120000;20000;false\n"
+              "abc;0;true\n")
+    execution = subprocess.run(
+        [sys.executable, "-m", "moteur_fiscal", "-d", ";"], input=entree, capture_output=True, text=True,
+        cwd=Path(__file__).parent.parent / "backend", check=True,
+    )
+    lignes = list(csv.DictReader(io.StringIO(execution.stdout), delimiter=";"))
+    assert len(lignes) == 2
+    attendu = optimiser_fiscalite(ParametresOptimisation(ca_previsionnel=120000, charges_deductibles=20000))
+    assert lignes[0]["erreur"] == "" and lignes[0]["include_curve"] == "false"
+    assert float(lignes[0]["net_disponible"]) == pytest.approx(attendu.scenario_optimal.net_disponible, abs=0.01)
+    assert "abc" in lignes[1]["erreur"] and lignes[1]["net_disponible"] == ""
+    assert "2 situation(s) traitée(s), 1 en erreur" in execution.stderr
@@ -0,0 +1,281 @@
+"""Tests de l'observabilité : métriques, écouteurs MongoDB, journal des requêtes lentes, traces, profilage"""
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from observabilite import (
+    EcouteurCommandesLentes,
+    EcouteurCommandesMongo,
+    JournalLent,
+    MiddlewareMetriques,
+    MiddlewareProfilage,
+    MiddlewareRequetesLentes,
+    MiddlewareTraces,
+    Profileur,
+    RouteTracee,
+    Traceur,
+    profil_courant,
+    profil_explicite,
+    registre,
+    span,
+)
+from observabilite.metriques import Histogramme, http_duree, http_en_cours, http_requetes, mongo_duree, mongo_erreurs
+from observabilite.requetes_lentes import forme, requete_courante, resumer_plan
+from observabilite.traces import ExportateurMemoire
+
+
+def creer_app():
+    app = FastAPI()
+
+    @app.get("/test-metriques/{element_id}")
+    async def lire_element(element_id: str):
+        return {"id": element_id}
+
+    app.add_middleware(MiddlewareMetriques)
+    return app
+
+
+def test_metriques_par_modele_de_route():
+    client = TestClient(creer_app())
+    avant = http_requetes.valeur('GET', '/test-metriques/{element_id}', '200')
+    for element_id in ('a', 'b', 'c'):
+        assert client.get(f"/test-metriques/{element_id}").status_code == 200
+    assert client.delete("/test-metriques/a").status_code == 405
+    assert client.get("/absent/123").status_code == 404
+
+    assert http_requetes.valeur('GET', '/test-metriques/{element_id}', '200') == avant + 3
+    assert http_requetes.valeur('DELETE', '/test-metriques/{element_id}', '405') >= 1
+    assert http_requetes.valeur('GET', '<inconnue>', '404') >= 1
+    assert http_duree.compte('GET', '/test-metriques/{element_id}') >= 3
+    assert http_en_cours.valeur('GET', '/test-metriques/{element_id}') == 0
+    # Aucune série par identifiant
+    assert 'route="/test-metriques/a"' not in registre.exposer()
+
+
+def test_histogramme_cumulatif():
+    histogramme = Histogramme('test_duree_secondes', "Test", ('op',), buckets=(0.1, 1.0))
+    for valeur in (0.05, 0.5, 0.5, 3.0):
+        histogramme.observer(valeur, 'x')
+    lignes = list(histogramme.lignes())
+
+    assert '# TYPE test_duree_secondes histogram' in lignes
+    assert 'test_duree_secondes_bucket{op="x",le="0.1"} 1' in lignes
+    assert 'test_duree_secondes_bucket{op="x",le="1.0"} 3' in lignes
+    assert 'test_duree_secondes_bucket{op="x",le="+Inf"} 4' in lignes
+    assert 'test_duree_secondes_count{op="x"} 4' in lignes
+
+
+def test_ecouteur_commandes_mongo():
+    ecouteur = EcouteurCommandesMongo()
+    avant = mongo_duree.compte('test_prospects', 'find')
+    erreurs_avant = mongo_erreurs.valeur('test_prospects', 'insert')
+
+    commandes = [('find', 1, True), ('insert', 2, False)]
+    for nom, request_id, _ in commandes:
+        ecouteur.started(SimpleNamespace(
+            command_name=nom, command={nom: 'test_prospects'}, connection_id=('h', 1), request_id=request_id
+        ))
+    for nom, request_id, succes in commandes:
+        evenement = SimpleNamespace(
+            command_name=nom, connection_id=('h', 1), request_id=request_id, duration_micros=1500
+        )
+        (ecouteur.succeeded if succes else ecouteur.failed)(evenement)
+
+    assert mongo_duree.compte('test_prospects', 'find') == avant + 1
+    assert mongo_erreurs.valeur('test_prospects', 'insert') == erreurs_avant + 1
+    assert not ecouteur._collections
+
+
+# --- Journal des requêtes et commandes lentes ---
+
+def entrees_journal(caplog):
+    return [json.loads(r.getMessage()) for r in caplog.records if r.name == 'requetes_lentes']
+
+
+def test_forme_du_filtre_sans_valeurs():
+    filtre = {
+        "client_id": "c-42",
+        "date_creation": {"$lt": "2025-01-01"},
+        "$or": [{"statut": "gagne"}, {"montant": {"$in": [1, 2, 3]}}],
+    }
+    assert forme(filtre) == {
+        "client_id": "?",
+        "date_creation": {"$lt": "?"},
+        "$or": [{"statut": "?"}, {"montant": {"$in": ["?"]}}],
+    }
+
+
+@pytest.mark.parametrize('taux,journalise', [(1.0, True), (0.0, False)])
+def test_requete_lente_journalisee(caplog, taux, journalise):
+    app = creer_app()
+    app.add_middleware(MiddlewareRequetesLentes, journal=JournalLent(0, 0, taux))
+    with caplog.at_level(logging.WARNING, logger='requetes_lentes'):
+        TestClient(app).get("/test-metriques/a")
+
+    entrees = entrees_journal(caplog)
+    if not journalise:
+        assert entrees == []
+        return
+    assert entrees[0]["type"] == "requete_lente"
+    assert entrees[0]["route"] == "/test-metriques/{element_id}"
+    assert entrees[0]["statut"] == 200 and entrees[0]["octets"] > 0
+
+
+@pytest.mark.parametrize('duree_micros,journalise', [(250000, True), (2000, False)])
+def test_commande_lente_journalisee(caplog, duree_micros, journalise):
+    ecouteur = EcouteurCommandesLentes(JournalLent(500, 100))
+    requete = {"route": "/api/clients/{client_id}", "mongo_commandes": 0, "mongo_ms": 0.0}
+    jeton = requete_courante.set(requete)
+    try:
+        ecouteur.started(SimpleNamespace(
+            command_name='find', database_name='crm', connection_id=('h', 1), request_id=7,
+            command={'find': 'simulations', 'filter': {'client_id': 'secret'}, 'sort': {'date_creation': -1}}
+        ))
+    finally:
+        requete_courante.reset(jeton)
+    with caplog.at_level(logging.WARNING, logger='requetes_lentes'):
+        ecouteur.succeeded(SimpleNamespace(
+            command_name='find', connection_id=('h', 1), request_id=7, duration_micros=duree_micros,
+            reply={'cursor': {'firstBatch': [{'a': 1}, {'a': 2}], 'id': 0}, 'ok': 1.0}
+        ))
+
+    assert requete["mongo_commandes"] == 1
+    assert requete["mongo_ms"] == duree_micros / 1000
+    entrees = entrees_journal(caplog)
+    if not journalise:
+        assert entrees == []
+        return
+    assert entrees == [{
+        "type": "commande_lente", "route": "/api/clients/{client_id}", "collection": "simulations",
+        "commande": "find", "duree_ms": duree_micros / 1000, "filtre": {"client_id": "?"},
+        "tri": {"date_creation": -1}, "documents": 2, "octets": entrees[0]["octets"],
+    }]
+    assert 'secret' not in json.dumps(entrees)
+
+
+def test_resume_du_plan():
+    explication = {"queryPlanner": {"winningPlan": {
+        "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "client_id_1_cle_1"}
+    }}}
+    assert resumer_plan(explication) == {"etapes": ["FETCH", "IXSCAN"], "index": ["client_id_1_cle_1"]}
+
+
+# --- Traces ---
+
+def creer_app_tracee(exportateur):
+    app = FastAPI()
+    routeur = APIRouter(route_class=RouteTracee)
+
+    @routeur.get("/test-traces/{element_id}")
+    async def lire_element(element_id: str):
+        with span("calcul", element=element_id):
+            return {"id": element_id}
+
+    app.include_router(routeur)
+    app.add_middleware(MiddlewareTraces, traceur=Traceur(exportateur))
+    return app
+
+
+def test_spans_imbriques_par_phase():
+    exportateur = ExportateurMemoire()
+    reponse = TestClient(creer_app_tracee(exportateur)).get("/test-traces/a")
+
+    (spans,) = exportateur.traces
+    par_nom = {s.nom: s for s in spans}
+    assert set(par_nom) == {
+        "GET /test-traces/{element_id}", "route", "validation_entree", "handler", "serialisation", "calcul"
+    }
+    racine = par_nom["GET /test-traces/{element_id}"]
+    assert racine.parent_id is None and racine.attributs["statut"] == 200
+    assert par_nom["route"].parent_id == racine.span_id
+    for phase in ("validation_entree", "handler", "serialisation"):
+        assert par_nom[phase].parent_id == par_nom["route"].span_id
+    assert par_nom["calcul"].parent_id == par_nom["handler"].span_id
+    assert par_nom["calcul"].attributs == {"element": "a"}
+    assert len({s.trace.trace_id for s in spans}) == 1
+    assert reponse.headers["traceparent"] == f"00-{racine.trace.trace_id}-{racine.span_id}-01"
+
+
+def test_traceparent_entrant_propage():
+    exportateur = ExportateurMemoire()
+    client = TestClient(creer_app_tracee(exportateur))
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+
+    client.get("/test-traces/a", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+    client.get("/test-traces/b", headers={"traceparent": f"00-{trace_id}-{parent_id}-00"})
+
+    (spans,) = exportateur.traces  # La requête non échantillonnée n'est pas tracée
+    racine = next(s for s in spans if s.nom.startswith("GET"))
+    assert racine.trace.trace_id == trace_id and racine.parent_id == parent_id
+
+
+def test_sans_trace_active_aucun_span():
+    client = TestClient(creer_app_tracee(None))
+    assert client.get("/test-traces/a").json() == {"id": "a"}
+    with span("hors_requete") as courant:
+        assert courant is None
+
+
+# --- Profilage ---
+
+def creer_app_profilee(profileur):
+    app = creer_app()
+    app.add_middleware(MiddlewareProfilage, profileur=profileur)
+    return app
+
+
+@pytest.mark.parametrize('valeur,format_attendu', [('1', 'pstats'), ('echantillonnage', 'collapsed')])
+def test_profil_sur_demande(tmp_path, valeur, format_attendu):
+    profileur = Profileur('jeton-admin', str(tmp_path))
+    client = TestClient(creer_app_profilee(profileur))
+
+    reponse = client.get("/test-metriques/a", headers={"X-Profile": valeur, "X-Profile-Token": "jeton-admin"})
+    profil_id = reponse.headers["x-profile-id"]
+    (metadonnees,) = profileur.lister()
+    assert metadonnees["id"] == profil_id and metadonnees["format"] == format_attendu
+    assert metadonnees["chemin"] == "/test-metriques/a" and metadonnees["statut"] == 200
+    contenu, format_profil = profileur.lire(profil_id)
+    assert format_profil == format_attendu
+    if format_attendu == 'pstats':
+        assert 'function calls' in profileur.lire(profil_id, texte=True)[0]
+
+
+def test_profil_refuse_sans_jeton_valide(tmp_path):
+    profileur = Profileur('jeton-admin', str(tmp_path))
+    client = TestClient(creer_app_profilee(profileur))
+    reponse = client.get("/test-metriques/a", headers={"X-Profile": "1", "X-Profile-Token": "mauvais"})
+    assert "x-profile-id" not in reponse.headers
+    assert profileur.lister() == []
+    assert profileur.lire('../../etc/passwd') is None
+
+
+def test_profils_conserves_bornes(tmp_path):
+    profileur = Profileur('jeton-admin', str(tmp_path), profils_max=2)
+    client = TestClient(creer_app_profilee(profileur))
+    for _ in range(4):
+        client.get("/test-metriques/a", headers={"X-Profile": "1", "X-Profile-Token": "jeton-admin"})
+    assert len(profileur.lister()) == 2
+    assert len(list(tmp_path.iterdir())) == 4
+
+
+def test_profil_echantillonne_non_explicite(tmp_path):
+    profileur = Profileur('jeton-admin', str(tmp_path), taux_echantillon=1.0)
+    app = creer_app_profilee(profileur)
+
+    @app.get("/test-profil-contexte")
+    async def contexte():
+        return {"profil": profil_courant.get(), "explicite": profil_explicite.get()}
+
+    client = TestClient(app)
+    echantillonne = client.get("/test-profil-contexte")
+    assert echantillonne.json() == {"profil": echantillonne.headers["x-profile-id"], "explicite": False}
+    demande = client.get("/test-profil-contexte", headers={"X-Profile": "1", "X-Profile-Token": "jeton-admin"})
+    assert demande.json() == {"profil": demande.headers["x-profile-id"], "explicite": True}
+    # Jeton invalide : pas de profil explicite, la requête retombe dans l'échantillonnage
+    assert client.get("/test-profil-contexte", headers={"X-Profile": "1", "X-Profile-Token": "mauvais"}) \
+        .json()["explicite"] is False
+    assert profil_explicite.get() is False
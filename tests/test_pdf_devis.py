@@ -0,0 +1,48 @@
+"""Tests du rendu PDF des devis et du cache d'artefacts"""
+import re
+import zlib
+
+from pdf_devis import CacheArtefacts, empreinte_devis, rendre_devis_pdf
+
+DEVIS = {"numero": "DEV-0042", "titre": "Étude (phase 1)", "statut": "envoye", "taux_tva": 20.0,
+         "montant_ht": 300.0, "montant_tva": 60.0, "montant_ttc": 360.0, "date_creation": "2025-06-01T00:00:00",
+         "date_modification": "2025-06-02T00:00:00",
+         "lignes": [{"description": "Audit \\ conseil", "quantite": 2, "prix_unitaire": 150.0, "montant": 300.0}]}
+CLIENT = {"nom": "Durand", "prenom": "Anne", "entreprise": "Durand SARL"}
+
+
+def test_pdf_deterministe_et_bien_forme():
+    pdf = rendre_devis_pdf(DEVIS, CLIENT)
+    assert pdf == rendre_devis_pdf(DEVIS, CLIENT)
+    # Chaque entrée de la table xref pointe sur le début de son objet
+    debut_xref = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    positions = [int(p) for p in re.findall(rb"(\d{10}) 00000 n ", pdf[debut_xref:])]
+    assert all(pdf[p:].startswith(b"%d 0 obj" % numero) for numero, p in enumerate(positions, start=1))
+
+    contenu = zlib.decompress(re.search(rb"stream\n(.*?)\nendstream", pdf, re.S).group(1))
+    assert b"(\xc9tude \\(phase 1\\))" in contenu  # WinAnsi, parenthèses échappées
+    assert b"(Audit \\\\ conseil)" in contenu
+    assert b"(360,00 \x80)" in contenu and b"(Statut : Envoy\xe9)" in contenu
+
+
+def test_empreinte_independante_de_la_date_de_modification():
+    autre_date = {**DEVIS, "date_modification": "2030-01-01T00:00:00"}
+    assert empreinte_devis(autre_date, CLIENT) == empreinte_devis(DEVIS, CLIENT)
+    assert empreinte_devis({**DEVIS, "titre": "Autre"}, CLIENT) != empreinte_devis(DEVIS, CLIENT)
+    assert empreinte_devis(DEVIS, {**CLIENT, "nom": "Martin"}) != empreinte_devis(DEVIS, CLIENT)
+
+
+def test_cache_borne_en_octets():
+    cache = CacheArtefacts(taille_max_octets=10)
+    cache.enregistrer("a", b"1234")
+    cache.enregistrer("b", b"5678")
+    assert cache.lire("a") == b"1234"
+    cache.enregistrer("c", b"9012")  # "b", le moins récemment lu, sort
+    assert cache.lire("b") is None and cache.lire("c") == b"9012"
+    cache.enregistrer("d", b"x" * 11)  # plus grand que le cache : ignoré
+    assert cache.lire("d") is None
+
+    cache.associer(("devis", "2025-06-02"), "a")
+    assert cache.empreinte(("devis", "2025-06-02")) == "a" and cache.empreinte(("devis", "autre")) is None
+    statistiques = cache.stats()
+    assert (statistiques["artefacts"], statistiques["octets"], statistiques["evictions"]) == (2, 8, 1)
@@ -0,0 +1,47 @@
+"""Tests de la recherche transverse : termes indexés, jetons de requête et classement"""
+from recherche import LONGUEUR_MAX, classer, entree_recherche, jetons_requete, requetes_candidats, termes
+
+
+def test_termes_prefixes_normalises():
+    assert termes(["Élodie"]) == ["=elodie", "el", "elo", "elod", "elodi", "elodie"]
+    assert {"42", "004", "=0042", "=42"} <= set(termes(["DEV-0042"]))
+    # Préfixes bornés, mot entier complet
+    assert max(len(t) for t in termes(["Anticonstitutionnellement"]) if t[0] != "=") == LONGUEUR_MAX
+    assert "=anticonstitutionnellement" in termes(["Anticonstitutionnellement"])
+    assert termes([None, "a"]) == []
+
+
+def test_requetes_de_candidats():
+    assert requetes_candidats(["du"]) == [["du"], ["=du"]]
+    assert requetes_candidats(["anne", "du"]) == [
+        ["anne", "du"], ["=anne", "=du"], ["=anne", "du"], ["anne", "=du"]]
+
+
+def test_jetons_de_requete():
+    assert jetons_requete("  Dur  ANNE, dur ") == ["dur", "anne"]
+    assert jetons_requete("a é") == []
+
+
+def test_entree_de_recherche_par_type():
+    prospect = entree_recherche("prospect", {"id": "p1", "prenom": "Anne", "nom": "Durand", "entreprise": "Durand SARL",
+                                             "email": "anne@exemple.fr", "date_creation": "2025-01-01"})
+    assert (prospect["cle"], prospect["libelle"], prospect["detail"]) == \
+        ("prospect:p1", "Anne Durand", "Durand SARL · anne@exemple.fr")
+    assert "exemple" in prospect["termes"] and prospect["date"] == "2025-01-01"
+    devis = entree_recherche("devis", {"id": "d1", "numero": "DEV-0042", "titre": "Toiture"})
+    assert devis["libelle"] == "DEV-0042 · Toiture" and devis["detail"] is None
+
+
+def test_classement():
+    candidats = [
+        entree_recherche("devis", {"id": "d1", "numero": "DEV-0001", "titre": "Durandal", "date_creation": "2025-05-01"}),
+        entree_recherche("prospect", {"id": "p1", "prenom": "Anne", "nom": "Durand", "date_creation": "2025-01-01"}),
+        entree_recherche("client", {"id": "c1", "prenom": "Paul", "nom": "Durand", "date_creation": "2025-01-01"}),
+        entree_recherche("client", {"id": "c2", "prenom": "Marc", "nom": "Dupont", "entreprise": "Durand SA",
+                                    "date_creation": "2025-06-01"}),
+    ]
+    # Mot entier d'abord, dans le libellé avant le détail, client avant prospect, préfixe seul en dernier
+    assert [e["id"] for e in classer(candidats, ["durand"], 10)] == ["c1", "p1", "c2", "d1"]
+    assert [e["id"] for e in classer(candidats, ["anne", "dur"], 10)] == ["p1"]
+    assert [e["id"] for e in classer(candidats, ["dur"], 2)] == ["c1", "p1"]
+    assert [e["id"] for e in classer(candidats, ["1"], 10)] == ["d1"]